@@ -0,0 +1,133 @@
+"""
+AMD GPU / APU telemetry from the amdgpu driver's sysfs files.
+
+For each /sys/class/drm/card<N>/device bound to amdgpu, the files are
+opened once and re-read with preadv() (backend.procfs):
+
+    mem_info_vram_used / _total   VRAM (on APUs such as Strix Halo: the
+                                  BIOS carve-out)
+    mem_info_gtt_used / _total    GTT: system RAM mapped for the GPU, i.e.
+                                  unified memory beyond the carve-out
+    gpu_busy_percent, mem_busy_percent
+    hwmon/hwmon*/power1_average   (or power1_input; microwatts)
+    hwmon/hwmon*/temp1_input      (millidegrees C)
+
+GTT is reported separately from VRAM. `root` can point at a fixture tree
+(containing sys/) for offline runs.
+"""
+import glob
+import os
+from typing import Dict, List, Optional
+
+from backend.procfs import _PreadFile
+
+GB = 1024**3
+
+AMD_VENDOR_ID = "0x1002"
+
+# Per-device series; the metrics log has one gpu<i>_<field> column each
+AMD_DEVICE_FIELDS = ["vram_used_gb", "vram_total_gb", "gtt_used_gb", "gtt_total_gb",
+                     "util_pct", "mem_util_pct", "power_w", "temp_c"]
+
+# field -> (sysfs file relative to the device dir, scale to the reported unit)
+_DEVICE_FILES = {
+    "vram_used_gb": ("mem_info_vram_used", 1 / GB),
+    "vram_total_gb": ("mem_info_vram_total", 1 / GB),
+    "gtt_used_gb": ("mem_info_gtt_used", 1 / GB),
+    "gtt_total_gb": ("mem_info_gtt_total", 1 / GB),
+    "util_pct": ("gpu_busy_percent", 1),
+    "mem_util_pct": ("mem_busy_percent", 1),
+}
+_HWMON_FILES = {
+    "power_w": (("power1_average", "power1_input"), 1e-6),
+    "temp_c": (("temp1_input",), 1e-3),
+}
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def find_devices(root: str = "/") -> List[str]:
+    """Device dirs of the amdgpu cards (card<N>, not their connectors), by card number."""
+    found = []
+    for card in glob.glob(os.path.join(root, "sys/class/drm/card[0-9]*")):
+        name = os.path.basename(card)
+        if not name[4:].isdigit():
+            continue  # card0-DP-1 etc.
+        device = os.path.join(card, "device")
+        if _read_text(os.path.join(device, "vendor")) != AMD_VENDOR_ID:
+            continue
+        if os.path.exists(os.path.join(device, "mem_info_vram_total")):
+            found.append((int(name[4:]), device))
+    return [device for _, device in sorted(found)]
+
+
+def device_name(device: str) -> str:
+    name = _read_text(os.path.join(device, "product_name"))
+    if name:
+        return name
+    pci_id = _read_text(os.path.join(device, "device"))
+    return f"AMD GPU ({pci_id})" if pci_id else "AMD GPU"
+
+
+class AmdGpuDevices:
+    """Cached sysfs handles of every amdgpu device, sampled per device."""
+
+    def __init__(self, root: str = "/"):
+        self.root = root
+        self.paths = find_devices(root)
+        self.names = [device_name(p) for p in self.paths]
+        # Per device: field -> (open file, scale); fields without a file are left out
+        self._files: List[Dict[str, tuple]] = []
+        for path in self.paths:
+            files = {}
+            for field, (rel, scale) in _DEVICE_FILES.items():
+                self._open(files, field, os.path.join(path, rel), scale)
+            hwmons = sorted(glob.glob(os.path.join(path, "hwmon", "hwmon*")))
+            for field, (names, scale) in _HWMON_FILES.items():
+                for hwmon in hwmons:
+                    for name in names:
+                        if field not in files:
+                            self._open(files, field, os.path.join(hwmon, name), scale)
+            self._files.append(files)
+
+    @staticmethod
+    def _open(files: Dict, field: str, path: str, scale: float):
+        try:
+            files[field] = (_PreadFile(path, 64), scale)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self.paths)
+
+    def sample(self) -> List[Dict]:
+        out = []
+        for i, files in enumerate(self._files):
+            dev = {"index": i, "name": self.names[i]}
+            dev.update({f: None for f in AMD_DEVICE_FIELDS})
+            for field, (f, scale) in files.items():
+                try:
+                    n = f.read()
+                    dev[field] = int(f.buf[:n]) * scale
+                except (OSError, ValueError):
+                    pass  # e.g. power1_average is EINVAL while the GPU is in a deep sleep state
+            out.append(dev)
+        return out
+
+    def power_w(self) -> Optional[float]:
+        """Power summed over devices (W)."""
+        power = [d["power_w"] for d in self.sample() if d["power_w"] is not None]
+        return sum(power) if power else None
+
+    def close(self):
+        for files in self._files:
+            for f, _ in files.values():
+                f.close()
+        self._files = []
+        self.paths = []
@@ -0,0 +1,188 @@
+import os
+import time
+from typing import Dict, List, Optional
+
+import psutil
+
+from backend.clock import now_ns
+
+MB = 1024 ** 2
+GB = 1024 ** 3
+
+# Per-request resource columns appended to requests_<mode>.csv
+RESOURCE_COLUMNS = [
+    "attribution",
+    "prefill_read_mb", "prefill_write_mb", "decode_read_mb", "decode_write_mb",
+    "prefill_swap_in_mb", "prefill_swap_out_mb", "decode_swap_in_mb", "decode_swap_out_mb",
+    "prefill_rss_delta_mb", "decode_rss_delta_mb", "peak_rss_gb",
+    "prefill_peak_ram_gb", "decode_peak_ram_gb",
+    "prefill_peak_vram_gb", "decode_peak_vram_gb",
+    "prefill_peak_swap_gb", "decode_peak_swap_gb",
+    "prefill_energy_j", "decode_energy_j"
+]
+
+# Cumulative counters carried by both request snapshots and telemetry samples
+BYTE_COUNTERS = ["read_bytes", "write_bytes", "swap_in_bytes", "swap_out_bytes"]
+
+
+class ResourceCounters:
+    """
+    Cheap cumulative counters snapshotted at request start, first token and end:
+    tier-3 block device bytes, swap in/out and the server process tree RSS.
+    """
+
+    def __init__(self, storage_device: str, tracker=None, clock=None):
+        self.storage_device = storage_device
+        self.clock = clock
+        self._sysfs_stat = f"/sys/block/{storage_device}/stat"
+        if not os.path.exists(self._sysfs_stat):
+            self._sysfs_stat = None
+        self.tracker = tracker
+
+    def _disk_bytes(self):
+        if self._sysfs_stat:
+            # Fields 3 and 7 are sectors read / written (always 512-byte units)
+            with open(self._sysfs_stat) as f:
+                fields = f.read().split()
+            return int(fields[2]) * 512, int(fields[6]) * 512
+        io = psutil.disk_io_counters(perdisk=True).get(self.storage_device)
+        if io:
+            return io.read_bytes, io.write_bytes
+        return 0, 0
+
+    def read(self) -> Dict[str, float]:
+        snap = {"timestamp": self.clock.time() if self.clock else time.time(), "mono_ns": now_ns()}
+        try:
+            snap["read_bytes"], snap["write_bytes"] = self._disk_bytes()
+        except Exception:
+            snap["read_bytes"], snap["write_bytes"] = 0, 0
+        try:
+            swap = psutil.swap_memory()
+            snap["swap_in_bytes"], snap["swap_out_bytes"] = swap.sin, swap.sout
+        except Exception:
+            snap["swap_in_bytes"], snap["swap_out_bytes"] = 0, 0
+        snap["rss_bytes"] = None
+        if self.tracker is not None:
+            # Not tracker.sample(): it holds the tracker lock through a full tree walk
+            snap["rss_bytes"] = self.tracker.rss()
+        return snap
+
+
+def _phases(m) -> Dict[str, tuple]:
+    """(start, end) monotonic ns windows (backend.clock) of a request's prefill and decode phases."""
+    return {"prefill": (m.start_ns, m.first_token_ns), "decode": (m.first_token_ns, m.end_ns)}
+
+
+def _overlaps_others(m, others) -> bool:
+    start, end = m.start_ns, m.end_ns
+    for o in others:
+        if o is m:
+            continue
+        if o.start_ns < end and start < o.end_ns:
+            return True
+    return False
+
+
+def _apportion(windows: List[tuple], samples: List[Dict],
+               counters: List[str] = BYTE_COUNTERS) -> List[Dict[str, float]]:
+    """
+    Split each telemetry interval's counter deltas across the phase windows
+    active in it. Inside an interval the deltas are assumed uniform in time;
+    every sub-segment's share is divided equally among the windows overlapping it.
+    """
+    totals = [{k: 0.0 for k in counters} for _ in windows]
+    for prev, cur in zip(samples, samples[1:]):
+        t_a, t_b = prev["mono_ns"], cur["mono_ns"]
+        span = t_b - t_a
+        if span <= 0:
+            continue
+        active = [i for i, (s, e) in enumerate(windows) if s < t_b and t_a < e]
+        if not active:
+            continue
+        deltas = {k: max(0, cur[k] - prev[k]) for k in counters}
+
+        # Sub-segment boundaries inside this interval
+        cuts = {t_a, t_b}
+        for i in active:
+            s, e = windows[i]
+            cuts.update(t for t in (s, e) if t_a < t < t_b)
+        cuts = sorted(cuts)
+
+        for seg_a, seg_b in zip(cuts, cuts[1:]):
+            owners = [i for i in active if windows[i][0] < seg_b and seg_a < windows[i][1]]
+            if not owners:
+                continue
+            frac = (seg_b - seg_a) / span / len(owners)
+            for i in owners:
+                for k in counters:
+                    totals[i][k] += deltas[k] * frac
+    return totals
+
+
+def _peak(samples: List[Dict], start: float, end: float, key: str) -> Optional[float]:
+    """Peak of a gauge over a window (or the next sample, for windows shorter than a tick)."""
+    vals = [s[key] for s in samples if start <= s["mono_ns"] <= end and s.get(key) is not None]
+    if not vals:
+        after = next((s for s in samples if s["mono_ns"] > end), None)
+        if after is not None and after.get(key) is not None:
+            vals.append(after[key])
+    return round(max(vals), 3) if vals else None
+
+
+def attribute_requests(metrics: List, samples: List[Dict]):
+    """
+    Fill `m.resources` for every request with prefill/decode deltas and peaks.
+
+    Requests that ran alone use their exact counter snapshots (start, first
+    token, end). Overlapping requests share the device-wide telemetry
+    timeline: byte deltas are apportioned by time overlap, peaks are taken
+    over each phase window.
+    """
+    windows = []
+    owners = []
+    for m in metrics:
+        for phase, window in _phases(m).items():
+            windows.append(window)
+            owners.append((m, phase))
+    shared = _apportion(windows, samples) if samples else [None] * len(windows)
+    # Energy (backend.energy) only exists on the timeline: always apportioned
+    energy_samples = [s for s in samples if s.get("energy_j") is not None]
+    energy = _apportion(windows, energy_samples, ["energy_j"]) if energy_samples else None
+
+    per_request = {}
+    per_request_energy = {}
+    for i, ((m, phase), share) in enumerate(zip(owners, shared)):
+        per_request.setdefault(id(m), {})[phase] = share
+        per_request_energy.setdefault(id(m), {})[phase] = energy[i]["energy_j"] if energy else None
+
+    for m in metrics:
+        res = {}
+        snaps = m.counters or {}
+        exact = all(k in snaps for k in ("start", "first", "end")) and not _overlaps_others(m, metrics)
+        res["attribution"] = "exact" if exact else "apportioned"
+
+        for phase, (a, b) in (("prefill", ("start", "first")), ("decode", ("first", "end"))):
+            if exact:
+                deltas = {k: snaps[b][k] - snaps[a][k] for k in BYTE_COUNTERS}
+            else:
+                deltas = per_request[id(m)][phase] or {k: 0.0 for k in BYTE_COUNTERS}
+            res[f"{phase}_read_mb"] = round(deltas["read_bytes"] / MB, 2)
+            res[f"{phase}_write_mb"] = round(deltas["write_bytes"] / MB, 2)
+            res[f"{phase}_swap_in_mb"] = round(deltas["swap_in_bytes"] / MB, 2)
+            res[f"{phase}_swap_out_mb"] = round(deltas["swap_out_bytes"] / MB, 2)
+
+            rss_a = snaps.get(a, {}).get("rss_bytes")
+            rss_b = snaps.get(b, {}).get("rss_bytes")
+            res[f"{phase}_rss_delta_mb"] = round((rss_b - rss_a) / MB, 2) \
+                if rss_a is not None and rss_b is not None else None
+
+            start, end = _phases(m)[phase]
+            res[f"{phase}_peak_ram_gb"] = _peak(samples, start, end, "ram_used_gb")
+            res[f"{phase}_peak_vram_gb"] = _peak(samples, start, end, "vram_used_gb")
+            res[f"{phase}_peak_swap_gb"] = _peak(samples, start, end, "swap_used_gb")
+            joules = per_request_energy[id(m)][phase]
+            res[f"{phase}_energy_j"] = round(joules, 3) if joules is not None else None
+
+        rss = [s.get("rss_bytes") for s in snaps.values() if s.get("rss_bytes") is not None]
+        res["peak_rss_gb"] = round(max(rss) / GB, 3) if rss else None
+        m.resources = res
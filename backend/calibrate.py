@@ -0,0 +1,118 @@
+"""
+One-shot sampler calibration: the sampling rates this host can sustain.
+
+Every sampler the telemetry config enables (cgroup and server need a
+running group / server and are left out) is built as TelemetryCollector
+would, warmed up, then run back to back for `seconds`. Per sampler it
+reports the wall and thread-CPU cost per run and
+
+    max_hz          1000 / p95 wall ms (the sampler alone on its thread)
+    budget_hz       the rate at which it uses overhead_pct of one core
+    sustainable_hz  the lower of the two
+
+and per scheduler thread (fast / io) the highest common rate with all its
+samplers on it. Run it on an idle box and again under load:
+
+    python runner.py calibrate --config config.yaml
+"""
+import os
+import time
+from typing import Dict, List
+
+from backend.sampling import SamplerEngine
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def _collector(telemetry_cfg: dict, storage_device: str = None):
+    """A TelemetryCollector with the run's sampler settings; never started, nothing is written."""
+    from telemetry import TelemetryCollector
+
+    kwargs = {"storage_device": storage_device} if storage_device else {}
+    return TelemetryCollector(
+        os.devnull, telemetry_cfg.get('sample_interval_sec') or 1.0,
+        sampler_intervals=telemetry_cfg.get('sampler_intervals'),
+        samplers=telemetry_cfg.get('samplers'),
+        psi=telemetry_cfg.get('psi'),
+        memcomp=telemetry_cfg.get('memcomp'),
+        residency=telemetry_cfg.get('residency'),
+        **kwargs)
+
+
+def calibrate(telemetry_cfg: dict, storage_device: str = None, seconds: float = 2.0,
+              warmup: int = 3, max_runs: int = 2000) -> Dict:
+    """Cost and sustainable rate of each enabled sampler (see module doc)."""
+    overhead_pct = (telemetry_cfg.get('adaptive') or {}).get('overhead_pct', 2.0)
+    collector = _collector(telemetry_cfg, storage_device)
+    intervals = collector.sampler_intervals
+    engine = SamplerEngine("calibrate")
+    results = {}
+    try:
+        # The collector's own builder: without a cgroup or server URL those two are left out
+        collector.build_samplers(engine)
+        for name, sampler in engine.samplers.items():
+            wall, cpu = [], []
+            deadline = None
+            for i in range(warmup + max_runs):
+                if i == warmup:
+                    deadline = time.perf_counter() + seconds
+                t0 = time.perf_counter()
+                c0 = time.thread_time()
+                out = sampler.sample()
+                c1 = time.thread_time()
+                t1 = time.perf_counter()
+                if out is not None:
+                    engine.latest[name] = out  # Later samplers read earlier ones' output
+                if i >= warmup:
+                    wall.append((t1 - t0) * 1000)
+                    cpu.append((c1 - c0) * 1000)
+                    if t1 >= deadline:
+                        break
+
+            p95 = _percentile(wall, 95)
+            mean_cpu = sum(cpu) / len(cpu)
+            max_hz = 1000 / p95 if p95 > 0 else None
+            budget_hz = overhead_pct * 10 / mean_cpu if mean_cpu > 0 else None
+            rates = [r for r in (max_hz, budget_hz) if r is not None]
+            results[name] = {
+                "thread": "io" if sampler.blocking else "fast",
+                "runs": len(wall),
+                "mean_wall_ms": round(sum(wall) / len(wall), 3),
+                "p95_wall_ms": round(p95, 3),
+                "mean_cpu_ms": round(mean_cpu, 3),
+                "max_hz": round(max_hz, 1) if max_hz else None,
+                "budget_hz": round(budget_hz, 1) if budget_hz else None,
+                "sustainable_hz": round(min(rates), 1) if rates else None,
+                "configured_hz": round(1 / intervals[name], 2) if intervals.get(name) else None
+            }
+    finally:
+        engine.stop()
+        if collector._procfs:
+            collector._procfs.close()
+
+    threads = {}
+    for thread in ("fast", "io"):
+        cost = sum(r["p95_wall_ms"] for r in results.values() if r["thread"] == thread)
+        if cost:
+            threads[thread] = {"p95_wall_ms": round(cost, 3), "max_common_hz": round(1000 / cost, 1)}
+    return {"overhead_pct": overhead_pct, "samplers": results, "threads": threads}
+
+
+def print_report(report: Dict):
+    print(f"📊 Sampler calibration (CPU budget {report['overhead_pct']}% of one core per sampler)")
+    print(f"{'sampler':<10} {'thread':<6} {'runs':>6} {'p95 ms':>9} {'cpu ms':>9} "
+          f"{'max Hz':>9} {'budget Hz':>10} {'sustain Hz':>11} {'config Hz':>10}")
+    for name, r in report["samplers"].items():
+        cells = [r[k] if r[k] is not None else "-" for k in
+                 ("max_hz", "budget_hz", "sustainable_hz", "configured_hz")]
+        flag = ""
+        if r["configured_hz"] and r["sustainable_hz"] and r["configured_hz"] > r["sustainable_hz"]:
+            flag = "  ⚠️  configured rate is not sustainable"
+        print(f"{name:<10} {r['thread']:<6} {r['runs']:>6} {r['p95_wall_ms']:>9} {r['mean_cpu_ms']:>9} "
+              f"{cells[0]:>9} {cells[1]:>10} {cells[2]:>11} {cells[3]:>10}{flag}")
+    for thread, t in report["threads"].items():
+        print(f"{thread} thread: all samplers together {t['p95_wall_ms']} ms p95 -> "
+              f"at most {t['max_common_hz']} Hz at a common interval")
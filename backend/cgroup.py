@@ -0,0 +1,489 @@
+"""
+cgroup v2 memory / I/O constraint for the inference server (replaces the
+systemd-run wrapper in limit_runner.sh).
+
+A CgroupConstraint creates (or joins) a group under the cgroup2 mount, writes
+memory.max, memory.swap.max, memory.high and optionally io.max, moves the
+server's processes into it and, on teardown, moves them back and removes the
+group (or restores the limits of a joined group). While it runs it samples
+memory.current, memory.stat, memory.events and memory.pressure, so the
+benchmark knows whether and when the limit was hit.
+
+cgroup v2 does not migrate memory charges: pages a process touched before
+it was moved (model weights, a preallocated KV cache) stay charged to its
+old group, so memory.max only limits what it allocates afterwards. To
+enforce the limit on the whole footprint, launch the server inside the
+group (`python -m backend.cgroup` / limit_runner.sh). add_pids() on running
+processes warns and records their RSS at the move (`precharged_gb`).
+
+`root` defaults to /sys/fs/cgroup; point it at a plain directory to exercise
+the logic without privileges (a fake cgroupfs: control files are created on
+write instead of by the kernel).
+"""
+import argparse
+import os
+import pwd
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from backend.columns import CGROUP_COLUMNS
+from backend.psi import PsiSampler, stall_pct
+from backend.sampling import Sampler
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+GB = 1024**3
+
+# memory.stat fields kept in samples (bytes unless noted)
+STAT_FIELDS = ["anon", "file", "kernel", "shmem", "file_mapped",
+               "pgmajfault", "workingset_refault_file", "workingset_refault_anon"]
+# memory.events counters (cumulative since the group was created)
+EVENT_FIELDS = ["low", "high", "max", "oom", "oom_kill"]
+
+
+def limit_value(gb: Optional[float]) -> str:
+    """GB -> cgroup limit string ("max" when unset)."""
+    if gb is None:
+        return "max"
+    return str(int(gb * GB))
+
+
+def parse_flat_keyed(text: str) -> Dict[str, int]:
+    """`key value` lines (memory.stat, memory.events) -> {key: int}."""
+    out = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2:
+            try:
+                out[parts[0]] = int(parts[1])
+            except ValueError:
+                pass
+    return out
+
+
+def cgroup_of_pid(pid: int, proc_root: str = "/proc") -> Optional[str]:
+    """The pid's cgroup v2 path relative to the mount (`0::/user.slice/...`)."""
+    try:
+        with open(os.path.join(proc_root, str(pid), "cgroup")) as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return line[3:].strip()
+    except OSError:
+        pass
+    return None
+
+
+def is_cgroup2_mount(path: str, mounts: str = "/proc/mounts") -> bool:
+    """True when `path` is a cgroup2 mount point (False for a fake root)."""
+    try:
+        with open(mounts) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == "cgroup2" and \
+                        os.path.realpath(parts[1]) == os.path.realpath(path):
+                    return True
+    except OSError:
+        pass
+    return False
+
+
+def device_numbers(device: str, sys_root: str = "/sys") -> Optional[str]:
+    """`nvme0n1` -> `259:0` (MAJ:MIN, as io.max expects)."""
+    for base in ("block", "class/block"):
+        try:
+            with open(os.path.join(sys_root, base, device, "dev")) as f:
+                return f.read().strip()
+        except OSError:
+            continue
+    return None
+
+
+def io_max_line(io_max, default_device: str = None) -> Optional[str]:
+    """
+    io.max line from config: a raw "MAJ:MIN rbps=... wbps=..." string, or a
+    dict {device, rbps, wbps, riops, wiops} (device defaults to the storage device).
+    """
+    if not io_max:
+        return None
+    if isinstance(io_max, str):
+        return io_max
+    device = io_max.get("device") or default_device
+    numbers = device if device and ":" in device else device_numbers(device) if device else None
+    if not numbers:
+        raise ValueError(f"Cannot resolve MAJ:MIN for io.max device {device!r}")
+    limits = [f"{k}={int(io_max[k])}" for k in ("rbps", "wbps", "riops", "wiops") if io_max.get(k)]
+    return f"{numbers} {' '.join(limits)}" if limits else None
+
+
+class CgroupConstraint:
+    """Creates or joins a cgroup v2 group, applies limits, samples it and tears it down."""
+
+    def __init__(self, name: str = "aidaptiv-bench", ram_limit_gb: float = None,
+                 swap_limit_gb: float = None, high_gb: float = None, io_max: str = None,
+                 root: str = CGROUP_ROOT, path: str = None, proc_root: str = "/proc"):
+        self.root = root
+        self.proc_root = proc_root
+        self.fake = not is_cgroup2_mount(root)
+        # Join an existing group (relative to the mount), else create <root>/<name>
+        self.rel_path = (path or name).strip("/")
+        self.path = os.path.join(root, self.rel_path)
+        self.ram_limit_gb = ram_limit_gb
+        self.swap_limit_gb = swap_limit_gb
+        self.high_gb = high_gb
+        self.io_max = io_max
+
+        self.created = False
+        self.joined = False
+        self._saved: Dict[str, str] = {}    # Original limits of a joined group
+        self._origin: Dict[int, str] = {}   # pid -> cgroup it was moved from
+        self.precharged_bytes = 0           # RSS of running processes when moved (not charged here)
+        self._events_start: Dict[str, int] = {}
+        self._psi = None
+        self._prev_psi = None
+        self.peak_bytes = 0
+        self.limit_hit_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.created or self.joined
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read(self, name: str) -> Optional[str]:
+        try:
+            with open(self._file(name)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, name: str, value: str, path: str = None):
+        with open(os.path.join(path or self.path, name), "w") as f:
+            f.write(value)
+
+    def _enable_controllers(self):
+        """Let the parent delegate memory (and io) controllers to our group."""
+        parent = os.path.dirname(self.path)
+        wanted = ["memory"] + (["io"] if self.io_max else [])
+        available = (self._read_path(os.path.join(parent, "cgroup.controllers")) or "").split()
+        enabled = (self._read_path(os.path.join(parent, "cgroup.subtree_control")) or "").split()
+        for ctl in wanted:
+            if ctl in enabled or (available and ctl not in available):
+                continue
+            try:
+                self._write("cgroup.subtree_control", f"+{ctl}", path=parent)
+            except OSError as e:
+                print(f"⚠️  Could not enable the {ctl} controller in {parent}: {e}")
+
+    @staticmethod
+    def _read_path(path: str) -> Optional[str]:
+        try:
+            with open(path) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def setup(self):
+        """Create (or join) the group and apply the limits."""
+        if os.path.isdir(self.path):
+            self.joined = True
+            for name in ("memory.max", "memory.swap.max", "memory.high", "io.max"):
+                value = self._read(name)
+                if value is not None:
+                    self._saved[name] = value.strip()
+        else:
+            self._enable_controllers()
+            os.makedirs(self.path)
+            self.created = True
+
+        self._write("memory.max", limit_value(self.ram_limit_gb))
+        self._write("memory.swap.max", limit_value(self.swap_limit_gb))
+        self._write("memory.high", limit_value(self.high_gb))
+        if self.io_max:
+            self._write("io.max", self.io_max)
+
+        self._events_start = self.read_events()
+        self._psi = PsiSampler(cgroup_path=self.path)
+        self._prev_psi = self._psi.read() if self._psi.available else None
+
+    def add_pid(self, pid: int):
+        """Move one process into the group (its future children follow it)."""
+        origin = cgroup_of_pid(pid, self.proc_root)
+        self._write("cgroup.procs", str(pid))
+        if origin is not None and pid not in self._origin:
+            self._origin[pid] = origin
+
+    def _rss(self, pid: int) -> int:
+        """Resident bytes of a process (/proc/<pid>/statm), 0 if unreadable."""
+        try:
+            with open(os.path.join(self.proc_root, str(pid), "statm")) as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def add_pids(self, pids: List[int]):
+        """
+        Move already-running processes into the group. Their memory charged
+        so far stays with the old group (see module doc), hence the warning.
+        """
+        moved = 0
+        for pid in pids:
+            rss = self._rss(pid)
+            try:
+                self.add_pid(pid)
+            except OSError as e:
+                # Exited meanwhile, or a kernel thread
+                print(f"⚠️  Could not move pid {pid} into {self.path}: {e}")
+                continue
+            moved += rss
+        self.precharged_bytes += moved
+        if moved:
+            print(f"⚠️  Moved a running process tree into {self.path}: its {moved / GB:.2f} GB already "
+                  f"resident stays charged to its old group, so memory.max only limits new "
+                  f"allocations. Launch the server inside the group (limit_runner.sh) to enforce "
+                  f"the limit on weights / KV cache already loaded.")
+
+    def spawn(self, command: List[str], user: str = None) -> subprocess.Popen:
+        """
+        Start `command` inside the group, so nothing of it runs unconstrained.
+        The child only writes its pid to cgroup.procs before exec (and drops
+        to `user` if given, for a group set up as root); the parent records
+        where it came from for teardown.
+        """
+        procs = self._file("cgroup.procs")
+        origin = cgroup_of_pid(os.getpid(), self.proc_root)  # Inherited by the child
+        env = None
+        ids = None
+        if user:
+            pw = pwd.getpwnam(user)
+            ids = (pw.pw_name, pw.pw_uid, pw.pw_gid)
+            env = dict(os.environ, USER=pw.pw_name, LOGNAME=pw.pw_name, HOME=pw.pw_dir)
+
+        def enter():
+            # Between fork and exec: bare syscalls, no Python-level state
+            fd = os.open(procs, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)  # As _write does
+            try:
+                os.write(fd, str(os.getpid()).encode())
+            finally:
+                os.close(fd)
+            if ids:
+                os.initgroups(ids[0], ids[2])
+                os.setgid(ids[2])
+                os.setuid(ids[1])
+
+        proc = subprocess.Popen(command, preexec_fn=enter, env=env)
+        if origin is not None:
+            self._origin[proc.pid] = origin
+        return proc
+
+    def pids(self) -> List[int]:
+        text = self._read("cgroup.procs") or ""
+        return [int(p) for p in text.split() if p.isdigit()]
+
+    def read_events(self) -> Dict[str, int]:
+        events = parse_flat_keyed(self._read("memory.events") or "")
+        return {k: events.get(k, 0) for k in EVENT_FIELDS}
+
+    def events_since(self, start: Dict[str, int] = None) -> Dict[str, int]:
+        """memory.events counters since `start` (default: since setup)."""
+        start = self._events_start if start is None else start
+        events = self.read_events()
+        return {k: max(0, events[k] - start.get(k, 0)) for k in EVENT_FIELDS}
+
+    def read_stat(self) -> Dict[str, int]:
+        stat = parse_flat_keyed(self._read("memory.stat") or "")
+        return {k: stat[k] for k in STAT_FIELDS if k in stat}
+
+    def read_current(self) -> Optional[int]:
+        text = self._read("memory.current")
+        return int(text) if text and text.strip().isdigit() else None
+
+    def sample(self) -> Dict:
+        """memory.current, memory.stat, memory.events since setup and per-interval PSI."""
+        now = time.time()
+        current = self.read_current()
+        if current is not None:
+            self.peak_bytes = max(self.peak_bytes, current)
+        since = self.events_since()
+        if self.limit_hit_at is None and (since["max"] or since["oom"] or since["oom_kill"]):
+            self.limit_hit_at = now
+
+        psi = {"memory_some_pct": None, "memory_full_pct": None}
+        if self._psi and self._psi.available:
+            cur = self._psi.read()
+            psi = stall_pct(self._prev_psi, cur)
+            self._prev_psi = cur
+        return {
+            "timestamp": now,
+            "memory_current": current,
+            "stat": self.read_stat(),
+            "events": since,
+            "psi_mem_some_pct": psi["memory_some_pct"],
+            "psi_mem_full_pct": psi["memory_full_pct"]
+        }
+
+    def row(self, sample: Optional[Dict]) -> List:
+        """CGROUP_COLUMNS values for one sample."""
+        if not sample:
+            return [None] * len(CGROUP_COLUMNS)
+
+        def gb(value):
+            return round(value / GB, 3) if value is not None else None
+
+        stat = sample["stat"]
+        events = sample["events"]
+        return [gb(sample["memory_current"]), gb(stat.get("anon")), gb(stat.get("file")),
+                events["high"], events["max"], events["oom"], events["oom_kill"],
+                sample["psi_mem_some_pct"], sample["psi_mem_full_pct"]]
+
+    def summary(self) -> Dict:
+        since = self.events_since() if self.active else {}
+        return {
+            "path": self.path,
+            "created": self.created,
+            "ram_limit_gb": self.ram_limit_gb,
+            "swap_limit_gb": self.swap_limit_gb,
+            "high_gb": self.high_gb,
+            "io_max": self.io_max,
+            "peak_gb": round(self.peak_bytes / GB, 3),
+            "precharged_gb": round(self.precharged_bytes / GB, 3),
+            "events": since,
+            "limit_hit": bool(since.get("max") or since.get("oom") or since.get("oom_kill")),
+            "limit_hit_at": self.limit_hit_at
+        }
+
+    def teardown(self):
+        """Move processes back where they came from and remove (or restore) the group."""
+        if not self.active:
+            return
+        if self.created:
+            parent = os.path.dirname(self.path)
+            for pid in self.pids():
+                origin = self._origin.get(pid)
+                target = os.path.join(self.root, origin.strip("/")) if origin else parent
+                try:
+                    self._write("cgroup.procs", str(pid), path=target)
+                except OSError:
+                    try:
+                        self._write("cgroup.procs", str(pid), path=parent)
+                    except OSError as e:
+                        print(f"⚠️  Could not move pid {pid} out of {self.path}: {e}")
+            try:
+                if self.fake:
+                    # Plain directory: control files were written by us, not the kernel
+                    shutil.rmtree(self.path)
+                else:
+                    os.rmdir(self.path)
+            except OSError as e:
+                print(f"⚠️  Could not remove cgroup {self.path}: {e}")
+        else:
+            for name, value in self._saved.items():
+                try:
+                    self._write(name, value)
+                except OSError as e:
+                    print(f"⚠️  Could not restore {name} of {self.path}: {e}")
+        self.created = self.joined = False
+
+
+class CgroupSampler(Sampler):
+    """Sampler plugin: CgroupConstraint.sample() of an active group."""
+
+    def __init__(self, constraint: CgroupConstraint):
+        self.constraint = constraint
+
+    def sample(self) -> Dict:
+        return self.constraint.sample()
+
+
+def from_config(config: Dict) -> Optional[CgroupConstraint]:
+    """
+    CgroupConstraint from `pressure` (enforce, ram_limit_gb, swap_limit_gb,
+    memory_high_gb, io_max, cgroup_*), with limits falling back to
+    test.ram_limit / test.swap_limit. None unless pressure.enforce is set.
+    """
+    pressure = config.get('pressure', {}) or {}
+    if not pressure.get('enforce'):
+        return None
+    test_cfg = config.get('test', {}) or {}
+    ram = pressure.get('ram_limit_gb') or test_cfg.get('ram_limit')
+    swap = pressure.get('swap_limit_gb')
+    if swap is None:
+        swap = test_cfg.get('swap_limit')
+    storage_dev = (config.get('aidaptiv', {}) or {}).get('storage_device')
+    return CgroupConstraint(
+        name=pressure.get('cgroup_name', 'aidaptiv-bench'),
+        ram_limit_gb=ram,
+        swap_limit_gb=swap,
+        high_gb=pressure.get('memory_high_gb'),
+        io_max=io_max_line(pressure.get('io_max'), storage_dev),
+        root=pressure.get('cgroup_root') or CGROUP_ROOT,
+        path=pressure.get('cgroup_path'))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a command (e.g. the inference server) inside a cgroup v2 memory limit")
+    parser.add_argument("ram_gb", type=float, help="memory.max in GB")
+    parser.add_argument("swap_gb", type=float, help="memory.swap.max in GB")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to run")
+    parser.add_argument("--high-gb", type=float, default=None, help="memory.high in GB")
+    parser.add_argument("--io-max", default=None, help='io.max line, e.g. "259:0 wbps=104857600"')
+    parser.add_argument("--name", default=f"bench-constrained-{int(time.time())}")
+    parser.add_argument("--root", default=CGROUP_ROOT, help="cgroup2 mount (or a fake root)")
+    parser.add_argument("--interval", type=float, default=5.0, help="Status print interval (s)")
+    parser.add_argument("--user", default=None,
+                        help="Run the command as this user (set up the group as root, don't run the server as root)")
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("no command provided to run")
+
+    cg = CgroupConstraint(name=args.name, ram_limit_gb=args.ram_gb, swap_limit_gb=args.swap_gb,
+                          high_gb=args.high_gb, io_max=args.io_max, root=args.root)
+    print("🔒 Configuring Constraints:")
+    print(f"   • RAM Limit:  {args.ram_gb} GB")
+    print(f"   • Swap Limit: {args.swap_gb} GB")
+    print(f"   • Cgroup:     {cg.path}")
+    print(f"   • Command:    {' '.join(command)}")
+    if args.user:
+        print(f"   • User:       {args.user}")
+    try:
+        cg.setup()
+    except OSError as e:
+        print(f"❌ Error: could not set up cgroup {cg.path}: {e} (run as root on a cgroup v2 system)")
+        sys.exit(1)
+
+    proc = None
+    try:
+        proc = cg.spawn(command, user=args.user)
+        print(f"✅ Started pid {proc.pid} in {cg.path} (Ctrl+C stops it and removes the group)")
+        while proc.poll() is None:
+            try:
+                proc.wait(timeout=args.interval)
+            except subprocess.TimeoutExpired:
+                s = cg.sample()
+                current = s["memory_current"]
+                print(f"📊 {current / GB if current is not None else 0:.2f} GB used | "
+                      f"events {s['events']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if proc and proc.poll() is None:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        summary = cg.summary()
+        cg.teardown()
+        print(f"📊 Peak {summary['peak_gb']} GB | events {summary['events']} | "
+              f"limit hit: {summary['limit_hit']}")
+    sys.exit(proc.returncode if proc and proc.returncode is not None else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+One clock domain for a benchmark run.
+
+Requests, tokens, telemetry rows and events are all stamped with
+time.perf_counter_ns() (CLOCK_MONOTONIC on Linux), so NTP steps and slews
+cannot move them relative to each other. A wall-clock anchor taken when the
+run starts maps monotonic stamps to wall time for display; it is recorded in
+metadata_<mode>.json under "clock".
+
+join_phases() aligns request phases (prefill = start..first token, decode =
+first token..end) with telemetry intervals (between consecutive rows)
+exactly, in integer nanoseconds:
+
+    python -m backend.clock results/<run_id> --mode baseline
+"""
+import argparse
+import bisect
+import csv
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PHASES = (("prefill", "start_ns", "first_token_ns"), ("decode", "first_token_ns", "end_ns"))
+
+JOIN_COLUMNS = ["request_index", "phase", "row_index", "interval_start_ns", "interval_end_ns",
+                "overlap_ns", "phase_frac", "interval_frac"]
+
+
+def now_ns() -> int:
+    """Monotonic nanoseconds (same domain as RunClock.now_ns)."""
+    return time.perf_counter_ns()
+
+
+def _read_anchor(attempts: int = 5) -> Tuple[int, int, int]:
+    """(mono ns, wall ns, uncertainty ns): the wall read bracketed most tightly by two mono reads."""
+    best = None
+    for _ in range(attempts):
+        a = time.perf_counter_ns()
+        wall = time.time_ns()
+        b = time.perf_counter_ns()
+        if best is None or b - a < best[2]:
+            best = ((a + b) // 2, wall, b - a)
+    return best
+
+
+class RunClock:
+    """Monotonic ns clock with the wall-clock anchor of one run."""
+
+    def __init__(self):
+        self.anchor_mono_ns, self.anchor_wall_ns, self.anchor_uncertainty_ns = _read_anchor()
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns()
+
+    def wall(self, mono_ns: int = None) -> float:
+        """Wall-clock seconds of a monotonic stamp (now by default), via the run's anchor."""
+        if mono_ns is None:
+            mono_ns = time.perf_counter_ns()
+        return (self.anchor_wall_ns + (mono_ns - self.anchor_mono_ns)) / 1e9
+
+    def time(self) -> float:
+        """Drop-in for time.time() that never jumps within the run."""
+        return self.wall()
+
+    def elapsed(self, mono_ns: int = None) -> float:
+        """Seconds since the anchor."""
+        if mono_ns is None:
+            mono_ns = time.perf_counter_ns()
+        return (mono_ns - self.anchor_mono_ns) / 1e9
+
+    def anchor(self) -> Dict:
+        # Current wall - anchored wall: how far the system clock moved during the run
+        mono, wall, _ = _read_anchor()
+        return {"source": "perf_counter_ns",
+                "anchor_mono_ns": self.anchor_mono_ns,
+                "anchor_wall_ns": self.anchor_wall_ns,
+                "anchor_uncertainty_ns": self.anchor_uncertainty_ns,
+                "wall_drift_ms": round((wall - (self.anchor_wall_ns + mono - self.anchor_mono_ns)) / 1e6, 3)}
+
+
+def join_intervals(windows: Sequence[Tuple[int, int]],
+                   marks: Sequence[int]) -> List[List[Tuple[int, int]]]:
+    """
+    For each (start, end) window, the intervals (marks[i-1], marks[i]] it
+    overlaps as [(i, overlap)]. `marks` must be sorted; all values are in
+    the same (ns) domain.
+    """
+    out = []
+    for start, end in windows:
+        hits = []
+        if end > start:
+            # First interval ending after `start`, through the first one ending at/after `end`
+            i = max(1, bisect.bisect_right(marks, start))
+            while i < len(marks) and marks[i - 1] < end:
+                overlap = min(end, marks[i]) - max(start, marks[i - 1])
+                if overlap > 0:
+                    hits.append((i, overlap))
+                i += 1
+        out.append(hits)
+    return out
+
+
+def join_phases(requests: List[Dict], rows: List[Dict]) -> List[Dict]:
+    """
+    One record per (request, phase, telemetry interval) they overlap.
+    `requests` carry start_ns / first_token_ns / end_ns, `rows` mono_ns.
+    row_index is the row closing the interval (its rates cover it);
+    phase_frac / interval_frac are the overlap's share of each.
+    """
+    rows = [r for r in rows if r.get("mono_ns") is not None]
+    rows.sort(key=lambda r: r["mono_ns"])
+    marks = [int(r["mono_ns"]) for r in rows]
+
+    windows, owners = [], []
+    for idx, req in enumerate(requests):
+        for phase, a, b in PHASES:
+            if req.get(a) is None or req.get(b) is None:
+                continue
+            windows.append((int(req[a]), int(req[b])))
+            owners.append((idx, phase))
+
+    out = []
+    for (idx, phase), (start, end), hits in zip(owners, windows, join_intervals(windows, marks)):
+        for i, overlap in hits:
+            out.append({
+                "request_index": idx, "phase": phase, "row_index": i,
+                "interval_start_ns": marks[i - 1], "interval_end_ns": marks[i],
+                "overlap_ns": overlap,
+                "phase_frac": round(overlap / (end - start), 6),
+                "interval_frac": round(overlap / (marks[i] - marks[i - 1]), 6)
+            })
+    return out
+
+
+def _int_or_none(value: Optional[str]) -> Optional[int]:
+    return int(value) if value not in (None, "") else None
+
+
+def _read_csv(path: str, int_columns: Sequence[str]) -> List[Dict]:
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for c in int_columns:
+            row[c] = _int_or_none(row.get(c))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Join request phases with telemetry intervals (phases_<mode>.csv)")
+    parser.add_argument("results_dir")
+    parser.add_argument("--mode", default="baseline")
+    args = parser.parse_args()
+
+    requests = _read_csv(os.path.join(args.results_dir, f"requests_{args.mode}.csv"),
+                         ("start_ns", "first_token_ns", "end_ns"))
+    rows = _read_csv(os.path.join(args.results_dir, f"metrics_{args.mode}.csv"), ("mono_ns",))
+    joined = join_phases(requests, rows)
+
+    out_path = os.path.join(args.results_dir, f"phases_{args.mode}.csv")
+    with open(out_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=JOIN_COLUMNS)
+        writer.writeheader()
+        writer.writerows(joined)
+    print(f"📊 {len(joined)} phase/interval overlaps for {len(requests)} requests -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
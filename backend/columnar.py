@@ -0,0 +1,213 @@
+"""
+Columnar (Parquet / Arrow IPC) output for telemetry, request logs and
+per-token timelines (export.write_parquet).
+
+Rows are buffered per column and written as one row group when
+`row_group_rows` rows are buffered or `flush_sec` has passed. Files are
+segmented (`<base>-0000.parquet`, `<base>-0001.parquet`, ...): a segment is
+closed, footer and all, every `segment_sec`, so a crash loses at most the
+open segment. Readers concatenate the segments with column projection and
+take the rows past them (a crashed run's open segment) from `<base>.csv`
+when it was written too, else read the CSV alone.
+"""
+import glob
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+_SEGMENT_RE = re.compile(r"-\d{4}$")
+
+
+def _arrow_type(name: str):
+    return {"float64": pa.float64(), "int64": pa.int64(),
+            "bool": pa.bool_(), "string": pa.string()}[name]
+
+
+def strip_base(path: str) -> str:
+    """`results/x/metrics_baseline.csv` / `...-0003.parquet` -> `results/x/metrics_baseline`."""
+    base, ext = os.path.splitext(path)
+    if ext not in (".csv", ".parquet", ".arrow"):
+        base = path
+    return _SEGMENT_RE.sub("", base)
+
+
+class ColumnarWriter:
+    """Typed, compressed, segmented Parquet or Arrow IPC writer."""
+
+    def __init__(self, base_path: str, columns: List[str], types: Dict[str, str] = None,
+                 fmt: str = "parquet", row_group_rows: int = 1000, flush_sec: float = 10.0,
+                 segment_sec: float = 300.0, compression: str = "zstd"):
+        if not HAS_ARROW:
+            raise RuntimeError("pyarrow is not installed")
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"Unknown columnar format: {fmt}")
+        self.base_path = strip_base(base_path)
+        self.fmt = fmt
+        self.columns = list(columns)
+        types = types or {}
+        self.schema = pa.schema([(c, _arrow_type(types.get(c, "float64"))) for c in self.columns])
+        self.row_group_rows = row_group_rows
+        self.flush_sec = flush_sec
+        self.segment_sec = segment_sec
+        self.compression = compression
+
+        self._buffer: Dict[str, list] = {c: [] for c in self.columns}
+        self._rows = 0
+        self._last_flush = time.monotonic()
+        self._writer = None
+        self._segment = 0
+        self._segment_opened = 0.0
+        self.rows_written = 0
+
+    @property
+    def segment_path(self) -> str:
+        return f"{self.base_path}-{self._segment:04d}{EXTENSIONS[self.fmt]}"
+
+    def write(self, row: list):
+        for col, value in zip(self.columns, row):
+            self._buffer[col].append(value)
+        self._rows += 1
+        if self._rows >= self.row_group_rows or time.monotonic() - self._last_flush >= self.flush_sec:
+            self.flush()
+
+    def write_rows(self, rows: List[list]):
+        for row in rows:
+            self.write(row)
+
+    def _open_segment(self):
+        path = self.segment_path
+        if self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, self.schema, compression=self.compression)
+        else:
+            options = pa_ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa_ipc.new_file(path, self.schema, options=options)
+        self._segment_opened = time.monotonic()
+
+    def flush(self):
+        """Write buffered rows as one row group / record batch."""
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        table = pa.table({c: pa.array(self._buffer[c], type=self.schema.field(c).type)
+                          for c in self.columns}, schema=self.schema)
+        if self._writer is None:
+            self._open_segment()
+        self._writer.write_table(table)
+        self.rows_written += self._rows
+        self._buffer = {c: [] for c in self.columns}
+        self._rows = 0
+
+        # Checkpoint: close the segment so everything so far has a footer
+        if time.monotonic() - self._segment_opened >= self.segment_sec:
+            self._close_segment()
+
+    def _close_segment(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._segment += 1
+
+    def close(self):
+        self.flush()
+        self._close_segment()
+
+
+def write_table(base_path: str, columns: List[str], rows: List[list],
+                types: Dict[str, str] = None, fmt: str = "parquet"):
+    """One-shot write of a small table (e.g. the per-request log at the end of a sweep)."""
+    writer = ColumnarWriter(base_path, columns, types=types, fmt=fmt,
+                            row_group_rows=max(len(rows), 1), segment_sec=float("inf"))
+    writer.write_rows(rows)
+    writer.close()
+
+
+def find_segments(path: str) -> List[str]:
+    base = strip_base(path)
+    found = []
+    for ext in EXTENSIONS.values():
+        found += glob.glob(f"{glob.escape(base)}-[0-9][0-9][0-9][0-9]{ext}")
+    return sorted(found)
+
+
+def _read_segment(path: str, columns: Optional[List[str]]):
+    if path.endswith(".parquet"):
+        return pq.read_table(path, columns=columns)
+    with pa.memory_map(path) as source:
+        table = pa_ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+def read_columnar(path: str, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Load a telemetry / request log by base path or any of its file names,
+    reading only `columns`. Prefers columnar segments, with any rows past
+    the last readable one from the CSV; falls back to the CSV alone.
+    """
+    segments = find_segments(path) if HAS_ARROW else []
+    tables = []
+    for seg in segments:
+        try:
+            tables.append(_read_segment(seg, columns))
+        except Exception:
+            break  # Open segment of a run that crashed: no footer yet
+    csv_path = f"{strip_base(path)}.csv"
+    if not tables:
+        return pd.read_csv(csv_path, usecols=columns)
+
+    df = pa.concat_tables(tables).to_pandas()
+    if os.path.exists(csv_path):
+        # The open segment's rows (lost in a crash) are still in the CSV
+        tail = pd.read_csv(csv_path, usecols=columns, skiprows=range(1, len(df) + 1))
+        if len(tail):
+            df = pd.concat([df, tail], ignore_index=True)
+    return df
+
+
+def read_rows(path: str, start: int, count: int, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Rows [start, start + count) of a segmented log, reading only the row
+    groups / record batches that hold them (segment footers give the counts).
+    """
+    tables = []
+    offset = 0
+    end = start + count
+    for seg in find_segments(path):
+        try:
+            if seg.endswith(".parquet"):
+                pf = pq.ParquetFile(seg)
+                groups = [pf.metadata.row_group(i).num_rows for i in range(pf.metadata.num_row_groups)]
+                read_group = lambda i, pf=pf: pf.read_row_group(i, columns=columns)
+            else:
+                reader = pa_ipc.open_file(pa.memory_map(seg))
+                groups = [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)]
+                read_group = lambda i, r=reader: pa.Table.from_batches(
+                    [r.get_batch(i)]).select(columns or r.schema.names)
+        except Exception:
+            continue  # Open segment of a run that crashed: no footer yet
+        for i, n in enumerate(groups):
+            if offset < end and start < offset + n:
+                table = read_group(i)
+                lo = max(0, start - offset)
+                tables.append(table.slice(lo, min(n, end - offset) - lo))
+            offset += n
+        if offset >= end:
+            break
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    return pa.concat_tables(tables).to_pandas()
+
+
+def has_log(path: str) -> bool:
+    return bool(find_segments(path)) or os.path.exists(f"{strip_base(path)}.csv")
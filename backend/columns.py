@@ -0,0 +1,39 @@
+"""
+Metrics-log columns of the optional samplers.
+
+Kept free of imports so TelemetryCollector can lay out its header without
+importing a disabled sampler's module (and what that pulls in: numpy for
+residency, pandas / pyarrow for the event log). Each sampler module uses
+its list from here.
+"""
+
+# backend.psi: memory avg10, per-interval stall % and the thrashing flag
+PSI_COLUMNS = [
+    "psi_mem_some_avg10", "psi_mem_full_avg10",
+    "psi_mem_some_pct", "psi_mem_full_pct",
+    "psi_io_some_pct", "psi_io_full_pct",
+    "thrashing"
+]
+
+# backend.cgroup: the enforced group's memory and memory.events since setup
+CGROUP_COLUMNS = [
+    "cg_mem_current_gb", "cg_anon_gb", "cg_file_gb",
+    "cg_high_events", "cg_max_events", "cg_oom_events", "cg_oom_kill_events",
+    "cg_psi_mem_some_pct", "cg_psi_mem_full_pct"
+]
+
+# backend.memcomp: memory composition (GB)
+COMP_COLUMNS = [
+    "comp_anon_gb", "comp_file_mapped_gb", "comp_file_cache_gb", "comp_shmem_gb",
+    "comp_kernel_gb", "comp_free_gb", "comp_dirty_gb", "comp_writeback_gb",
+    "comp_swap_disk_gb", "comp_swap_zram_gb", "comp_zram_ram_gb",
+    "comp_vram_gb", "comp_gtt_gb", "comp_tier3_gb"
+]
+
+# backend.residency: model weight page-cache residency
+RESIDENCY_COLUMNS = ["weight_total_gb", "weight_resident_gb", "weight_resident_pct",
+                     "weight_load_mb_s", "weight_refault_mb_s",
+                     "t3_weight_read_mb_s", "t3_kv_read_mb_s"]
+
+# backend.energy: cumulative energies and the total power over the last interval
+ENERGY_COLUMNS = ["energy_j", "cpu_energy_j", "gpu_energy_j", "system_power_w"]
@@ -0,0 +1,183 @@
+"""
+Per-interval block device statistics (iostat-style) from two snapshots of
+/sys/block/<dev>/stat, plus the per-context tier-3 table for the run summary.
+
+Fields used (Documentation/block/stat.rst): read/write ios and sectors,
+read/write ticks (ms spent on completed I/Os), in_flight, io_ticks (ms the
+device had I/O in flight) and time_in_queue (ms, weighted by queue length).
+
+Device traffic is split into what the inference server's process tree did
+(/proc/<pid>/io, capped at the device figure) and noise: page cache
+writeback of other processes, logging, our own telemetry files.
+"""
+from collections import deque
+from typing import Dict, List, Optional
+
+SECTOR_BYTES = 512
+
+# Per-interval columns appended to the metrics CSV (tier-3 device)
+DEVICE_COLUMNS = ["t3_read_iops", "t3_write_iops", "t3_avg_req_kb",
+                  "t3_await_ms", "t3_queue_depth", "t3_util_pct"]
+
+# Server process-tree I/O and the tier-3 traffic attributed to it
+SERVER_IO_COLUMNS = ["proc_read_mb_s", "proc_write_mb_s", "proc_syscr_s", "proc_syscw_s",
+                     "t3_server_read_mb_s", "t3_server_write_mb_s",
+                     "t3_noise_read_mb_s", "t3_noise_write_mb_s"]
+
+
+def _delta(cur: Dict, prev: Dict, key: str) -> Optional[int]:
+    if cur.get(key) is None or prev.get(key) is None:
+        return None
+    return max(0, cur[key] - prev[key])
+
+
+def interval_stats(prev: Dict, cur: Dict, dt_sec: float) -> Dict[str, Optional[float]]:
+    """
+    IOPS, average request size, average await per I/O, average queue depth
+    and utilisation between two stat snapshots taken `dt_sec` apart.
+    Fields the platform doesn't provide (io_ticks / time_in_queue off Linux)
+    come back as None.
+    """
+    out = {"read_iops": 0.0, "write_iops": 0.0, "avg_req_kb": None, "read_await_ms": None,
+           "write_await_ms": None, "await_ms": None, "queue_depth": None, "util_pct": None,
+           "in_flight": cur.get("in_flight")}
+    if not prev or not cur or dt_sec <= 0:
+        return out
+
+    r_ios = _delta(cur, prev, "read_ios") or 0
+    w_ios = _delta(cur, prev, "write_ios") or 0
+    ios = r_ios + w_ios
+    out["read_iops"] = r_ios / dt_sec
+    out["write_iops"] = w_ios / dt_sec
+
+    if ios:
+        sectors = (_delta(cur, prev, "read_sectors") or 0) + (_delta(cur, prev, "write_sectors") or 0)
+        out["avg_req_kb"] = sectors * SECTOR_BYTES / 1024 / ios
+        r_ticks = _delta(cur, prev, "read_ticks")
+        w_ticks = _delta(cur, prev, "write_ticks")
+        if r_ticks is not None and r_ios:
+            out["read_await_ms"] = r_ticks / r_ios
+        if w_ticks is not None and w_ios:
+            out["write_await_ms"] = w_ticks / w_ios
+        if r_ticks is not None and w_ticks is not None:
+            out["await_ms"] = (r_ticks + w_ticks) / ios
+
+    dt_ms = dt_sec * 1000
+    in_queue = _delta(cur, prev, "time_in_queue")
+    if in_queue is not None:
+        # Little's law: average number of I/Os in flight over the interval
+        out["queue_depth"] = in_queue / dt_ms
+    busy = _delta(cur, prev, "io_ticks")
+    if busy is not None:
+        out["util_pct"] = min(100.0, busy / dt_ms * 100)
+    return out
+
+
+def server_io_stats(prev_io: Optional[Dict], cur_io: Optional[Dict], dt_sec: float,
+                    t3_read_mb_s: float, t3_write_mb_s: float) -> Dict[str, Optional[float]]:
+    """
+    SERVER_IO_COLUMNS for one interval from two cumulative process-tree I/O
+    snapshots. /proc/<pid>/io counts storage I/O on any device, so the share
+    attributed to the tier-3 device is capped at what the device did.
+    """
+    out = {c: None for c in SERVER_IO_COLUMNS}
+    if not prev_io or not cur_io or dt_sec <= 0:
+        return out
+    mb = 1024**2
+    read = max(0, cur_io["read_bytes"] - prev_io["read_bytes"]) / mb / dt_sec
+    write = max(0, cur_io["write_bytes"] - prev_io["write_bytes"]) / mb / dt_sec
+    out.update(proc_read_mb_s=read, proc_write_mb_s=write,
+               proc_syscr_s=max(0, cur_io["syscr"] - prev_io["syscr"]) / dt_sec,
+               proc_syscw_s=max(0, cur_io["syscw"] - prev_io["syscw"]) / dt_sec)
+    out["t3_server_read_mb_s"] = min(read, t3_read_mb_s)
+    out["t3_server_write_mb_s"] = min(write, t3_write_mb_s)
+    out["t3_noise_read_mb_s"] = t3_read_mb_s - out["t3_server_read_mb_s"]
+    out["t3_noise_write_mb_s"] = t3_write_mb_s - out["t3_server_write_mb_s"]
+    return out
+
+
+class AwaitWindow:
+    """
+    Rolling window of per-interval average await values. p95() is the 95th
+    percentile of those averages, which smooths out single slow I/Os: it is
+    not a per-I/O latency percentile (that needs blktrace / eBPF).
+    """
+
+    def __init__(self, size: int = 120):
+        self._values = deque(maxlen=size)
+
+    def add(self, await_ms: Optional[float]):
+        if await_ms is not None:
+            self._values.append(await_ms)
+
+    def p95(self) -> Optional[float]:
+        if not self._values:
+            return None
+        vals = sorted(self._values)
+        return vals[min(len(vals) - 1, int(0.95 * len(vals)))]
+
+
+def _summarize(rows: List[Dict]) -> Dict[str, Optional[float]]:
+    def mean(key):
+        vals = [r[key] for r in rows if r.get(key) is not None]
+        return round(sum(vals) / len(vals), 3) if vals else None
+
+    awaits = sorted(r["t3_await_ms"] for r in rows if r.get("t3_await_ms") is not None)
+    qd = [r["t3_queue_depth"] for r in rows if r.get("t3_queue_depth") is not None]
+    attributed = any(r["_srv_read"] is not None for r in rows)
+    mb = 1024**2
+    read, write = sum(r["_read"] for r in rows), sum(r["_write"] for r in rows)
+    srv_read, srv_write = sum(r["_srv_read"] or 0 for r in rows), sum(r["_srv_write"] or 0 for r in rows)
+
+    return {
+        "samples": len(rows),
+        "duration_sec": round(sum(r["_dt"] for r in rows), 2),
+        "read_mb": round(read / mb, 2),
+        "write_mb": round(write / mb, 2),
+        "read_iops": mean("t3_read_iops"),
+        "write_iops": mean("t3_write_iops"),
+        "avg_req_kb": mean("t3_avg_req_kb"),
+        "await_ms": mean("t3_await_ms"),
+        # Over per-interval averages: not a per-I/O latency percentile
+        "await_avg_p95_ms": round(awaits[min(len(awaits) - 1, int(0.95 * len(awaits)))], 3) if awaits else None,
+        "queue_depth": mean("t3_queue_depth"),
+        "queue_depth_max": round(max(qd), 3) if qd else None,
+        "util_pct": mean("t3_util_pct"),
+        # Device bytes done by the server's process tree vs everything else
+        "server_read_mb": round(srv_read / mb, 2) if attributed else None,
+        "server_write_mb": round(srv_write / mb, 2) if attributed else None,
+        "noise_read_mb": round((read - srv_read) / mb, 2) if attributed else None,
+        "noise_write_mb": round((write - srv_write) / mb, 2) if attributed else None
+    }
+
+
+def summarize_device(samples: List[Dict], device: str) -> Dict:
+    """
+    Tier-3 utilisation for the run summary: overall plus one row per context
+    length, from telemetry timeline samples carrying the DEVICE_COLUMNS.
+    """
+    # Each sample owns the interval that ends at it (bytes and time since the previous one)
+    rows = []
+    for prev, s in zip([None] + samples[:-1], samples):
+        row = dict(s, _dt=0.0, _read=0, _write=0, _srv_read=None, _srv_write=None)
+        if prev is not None:
+            row.update(_dt=s["timestamp"] - prev["timestamp"],
+                       _read=max(0, s["read_bytes"] - prev["read_bytes"]),
+                       _write=max(0, s["write_bytes"] - prev["write_bytes"]))
+            if s.get("proc_read_bytes") is not None and prev.get("proc_read_bytes") is not None:
+                row.update(_srv_read=min(row["_read"], max(0, s["proc_read_bytes"] - prev["proc_read_bytes"])),
+                           _srv_write=min(row["_write"], max(0, s["proc_write_bytes"] - prev["proc_write_bytes"])))
+        rows.append(row)
+
+    by_context: Dict[int, List[Dict]] = {}
+    for row in rows:
+        ctx = row.get("context_len") or 0
+        if ctx:
+            by_context.setdefault(ctx, []).append(row)
+
+    return {
+        "device": device,
+        "overall": _summarize(rows),
+        # JSON object keys must be strings
+        "by_context": {str(ctx): _summarize(ctx_rows) for ctx, ctx_rows in sorted(by_context.items())}
+    }
@@ -0,0 +1,244 @@
+"""
+Energy telemetry from Linux powercap (RAPL) and hwmon.
+
+CPU / SoC energy comes from the cumulative RAPL counters
+(/sys/class/powercap/intel-rapl:<n>[:<m>]/energy_uj; AMD Zen exposes the
+same zones), which wrap at max_energy_range_uj. Without readable RAPL
+(energy_uj is root-only on recent kernels), hwmon sensors are used instead:
+energy<n>_input counters, else power<n>_input / power<n>_average integrated
+over time. GPU energy integrates the power sampler's (or gpu sampler's)
+board power; GPU hwmon sensors are skipped so it isn't counted twice.
+
+All figures are cumulative joules since the sampler started. The benchmark
+takes snapshots around each batch for joules/request and tokens/joule;
+per-request energy is apportioned from the timeline (backend.attribution).
+`root` can point at a fixture tree (containing sys/) for offline runs.
+"""
+import glob
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.columns import ENERGY_COLUMNS
+from backend.procfs import _PreadFile
+from backend.sampling import Sampler
+
+# hwmon drivers of GPUs (their power is the gpu / power samplers')
+GPU_HWMON_NAMES = ("amdgpu", "nouveau", "radeon", "i915", "xe")
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _read_int(f: _PreadFile) -> int:
+    n = f.read()
+    return int(f.buf[:n])
+
+
+class _Counter:
+    """A cumulative microjoule counter, accumulated across wraparounds."""
+
+    def __init__(self, name: str, path: str, max_range_uj: Optional[int] = None):
+        self.name = name
+        self.file = _PreadFile(path, 64)
+        self.max_range_uj = max_range_uj
+        self.prev = _read_int(self.file)
+        self.joules = 0.0
+
+    def update(self) -> float:
+        cur = _read_int(self.file)
+        delta = cur - self.prev
+        if delta < 0:
+            # Wrapped (RAPL: at max_energy_range_uj); an unknown range means a reset
+            delta = delta + self.max_range_uj + 1 if self.max_range_uj else 0
+        self.prev = cur
+        self.joules += delta / 1e6
+        return self.joules
+
+
+class _PowerSensor:
+    """A power input (microwatts) integrated over time (trapezoid)."""
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.file = _PreadFile(path, 64)
+        self.prev = None  # (monotonic time, watts)
+        self.joules = 0.0
+
+    def update(self, mono: float) -> float:
+        watts = _read_int(self.file) / 1e6
+        if self.prev is not None:
+            self.joules += (watts + self.prev[1]) / 2 * (mono - self.prev[0])
+        self.prev = (mono, watts)
+        return self.joules
+
+
+def rapl_zones(root: str = "/") -> List[Dict]:
+    """powercap RAPL zones: path, name, max range, and whether it is top-level (package, psys)."""
+    zones = []
+    for path in sorted(glob.glob(os.path.join(root, "sys/class/powercap/intel-rapl:*"))):
+        if not os.path.exists(os.path.join(path, "energy_uj")):
+            continue
+        max_range = _read_text(os.path.join(path, "max_energy_range_uj"))
+        zones.append({"path": path, "name": _read_text(os.path.join(path, "name")) or os.path.basename(path),
+                      "max_range_uj": int(max_range) if max_range else None,
+                      "top": os.path.basename(path).count(":") == 1})
+    return zones
+
+
+def hwmon_sensors(root: str = "/") -> List[Dict]:
+    """Non-GPU hwmon energy counters and power inputs: kind ("energy" / "power"), name, path."""
+    sensors = []
+    for hwmon in sorted(glob.glob(os.path.join(root, "sys/class/hwmon/hwmon*"))):
+        driver = _read_text(os.path.join(hwmon, "name")) or os.path.basename(hwmon)
+        if driver in GPU_HWMON_NAMES:
+            continue
+        for path in sorted(glob.glob(os.path.join(hwmon, "energy*_input"))):
+            label = _read_text(path.replace("_input", "_label"))
+            sensors.append({"kind": "energy", "name": f"{driver}/{label or os.path.basename(path)}", "path": path})
+        for path in sorted(glob.glob(os.path.join(hwmon, "power*_input")) +
+                           glob.glob(os.path.join(hwmon, "power*_average"))):
+            label = _read_text(os.path.join(hwmon, os.path.basename(path).split("_")[0] + "_label"))
+            sensors.append({"kind": "power", "name": f"{driver}/{label or os.path.basename(path)}", "path": path})
+    return sensors
+
+
+class EnergySampler(Sampler):
+    """
+    Cumulative CPU (RAPL / hwmon), GPU and total energy in joules, plus
+    per-zone joules and the total power over the last interval. Also called
+    from the benchmark thread (snapshot()), hence the lock.
+    """
+
+    def __init__(self, root: str = "/"):
+        self.root = root
+        self._lock = threading.Lock()
+        self.rapl: List[_Counter] = []
+        self._rapl_top: List[_Counter] = []
+        self.hwmon_counters: List[_Counter] = []
+        self.hwmon_power: List[_PowerSensor] = []
+
+        zones = rapl_zones(root)
+        denied = False
+        for z in zones:
+            try:
+                counter = _Counter(z["name"], os.path.join(z["path"], "energy_uj"), z["max_range_uj"])
+            except PermissionError:
+                denied = True
+                continue
+            except (OSError, ValueError):
+                continue
+            self.rapl.append(counter)
+            if z["top"]:
+                self._rapl_top.append(counter)
+        # psys covers the whole platform including the packages: count it only alone
+        if any(c.name != "psys" for c in self._rapl_top):
+            self._rapl_top = [c for c in self._rapl_top if c.name != "psys"]
+        if denied and not self.rapl:
+            print("⚠️  RAPL energy_uj is not readable (root only); using hwmon sensors")
+
+        if not self.rapl:
+            for s in hwmon_sensors(root):
+                try:
+                    if s["kind"] == "energy":
+                        self.hwmon_counters.append(_Counter(s["name"], s["path"]))
+                    elif not self.hwmon_counters:
+                        self.hwmon_power.append(_PowerSensor(s["name"], s["path"]))
+                except (OSError, ValueError):
+                    pass
+            if self.hwmon_counters:
+                # Counters are exact; integrating power inputs as well would double count
+                self.hwmon_power = []
+
+        self._gpu_j = 0.0
+        self._prev = None  # (monotonic time, GPU watts, total joules)
+
+    @property
+    def source(self) -> Optional[str]:
+        if self.rapl:
+            return "rapl"
+        if self.hwmon_counters or self.hwmon_power:
+            return "hwmon"
+        return None
+
+    def _gpu_watts(self) -> Optional[float]:
+        latest = self.engine.latest if hasattr(self, "engine") else {}
+        for name in ("power", "gpu"):
+            watts = (latest.get(name) or {}).get("power_w")
+            if watts:
+                return watts
+        return None
+
+    def sample(self) -> Dict:
+        with self._lock:
+            mono = time.monotonic()
+            zones = {}
+            cpu_j = None
+            try:
+                if self.rapl:
+                    for c in self.rapl:
+                        zones[c.name] = round(c.update(), 3)
+                    cpu_j = sum(c.joules for c in self._rapl_top)
+                elif self.hwmon_counters:
+                    cpu_j = 0.0
+                    for c in self.hwmon_counters:
+                        cpu_j += c.update()
+                        zones[c.name] = round(c.joules, 3)
+                elif self.hwmon_power:
+                    cpu_j = 0.0
+                    for s in self.hwmon_power:
+                        cpu_j += s.update(mono)
+                        zones[s.name] = round(s.joules, 3)
+            except (OSError, ValueError):
+                pass
+
+            # GPU board power held since the previous sample
+            watts = self._gpu_watts()
+            if self._prev is not None and self._prev[1] is not None:
+                self._gpu_j += self._prev[1] * (mono - self._prev[0])
+            gpu_j = self._gpu_j if (watts is not None or self._gpu_j) else None
+
+            total = None
+            if cpu_j is not None or gpu_j is not None:
+                total = (cpu_j or 0.0) + (gpu_j or 0.0)
+            power = None
+            if self._prev is not None and total is not None and self._prev[2] is not None and mono > self._prev[0]:
+                power = (total - self._prev[2]) / (mono - self._prev[0])
+            self._prev = (mono, watts, total)
+            return {"energy_j": total, "cpu_energy_j": cpu_j, "gpu_energy_j": gpu_j,
+                    "system_power_w": power, "zones": zones, "source": self.source}
+
+    def snapshot(self) -> Optional[float]:
+        """Cumulative total joules right now (for batch / request windows)."""
+        return self.sample()["energy_j"]
+
+    def row(self, sample: Optional[Dict]) -> List[Optional[float]]:
+        """Metrics-log values (ENERGY_COLUMNS) of one sample."""
+        return energy_row(sample)
+
+    def close(self):
+        with self._lock:
+            for c in self.rapl + self.hwmon_counters + self.hwmon_power:
+                c.file.close()
+            self.rapl, self._rapl_top, self.hwmon_counters, self.hwmon_power = [], [], [], []
+
+
+def energy_row(sample: Optional[Dict]) -> List[Optional[float]]:
+    sample = sample or {}
+    return [round(sample[c], 3) if sample.get(c) is not None else None for c in ENERGY_COLUMNS]
+
+
+def energy_stats(joules: Optional[float], requests: int, tokens: int, seconds: float) -> Dict:
+    """Joules / request, tokens / joule and average power of a batch (None without energy data)."""
+    if joules is None or joules <= 0:
+        return {"energy_j": None, "avg_power_w": None, "joules_per_request": None, "tokens_per_joule": None}
+    return {"energy_j": round(joules, 3),
+            "avg_power_w": round(joules / seconds, 2) if seconds > 0 else None,
+            "joules_per_request": round(joules / requests, 3) if requests else None,
+            "tokens_per_joule": round(tokens / joules, 4)}
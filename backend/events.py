@@ -0,0 +1,171 @@
+"""
+Append-only event log of a sweep (`events_<mode>.jsonl`).
+
+The benchmark, telemetry collector and scenarios write typed events (stage
+start / end, toggle commands, warmup, context changes, request start / first
+token / end, failures, status messages, thrashing, cgroup limits). Each
+record carries the run clock's mono_ns (backend.clock), its wall time, and
+the metrics log position at that moment: `row` (index of the next telemetry
+row) and `offset` (its byte offset in the metrics CSV). The plotter and the
+dashboard overlay events on timelines; read_window() uses the position to
+read the telemetry around an event without loading the whole log.
+
+Lines are buffered and written once `flush_sec` has passed (checked on each
+emit and by the telemetry collector's periodic flush), after `max_buffered`
+events and on close. Unknown event kinds are reported once and dropped.
+"""
+import collections
+import io
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from backend.clock import RunClock
+from backend.columnar import find_segments, read_rows, strip_base
+
+EVENT_TYPES = {
+    # Benchmark
+    "stage_start", "stage_end", "toggle", "warmup_start", "warmup_end",
+    "context_change", "level_start", "level_end",
+    "request_start", "first_token", "request_end", "status",
+    # Failures (backend.watchdog reasons)
+    "oom_kill", "server_crash", "stall",
+    # Collector detectors
+    "thrash_start", "thrash_end", "cgroup_limit_hit", "cgroup_oom_kill",
+    # Scenarios
+    "scenario_prompt",
+}
+
+
+class EventLog:
+    """Buffered JSONL writer for typed events; safe to emit from any thread."""
+
+    def __init__(self, path: str, clock: RunClock = None,
+                 position: Callable[[], Dict] = None,
+                 flush_sec: float = 1.0, max_buffered: int = 256, keep_recent: int = 20):
+        self.path = path
+        self.clock = clock or RunClock()
+        # Metrics log position ({"row", "offset"}), set by the telemetry collector
+        self.position = position
+        self.flush_sec = flush_sec
+        self.flush_ns = int(flush_sec * 1e9)
+        self.max_buffered = max_buffered
+        self.count = 0
+        self._lock = threading.Lock()
+        self._buf: List[str] = []
+        self._recent = collections.deque(maxlen=keep_recent)
+        self._unknown = set()
+        self._file = open(path, "a")
+        self._last_flush = self.clock.now_ns()
+
+    def emit(self, kind: str, **fields) -> Optional[Dict]:
+        if kind not in EVENT_TYPES:
+            # A typo in a caller must not abort a sweep: warn once per kind and drop
+            if kind not in self._unknown:
+                self._unknown.add(kind)
+                print(f"⚠️  Dropping events of unknown type: {kind}")
+            return None
+        mono_ns = self.clock.now_ns()
+        record = {"kind": kind, "mono_ns": mono_ns, "t": round(self.clock.wall(mono_ns), 6)}
+        if self.position:
+            record.update(self.position())
+        record.update(fields)
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._buf.append(line)
+            self._recent.append(record)
+            self.count += 1
+            if len(self._buf) >= self.max_buffered or mono_ns - self._last_flush >= self.flush_ns:
+                self._flush(mono_ns)
+        return record
+
+    def _flush(self, mono_ns: int):
+        if self._buf and not self._file.closed:
+            self._file.write("\n".join(self._buf) + "\n")
+            self._file.flush()
+        self._buf = []
+        self._last_flush = mono_ns
+
+    def flush(self):
+        with self._lock:
+            self._flush(self.clock.now_ns())
+
+    def flush_if_due(self):
+        """Write buffered lines older than `flush_sec` (called periodically, so a quiet log still lands)."""
+        with self._lock:
+            mono_ns = self.clock.now_ns()
+            if self._buf and mono_ns - self._last_flush >= self.flush_ns:
+                self._flush(mono_ns)
+
+    def recent(self) -> List[Dict]:
+        """Newest events (for the live dashboard)."""
+        with self._lock:
+            return list(self._recent)
+
+    def close(self):
+        with self._lock:
+            self._flush(self.clock.now_ns())
+            self._file.close()
+
+
+def event_log_path(metrics_path: str) -> str:
+    """`results/x/metrics_baseline.csv` (or a segment) -> `results/x/events_baseline.jsonl`."""
+    base = strip_base(metrics_path)
+    head, name = os.path.split(base)
+    if name.startswith("metrics_"):
+        name = name[len("metrics_"):]
+    return os.path.join(head, f"events_{name}.jsonl")
+
+
+def read_events(path: str, kinds: Iterable[str] = None) -> List[Dict]:
+    """Events of a log, optionally only some kinds; a truncated last line is skipped."""
+    kinds = set(kinds) if kinds else None
+    events = []
+    if not os.path.exists(path):
+        return events
+    with open(path) as f:
+        for line in f:
+            try:
+                ev = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if kinds is None or ev.get("kind") in kinds:
+                events.append(ev)
+    return events
+
+
+def event_elapsed(events: List[Dict], rows: pd.DataFrame) -> List[Optional[float]]:
+    """
+    Each event's position on the telemetry `elapsed_sec` axis, from the rows'
+    mono_ns (exact), else from the event's row index.
+    """
+    if rows.empty:
+        return [None] * len(events)
+    if "mono_ns" in rows and rows["mono_ns"].notna().any():
+        first = rows[rows["mono_ns"].notna()].iloc[0]
+        return [first["elapsed_sec"] + (ev["mono_ns"] - first["mono_ns"]) / 1e9
+                if ev.get("mono_ns") is not None else None for ev in events]
+    last = len(rows) - 1
+    return [float(rows["elapsed_sec"].iloc[min(ev["row"], last)])
+            if ev.get("row") is not None else None for ev in events]
+
+
+def read_window(metrics_path: str, event: Dict, rows: int = 50) -> pd.DataFrame:
+    """
+    `rows` telemetry rows starting at an event, seeking instead of loading
+    the log: by byte offset in the metrics CSV, else by row group in the
+    Parquet / Arrow segments.
+    """
+    csv_path = f"{strip_base(metrics_path)}.csv"
+    if event.get("offset") is not None and os.path.exists(csv_path):
+        with open(csv_path, newline="") as f:
+            header = f.readline()
+            f.seek(event["offset"])
+            lines = [f.readline() for _ in range(rows)]
+        return pd.read_csv(io.StringIO(header + "".join(l for l in lines if l)))
+    if event.get("row") is not None and find_segments(metrics_path):
+        return read_rows(metrics_path, event["row"], rows)
+    return pd.DataFrame()
@@ -0,0 +1,186 @@
+"""
+GPU memory / utilisation and power sampler plugins (backend.sampling).
+
+NVIDIA via NVML, per device (backend.nvgpu); AMD GPUs and APUs via the
+amdgpu sysfs files (backend.amdgpu); failing both, a running `nvidia-smi
+dmon` / `amd-smi monitor`; Apple Silicon via a running `powermetrics`
+(needs sudo). The tools are long-lived streams (backend.streaming_tools).
+Only imported when the gpu or power sampler is enabled.
+"""
+import platform
+from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
+
+import psutil
+
+from backend.amdgpu import AMD_DEVICE_FIELDS, AmdGpuDevices
+from backend.nvgpu import GB, GPU_DEVICE_FIELDS, HAS_NVML, NvmlDevices, device_columns
+from backend.sampling import Sampler
+from backend.streaming_tools import ToolDevices, acquire, available, release
+
+
+def gpu_name(devices: Union[NvmlDevices, AmdGpuDevices, ToolDevices] = None) -> str:
+    names = devices.names if devices is not None else []
+    if devices is None and HAS_NVML:
+        probe = NvmlDevices()
+        names = probe.names
+        probe.close()
+    if names:
+        # "2x NVIDIA H100 80GB HBM3" on multi-GPU boxes, "AMD Radeon 8060S + AMD GPU (0x744c)"
+        # for an APU next to a discrete card
+        counts = Counter(names)
+        return " + ".join(name if n == 1 else f"{n}x {name}" for name, n in counts.items())
+    if platform.system() == "Darwin":
+        return "Apple Silicon"
+    return "Unknown"
+
+
+def open_devices(sysfs_root: str = "/", interval_sec: float = 1.0
+                 ) -> Tuple[Union[NvmlDevices, AmdGpuDevices, ToolDevices, None], List[str]]:
+    """
+    (devices, per-device fields): NVML devices, else amdgpu ones (Linux),
+    else an `nvidia-smi dmon` / `amd-smi monitor` stream, else (None, []).
+    """
+    nv = NvmlDevices()
+    if nv.ok and len(nv):
+        return nv, GPU_DEVICE_FIELDS
+    nv.close()
+    if platform.system() == "Linux":
+        amd = AmdGpuDevices(sysfs_root)
+        if len(amd):
+            return amd, AMD_DEVICE_FIELDS
+    for tool, fields in (("nvidia-smi", GPU_DEVICE_FIELDS), ("amd-smi", AMD_DEVICE_FIELDS)):
+        if available(tool):
+            devices = ToolDevices(tool, interval_sec)
+            if len(devices):
+                return devices, fields
+            devices.close()
+    return None, []
+
+
+def summarize(devices: List[Dict]) -> Dict[str, Optional[float]]:
+    """
+    Whole-box figures: VRAM, GTT and power summed, utilisation averaged,
+    hottest temperature.
+    """
+    def vals(field):
+        return [d[field] for d in devices if d.get(field) is not None]
+
+    util, mem_util, temp, power = vals("util_pct"), vals("mem_util_pct"), vals("temp_c"), vals("power_w")
+    gtt_used, gtt_total = vals("gtt_used_gb"), vals("gtt_total_gb")
+    return {
+        "vram_used": sum(vals("vram_used_gb")), "vram_total": sum(vals("vram_total_gb")),
+        "gtt_used": sum(gtt_used) if gtt_used else None,
+        "gtt_total": sum(gtt_total) if gtt_total else None,
+        "util": sum(util) / len(util) if util else None,
+        "mem_util": sum(mem_util) / len(mem_util) if mem_util else None,
+        "temp_c": max(temp) if temp else None,
+        "power_w": sum(power) if power else None
+    }
+
+
+class GpuSampler(Sampler):
+    """
+    Per-device figures of every NVIDIA device (VRAM, utilisation, power,
+    temperature, PCIe throughput) or amdgpu device (VRAM, GTT, utilisation,
+    power, temperature) as "devices", plus whole-box figures: VRAM / GTT
+    summed, utilisation averaged, hottest temperature. Without either (and
+    unless unified_memory=False): the unified-memory estimate (server RSS
+    from the process sampler + wired growth on macOS) against system RAM.
+    """
+
+    # NVML's PCIe throughput reads each measure over a 20 ms window (two per
+    # device per run): keep them off the fast thread and its row timestamps
+    blocking = True
+
+    def __init__(self, model_name: str = "Unknown", unified_memory: bool = True,
+                 sysfs_root: str = "/", stream_interval_sec: float = 1.0):
+        self.model_name = model_name
+        self.unified_memory = unified_memory
+        self.devices, self.fields = open_devices(sysfs_root, stream_interval_sec)
+        self.name = gpu_name(self.devices)
+        self._wired_base = None
+        if not self.devices and platform.system() == "Darwin":
+            self._wired_base = getattr(psutil.virtual_memory(), "wired", None)
+
+    @property
+    def device_count(self) -> int:
+        return len(self.devices) if self.devices else 0
+
+    @property
+    def columns(self) -> List[str]:
+        """Per-device metrics-log columns (gpu<i>_<field>)."""
+        return device_columns(self.device_count, self.fields)
+
+    def row(self, sample: Optional[Dict]) -> List[Optional[float]]:
+        devices = (sample or {}).get("devices") or []
+        values = []
+        for i in range(self.device_count):
+            dev = devices[i] if i < len(devices) else {}
+            values += [round(dev[f], 2) if dev.get(f) is not None else None for f in self.fields]
+        return values
+
+    def _unified_memory(self) -> Tuple[float, float]:
+        """
+        Inference server process tree RSS plus, on macOS, the wired memory
+        added since the sampler started: Metal buffers holding weights and KV
+        cache are wired and not in any RSS. Against system RAM, since it's
+        unified. backend.memcomp has the full breakdown.
+        """
+        procs = self.engine.latest.get("process") or {}
+        rss = (procs.get("total") or {}).get("rss") or 0.0
+
+        ram = psutil.virtual_memory()
+        wired_growth = 0.0
+        if self._wired_base is not None:
+            wired_growth = max(getattr(ram, "wired", 0) - self._wired_base, 0)
+        return (rss + wired_growth) / GB, ram.total / GB
+
+    def sample(self) -> Dict:
+        out = {"vram_used": 0.0, "vram_total": 0.0, "gtt_used": None, "gtt_total": None,
+               "util": None, "mem_util": None, "temp_c": None, "power_w": None,
+               "name": self.name, "devices": []}
+        if not self.devices:
+            if self.unified_memory:
+                out["vram_used"], out["vram_total"] = self._unified_memory()
+            return out
+
+        out["devices"] = self.devices.sample()
+        out.update(summarize(out["devices"]))
+        return out
+
+    def close(self):
+        if self.devices:
+            self.devices.close()
+            self.devices = None
+
+
+class PowerSampler(Sampler):
+    """
+    GPU power (W), summed over NVIDIA or amdgpu devices, else the latest
+    sample of a running powermetrics (which also reports residency).
+    """
+
+    def __init__(self, sysfs_root: str = "/", stream_interval_sec: float = 1.0):
+        self.devices, _ = open_devices(sysfs_root, stream_interval_sec)
+        self.stream = None
+        if not self.devices and platform.system() == "Darwin":
+            self.stream = acquire("powermetrics", stream_interval_sec)
+
+    def sample(self) -> Dict:
+        util: Optional[float] = None
+        power = 0.0
+        if self.devices:
+            power = self.devices.power_w() or 0.0
+        elif self.stream:
+            latest = self.stream.latest().get(0) or {}
+            util, power = latest.get("util_pct"), latest.get("power_w") or 0.0
+        return {"util": util, "power_w": power}
+
+    def close(self):
+        if self.devices:
+            self.devices.close()
+            self.devices = None
+        if self.stream:
+            release(self.stream)
+            self.stream = None
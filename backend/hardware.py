@@ -1,3 +1,4 @@
+import os
 import platform
 import subprocess
 import json
@@ -61,6 +62,22 @@ class DeviceDetector:
             except Exception:
                 pass
 
+        # amdgpu sysfs (no ROCm install needed, e.g. Strix Halo APUs)
+        elif self.system == "Linux":
+            from backend.amdgpu import device_name, find_devices
+            for device in find_devices():
+                try:
+                    with open(os.path.join(device, "mem_info_vram_total")) as f:
+                        vram_total = int(f.read())
+                except (OSError, ValueError):
+                    vram_total = 0
+                gpus.append({
+                    "type": "AMD",
+                    "id": os.path.basename(os.path.dirname(device)),
+                    "name": device_name(device),
+                    "vram_total_mb": vram_total // (1024**2)
+                })
+
         return gpus
 
     def detect_phison_storage(self) -> List[Dict[str, Any]]:
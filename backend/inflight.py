@@ -0,0 +1,103 @@
+"""
+In-flight request table for the live telemetry view.
+
+With concurrency > 1 every worker thread streams its own request. Each one
+owns a RequestSlot and is the only writer of it (phase, token count); the
+table lock is only taken to add / retire slots and to snapshot them, so the
+per-token path is a plain attribute increment. The telemetry row task turns
+the table into aggregates: requests in flight, prefill vs decode split,
+aggregate tokens/sec across all streams, and the oldest request's age.
+"""
+import threading
+from typing import Dict, List, Optional
+
+from backend.clock import RunClock
+
+# Appended to the metrics log (see TelemetryCollector)
+INFLIGHT_COLUMNS = ["inflight_reqs", "inflight_prefill", "inflight_decode",
+                    "live_tok_s", "oldest_req_ms"]
+
+
+class RequestSlot:
+    """One active request; written only by the thread streaming it."""
+    __slots__ = ("request_id", "context_len", "start_ns", "first_token_ns", "tokens", "last_token_ns")
+
+    def __init__(self, request_id, context_len: int, start_ns: int):
+        self.request_id = request_id
+        self.context_len = context_len
+        self.start_ns = start_ns
+        self.first_token_ns: Optional[int] = None
+        self.tokens = 0
+        self.last_token_ns: Optional[int] = None
+
+    @property
+    def phase(self) -> str:
+        return "prefill" if self.first_token_ns is None else "decode"
+
+
+class InflightTable:
+    """Thread-safe table of active requests, with live aggregates."""
+
+    def __init__(self, clock: RunClock = None):
+        self.clock = clock or RunClock()
+        self._lock = threading.Lock()
+        self._slots: Dict[int, RequestSlot] = {}  # id(slot) -> slot
+        # Tokens of retired requests (in-flight ones are summed from their slots)
+        self._retired_tokens = 0
+        self._prev = None  # (mono ns, total tokens) of the previous aggregate()
+
+    def begin(self, request_id=None, context_len: int = 0) -> RequestSlot:
+        slot = RequestSlot(request_id, context_len, self.clock.now_ns())
+        with self._lock:
+            self._slots[id(slot)] = slot
+        return slot
+
+    def first_token(self, slot: RequestSlot, mono_ns: int = None):
+        slot.first_token_ns = mono_ns or self.clock.now_ns()
+
+    def token(self, slot: RequestSlot, mono_ns: int = None):
+        """One streamed token chunk (called from the request's own thread)."""
+        slot.last_token_ns = mono_ns or self.clock.now_ns()
+        slot.tokens += 1
+
+    def end(self, slot: RequestSlot):
+        with self._lock:
+            if self._slots.pop(id(slot), None) is not None:
+                self._retired_tokens += slot.tokens
+
+    def active(self) -> List[RequestSlot]:
+        with self._lock:
+            return list(self._slots.values())
+
+    def aggregate(self, top: int = 8) -> Dict:
+        """
+        Live aggregates; live_tok_s is the token rate across all streams since
+        the previous call (the row interval). `requests` lists the oldest
+        `top` requests with their phase, age and token count.
+        """
+        now = self.clock.now_ns()
+        with self._lock:
+            slots = list(self._slots.values())
+            total = self._retired_tokens + sum(s.tokens for s in slots)
+
+        tok_s = None
+        if self._prev and now > self._prev[0]:
+            tok_s = (total - self._prev[1]) / ((now - self._prev[0]) / 1e9)
+        self._prev = (now, total)
+
+        slots.sort(key=lambda s: s.start_ns)
+        prefill = sum(1 for s in slots if s.first_token_ns is None)
+        return {
+            "inflight_reqs": len(slots),
+            "inflight_prefill": prefill,
+            "inflight_decode": len(slots) - prefill,
+            "live_tok_s": tok_s,
+            "oldest_req_ms": (now - slots[0].start_ns) / 1e6 if slots else None,
+            "tokens_total": total,
+            "requests": [{
+                "request": s.request_id, "context_len": s.context_len, "phase": s.phase,
+                "elapsed_ms": round((now - s.start_ns) / 1e6, 1), "tokens": s.tokens,
+                "ttft_ms": round((s.first_token_ns - s.start_ns) / 1e6, 1)
+                if s.first_token_ns is not None else None
+            } for s in slots[:top]]
+        }
@@ -0,0 +1,255 @@
+"""
+Byte-level memory composition: where model weights and KV cache live.
+
+Each sample splits memory into a stacked series (GB):
+
+    comp_anon_gb           anonymous memory (AnonPages; macOS: active)
+    comp_file_mapped_gb    page cache mapped into processes (Mapped: mmapped weights)
+    comp_file_cache_gb     the rest of the page cache (Cached + Buffers - Mapped - Shmem;
+                           macOS: inactive)
+    comp_shmem_gb          tmpfs / shared memory (Shmem)
+    comp_kernel_gb         slab, kernel stacks, page tables (macOS: wired, incl. Metal buffers)
+    comp_free_gb           MemFree
+    comp_swap_disk_gb      swap used on other block devices / files
+    comp_swap_zram_gb      swap used on zram (compressed in RAM) ...
+    comp_zram_ram_gb       ... and the RAM that takes (zram mm_stat mem_used_total)
+    comp_vram_gb           GPU VRAM (gpu sampler)
+    comp_gtt_gb            amdgpu GTT (gpu sampler)
+    comp_tier3_gb          data resident on the tier-3 device: swap on it plus the
+                           on-disk size of `tier3_paths` (e.g. the SSD cache dir)
+
+plus comp_dirty_gb / comp_writeback_gb, the part of the page cache not yet
+on disk (not stacked). Linux reads /proc/meminfo, /proc/swaps and
+/sys/block/zram*/mm_stat through kept-open files (backend.procfs); macOS
+uses psutil. `root` can point at a fixture tree for offline runs.
+
+peak_composition() turns a run's timeline into one row per context length,
+at the sample with the largest footprint (memcomp_<mode>.csv).
+"""
+import os
+import platform
+import time
+from typing import Dict, List, Optional
+
+import psutil
+
+from backend.columns import COMP_COLUMNS
+from backend.procfs import _PreadFile, _find_int
+from backend.sampling import Sampler
+
+GB = 1024**3
+
+# Components that add up to the footprint (dirty / writeback are part of the page cache)
+STACKED_COLUMNS = [
+    "comp_anon_gb", "comp_file_mapped_gb", "comp_file_cache_gb", "comp_shmem_gb",
+    "comp_kernel_gb", "comp_swap_disk_gb", "comp_zram_ram_gb",
+    "comp_vram_gb", "comp_gtt_gb", "comp_tier3_gb"
+]
+
+PEAK_COLUMNS = ["context_len", "samples", "peak_elapsed_sec", "footprint_gb"] + COMP_COLUMNS
+
+MEMINFO_FIELDS = ["MemFree", "Buffers", "Cached", "AnonPages", "Mapped", "Shmem",
+                  "Slab", "KernelStack", "PageTables", "Dirty", "Writeback"]
+
+
+def _block_parent(root: str, name: str) -> str:
+    """Whole-disk device of a partition (nvme0n1p3 -> nvme0n1); the name itself otherwise."""
+    link = os.path.join(root, "sys/class/block", name)
+    try:
+        parent = os.path.basename(os.path.dirname(os.path.realpath(link)))
+    except OSError:
+        return name
+    return parent if os.path.exists(os.path.join(root, "sys/block", parent, name)) else name
+
+
+def backing_device(root: str, filename: str) -> Optional[str]:
+    """Whole-disk device holding a partition (/dev/...) or a file."""
+    if filename.startswith("/dev/"):
+        return _block_parent(root, os.path.basename(filename))
+    try:
+        st = os.stat(os.path.join(root, filename.lstrip("/")))
+        link = os.path.realpath(os.path.join(
+            root, f"sys/dev/block/{os.major(st.st_dev)}:{os.minor(st.st_dev)}"))
+    except OSError:
+        return None
+    return _block_parent(root, os.path.basename(link))
+
+
+def disk_usage(paths: List[str]) -> int:
+    """Allocated bytes of every file under `paths` (st_blocks, like du)."""
+    total = 0
+    for path in paths:
+        for dirpath, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(dirpath, name)).st_blocks * 512
+                except OSError:
+                    pass
+    return total
+
+
+class MemCompositionSampler(Sampler):
+    """
+    Memory composition in bytes (see module doc). tier3_paths are walked
+    every `tier3_interval_sec` at most, so the sampler is blocking.
+    """
+
+    blocking = True
+
+    def __init__(self, storage_device: str = None, tier3_paths: List[str] = None,
+                 tier3_interval_sec: float = 5.0, root: str = "/"):
+        self.storage_device = storage_device
+        self.tier3_paths = [p for p in (tier3_paths or []) if p]
+        self.tier3_interval_sec = tier3_interval_sec
+        self.root = root
+        self._tier3 = (None, 0)  # (monotonic time, bytes) of the last walk
+        self._swap_devices: Dict[str, Optional[str]] = {}  # swap filename -> backing disk
+        self._procfs = platform.system() == "Linux"
+        self._meminfo = self._swaps = None
+        self._zram: Dict[str, _PreadFile] = {}
+        if self._procfs:
+            self._meminfo = _PreadFile(os.path.join(root, "proc/meminfo"), 8192)
+            self._swaps = _PreadFile(os.path.join(root, "proc/swaps"), 4096)
+            self._keys = [(f, f"\n{f}:".encode()) for f in MEMINFO_FIELDS]
+            block = os.path.join(root, "sys/block")
+            for dev in sorted(os.listdir(block)) if os.path.isdir(block) else []:
+                path = os.path.join(block, dev, "mm_stat")
+                if dev.startswith("zram") and os.path.exists(path):
+                    self._zram[dev] = _PreadFile(path, 256)
+
+    def _meminfo_bytes(self) -> Dict[str, int]:
+        n = self._meminfo.read()
+        buf = self._meminfo.buf
+        return {name: (_find_int(buf, key, n) or 0) * 1024 for name, key in self._keys}
+
+    def read_swaps(self) -> List[Dict]:
+        """Swap areas: filename, type, size / used (bytes), backing disk."""
+        n = self._swaps.read()
+        swaps = []
+        # "Filename  Type  Size  Used  Priority" (sizes in kB)
+        for line in bytes(self._swaps.view[:n]).decode().splitlines()[1:]:
+            parts = line.split()
+            if len(parts) < 4:
+                continue
+            name = parts[0]
+            if name not in self._swap_devices:
+                self._swap_devices[name] = backing_device(self.root, name)
+            swaps.append({"filename": name, "type": parts[1],
+                          "size": int(parts[2]) * 1024, "used": int(parts[3]) * 1024,
+                          "device": self._swap_devices[name]})
+        return swaps
+
+    def _zram_ram(self) -> Dict[str, int]:
+        """RAM used by each zram device (mm_stat column 3: mem_used_total)."""
+        out = {}
+        for dev, f in self._zram.items():
+            try:
+                n = f.read()
+                out[dev] = int(bytes(f.view[:n]).split()[2])
+            except (OSError, ValueError, IndexError):
+                pass
+        return out
+
+    def _tier3_bytes(self, swap_on_tier3: int) -> int:
+        now = time.monotonic()
+        last, size = self._tier3
+        if self.tier3_paths and (last is None or now - last >= self.tier3_interval_sec):
+            size = disk_usage(self.tier3_paths)
+            self._tier3 = (now, size)
+        return swap_on_tier3 + size
+
+    def _read_linux(self) -> Dict:
+        mem = self._meminfo_bytes()
+        swaps = self.read_swaps()
+        zram = self._zram_ram()
+        page_cache = mem["Cached"] + mem["Buffers"]
+
+        swap_zram = swap_disk = swap_tier3 = 0
+        for s in swaps:
+            if (s["device"] or "").startswith("zram"):
+                swap_zram += s["used"]
+            elif self.storage_device and s["device"] == self.storage_device:
+                swap_tier3 += s["used"]
+            else:
+                swap_disk += s["used"]
+
+        return {
+            "anon": mem["AnonPages"], "file_mapped": mem["Mapped"],
+            "file_cache": max(page_cache - mem["Mapped"] - mem["Shmem"], 0),
+            "shmem": mem["Shmem"],
+            "kernel": mem["Slab"] + mem["KernelStack"] + mem["PageTables"],
+            "free": mem["MemFree"], "dirty": mem["Dirty"], "writeback": mem["Writeback"],
+            "swap_disk": swap_disk, "swap_zram": swap_zram, "zram_ram": sum(zram.values()),
+            "tier3": self._tier3_bytes(swap_tier3),
+            "swaps": swaps, "zram": zram
+        }
+
+    def _read_psutil(self) -> Dict:
+        ram = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        return {
+            "anon": getattr(ram, "active", None), "file_mapped": None,
+            "file_cache": getattr(ram, "inactive", None), "shmem": getattr(ram, "shared", None),
+            "kernel": getattr(ram, "wired", None), "free": ram.free,
+            "dirty": None, "writeback": None,
+            "swap_disk": swap.used, "swap_zram": 0, "zram_ram": 0,
+            "tier3": self._tier3_bytes(0),
+            "swaps": [], "zram": {}
+        }
+
+    def sample(self) -> Dict:
+        out = self._read_linux() if self._procfs else self._read_psutil()
+        gpu = self.engine.latest.get("gpu") or {}
+        # The unified-memory estimate is RAM already counted above, not VRAM
+        out["vram"] = gpu.get("vram_used", 0.0) * GB if gpu.get("devices") else None
+        out["gtt"] = gpu["gtt_used"] * GB if gpu.get("gtt_used") is not None else None
+        return out
+
+    def row(self, sample: Optional[Dict]) -> List[Optional[float]]:
+        """Metrics-log values (COMP_COLUMNS) of one sample."""
+        return composition_row(sample)
+
+    def close(self):
+        for f in [self._meminfo, self._swaps] + list(self._zram.values()):
+            if f is not None:
+                f.close()
+        self._meminfo = self._swaps = None
+        self._zram = {}
+
+
+def composition_row(sample: Optional[Dict]) -> List[Optional[float]]:
+    """COMP_COLUMNS values (GB) of a sampler output."""
+    sample = sample or {}
+    values = []
+    for col in COMP_COLUMNS:
+        v = sample.get(col[len("comp_"):-len("_gb")])
+        values.append(round(v / GB, 3) if v is not None else None)
+    return values
+
+
+def footprint(row: Dict) -> float:
+    return sum(row.get(c) or 0.0 for c in STACKED_COLUMNS)
+
+
+def peak_composition(samples: List[Dict]) -> List[Dict]:
+    """
+    One row per context length: the composition at the sample with the
+    largest footprint (sum of STACKED_COLUMNS). `samples` are telemetry
+    timeline entries carrying COMP_COLUMNS.
+    """
+    if not samples:
+        return []
+    start = samples[0]["timestamp"]
+    by_context: Dict[int, List[Dict]] = {}
+    for s in samples:
+        if s.get("context_len") and s.get("comp_free_gb") is not None:
+            by_context.setdefault(s["context_len"], []).append(s)
+
+    rows = []
+    for ctx, ctx_samples in sorted(by_context.items()):
+        peak = max(ctx_samples, key=footprint)
+        rows.append(dict({c: peak.get(c) for c in COMP_COLUMNS},
+                         context_len=ctx, samples=len(ctx_samples),
+                         peak_elapsed_sec=round(peak["timestamp"] - start, 2),
+                         footprint_gb=round(footprint(peak), 3)))
+    return rows
@@ -1,26 +1,33 @@
 import time
-import psutil
-import threading
+import platform
 from typing import Dict, Any
 
-# Try importing pynvml, handle missing (e.g. on generic Mac/AMD)
-try:
-    import pynvml
-    HAS_NVML = True
-except ImportError:
-    HAS_NVML = False
+from backend.procfs import ProcfsSampler
+from backend.sampling import SamplerEngine
+from backend.schemas import (AidaptivMetrics, AppMetrics, DiskMetrics, GpuMetrics, Snapshot,
+                             SystemMetrics)
+
+GB = 1024**3
+MB = 1024**2
 
 
 class SystemMonitor:
-    def __init__(self, poll_interval: float = 0.5, disk_device: str = None):
+    """
+    Polls system, GPU and disk state into one Snapshot dict, using the same
+    sampler plugins as TelemetryCollector (backend.sampling).
+    """
+
+    def __init__(self, poll_interval: float = 0.5, disk_device: str = None,
+                 gpu: bool = True, power: bool = True):
         self.poll_interval = poll_interval
         self.disk_device = disk_device
+        self.gpu = gpu
+        self.power = power
         self.running = False
-        self._thread = None
-        # Raw counters for calculating rates
-        self._last_disk_read = 0
-        self._last_disk_write = 0
-        self._last_disk_time = 0
+        self.engine = None
+
+        # Linux: direct /proc + /sys reads instead of psutil
+        self._procfs = None
 
         # Current state container
         self.snapshot: Dict[str, Any] = {
@@ -37,162 +44,77 @@ class SystemMonitor:
             "aidaptiv": {}
         }
 
-    def _init_nvml(self):
-        if HAS_NVML:
-            try:
-                pynvml.nvmlInit()
-                return True
-            except pynvml.NVMLError:
-                return False
-        return False
-
-    def _get_gpu_metrics(self):
-        metrics = {
-            "vram_total_gb": 0.0, "vram_used_gb": 0.0,
-            "util_pct": 0.0, "mem_util_pct": 0.0,
-            "power_w": None, "temp_c": None
-        }
-
-        if HAS_NVML:
-            try:
-                # Assuming single GPU focus for V1 or aggregation; taking device 0 for now
-                handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-                mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-
-                metrics["vram_total_gb"] = mem_info.total / (1024**3)
-                metrics["vram_used_gb"] = mem_info.used / (1024**3)
-                metrics["util_pct"] = util.gpu
-                metrics["mem_util_pct"] = util.memory
-
-                try:
-                    metrics["power_w"] = pynvml.nvmlDeviceGetPowerUsage(
-                        handle) / 1000.0
-                except:
-                    pass
-                try:
-                    metrics["temp_c"] = pynvml.nvmlDeviceGetTemperature(
-                        handle, pynvml.NVML_TEMPERATURE_GPU)
-                except:
-                    pass
-            except Exception:
-                pass
-        return metrics
-
-    def _get_disk_metrics(self):
-        """Calculates IOPS and BPS since last poll"""
-        metrics = {
-            "read_bps": 0.0, "write_bps": 0.0,
-            "read_iops": 0.0, "write_iops": 0.0,
-            "lat_p95_ms": None, "queue_depth": None
-        }
-
+    def _init_procfs(self):
+        if platform.system() != "Linux":
+            return None
         try:
-            # If specific device not set, might aggregate or pick first?
-            # For now, using system-wide counters if device is None, or specific if psutil supports
-            # psutil.disk_io_counters(perdisk=True)
-
-            counters = psutil.disk_io_counters(
-                perdisk=True if self.disk_device else False)
-
-            current_read = 0
-            current_write = 0
-            current_reads_count = 0
-            current_writes_count = 0
-
-            if self.disk_device and self.disk_device in counters:
-                io = counters[self.disk_device]
-                current_read = io.read_bytes
-                current_write = io.write_bytes
-                current_reads_count = io.read_count
-                current_writes_count = io.write_count
-            elif not self.disk_device:
-                io = counters  # global if perdisk=False
-                current_read = io.read_bytes
-                current_write = io.write_bytes
-                current_reads_count = io.read_count
-                current_writes_count = io.write_count
-
-            now = time.time()
-            delta = now - self._last_disk_time
-
-            if delta > 0 and self._last_disk_time > 0:
-                metrics["read_bps"] = (
-                    current_read - self._last_read_bytes) / delta
-                metrics["write_bps"] = (
-                    current_write - self._last_write_bytes) / delta
-                metrics["read_iops"] = (
-                    current_reads_count - self._last_read_count) / delta
-                metrics["write_iops"] = (
-                    current_writes_count - self._last_write_count) / delta
-
-            self._last_read_bytes = current_read
-            self._last_write_bytes = current_write
-            self._last_read_count = current_reads_count
-            self._last_write_count = current_writes_count
-            self._last_disk_time = now
-
-        except Exception:
-            pass
-
-        return metrics
-
-    def _poll_loop(self):
-        self._init_nvml()
-        self._last_disk_time = time.time()
-        # Init counters
-        if self.disk_device:
-            c = psutil.disk_io_counters(perdisk=True).get(self.disk_device)
-        else:
-            c = psutil.disk_io_counters()
-
-        if c:
-            self._last_read_bytes = c.read_bytes
-            self._last_write_bytes = c.write_bytes
-            self._last_read_count = c.read_count
-            self._last_write_count = c.write_count
-
-        while self.running:
-            # System
-            mem = psutil.virtual_memory()
-            swap = psutil.swap_memory()
-
-            self.snapshot["system"] = {
-                "ram_total_gb": mem.total / (1024**3),
-                "ram_used_gb": mem.used / (1024**3),
-                "ram_available_gb": mem.available / (1024**3),
-                "swap_used_gb": swap.used / (1024**3),
-                "cpu_util_pct": psutil.cpu_percent(interval=None),
-                # Hard to get realtime via psutil easily without OS specific calls
-                "page_faults_major": None
-            }
-
-            # GPU
-            self.snapshot["gpu"] = self._get_gpu_metrics()
-
-            # Disk
-            self.snapshot["disk"] = self._get_disk_metrics()
-
-            self.snapshot["timestamp"] = time.time()
-            time.sleep(self.poll_interval)
+            return ProcfsSampler(devices=[self.disk_device] if self.disk_device else None)
+        except OSError:
+            return None
+
+    def _compose(self):
+        latest = self.engine.latest
+        mem = latest.get("memory")
+        disk = latest.get("disk")
+        if not mem or not disk:
+            return
+        gpu = latest.get("gpu", {})
+        power = latest.get("power", {})
+        dev = disk["device"]
+        read_mb_s, write_mb_s, _, _ = disk["rates"]
+
+        snapshot = Snapshot(
+            timestamp=time.time(),
+            system=SystemMetrics(
+                ram_total_gb=mem["ram_total"] / GB,
+                ram_used_gb=mem["ram_used"] / GB,
+                ram_available_gb=(mem["ram_available"] or 0) / GB,
+                swap_used_gb=mem["swap_used"] / GB,
+                cpu_util_pct=mem["cpu_pct"] or 0.0,
+                page_faults_major=mem["major_faults_s"]),
+            gpu=GpuMetrics(
+                vram_total_gb=gpu.get("vram_total", 0.0), vram_used_gb=gpu.get("vram_used", 0.0),
+                util_pct=gpu.get("util") or 0.0, mem_util_pct=gpu.get("mem_util") or 0.0,
+                power_w=power.get("power_w", gpu.get("power_w")), temp_c=gpu.get("temp_c"),
+                gtt_total_gb=gpu.get("gtt_total"), gtt_used_gb=gpu.get("gtt_used"),
+                devices=gpu.get("devices", [])),
+            disk=DiskMetrics(
+                read_bps=read_mb_s * MB, write_bps=write_mb_s * MB,
+                read_iops=dev["read_iops"], write_iops=dev["write_iops"],
+                await_avg_p95_ms=disk["await_avg_p95_ms"], queue_depth=dev["queue_depth"],
+                await_ms=dev["await_ms"], avg_req_kb=dev["avg_req_kb"], util_pct=dev["util_pct"]),
+            app=AppMetrics(**self.snapshot["app"]),
+            aidaptiv=AidaptivMetrics(**self.snapshot["aidaptiv"]))
+        self.snapshot = snapshot.model_dump(include={"timestamp", "system", "gpu", "disk", "app", "aidaptiv"})
 
     def start_monitoring(self):
         if self.running:
             return
         self.running = True
-        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
-        self._thread.start()
+        self._procfs = self._init_procfs()
+
+        engine = SamplerEngine("monitor")
+        self.engine = engine
+        iv = self.poll_interval
+        engine.build("memory", iv, procfs=self._procfs, cpu=True)
+        engine.build("disk", iv, storage_device=self.disk_device, procfs=self._procfs)
+        if self.gpu:
+            engine.build("gpu", iv, unified_memory=False, stream_interval_sec=iv)
+        if self.power and platform.system() != "Darwin":
+            # NVML board power; the Mac path (powermetrics) needs sudo, so it's left to telemetry
+            engine.build("power", iv, stream_interval_sec=iv)
+        engine.every("snapshot", iv, self._compose)
+        engine.start()
         print(f"System Monitoring Started (Interval: {self.poll_interval}s).")
 
     def stop_monitoring(self):
         self.running = False
-        if self._thread:
-            self._thread.join()
-        if HAS_NVML:
-            try:
-                pynvml.nvmlShutdown()
-            except:
-                pass
+        if self.engine:
+            self.engine.stop()
+            self.engine = None
+        if self._procfs:
+            self._procfs.close()
+            self._procfs = None
 
     def get_latest_metrics(self) -> Dict[str, Any]:
         return self.snapshot.copy()
@@ -0,0 +1,160 @@
+"""
+Per-device NVIDIA GPU telemetry via NVML.
+
+NVML is initialised once per process (reference counted, shared by every
+user) and device handles are fetched once, when NvmlDevices is created, not
+every tick. GPU utilisation comes from NVML's sample buffer where the driver
+keeps one (the mean over the interval since the previous read instead of a
+single instantaneous value), else from nvmlDeviceGetUtilizationRates.
+"""
+import platform
+import threading
+from typing import Dict, List, Optional
+
+# Try importing pynvml for NVIDIA support, but skip on macOS
+try:
+    if platform.system() == "Darwin":
+        HAS_NVML = False
+    else:
+        import pynvml
+        HAS_NVML = True
+except ImportError:
+    HAS_NVML = False
+
+GB = 1024**3
+
+# Per-device series; the metrics log has one gpu<i>_<field> column each
+GPU_DEVICE_FIELDS = ["vram_used_gb", "vram_total_gb", "util_pct", "mem_util_pct",
+                     "power_w", "temp_c", "pcie_tx_mb_s", "pcie_rx_mb_s"]
+
+_nvml_lock = threading.Lock()
+_nvml_users = 0
+
+
+def nvml_init() -> bool:
+    """Initialise NVML once per process; pair every True with nvml_shutdown()."""
+    global _nvml_users
+    if not HAS_NVML:
+        return False
+    with _nvml_lock:
+        if _nvml_users == 0:
+            try:
+                pynvml.nvmlInit()
+            except Exception:
+                return False
+        _nvml_users += 1
+    return True
+
+
+def nvml_shutdown():
+    global _nvml_users
+    with _nvml_lock:
+        if _nvml_users == 0:
+            return
+        _nvml_users -= 1
+        if _nvml_users == 0:
+            try:
+                pynvml.nvmlShutdown()
+            except Exception:
+                pass
+
+
+def device_columns(count: int, fields: List[str] = GPU_DEVICE_FIELDS) -> List[str]:
+    return [f"gpu{i}_{field}" for i in range(count) for field in fields]
+
+
+def _decode(name) -> str:
+    return name.decode("utf-8") if isinstance(name, bytes) else name
+
+
+class NvmlDevices:
+    """Cached NVML handles of every device, sampled per device."""
+
+    def __init__(self):
+        self.ok = nvml_init()
+        self.handles = []
+        self.names: List[str] = []
+        if self.ok:
+            try:
+                for i in range(pynvml.nvmlDeviceGetCount()):
+                    handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+                    self.handles.append(handle)
+                    self.names.append(_decode(pynvml.nvmlDeviceGetName(handle)))
+            except Exception:
+                pass
+        # Newest sample-buffer timestamp read per device (None: no buffer on this driver)
+        self._util_ts: List[Optional[int]] = [0] * len(self.handles)
+
+    def __len__(self):
+        return len(self.handles)
+
+    def _buffered_util(self, i: int, handle) -> Optional[float]:
+        """Mean GPU utilisation of the samples NVML buffered since the previous read."""
+        if self._util_ts[i] is None:
+            return None
+        try:
+            _, samples = pynvml.nvmlDeviceGetSamples(
+                handle, pynvml.NVML_GPU_UTILIZATION_SAMPLES, self._util_ts[i])
+        except pynvml.NVMLError_NotFound:
+            return None  # No new samples yet
+        except Exception:
+            self._util_ts[i] = None
+            return None
+        if not samples:
+            return None
+        self._util_ts[i] = max(s.timeStamp for s in samples)
+        return sum(s.sampleValue.uiVal for s in samples) / len(samples)
+
+    def sample(self) -> List[Dict]:
+        out = []
+        for i, handle in enumerate(self.handles):
+            dev = {"index": i, "name": self.names[i]}
+            dev.update({f: None for f in GPU_DEVICE_FIELDS})
+            try:
+                mem = pynvml.nvmlDeviceGetMemoryInfo(handle)
+                dev["vram_used_gb"], dev["vram_total_gb"] = mem.used / GB, mem.total / GB
+            except Exception:
+                pass
+            try:
+                util = pynvml.nvmlDeviceGetUtilizationRates(handle)
+                dev["util_pct"], dev["mem_util_pct"] = util.gpu, util.memory
+            except Exception:
+                pass
+            buffered = self._buffered_util(i, handle)
+            if buffered is not None:
+                dev["util_pct"] = buffered
+            try:
+                dev["power_w"] = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0
+            except Exception:
+                pass
+            try:
+                dev["temp_c"] = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
+            except Exception:
+                pass
+            try:
+                # KB/s over NVML's 20 ms window
+                dev["pcie_tx_mb_s"] = pynvml.nvmlDeviceGetPcieThroughput(
+                    handle, pynvml.NVML_PCIE_UTIL_TX_BYTES) / 1024
+                dev["pcie_rx_mb_s"] = pynvml.nvmlDeviceGetPcieThroughput(
+                    handle, pynvml.NVML_PCIE_UTIL_RX_BYTES) / 1024
+            except Exception:
+                pass
+            out.append(dev)
+        return out
+
+    def power_w(self) -> Optional[float]:
+        """Board power summed over devices (W)."""
+        total = None
+        for handle in self.handles:
+            try:
+                total = (total or 0.0) + pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0
+            except Exception:
+                pass
+        return total
+
+    def close(self):
+        if self.ok:
+            nvml_shutdown()
+            self.ok = False
+        self.handles = []
+
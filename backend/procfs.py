@@ -0,0 +1,296 @@
+"""
+Direct /proc and /sys sampler backend for Linux telemetry.
+
+File descriptors on /proc/meminfo, /proc/vmstat, /proc/stat and
+/sys/block/<dev>/stat are opened once and re-read with preadv() into
+preallocated buffers; only the fields we report are parsed. `root` can point
+at a fixture tree (containing proc/ and sys/) for offline runs.
+
+Microbenchmark against the psutil path:
+    python -m backend.procfs --bench
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Optional
+
+# /proc/meminfo fields we keep (kB in the file, reported in bytes)
+MEMINFO_FIELDS = [
+    "MemTotal", "MemFree", "MemAvailable", "Buffers", "Cached", "SReclaimable",
+    "SwapTotal", "SwapFree"
+]
+
+# /proc/vmstat counters we keep
+VMSTAT_FIELDS = ["pgmajfault", "pswpin", "pswpout"]
+
+# /sys/block/<dev>/stat columns (Documentation/block/stat.rst)
+BLOCK_STAT_FIELDS = [
+    "read_ios", "read_merges", "read_sectors", "read_ticks",
+    "write_ios", "write_merges", "write_sectors", "write_ticks",
+    "in_flight", "io_ticks", "time_in_queue"
+]
+SECTOR_BYTES = 512  # sysfs always counts 512-byte sectors
+
+
+class _PreadFile:
+    """An fd kept open for the life of the sampler, re-read from offset 0."""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+
+    def read(self) -> int:
+        n = os.preadv(self.fd, [self.buf], 0)
+        while n == len(self.buf):
+            # File outgrew the buffer (e.g. many CPUs in /proc/stat): grow once
+            self.buf = bytearray(len(self.buf) * 2)
+            self.view = memoryview(self.buf)
+            n = os.preadv(self.fd, [self.buf], 0)
+        return n
+
+    def close(self):
+        self.view.release()
+        os.close(self.fd)
+
+
+def _find_int(buf: bytearray, key: bytes, end: int) -> Optional[int]:
+    """
+    Integer following a line key (given with its leading newline, e.g.
+    b'\\npgmajfault ') in buf[:end].
+    """
+    if buf.startswith(key[1:], 0, end):
+        # The first line has no newline before it
+        i = len(key) - 1
+    else:
+        i = buf.find(key, 0, end)
+        if i < 0:
+            return None
+        i += len(key)
+    while i < end and buf[i] == 32:  # skip spaces
+        i += 1
+    j = i
+    while j < end and 48 <= buf[j] <= 57:
+        j += 1
+    return int(buf[i:j]) if j > i else None
+
+
+# Virtual block devices: their I/O is RAM (zram, ram, loop over a cached file)
+# or already counted on the disks underneath (dm, md)
+VIRTUAL_BLOCK_PREFIXES = ("loop", "zram", "ram", "dm-", "md")
+
+
+def list_block_devices(root: str = "/") -> List[str]:
+    """
+    Physical whole-disk devices under /sys/block. Virtual devices and any
+    device stacked on others (non-empty slaves/, e.g. LVM, LUKS, RAID) are
+    skipped so summing them does not count the same bytes twice.
+    """
+    try:
+        names = sorted(os.listdir(os.path.join(root, "sys/block")))
+    except OSError:
+        return []
+    devices = []
+    for name in names:
+        if name.startswith(VIRTUAL_BLOCK_PREFIXES):
+            continue
+        try:
+            if os.listdir(os.path.join(root, "sys/block", name, "slaves")):
+                continue
+        except OSError:
+            pass
+        devices.append(name)
+    return devices
+
+
+class ProcfsSampler:
+    """
+    One-pass reader for memory, swap, major-fault, CPU and block-device
+    counters. Not thread-safe: give each sampling thread its own instance.
+    """
+
+    def __init__(self, root: str = "/", devices: List[str] = None):
+        self.root = root
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self._meminfo = _PreadFile(os.path.join(root, "proc/meminfo"), 8192)
+        self._vmstat = _PreadFile(os.path.join(root, "proc/vmstat"), 16384)
+        self._stat = _PreadFile(os.path.join(root, "proc/stat"), 16384)
+
+        # Per-device stat files; None = every whole-disk device under /sys/block
+        if devices is None:
+            devices = list_block_devices(root)
+        self._block: Dict[str, _PreadFile] = {}
+        for dev in devices:
+            # Partitions only appear under /sys/class/block
+            for parent in ("sys/block", "sys/class/block"):
+                path = os.path.join(root, parent, dev, "stat")
+                if os.path.exists(path):
+                    self._block[dev] = _PreadFile(path, 256)
+                    break
+
+        self._meminfo_keys = [(f, f"\n{f}:".encode()) for f in MEMINFO_FIELDS]
+        self._vmstat_keys = [(f, f"\n{f} ".encode()) for f in VMSTAT_FIELDS]
+        self._fast_mem_keys = [f"\n{f}:".encode() for f in (
+            "MemTotal", "MemFree", "Buffers", "Cached", "SReclaimable", "SwapTotal", "SwapFree")]
+        self._last_cpu = None
+
+    @property
+    def devices(self) -> List[str]:
+        return list(self._block)
+
+    def read_meminfo(self) -> Dict[str, int]:
+        n = self._meminfo.read()
+        buf = self._meminfo.buf
+        out = {}
+        for name, key in self._meminfo_keys:
+            v = _find_int(buf, key, n)
+            out[name] = v * 1024 if v is not None else None
+        return out
+
+    def read_vmstat(self) -> Dict[str, int]:
+        n = self._vmstat.read()
+        buf = self._vmstat.buf
+        out = {}
+        for name, key in self._vmstat_keys:
+            out[name] = _find_int(buf, key, n)
+        return out
+
+    def read_cpu_pct(self) -> Optional[float]:
+        """Busy % of all CPUs since the previous call (None on the first call)."""
+        n = self._stat.read()
+        buf = self._stat.buf
+        eol = buf.find(b"\n", 0, n)
+        # "cpu  user nice system idle iowait irq softirq steal guest guest_nice"
+        fields = [int(x) for x in buf[:eol].split()[1:9]]
+        idle = fields[3] + fields[4]
+        total = sum(fields)
+        pct = None
+        if self._last_cpu is not None:
+            d_total = total - self._last_cpu[0]
+            d_idle = idle - self._last_cpu[1]
+            pct = 100.0 * (d_total - d_idle) / d_total if d_total > 0 else 0.0
+        self._last_cpu = (total, idle)
+        return pct
+
+    def read_disk(self, dev: str) -> Optional[Dict[str, int]]:
+        f = self._block.get(dev)
+        if f is None:
+            return None
+        n = f.read()
+        vals = bytes(f.view[:n]).split()
+        out = {name: int(v) for name, v in zip(BLOCK_STAT_FIELDS, vals)}
+        out["read_bytes"] = out["read_sectors"] * SECTOR_BYTES
+        out["write_bytes"] = out["write_sectors"] * SECTOR_BYTES
+        return out
+
+    def read_memory(self) -> Dict:
+        """RAM / swap usage and paging counters (meminfo + vmstat only)."""
+        mem = self.read_meminfo()
+        vm = self.read_vmstat()
+
+        # psutil-compatible "used": total - free - buffers - cached (incl. SReclaimable)
+        cached = (mem["Cached"] or 0) + (mem["SReclaimable"] or 0)
+        ram_used = mem["MemTotal"] - mem["MemFree"] - (mem["Buffers"] or 0) - cached
+        if ram_used < 0:
+            ram_used = mem["MemTotal"] - mem["MemFree"]
+
+        return {
+            "timestamp": time.time(),
+            "ram_total": mem["MemTotal"],
+            "ram_used": ram_used,
+            "ram_available": mem["MemAvailable"],
+            "swap_total": mem["SwapTotal"],
+            "swap_used": (mem["SwapTotal"] or 0) - (mem["SwapFree"] or 0),
+            "meminfo": mem,
+            "page_faults_major": vm["pgmajfault"],
+            "swap_in_bytes": (vm["pswpin"] or 0) * self.page_size,
+            "swap_out_bytes": (vm["pswpout"] or 0) * self.page_size
+        }
+
+    def read_fast(self, dev: str = None) -> tuple:
+        """
+        (ram_used, swap_used, pgmajfault, pswpin, pswpout, read_sectors,
+        write_sectors of `dev`) as a flat tuple, for high-rate capture:
+        no per-field dicts, meminfo / vmstat / one block stat file only.
+        """
+        # read() first: it may swap in a larger buffer
+        n = self._meminfo.read()
+        buf = self._meminfo.buf
+        total, free, buffers, cached, sreclaim, swap_total, swap_free = (
+            _find_int(buf, key, n) or 0 for key in self._fast_mem_keys)
+        ram_used = total - free - buffers - cached - sreclaim
+        if ram_used < 0:
+            ram_used = total - free
+
+        n = self._vmstat.read()
+        buf = self._vmstat.buf
+        majflt, pswpin, pswpout = (_find_int(buf, key, n) or 0 for _, key in self._vmstat_keys)
+
+        rd = wr = 0
+        f = self._block.get(dev)
+        if f is not None:
+            n = f.read()
+            vals = f.buf[:n].split()
+            rd, wr = int(vals[2]), int(vals[6])
+        return (ram_used * 1024, (swap_total - swap_free) * 1024, majflt,
+                pswpin * self.page_size, pswpout * self.page_size,
+                rd * SECTOR_BYTES, wr * SECTOR_BYTES)
+
+    def read_disks(self) -> Dict[str, Dict[str, int]]:
+        return {dev: self.read_disk(dev) for dev in self._block}
+
+    def sample(self) -> Dict:
+        """One pass over every source."""
+        out = self.read_memory()
+        out["cpu_pct"] = self.read_cpu_pct()
+        out["disks"] = self.read_disks()
+        return out
+
+    def close(self):
+        for f in [self._meminfo, self._vmstat, self._stat] + list(self._block.values()):
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._block = {}
+
+
+def _bench(iterations: int, device: str = None):
+    import psutil
+
+    sampler = ProcfsSampler()
+    dev = device or (sampler.devices[0] if sampler.devices else None)
+
+    def psutil_path():
+        # What TelemetryCollector / SystemMonitor call per tick
+        psutil.virtual_memory()
+        psutil.swap_memory()
+        psutil.disk_io_counters(perdisk=True).get(dev)
+        psutil.disk_io_counters()
+        psutil.cpu_percent(interval=None)
+
+    for name, fn in (("psutil", psutil_path), ("procfs", sampler.sample)):
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per = (time.perf_counter() - t0) / iterations * 1e6
+        print(f"{name:>7}: {per:8.1f} us/sample")
+    sampler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Direct /proc and /sys sampler")
+    parser.add_argument("--bench", action="store_true", help="Compare per-sample cost with psutil")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--root", default="/", help="Root of a fixture tree")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.iterations, args.device)
+    else:
+        s = ProcfsSampler(root=args.root)
+        print(s.sample())
+        s.close()
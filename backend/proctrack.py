@@ -0,0 +1,277 @@
+import os
+import platform
+import threading
+import time
+from typing import Dict, List, Optional
+
+import psutil
+
+IS_LINUX = platform.system() == "Linux"
+
+# Process names that identify an inference server when no PID/port is given
+DEFAULT_SERVER_NAMES = ("ollama", "llama-server", "vllm")
+
+# smaps_rollup fields we keep (kB in the file)
+SMAPS_FIELDS = {"Rss:": "rss", "Pss:": "pss", "Private_Clean:": "uss",
+                "Private_Dirty:": "uss", "Swap:": "swap"}
+
+# /proc/<pid>/io fields we keep (cumulative since process start)
+PROC_IO_FIELDS = ("read_bytes", "write_bytes", "syscr", "syscw")
+
+
+def find_listening_pid(port: int) -> Optional[int]:
+    """PID of the process listening on a local TCP port (may need root on macOS)."""
+    try:
+        for conn in psutil.net_connections(kind="tcp"):
+            if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == port and conn.pid:
+                return conn.pid
+    except (psutil.AccessDenied, PermissionError):
+        pass
+    return None
+
+
+def find_pid_by_name(names) -> Optional[int]:
+    """Oldest process whose name matches one of `names` (excluding this harness)."""
+    me = os.getpid()
+    best = None
+    for proc in psutil.process_iter(["name", "create_time"]):
+        try:
+            name = (proc.info["name"] or "").lower()
+            if proc.pid == me or not any(n in name for n in names):
+                continue
+            if best is None or proc.info["create_time"] < best.info["create_time"]:
+                best = proc
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return best.pid if best else None
+
+
+def read_smaps_rollup(pid: int, proc_root: str = "/proc") -> Optional[Dict[str, int]]:
+    """RSS / PSS / USS / swap in bytes from /proc/<pid>/smaps_rollup (Linux 4.14+)."""
+    out = {"rss": 0, "pss": 0, "uss": 0, "swap": 0}
+    try:
+        with open(f"{proc_root}/{pid}/smaps_rollup", "rb") as f:
+            for line in f:
+                parts = line.split()
+                key = SMAPS_FIELDS.get(parts[0].decode()) if parts else None
+                if key:
+                    out[key] += int(parts[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        return None
+    return out
+
+
+def read_proc_io(pid: int, proc_root: str = "/proc") -> Optional[Dict[str, int]]:
+    """
+    Storage-layer bytes read / written (read_bytes, write_bytes; writes are
+    counted when pages are dirtied) and read / write syscalls from
+    /proc/<pid>/io. Needs the same user or root.
+    """
+    out = {}
+    try:
+        with open(f"{proc_root}/{pid}/io", "rb") as f:
+            for line in f:
+                key, _, value = line.partition(b":")
+                key = key.decode()
+                if key in PROC_IO_FIELDS:
+                    out[key] = int(value)
+    except (OSError, ValueError):
+        return None
+    return out if len(out) == len(PROC_IO_FIELDS) else None
+
+
+class ProcessTracker:
+    """
+    Tracks the inference server's process tree without scanning every process
+    on the box.
+
+    The root is resolved once (by PID, listening port or name) and
+    `psutil.Process` handles for the tree are cached. The tree is rebuilt when
+    a cached process exits, and checked for new children at most every
+    `spawn_check_sec`. Per-sample reads are limited to RSS (statm); PSS/USS/swap
+    come from smaps_rollup on Linux at the slower `detail_interval_sec`.
+
+    I/O (/proc/<pid>/io) is accumulated per process from the first time it is
+    seen, so the tree total keeps counting after a worker exits.
+    """
+
+    def __init__(self, pid: int = None, port: int = None, names=DEFAULT_SERVER_NAMES,
+                 spawn_check_sec: float = 1.0, detail_interval_sec: float = 2.0,
+                 resolve_retry_sec: float = 5.0):
+        self.pid = pid
+        self.port = port
+        self.names = tuple(n.lower() for n in names) if names else ()
+        self.spawn_check_sec = spawn_check_sec
+        self.detail_interval_sec = detail_interval_sec
+        self.resolve_retry_sec = resolve_retry_sec
+
+        self.root: Optional[psutil.Process] = None
+        self._procs: Dict[int, psutil.Process] = {}
+        self._lock = threading.Lock()
+        self._last_spawn_check = 0.0
+        self._last_resolve = None
+        self._last_detail = 0.0
+        self._detail: Dict[int, Dict[str, int]] = {}
+        self._io_last: Dict[int, Dict[str, int]] = {}
+        self._io_total = {f: 0 for f in PROC_IO_FIELDS}
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    @property
+    def root_pid(self) -> Optional[int]:
+        if self.root is None:
+            self.resolve()
+        return self.root.pid if self.root else None
+
+    def resolve(self) -> bool:
+        """Find the root server process. Cheap lookups first, name scan last."""
+        self._last_resolve = time.monotonic()
+        pid = self.pid
+        if not pid and self.port:
+            pid = find_listening_pid(self.port)
+        if not pid and self.names:
+            pid = find_pid_by_name(self.names)
+        if not pid:
+            return False
+        try:
+            self.root = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            self.root = None
+            return False
+        self._refresh_tree()
+        return True
+
+    def _refresh_tree(self):
+        procs = {self.root.pid: self.root}
+        try:
+            for child in self.root.children(recursive=True):
+                # Reuse existing handles so psutil's cached state survives
+                procs[child.pid] = self._procs.get(child.pid, child)
+        except psutil.NoSuchProcess:
+            pass
+        self._procs = procs
+        self._last_spawn_check = time.monotonic()
+
+    def _child_pids(self) -> set:
+        """Direct children of every tracked process (Linux: /proc/<pid>/task/*/children)."""
+        pids = set()
+        for pid in list(self._procs):
+            task_dir = f"/proc/{pid}/task"
+            try:
+                for tid in os.listdir(task_dir):
+                    with open(f"{task_dir}/{tid}/children") as f:
+                        pids.update(int(c) for c in f.read().split())
+            except OSError:
+                pass
+        return pids
+
+    def _check_spawns(self):
+        now = time.monotonic()
+        if now - self._last_spawn_check < self.spawn_check_sec:
+            return
+        self._last_spawn_check = now
+        if IS_LINUX and os.path.exists(f"/proc/{self.root.pid}/task/{self.root.pid}/children"):
+            if not self._child_pids() <= set(self._procs):
+                self._refresh_tree()
+        else:
+            self._refresh_tree()
+
+    def _rss(self, proc: psutil.Process) -> int:
+        if IS_LINUX:
+            # statm: size resident shared ... (pages); cheaper than a full memory_info()
+            with open(f"/proc/{proc.pid}/statm") as f:
+                return int(f.read().split()[1]) * self._page_size
+        return proc.memory_info().rss
+
+    def _io(self, proc: psutil.Process) -> Optional[Dict[str, int]]:
+        if IS_LINUX:
+            return read_proc_io(proc.pid)
+        try:
+            io = proc.io_counters()  # Not available on macOS
+        except (AttributeError, psutil.AccessDenied, psutil.NoSuchProcess):
+            return None
+        return {"read_bytes": io.read_bytes, "write_bytes": io.write_bytes,
+                "syscr": io.read_count, "syscw": io.write_count}
+
+    def _add_io(self, pid: int, io: Dict[str, int]):
+        last = self._io_last.get(pid)
+        if last is not None:
+            for f in PROC_IO_FIELDS:
+                self._io_total[f] += max(0, io[f] - last[f])
+        self._io_last[pid] = io
+
+    def rss(self) -> Optional[int]:
+        """
+        Tree RSS from the cached handles only: one statm read per process,
+        no lock, spawn check, smaps or I/O. For callers on a latency-sensitive
+        path (request counters) that must not wait behind a running sample().
+        """
+        procs = list(self._procs.values())
+        if not procs:
+            return None
+        total = 0
+        for proc in procs:
+            try:
+                total += self._rss(proc)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, OSError):
+                continue  # Exited: the next sample() rebuilds the tree
+        return total
+
+    def sample(self) -> Dict:
+        """
+        Memory of the tracked tree: totals plus a per-process breakdown.
+        pss/uss/swap are None where smaps_rollup is unavailable; total["io"]
+        (cumulative tree I/O) is None where per-process I/O is unavailable.
+        """
+        with self._lock:
+            if self.root is None:
+                # Server not up (yet): don't rescan the process table every tick
+                retry_due = self._last_resolve is None or \
+                    time.monotonic() - self._last_resolve >= self.resolve_retry_sec
+                if not (retry_due and self.resolve()):
+                    return {"total": {}, "processes": []}
+
+            self._check_spawns()
+            want_detail = IS_LINUX and time.monotonic() - self._last_detail >= self.detail_interval_sec
+            if want_detail:
+                self._last_detail = time.monotonic()
+
+            processes: List[Dict] = []
+            exited = False
+            have_io = False
+            for pid, proc in list(self._procs.items()):
+                try:
+                    entry = {"pid": pid, "name": proc.name(), "rss": self._rss(proc),
+                             "pss": None, "uss": None, "swap": None}
+                except (psutil.NoSuchProcess, psutil.AccessDenied, OSError):
+                    exited = True
+                    continue
+                if want_detail:
+                    detail = read_smaps_rollup(pid)
+                    if detail:
+                        self._detail[pid] = detail
+                detail = self._detail.get(pid)
+                if detail:
+                    entry.update(pss=detail["pss"], uss=detail["uss"], swap=detail["swap"])
+                io = self._io(proc)
+                if io:
+                    self._add_io(pid, io)
+                    have_io = True
+                entry["io"] = io
+                processes.append(entry)
+
+            if exited:
+                # A process left the tree (or the root died): rebuild from scratch
+                if self.root is not None and not self.root.is_running():
+                    self.root = None
+                    self._procs = {}
+                elif self.root is not None:
+                    self._refresh_tree()
+                self._detail = {p: d for p, d in self._detail.items() if p in self._procs}
+                self._io_last = {p: io for p, io in self._io_last.items() if p in self._procs}
+            io_total = dict(self._io_total) if have_io else None
+
+        total = {"rss": sum(p["rss"] for p in processes), "count": len(processes), "io": io_total}
+        for key in ("pss", "uss", "swap"):
+            vals = [p[key] for p in processes if p[key] is not None]
+            total[key] = sum(vals) if vals else None
+        return {"total": total, "processes": processes}
@@ -0,0 +1,146 @@
+"""
+Linux pressure stall information (PSI) sampling and memory-thrash detection.
+
+/proc/pressure/{memory,io} (or a cgroup v2 directory's memory.pressure /
+io.pressure) report, for "some" (at least one task stalled) and "full" (all
+non-idle tasks stalled), running averages and a cumulative stall time in
+microseconds. Per-interval stall % = delta(total) / delta(wall time).
+"""
+import os
+import time
+from typing import Dict, List, Optional
+
+from backend.sampling import Sampler
+
+PSI_RESOURCES = ["memory", "io"]
+
+
+def parse_psi(text: str) -> Dict[str, float]:
+    """`some avg10=0.12 ... total=123` lines -> {some_avg10, some_total, full_avg10, full_total}."""
+    out = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts or parts[0] not in ("some", "full"):
+            continue
+        kind = parts[0]
+        for field in parts[1:]:
+            key, _, value = field.partition("=")
+            if key == "avg10":
+                out[f"{kind}_avg10"] = float(value)
+            elif key == "total":
+                out[f"{kind}_total"] = int(value)
+    return out
+
+
+class PsiSampler:
+    """Reads PSI for the whole system, or for one cgroup when `cgroup_path` is set."""
+
+    def __init__(self, root: str = "/", cgroup_path: str = None):
+        self.paths = {}
+        for res in PSI_RESOURCES:
+            if cgroup_path:
+                path = os.path.join(cgroup_path, f"{res}.pressure")
+            else:
+                path = os.path.join(root, "proc/pressure", res)
+            if os.path.exists(path):
+                self.paths[res] = path
+
+    @property
+    def available(self) -> bool:
+        return bool(self.paths)
+
+    def read(self) -> Dict[str, Dict[str, float]]:
+        """{resource: parsed PSI} plus a monotonic timestamp under "mono"."""
+        snap = {"mono": time.monotonic()}
+        for res, path in self.paths.items():
+            try:
+                with open(path) as f:
+                    snap[res] = parse_psi(f.read())
+            except OSError:
+                snap[res] = {}
+        return snap
+
+
+class PsiStallSampler(Sampler):
+    """Sampler plugin: memory avg10 and per-interval stall % of a PsiSampler."""
+
+    def __init__(self, psi: PsiSampler):
+        self.psi = psi
+        self._prev = None
+
+    def sample(self) -> Dict:
+        cur = self.psi.read()
+        pct = stall_pct(self._prev, cur)
+        self._prev = cur
+        mem = cur.get("memory", {})
+        return {"raw": cur,
+                "mem_some_avg10": mem.get("some_avg10"), "mem_full_avg10": mem.get("full_avg10"),
+                **pct}
+
+
+def stall_pct(prev: Optional[Dict], cur: Optional[Dict]) -> Dict[str, Optional[float]]:
+    """Share of wall time stalled between two snapshots, per resource and kind."""
+    out = {f"{res}_{kind}_pct": None for res in PSI_RESOURCES for kind in ("some", "full")}
+    if not prev or not cur:
+        return out
+    dt_us = (cur["mono"] - prev["mono"]) * 1e6
+    if dt_us <= 0:
+        return out
+    for res in PSI_RESOURCES:
+        for kind in ("some", "full"):
+            a = (prev.get(res) or {}).get(f"{kind}_total")
+            b = (cur.get(res) or {}).get(f"{kind}_total")
+            if a is not None and b is not None:
+                out[f"{res}_{kind}_pct"] = round(min(100.0, max(0, b - a) / dt_us * 100), 3)
+    return out
+
+
+class ThrashDetector:
+    """
+    Online memory-thrash detector. Thrashing starts once the per-interval
+    memory "some" stall % stays at or above `threshold_pct` for `min_sec`,
+    and ends when it drops below half the threshold.
+    """
+
+    def __init__(self, threshold_pct: float = 10.0, min_sec: float = 1.0):
+        self.threshold_pct = threshold_pct
+        self.min_sec = min_sec
+        self.thrashing = False
+        self.onset: Optional[Dict] = None  # First onset of the run
+        self.events: List[Dict] = []
+        self._above_since = None
+
+    def update(self, timestamp: float, mem_some_pct: Optional[float], context_len: int = 0) -> Optional[str]:
+        """Feed one interval; returns "thrash_start" / "thrash_end" on a transition."""
+        if mem_some_pct is None:
+            return None
+        if not self.thrashing:
+            if mem_some_pct >= self.threshold_pct:
+                if self._above_since is None:
+                    self._above_since = timestamp
+                if timestamp - self._above_since >= self.min_sec:
+                    self.thrashing = True
+                    event = {"event": "thrash_start", "timestamp": self._above_since,
+                             "context_len": context_len, "mem_some_pct": mem_some_pct}
+                    self.events.append(event)
+                    if self.onset is None:
+                        self.onset = event
+                    return "thrash_start"
+            else:
+                self._above_since = None
+        elif mem_some_pct < self.threshold_pct / 2:
+            self.thrashing = False
+            self._above_since = None
+            self.events.append({"event": "thrash_end", "timestamp": timestamp,
+                                "context_len": context_len, "mem_some_pct": mem_some_pct})
+            return "thrash_end"
+        return None
+
+    def summary(self) -> Dict:
+        return {
+            "threshold_pct": self.threshold_pct,
+            "min_sec": self.min_sec,
+            "onset_context": self.onset["context_len"] if self.onset else None,
+            "onset_timestamp": self.onset["timestamp"] if self.onset else None,
+            "events": self.events
+        }
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+import requests
+
+
+class DashboardPublisher:
+    """
+    Ships telemetry samples to the dashboard from its own thread, so sampling
+    never waits on the dashboard.
+
+    Samples go into a bounded queue; when it is full the oldest sample is
+    dropped. Batches of up to `batch_size` samples are POSTed to
+    `/update_batch` over one keep-alive session. `test_progress.results` is
+    sent as a delta (only changed contexts), with a full resync on the first
+    batch, after failures, or when the dashboard reports a different count.
+    """
+
+    def __init__(self, dashboard_url: str, max_queue: int = 64, batch_size: int = 10,
+                 flush_interval_sec: float = 0.5, timeout: float = 1.0):
+        self.url = f"{dashboard_url.rstrip('/')}/update_batch"
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.timeout = timeout
+
+        self._queue = deque(maxlen=max_queue)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._session = requests.Session()
+        self._thread = None
+        self.running = False
+
+        # Results the dashboard is known to hold (for deltas)
+        self._sent_results: Dict = {}
+        self._resync = True
+
+        self.sent_batches = 0
+        self.sent_samples = 0
+        self.failed_batches = 0
+        self.dropped_samples = 0
+        self.last_error = None
+
+    def publish(self, sample: Dict):
+        """Queue a sample (never blocks; drops the oldest one when full)."""
+        with self._lock:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped_samples += 1
+            self._queue.append(sample)
+            full_batch = len(self._queue) >= self.batch_size
+        if full_batch:
+            self._wake.set()
+
+    def _take_batch(self) -> List[Dict]:
+        with self._lock:
+            n = min(self.batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _results_delta(self, results: Dict):
+        """(changed results, is_full) relative to what the dashboard holds."""
+        if self._resync or any(k not in results for k in self._sent_results):
+            return dict(results), True
+        changed = {k: v for k, v in results.items() if self._sent_results.get(k) != v}
+        return changed, False
+
+    def _send(self, batch: List[Dict]):
+        # Results only travel once per batch, taken from the newest sample
+        results = {}
+        samples = []
+        for sample in batch:
+            progress = sample.get("test_progress")
+            if progress and "results" in progress:
+                results = progress["results"]
+                sample = dict(sample, test_progress={k: v for k, v in progress.items() if k != "results"})
+            samples.append(sample)
+
+        delta, full = self._results_delta(results)
+        payload = {"samples": samples, "results": delta, "results_full": full}
+        try:
+            resp = self._session.post(self.url, json=payload, timeout=self.timeout)
+            resp.raise_for_status()
+            ack = resp.json()
+        except Exception as e:
+            # Lossy by design: the batch is dropped, results resync next time
+            self.failed_batches += 1
+            self.dropped_samples += len(batch)
+            self.last_error = str(e)
+            self._resync = True
+            return
+
+        self._sent_results = dict(results)
+        self._resync = ack.get("results_count") != len(results)
+        self.sent_batches += 1
+        self.sent_samples += len(batch)
+
+    def _loop(self):
+        while self.running:
+            self._wake.wait(self.flush_interval_sec)
+            self._wake.clear()
+            while self.running:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                self._send(batch)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True):
+        """Stop the thread; optionally make one last attempt to send what is queued."""
+        self.running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            deadline = time.monotonic() + self.timeout
+            while time.monotonic() < deadline:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                self._send(batch)
+        self._session.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            queued = len(self._queue)
+        return {
+            "sent_batches": self.sent_batches,
+            "sent_samples": self.sent_samples,
+            "failed_batches": self.failed_batches,
+            "dropped_samples": self.dropped_samples,
+            "queued": queued,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,259 @@
+"""
+Page-cache residency of the model weights the inference server has mmap'd.
+
+llama.cpp / Ollama map GGUF (and safetensors) files; under memory pressure
+the kernel drops clean weight pages and later reads them back from disk,
+which shows up as tier-3 read traffic that has nothing to do with KV
+offload. This sampler finds the weight files in the server tree's
+/proc/<pid>/maps (or takes them from `model_paths`), maps each one once
+(PROT_READ, no populate) and asks mincore() which pages are resident.
+
+Per page it remembers whether it was ever resident and whether it has been
+evicted since, so each sample yields:
+    load bytes     pages resident for the first time (initial load)
+    refault bytes  evicted pages that came back (weight paging)
+
+Telemetry splits tier-3 reads into weight paging (when the weights live on
+the tier-3 device) and the rest (KV offload, swap).
+"""
+import ctypes
+import ctypes.util
+import mmap
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.columns import RESIDENCY_COLUMNS
+from backend.memcomp import backing_device
+from backend.sampling import Sampler
+
+GB = 1024**3
+MB = 1024**2
+
+WEIGHT_SUFFIXES = (".gguf", ".safetensors", ".bin", ".pt", ".pth")
+GGUF_MAGIC = b"GGUF"
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int,
+                              ctypes.c_int, ctypes.c_int, ctypes.c_long]
+        libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+        _libc = libc
+    return _libc
+
+
+def is_weight_file(path: str, min_bytes: int) -> bool:
+    """Large regular file that looks like model weights (by suffix or GGUF magic, e.g. Ollama blobs)."""
+    try:
+        if os.path.getsize(path) < min_bytes:
+            return False
+        if path.lower().endswith(WEIGHT_SUFFIXES):
+            return True
+        with open(path, "rb") as f:
+            return f.read(4) == GGUF_MAGIC
+    except OSError:
+        return False
+
+
+def mapped_files(pid: int, proc_root: str = "/proc") -> List[str]:
+    """Regular files mapped by a process (from /proc/<pid>/maps)."""
+    paths = []
+    try:
+        with open(os.path.join(proc_root, str(pid), "maps")) as f:
+            for line in f:
+                parts = line.split(None, 5)
+                # address perms offset dev inode [pathname]
+                if len(parts) == 6 and parts[4] != "0" and parts[5].startswith("/"):
+                    path = parts[5].rstrip("\n")
+                    if not path.endswith(" (deleted)") and path not in paths:
+                        paths.append(path)
+    except OSError:
+        pass
+    return paths
+
+
+class MappedFile:
+    """One weight file mapped read-only for mincore(), with per-page history."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.page_size = mmap.PAGESIZE
+        self.size = os.path.getsize(path)
+        self.pages = (self.size + self.page_size - 1) // self.page_size
+        libc = _load_libc()
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            addr = libc.mmap(None, self.size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+        finally:
+            os.close(fd)  # The mapping keeps the file
+        if addr in (None, ctypes.c_void_p(-1).value):
+            raise OSError(ctypes.get_errno(), f"mmap failed: {path}")
+        self.addr = addr
+        self._vec = (ctypes.c_ubyte * self.pages)()
+        self._ever = np.zeros(self.pages, dtype=bool)
+        self._evicted = np.zeros(self.pages, dtype=bool)
+        self._first = True  # Pages resident at the first sample were loaded before we looked
+
+    def sample(self) -> Dict[str, int]:
+        """Resident pages now, and pages loaded / refaulted since the previous sample."""
+        if _load_libc().mincore(self.addr, self.size, self._vec) != 0:
+            raise OSError(ctypes.get_errno(), f"mincore failed: {self.path}")
+        resident = (np.frombuffer(self._vec, dtype=np.uint8) & 1).astype(bool)
+        refault = int(np.count_nonzero(self._evicted & resident))
+        loaded = 0 if self._first else int(np.count_nonzero(resident & ~self._ever))
+        self._first = False
+        self._evicted &= ~resident
+        self._evicted |= self._ever & ~resident
+        self._ever |= resident
+        return {"resident": int(np.count_nonzero(resident)) * self.page_size,
+                "load": loaded * self.page_size, "refault": refault * self.page_size}
+
+    def close(self):
+        if self.addr is not None:
+            _load_libc().munmap(self.addr, self.size)
+            self.addr = None
+
+
+class ResidencySampler(Sampler):
+    """
+    Weight-file residency (bytes) and load / refault rates of the server's
+    mapped model files. Pids come from the process sampler's output; the
+    maps are rescanned every `rescan_sec`.
+    """
+
+    # mincore() over tens of GB of weights takes a while: keep it off the row thread
+    blocking = True
+
+    def __init__(self, model_paths: List[str] = None, storage_device: str = None,
+                 min_file_mb: float = 64.0, rescan_sec: float = 10.0, proc_root: str = "/proc"):
+        self.model_paths = [p for p in (model_paths or []) if p]
+        self.storage_device = storage_device
+        self.min_bytes = int(min_file_mb * MB)
+        self.rescan_sec = rescan_sec
+        self.proc_root = proc_root
+        self.files: Dict[str, MappedFile] = {}
+        self._devices: Dict[str, Optional[str]] = {}  # path -> backing disk
+        self._skipped = set()  # mapped files that are not weights
+        self._last_scan = None
+        self._load = self._refault = 0  # Cumulative bytes
+        self._prev = None  # (monotonic time, load, refault) of the previous sample
+
+    def _pids(self) -> List[int]:
+        procs = self.engine.latest.get("process") or {}
+        return [p["pid"] for p in procs.get("processes", [])]
+
+    def _scan(self):
+        self._last_scan = time.monotonic()
+        candidates = list(self.model_paths)
+        for pid in self._pids():
+            candidates += mapped_files(pid, self.proc_root)
+        for path in candidates:
+            if path in self.files or path in self._skipped:
+                continue
+            if not (path in self.model_paths or is_weight_file(path, self.min_bytes)):
+                self._skipped.add(path)
+                continue
+            try:
+                self.files[path] = MappedFile(path)
+                self._devices[path] = backing_device("/", path)
+            except OSError:
+                self._skipped.add(path)
+
+    def sample(self) -> Optional[Dict]:
+        if self._last_scan is None or time.monotonic() - self._last_scan >= self.rescan_sec:
+            self._scan()
+
+        files = []
+        tier3_load = tier3_refault = 0
+        for path, mf in list(self.files.items()):
+            try:
+                s = mf.sample()
+            except OSError:
+                continue
+            self._load += s["load"]
+            self._refault += s["refault"]
+            on_tier3 = bool(self.storage_device) and self._devices.get(path) == self.storage_device
+            if on_tier3:
+                tier3_load += s["load"]
+                tier3_refault += s["refault"]
+            files.append({"path": path, "size": mf.size, "resident": s["resident"],
+                          "resident_pct": 100.0 * s["resident"] / mf.size if mf.size else None,
+                          "device": self._devices.get(path)})
+
+        mono = time.monotonic()
+        out = {"files": files,
+               "total": sum(f["size"] for f in files),
+               "resident": sum(f["resident"] for f in files),
+               "load_bytes": self._load, "refault_bytes": self._refault,
+               "load_mb_s": None, "refault_mb_s": None, "tier3_mb_s": None}
+        out["resident_pct"] = 100.0 * out["resident"] / out["total"] if out["total"] else None
+        if self._prev and mono > self._prev[0]:
+            dt = mono - self._prev[0]
+            out["load_mb_s"] = (self._load - self._prev[1]) / MB / dt
+            out["refault_mb_s"] = (self._refault - self._prev[2]) / MB / dt
+            # Weight pages read back from the tier-3 device
+            out["tier3_mb_s"] = (tier3_load + tier3_refault) / MB / dt
+        self._prev = (mono, self._load, self._refault)
+        return out
+
+    def row(self, sample: Optional[Dict], t3_read_mb_s: float) -> List[Optional[float]]:
+        """Metrics-log values (RESIDENCY_COLUMNS) of one sample."""
+        return residency_row(sample, t3_read_mb_s)
+
+    def close(self):
+        for mf in self.files.values():
+            mf.close()
+        self.files = {}
+
+
+def residency_row(sample: Optional[Dict], t3_read_mb_s: float) -> List[Optional[float]]:
+    """RESIDENCY_COLUMNS values; tier-3 reads split into weight paging and the rest."""
+    if not sample:
+        return [None] * len(RESIDENCY_COLUMNS)
+    weight_read = sample.get("tier3_mb_s")
+    kv_read = None
+    if weight_read is not None:
+        weight_read = min(weight_read, t3_read_mb_s)
+        kv_read = t3_read_mb_s - weight_read
+    vals = [sample["total"] / GB, sample["resident"] / GB, sample["resident_pct"],
+            sample["load_mb_s"], sample["refault_mb_s"], weight_read, kv_read]
+    return [round(v, 2) if v is not None else None for v in vals]
+
+
+def summarize_residency(samples: List[Dict]) -> Dict:
+    """
+    Weight residency per context length for the run summary: lowest
+    resident %, and MB loaded / refaulted while that context ran. `samples`
+    are telemetry timeline entries carrying weight_* fields.
+    """
+    by_context: Dict[int, List[Dict]] = {}
+    prev = None
+    for s in samples:
+        if s.get("weight_refault_bytes") is None:
+            continue
+        ctx = s.get("context_len") or 0
+        if ctx and prev is not None:
+            by_context.setdefault(ctx, []).append({
+                "pct": s.get("weight_resident_pct"),
+                "load": max(0, s["weight_load_bytes"] - prev["weight_load_bytes"]),
+                "refault": max(0, s["weight_refault_bytes"] - prev["weight_refault_bytes"])})
+        prev = s
+
+    out = {}
+    for ctx, rows in sorted(by_context.items()):
+        pcts = [r["pct"] for r in rows if r["pct"] is not None]
+        out[str(ctx)] = {
+            "min_resident_pct": round(min(pcts), 2) if pcts else None,
+            "load_mb": round(sum(r["load"] for r in rows) / MB, 2),
+            "refault_mb": round(sum(r["refault"] for r in rows) / MB, 2)
+        }
+    return {"by_context": out}
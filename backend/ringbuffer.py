@@ -0,0 +1,277 @@
+"""
+High-rate telemetry capture (10-50 ms) into a shared-memory ring buffer.
+
+The capture thread packs fixed-width float64 rows straight into shared memory
+(no per-sample dicts or lists). A slower consumer turns the ring into:
+  - min/max/mean decimated rows (persisted and streamed to the dashboard);
+  - full-resolution rows for windows around marked events (first token,
+    OOM kill, context change, ...).
+Other processes can attach to the ring by name with SampleRing.attach().
+"""
+import csv
+import platform
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List
+
+import numpy as np
+import psutil
+
+from backend.procfs import ProcfsSampler
+from backend.scheduler import FixedRateScheduler
+
+# Row layout of the capture ring. Counters are cumulative and converted to
+# per-second rates before decimation; gauges are decimated as-is.
+HIRES_FIELDS = ["timestamp", "ram_used", "swap_used", "major_faults",
+                "swap_in_bytes", "swap_out_bytes", "read_bytes", "write_bytes"]
+HIRES_COUNTERS = {"major_faults", "swap_in_bytes", "swap_out_bytes", "read_bytes", "write_bytes"}
+
+_HEADER = struct.Struct("<QQQ")  # rows written, fields per row, capacity
+
+
+class SampleRing:
+    """
+    Fixed-capacity ring of float64 rows in a multiprocessing SharedMemory block.
+    Single writer; readers copy rows out by sequence number.
+    """
+
+    def __init__(self, fields: List[str], capacity: int, name: str = None, _shm=None):
+        self.fields = list(fields)
+        self.capacity = capacity
+        self._row = struct.Struct(f"<{len(fields)}d")
+        size = _HEADER.size + capacity * self._row.size
+        if _shm is None:
+            _shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _HEADER.pack_into(_shm.buf, 0, 0, len(fields), capacity)
+            self.owner = True
+        else:
+            self.owner = False
+        self._shm = _shm
+        self._buf = _shm.buf
+        self._written = _HEADER.unpack_from(self._buf, 0)[0]
+        self._rows = np.ndarray((capacity, len(fields)), dtype=np.float64,
+                                buffer=self._buf, offset=_HEADER.size)
+
+    @classmethod
+    def attach(cls, name: str, fields: List[str] = HIRES_FIELDS) -> "SampleRing":
+        shm = shared_memory.SharedMemory(name=name)
+        _, n_fields, capacity = _HEADER.unpack_from(shm.buf, 0)
+        if n_fields != len(fields):
+            raise ValueError(f"Ring {name} has {n_fields} fields, expected {len(fields)}")
+        return cls(fields, capacity, _shm=shm)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def written(self) -> int:
+        return _HEADER.unpack_from(self._buf, 0)[0]
+
+    def write(self, *values):
+        seq = self._written
+        self._row.pack_into(self._buf, _HEADER.size + (seq % self.capacity) * self._row.size, *values)
+        # Publish the row only after it is complete
+        self._written = seq + 1
+        struct.pack_into("<Q", self._buf, 0, self._written)
+
+    def read_since(self, seq: int):
+        """
+        (rows, next_seq, lost): rows written at or after `seq` that are still
+        in the ring, as an (n, fields) array copy; `lost` counts overwritten rows.
+        """
+        end = self.written
+        start = max(seq, end - self.capacity)
+        lost = start - seq
+        if end <= start:
+            return np.empty((0, len(self.fields))), end, lost
+        idx = np.arange(start, end) % self.capacity
+        return self._rows[idx].copy(), end, lost
+
+    def close(self):
+        # Drop our numpy view first or SharedMemory.close() refuses (exported pointers)
+        self._rows = None
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def to_rates(rows: np.ndarray, fields: List[str], prev_row: np.ndarray = None,
+             counters=HIRES_COUNTERS) -> np.ndarray:
+    """Replace cumulative counter columns by per-second rates (first row uses prev_row)."""
+    out = rows.copy()
+    if len(rows) == 0:
+        return out
+    base = np.vstack([prev_row, rows]) if prev_row is not None else np.vstack([rows[:1], rows])
+    dt = np.diff(base[:, 0])
+    dt[dt <= 0] = np.nan
+    for i, f in enumerate(fields):
+        if f in counters:
+            out[:, i] = np.clip(np.diff(base[:, i]), 0, None) / dt
+    return out
+
+
+def decimate(rows: np.ndarray, fields: List[str], bucket_sec: float) -> List[Dict[str, float]]:
+    """min/max/mean of every column per time bucket (rows are timestamp-first)."""
+    if len(rows) == 0:
+        return []
+    buckets = np.floor(rows[:, 0] / bucket_sec)
+    out = []
+    for b in np.unique(buckets):
+        chunk = rows[buckets == b]
+        entry = {"timestamp": round(float(b * bucket_sec), 3), "samples": len(chunk)}
+        for i, f in enumerate(fields[1:], start=1):
+            col = chunk[:, i]
+            col = col[~np.isnan(col)]
+            if len(col):
+                entry[f"{f}_min"] = float(col.min())
+                entry[f"{f}_max"] = float(col.max())
+                entry[f"{f}_mean"] = float(col.mean())
+            else:
+                entry[f"{f}_min"] = entry[f"{f}_max"] = entry[f"{f}_mean"] = None
+        out.append(entry)
+    return out
+
+
+def decimated_columns(fields: List[str] = HIRES_FIELDS) -> List[str]:
+    cols = ["timestamp", "samples"]
+    for f in fields[1:]:
+        cols += [f"{f}_min", f"{f}_max", f"{f}_mean"]
+    return cols
+
+
+class HighRateCapture:
+    """
+    Captures HIRES_FIELDS every `interval_ms` into a SampleRing and, every
+    `flush_sec`, persists decimated rows plus full-resolution rows within
+    `event_window_sec` of marked events.
+
+    Rows are only processed once they are `event_window_sec` old, so an event
+    can still claim the samples just before it. Size the ring (`capacity`) to
+    hold at least that lag plus one flush; older rows are counted as lost.
+    """
+
+    def __init__(self, storage_device: str, decimated_path: str, events_path: str,
+                 interval_ms: float = 20.0, decimate_sec: float = 0.5,
+                 event_window_sec: float = 1.0, flush_sec: float = 1.0,
+                 capacity: int = None, ring_name: str = None, clock=None):
+        self.storage_device = storage_device
+        # Run clock (backend.clock.RunClock): anchored wall time that never jumps
+        self._time = clock.time if clock else time.time
+        self.interval_sec = interval_ms / 1000.0
+        self.decimate_sec = decimate_sec
+        self.event_window_sec = event_window_sec
+        self.flush_sec = flush_sec
+        if capacity is None:
+            capacity = int(4 * (event_window_sec + flush_sec + decimate_sec) / self.interval_sec) + 64
+        self.ring = SampleRing(HIRES_FIELDS, capacity, name=ring_name)
+
+        self._procfs = None
+        if platform.system() == "Linux":
+            try:
+                self._procfs = ProcfsSampler(devices=[storage_device])
+            except OSError:
+                self._procfs = None
+
+        self._events: List[tuple] = []  # (timestamp, kind)
+        self._events_lock = threading.Lock()
+        self._next_seq = 0
+        self._prev_row = None
+        self._pending = np.empty((0, len(HIRES_FIELDS)))  # Rows of a not-yet-closed bucket
+        self.latest: Dict[str, float] = {}  # Newest decimated bucket (for the dashboard)
+        self.lost_rows = 0
+        self.event_rows = 0
+
+        self._decimated_file = open(decimated_path, "w", newline="")
+        self._decimated = csv.writer(self._decimated_file)
+        self._decimated.writerow(decimated_columns())
+        self._events_file = open(events_path, "w", newline="")
+        self._events_writer = csv.writer(self._events_file)
+        self._events_writer.writerow(["event", "event_time"] + HIRES_FIELDS)
+
+        self._capture_sched = FixedRateScheduler("telemetry-hires")
+        self._capture_task = self._capture_sched.add("capture", self.interval_sec, self._capture)
+        self._flush_sched = FixedRateScheduler("telemetry-hires-flush")
+        self._flush_sched.add("flush", flush_sec, self.flush)
+
+    def _capture(self):
+        if self._procfs:
+            self.ring.write(self._time(), *self._procfs.read_fast(self.storage_device))
+            return
+        vm = psutil.virtual_memory()
+        sw = psutil.swap_memory()
+        io = psutil.disk_io_counters(perdisk=True).get(self.storage_device)
+        self.ring.write(self._time(), vm.used, sw.used, 0, sw.sin, sw.sout,
+                        io.read_bytes if io else 0, io.write_bytes if io else 0)
+
+    def mark(self, kind: str, timestamp: float = None):
+        """Keep full-resolution samples within event_window_sec of this moment."""
+        with self._events_lock:
+            self._events.append((timestamp or self._time(), kind))
+
+    def flush(self, final: bool = False):
+        rows, self._next_seq, lost = self.ring.read_since(self._next_seq)
+        self.lost_rows += lost
+        rows = np.vstack([self._pending, rows])
+
+        # Hold back rows an event could still claim, and the still-open bucket
+        ready = rows
+        if not final:
+            ready = rows[rows[:, 0] <= self._time() - self.event_window_sec]
+            if len(ready):
+                open_bucket = np.floor(ready[-1, 0] / self.decimate_sec)
+                ready = ready[np.floor(ready[:, 0] / self.decimate_sec) < open_bucket]
+        self._pending = rows[len(ready):]
+        if not len(ready):
+            return
+
+        # Full-resolution rows around events (raw counters, not rates)
+        with self._events_lock:
+            events = list(self._events)
+            # Forget events whose window ends before what is still pending
+            keep_after = self._pending[0, 0] if len(self._pending) else ready[-1, 0]
+            self._events = [e for e in events if e[0] + self.event_window_sec >= keep_after]
+        for t_event, kind in events:
+            mask = np.abs(ready[:, 0] - t_event) <= self.event_window_sec
+            for row in ready[mask]:
+                self._events_writer.writerow([kind, round(t_event, 3)] + row.tolist())
+                self.event_rows += 1
+        self._events_file.flush()
+
+        # Decimated view of counter rates and gauges
+        rates = to_rates(ready, HIRES_FIELDS, self._prev_row)
+        self._prev_row = ready[-1]
+        cols = decimated_columns()
+        for entry in decimate(rates, HIRES_FIELDS, self.decimate_sec):
+            self._decimated.writerow([entry[c] for c in cols])
+            self.latest = entry
+        self._decimated_file.flush()
+
+    def start(self):
+        self._capture_sched.start()
+        self._flush_sched.start()
+
+    def stop(self):
+        self._capture_sched.stop()
+        self._flush_sched.stop()
+        try:
+            self.flush(final=True)
+        except Exception as e:
+            print(f"❌ High-rate flush error: {e}")
+        self._decimated_file.close()
+        self._events_file.close()
+        if self._procfs:
+            self._procfs.close()
+        self.ring.close()
+
+    def stats(self) -> Dict:
+        stats = self._capture_task.stats()
+        stats.update(lost_rows=self.lost_rows, event_rows=self.event_rows,
+                     ring=self.ring.name, capacity=self.ring.capacity)
+        return stats
@@ -0,0 +1,254 @@
+"""
+Sampler plugin framework shared by TelemetryCollector and SystemMonitor.
+
+Samplers are registered by name with a lazy "module:Class" path, so a
+disabled sampler's module (and what it pulls in, e.g. pynvml) is never
+imported. Enabled samplers run at their own interval on the engine's
+fixed-rate schedulers: a fast thread, and an I/O thread for samplers that
+may block (subprocesses, HTTP). Each run's wall and thread CPU time is
+measured against the sampler's cost budget, and its output is kept in
+`latest`.
+
+In adaptive mode (telemetry.adaptive) a sampler whose cost stays over its
+budget_ms, or whose CPU share of its interval stays over overhead_pct, has
+its interval doubled (up to max_factor x the configured one), and relaxed
+back once it is cheap again. While the owner marks a focus phase (prefill,
+near-OOM), every interval is divided by focus_factor. New intervals apply
+from each sampler's next run.
+
+The owner composes typed backend.schemas.Snapshot records from `latest`
+and publishes them to the subscribed sinks (backend.sinks: CSV / Parquet,
+dashboard, Prometheus).
+"""
+import importlib
+import time
+from typing import Callable, Dict, List, Optional
+
+from backend.scheduler import FixedRateScheduler, SamplerTask
+
+# name -> "module:Class"; modules are only imported for enabled samplers
+SAMPLERS: Dict[str, str] = {
+    "memory": "backend.system_samplers:MemorySampler",
+    "disk": "backend.system_samplers:DiskSampler",
+    "process": "backend.system_samplers:ProcessSampler",
+    "gpu": "backend.gpu_samplers:GpuSampler",
+    "power": "backend.gpu_samplers:PowerSampler",
+    "psi": "backend.psi:PsiStallSampler",
+    "cgroup": "backend.cgroup:CgroupSampler",
+    "server": "backend.scraper:ServerScrapeSampler",
+    "memcomp": "backend.memcomp:MemCompositionSampler",
+    "residency": "backend.residency:ResidencySampler",
+    "energy": "backend.energy:EnergySampler",
+}
+
+
+def register_sampler(name: str, path: str):
+    """Add (or replace) a sampler plugin: `path` is "module:Class"."""
+    SAMPLERS[name] = path
+
+
+def load_sampler(name: str):
+    module, _, attr = SAMPLERS[name].partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+class Sampler:
+    """
+    Base class of sampler plugins. sample() returns a dict (kept as
+    engine.latest[name]) or None to keep the previous output.
+    """
+
+    # Samplers that can block (subprocesses, HTTP) run on the engine's I/O thread
+    blocking = False
+
+    def open(self, engine: "SamplerEngine"):
+        """Called once when added; other samplers' output is in engine.latest."""
+        self.engine = engine
+
+    def sample(self) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SamplerEngine:
+    """Runs registered samplers on shared schedulers and fans snapshots out to sinks."""
+
+    def __init__(self, name: str = "telemetry", adaptive: dict = None):
+        self._sched = FixedRateScheduler(name)
+        self._io_sched = FixedRateScheduler(f"{name}-io")
+        self.samplers: Dict[str, Sampler] = {}
+        self.latest: Dict[str, Dict] = {}
+        self._budgets: Dict[str, Optional[float]] = {}
+        self._over_budget: Dict[str, int] = {}
+        self._cost_ms: Dict[str, float] = {}
+        self._cpu_ms: Dict[str, float] = {}
+        self._tasks: Dict[str, SamplerTask] = {}
+
+        # Adaptive intervals: {enabled, overhead_pct, max_factor, focus_factor, patience}
+        adaptive = adaptive or {}
+        self.adaptive = adaptive.get('enabled', False)
+        self.overhead_pct = adaptive.get('overhead_pct', 2.0)
+        self.max_factor = adaptive.get('max_factor', 8)
+        self.focus_factor = adaptive.get('focus_factor', 2.0)
+        self.patience = adaptive.get('patience', 3)
+        self.focus_reason: Optional[str] = None
+        self._base_interval: Dict[str, float] = {}
+        self._factor: Dict[str, int] = {}  # Back-off multiplier per sampler (1 .. max_factor)
+        self._streak: Dict[str, int] = {}  # Consecutive expensive (> 0) / cheap (< 0) runs
+        self._overhead_prev = None  # (monotonic time, CPU ms of all tasks) at the last overhead_row()
+        self._listeners: Dict[str, List[Callable[[Dict], None]]] = {}
+        self._sinks: List = []
+        self.sink_errors = 0
+        self.last_sink_error = None
+
+    def add(self, name: str, sampler: Sampler, interval_sec: float,
+            budget_ms: float = None) -> SamplerTask:
+        sampler.open(self)
+        self.samplers[name] = sampler
+        self._budgets[name] = budget_ms
+        self._over_budget[name] = 0
+        self._cost_ms[name] = 0.0
+        self._cpu_ms[name] = 0.0
+        self._base_interval[name] = interval_sec
+        self._factor[name] = 1
+        self._streak[name] = 0
+        sched = self._io_sched if sampler.blocking else self._sched
+        task = sched.add(name, interval_sec, lambda: self._run(name))
+        self._tasks[name] = task
+        return task
+
+    def build(self, name: str, interval_sec: float, budget_ms: float = None,
+              **kwargs) -> SamplerTask:
+        """Import a registered sampler and add it (only called for enabled ones)."""
+        return self.add(name, load_sampler(name)(**kwargs), interval_sec, budget_ms)
+
+    def every(self, name: str, interval_sec: float, fn: Callable[[], None]) -> SamplerTask:
+        """A periodic non-sampler task on the fast thread (e.g. compose and publish a row)."""
+        return self._sched.add(name, interval_sec, fn)
+
+    def _run(self, name: str):
+        t0 = time.perf_counter()
+        c0 = time.thread_time()
+        out = self.samplers[name].sample()
+        cpu_ms = (time.thread_time() - c0) * 1000
+        cost_ms = (time.perf_counter() - t0) * 1000
+        self._cost_ms[name] = cost_ms
+        self._cpu_ms[name] = cpu_ms
+        budget = self._budgets[name]
+        if budget is not None and cost_ms > budget:
+            self._over_budget[name] += 1
+        if self.adaptive:
+            self._adapt(name, cost_ms, cpu_ms)
+        if out is not None:
+            self.latest[name] = out
+            for fn in self._listeners.get(name, ()):
+                fn(out)
+
+    def _adapt(self, name: str, cost_ms: float, cpu_ms: float):
+        """Back a sampler off while it is expensive, relax it when cheap; apply focus."""
+        budget = self._budgets[name]
+        interval_ms = self._tasks[name].interval_sec * 1000
+        share = 100.0 * cpu_ms / interval_ms
+        if (budget is not None and cost_ms > budget) or share > self.overhead_pct:
+            self._streak[name] = max(self._streak[name], 0) + 1
+        elif (budget is None or cost_ms < budget / 2) and share < self.overhead_pct / 2:
+            self._streak[name] = min(self._streak[name], 0) - 1
+        else:
+            self._streak[name] = 0
+
+        factor = self._factor[name]
+        if self._streak[name] >= self.patience and factor < self.max_factor:
+            factor = min(factor * 2, self.max_factor)
+            self._streak[name] = 0
+        elif self._streak[name] <= -self.patience and factor > 1:
+            factor //= 2
+            self._streak[name] = 0
+        self._factor[name] = factor
+
+        interval = self._base_interval[name] * factor
+        if self.focus_reason:
+            interval /= self.focus_factor
+        if abs(interval - self._tasks[name].interval_sec) > 1e-9:
+            self._tasks[name].set_interval(interval)
+
+    def focus(self, reason: Optional[str]):
+        """Mark (reason, e.g. "prefill" / "near_oom") or clear (None) a phase sampled more densely."""
+        self.focus_reason = reason
+
+    def overhead_columns(self) -> List[str]:
+        """Self-overhead columns of the metrics log (call once every sampler is added)."""
+        cols = ["telemetry_cpu_pct", "sampler_focus"]
+        for name in self.samplers:
+            cols += [f"sampler_{name}_cpu_ms", f"sampler_{name}_wall_ms", f"sampler_{name}_interval_sec"]
+        return cols
+
+    def overhead_row(self) -> List[Optional[float]]:
+        """
+        CPU used by every engine task (samplers, listeners, the row itself)
+        as % of one core since the previous call, whether a focus phase is
+        on, and per sampler the last run's CPU / wall ms and its interval.
+        """
+        now = time.monotonic()
+        cpu = sum(t.cpu_ms for t in self._sched.tasks + self._io_sched.tasks)
+        pct = None
+        if self._overhead_prev and now > self._overhead_prev[0]:
+            pct = round(100.0 * (cpu - self._overhead_prev[1]) / ((now - self._overhead_prev[0]) * 1000), 3)
+        self._overhead_prev = (now, cpu)
+        row = [pct, int(self.focus_reason is not None)]
+        for name in self.samplers:
+            row += [round(self._cpu_ms[name], 3), round(self._cost_ms[name], 3),
+                    round(self._tasks[name].interval_sec, 3)]
+        return row
+
+    def on_sample(self, name: str, fn: Callable[[Dict], None]):
+        """Call fn(output) after every run of sampler `name` (on its thread)."""
+        self._listeners.setdefault(name, []).append(fn)
+
+    def subscribe(self, sink):
+        """Sinks have write(snapshot) and close()."""
+        self._sinks.append(sink)
+
+    def publish(self, snapshot):
+        for sink in self._sinks:
+            try:
+                sink.write(snapshot)
+            except Exception as e:
+                # One broken sink must not stop the others (or sampling)
+                self.sink_errors += 1
+                self.last_sink_error = f"{type(sink).__name__}: {e}"
+
+    def start(self):
+        self._sched.start()
+        self._io_sched.start()
+
+    def stop(self):
+        """Stop sampling, then close samplers and sinks."""
+        self._sched.stop()
+        self._io_sched.stop()
+        for name, sampler in self.samplers.items():
+            try:
+                sampler.close()
+            except Exception as e:
+                print(f"⚠️  Error closing {name} sampler: {e}")
+        for sink in self._sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"⚠️  Error closing {type(sink).__name__}: {e}")
+
+    def task(self, name: str) -> Optional[SamplerTask]:
+        return self._sched.get(name) or self._io_sched.get(name)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Scheduler stats per task, plus cost budget figures per sampler."""
+        stats = self._sched.stats()
+        stats.update(self._io_sched.stats())
+        for name in self.samplers:
+            stats[name].update(budget_ms=self._budgets[name],
+                               last_cost_ms=round(self._cost_ms[name], 3),
+                               last_cpu_ms=round(self._cpu_ms[name], 3),
+                               over_budget=self._over_budget[name],
+                               adaptive_factor=self._factor[name])
+        return stats
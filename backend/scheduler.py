@@ -0,0 +1,145 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class SamplerTask:
+    """One periodic sampler and its timing statistics."""
+
+    def __init__(self, name: str, interval_sec: float, fn: Callable[[], None], order: int):
+        self.name = name
+        self.interval_sec = interval_sec
+        self.fn = fn
+        self.order = order  # Tie-break: tasks due at the same deadline run in add() order
+
+        self.start_time = 0.0
+        self.tick = 0  # Index of the next deadline: start_time + tick * interval_sec
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0   # Runs that took longer than the interval
+        self.missed = 0     # Deadlines skipped because we were already past them
+        self.last_jitter_ms = 0.0
+        self.max_jitter_ms = 0.0
+        self.last_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+        self.last_cpu_ms = 0.0  # Thread CPU time of the last run
+        self.cpu_ms = 0.0       # ... and of all runs
+        self._pending_interval = None
+        self._first_run = None
+        self._last_run = None
+
+    @property
+    def next_deadline(self) -> float:
+        # Computed from the tick count, not accumulated, so it never drifts
+        return self.start_time + self.tick * self.interval_sec
+
+    def set_interval(self, interval_sec: float):
+        """New period, from the end of the current / next run (safe from any thread)."""
+        self._pending_interval = max(interval_sec, 0.001)
+
+    def stats(self) -> Dict[str, float]:
+        rate = 0.0
+        if self.runs > 1 and self._last_run > self._first_run:
+            rate = (self.runs - 1) / (self._last_run - self._first_run)
+        return {
+            "interval_sec": self.interval_sec,
+            "target_hz": round(1.0 / self.interval_sec, 3),
+            "actual_hz": round(rate, 3),
+            "runs": self.runs,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "missed_ticks": self.missed,
+            "max_jitter_ms": round(self.max_jitter_ms, 2),
+            "max_duration_ms": round(self.max_duration_ms, 2),
+            "cpu_ms": round(self.cpu_ms, 2)
+        }
+
+
+class FixedRateScheduler:
+    """
+    Runs samplers on absolute monotonic deadlines (start + n * interval) from a
+    single thread, so the sampling period does not stretch by the work time.
+
+    A run that starts late records its jitter; a run that ends past its next
+    deadline skips the deadlines it missed instead of bursting to catch up.
+    Samplers that can block (HTTP, subprocesses) belong on a separate
+    scheduler so they cannot delay the fast ones.
+    """
+
+    def __init__(self, name: str = "sampler"):
+        self.name = name
+        self.tasks: List[SamplerTask] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, name: str, interval_sec: float, fn: Callable[[], None]) -> SamplerTask:
+        task = SamplerTask(name, max(interval_sec, 0.001), fn, len(self.tasks))
+        self.tasks.append(task)
+        return task
+
+    def get(self, name: str) -> Optional[SamplerTask]:
+        return next((t for t in self.tasks if t.name == name), None)
+
+    def _run(self, task: SamplerTask, deadline: float):
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+        try:
+            task.fn()
+        except Exception as e:
+            task.errors += 1
+            print(f"❌ {self.name}/{task.name} sampler error: {e}")
+        finished = time.monotonic()
+        task.last_cpu_ms = (time.thread_time() - cpu_started) * 1000
+        task.cpu_ms += task.last_cpu_ms
+
+        task.runs += 1
+        task.last_jitter_ms = (started - deadline) * 1000
+        task.max_jitter_ms = max(task.max_jitter_ms, task.last_jitter_ms)
+        task.last_duration_ms = (finished - started) * 1000
+        task.max_duration_ms = max(task.max_duration_ms, task.last_duration_ms)
+        if task._first_run is None:
+            task._first_run = started
+        task._last_run = started
+        if finished - started > task.interval_sec:
+            task.overruns += 1
+
+        task.tick += 1
+        if finished >= task.next_deadline:
+            # Already late for the next tick(s): skip to the next future deadline
+            behind = int((finished - task.next_deadline) // task.interval_sec) + 1
+            task.missed += behind
+            task.tick += behind
+
+        if task._pending_interval is not None:
+            # Re-anchor the deadlines on this run: start + n * new interval
+            task.interval_sec, task._pending_interval = task._pending_interval, None
+            task.start_time = started
+            task.tick = 1
+
+    def _loop(self):
+        start = time.monotonic()
+        for task in self.tasks:
+            task.start_time = start
+        while not self._stop.is_set() and self.tasks:
+            task = min(self.tasks, key=lambda t: (t.next_deadline, t.order))
+            deadline = task.next_deadline
+            wait = deadline - time.monotonic()
+            if wait > 0 and self._stop.wait(wait):
+                break
+            self._run(task, deadline)
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {t.name: t.stats() for t in self.tasks}
@@ -13,13 +13,33 @@ class SystemMetrics(BaseModel):
     page_faults_major: Optional[float] = None
 
 
+class GpuDeviceMetrics(BaseModel):
+    index: int
+    name: str = "Unknown"
+    vram_total_gb: Optional[float] = None
+    vram_used_gb: Optional[float] = None
+    gtt_total_gb: Optional[float] = None  # amdgpu: system RAM mapped for the GPU
+    gtt_used_gb: Optional[float] = None
+    util_pct: Optional[float] = None
+    mem_util_pct: Optional[float] = None
+    power_w: Optional[float] = None
+    temp_c: Optional[float] = None
+    pcie_tx_mb_s: Optional[float] = None
+    pcie_rx_mb_s: Optional[float] = None
+
+
 class GpuMetrics(BaseModel):
+    # Whole box: VRAM and power summed over devices, utilisation averaged, hottest temperature
     vram_total_gb: float
     vram_used_gb: float
     util_pct: float
     mem_util_pct: float
     power_w: Optional[float] = None
     temp_c: Optional[float] = None
+    # amdgpu GTT (unified memory beyond the VRAM carve-out on APUs)
+    gtt_total_gb: Optional[float] = None
+    gtt_used_gb: Optional[float] = None
+    devices: List[GpuDeviceMetrics] = []
 
 
 class DiskMetrics(BaseModel):
@@ -27,8 +47,11 @@ class DiskMetrics(BaseModel):
     write_bps: float
     read_iops: float
     write_iops: float
-    lat_p95_ms: Optional[float] = None
-    queue_depth: Optional[float] = None
+    await_avg_p95_ms: Optional[float] = None  # Rolling p95 of per-interval average await, not of single I/Os
+    queue_depth: Optional[float] = None  # Average I/Os in flight (time_in_queue / interval)
+    await_ms: Optional[float] = None
+    avg_req_kb: Optional[float] = None
+    util_pct: Optional[float] = None
 
 
 class AppMetrics(BaseModel):
@@ -53,11 +76,25 @@ class AidaptivMetrics(BaseModel):
 
 class Snapshot(BaseModel):
     timestamp: float
+    mono_ns: Optional[int] = None  # backend.clock run clock (perf_counter_ns)
     system: SystemMetrics
     gpu: GpuMetrics
     disk: DiskMetrics
     app: AppMetrics
     aidaptiv: AidaptivMetrics
+    # Optional sampler sections (backend.sampling); empty when the sampler is off
+    os_disk: Dict[str, float] = {}
+    device: Dict[str, Optional[float]] = {}  # Tier-3 interval stats and server I/O split
+    processes: Dict[str, Any] = {}
+    psi: Dict[str, Optional[float]] = {}
+    cgroup: Dict[str, Any] = {}
+    server: Dict[str, Optional[float]] = {}
+    inflight: Dict[str, Any] = {}  # backend.inflight aggregates + oldest active requests
+    memcomp: Dict[str, Any] = {}  # backend.memcomp composition (GB) + swap areas
+    residency: Dict[str, Any] = {}  # backend.residency weight-file residency
+    energy: Dict[str, Any] = {}  # backend.energy cumulative joules + per-zone joules
+    # Flat metrics-log columns (CSV / Parquet / Prometheus sinks)
+    row: Dict[str, Any] = {}
 
 # --- Config Schemas ---
 
@@ -81,6 +118,14 @@ class PressureConfig(BaseModel):
     ram_limit_gb: Optional[float] = None
     vram_reserve_gb: Optional[float] = None
     swap_enabled: bool = False
+    # cgroup v2 enforcement (backend.cgroup); unset limits fall back to test.ram_limit / swap_limit
+    enforce: bool = False
+    swap_limit_gb: Optional[float] = None
+    memory_high_gb: Optional[float] = None
+    io_max: Optional[Union[str, Dict[str, Union[str, int]]]] = None
+    cgroup_root: str = "/sys/fs/cgroup"
+    cgroup_name: str = "aidaptiv-bench"
+    cgroup_path: Optional[str] = None
 
 
 class TelemetryConfig(BaseModel):
@@ -95,7 +140,7 @@ class ScenarioConfig(BaseModel):
 
 class ExportConfig(BaseModel):
     write_csv: bool = True
-    write_parquet: bool = True
+    write_parquet: bool = False  # Needs pyarrow (the `parquet` extra)
     charts: List[str] = []
 
 
@@ -0,0 +1,244 @@
+import json
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import requests
+
+from backend.sampling import Sampler
+
+# Series we pull from the inference server's Prometheus endpoint.
+# Key = metric name, value = (column name, scale). Ratios are scaled to %.
+# Values for the same metric with different labels (e.g. per model) are
+# summed, except ratios (`*_pct` columns), which are averaged.
+DEFAULT_SERIES = {
+    # vLLM (v0 and v1 names)
+    "vllm:gpu_cache_usage_perc": ("kv_cache_usage_pct", 100.0),
+    "vllm:kv_cache_usage_perc": ("kv_cache_usage_pct", 100.0),
+    "vllm:cpu_cache_usage_perc": ("cpu_kv_cache_usage_pct", 100.0),
+    "vllm:num_requests_running": ("requests_running", 1.0),
+    "vllm:num_requests_waiting": ("requests_waiting", 1.0),
+    "vllm:num_requests_swapped": ("requests_swapped", 1.0),
+    "vllm:num_preemptions_total": ("preemptions_total", 1.0),
+    # llama.cpp (llama-server --metrics)
+    "llamacpp:kv_cache_usage_ratio": ("kv_cache_usage_pct", 100.0),
+    "llamacpp:kv_cache_tokens": ("kv_cache_tokens", 1.0),
+    "llamacpp:requests_processing": ("requests_running", 1.0),
+    "llamacpp:requests_deferred": ("requests_waiting", 1.0),
+}
+
+# Extra columns derived from llama.cpp's /slots endpoint
+SLOT_COLUMNS = ["slots_total", "slots_busy"]
+
+
+def series_columns(series: Dict = None, scrape_slots: bool = False) -> list:
+    """Ordered, de-duplicated list of column names a scraper will report."""
+    series = series or DEFAULT_SERIES
+    cols = []
+    for col, _ in series.values():
+        if col not in cols:
+            cols.append(col)
+    if scrape_slots:
+        cols.extend(SLOT_COLUMNS)
+    return cols
+
+
+_ESCAPES = {"\\": "\\", '"': '"', "n": "\n"}
+
+
+def _parse_labels(text: str, labels: Dict[str, str]) -> int:
+    """
+    Parse `{k="v",...}` at the start of `text` into `labels`. Values may hold
+    commas, braces and the escapes \\\\, \\" and \\n. Returns the index of the
+    closing brace, or -1 if the label set is malformed.
+    """
+    i, n = 1, len(text)
+    while i < n:
+        while i < n and text[i] in " ,":
+            i += 1
+        if i < n and text[i] == "}":
+            return i
+        eq = text.find("=", i)
+        if eq < 0 or eq + 1 >= n or text[eq + 1] != '"':
+            return -1
+        key = text[i:eq].strip()
+        i = eq + 2
+        value = []
+        while i < n and text[i] != '"':
+            if text[i] == "\\" and i + 1 < n:
+                i += 1
+                value.append(_ESCAPES.get(text[i], "\\" + text[i]))
+            else:
+                value.append(text[i])
+            i += 1
+        if i >= n:
+            return -1
+        labels[key] = "".join(value)
+        i += 1
+    return -1
+
+
+class PrometheusTextParser:
+    """
+    Incremental parser for the Prometheus text exposition format.
+
+    Feed it arbitrary chunks of the response body; complete lines are parsed
+    as they arrive and only metrics in `wanted` are decoded (label parsing is
+    skipped entirely for everything else).
+    """
+
+    def __init__(self, wanted=None):
+        self.wanted = set(wanted) if wanted else None
+        self._partial = ""
+
+    def feed(self, chunk: str) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        data = self._partial + chunk
+        lines = data.split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            sample = self._parse_line(line)
+            if sample:
+                yield sample
+
+    def close(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """Flush a trailing line that had no newline."""
+        line, self._partial = self._partial, ""
+        sample = self._parse_line(line)
+        if sample:
+            yield sample
+
+    def _parse_line(self, line: str):
+        line = line.strip()
+        if not line or line[0] == "#":
+            return None
+
+        # Metric name ends at '{' (labels) or the first space
+        brace = line.find("{")
+        space = line.find(" ")
+        if space < 0:
+            return None
+        end = brace if 0 <= brace < space else space
+        name = line[:end]
+        if self.wanted is not None and name not in self.wanted:
+            return None
+
+        labels = {}
+        rest = line[end:]
+        if rest.startswith("{"):
+            close = _parse_labels(rest, labels)
+            if close < 0:
+                return None
+            rest = rest[close + 1:]
+
+        # Value, optionally followed by a timestamp
+        parts = rest.split()
+        if not parts:
+            return None
+        try:
+            value = float(parts[0])
+        except ValueError:
+            return None
+        return name, labels, value
+
+
+class ServerScrapeSampler(Sampler):
+    """Sampler plugin: one scrape per run; output is the latest value of every column."""
+
+    # HTTP requests can block up to the scraper's timeout
+    blocking = True
+
+    def __init__(self, scraper: "ServerMetricsScraper"):
+        self.scraper = scraper
+
+    def sample(self) -> Dict[str, Optional[float]]:
+        self.scraper.scrape_once()
+        return self.scraper.latest()
+
+    def close(self):
+        self.scraper.stop()
+
+
+class ServerMetricsScraper:
+    """
+    Scrapes an inference server's `/metrics` (and optionally llama.cpp `/slots`)
+    and keeps the latest value of each selected series. ServerScrapeSampler
+    runs it every `interval_sec` on the sampler engine's I/O thread. A failed
+    scrape (or a series missing from the response) leaves its columns None,
+    never the previous scrape's values.
+    """
+
+    def __init__(self, base_url: str, interval_sec: float = 1.0, series: Dict = None,
+                 scrape_slots: bool = False, timeout: float = 0.5):
+        self.base_url = base_url.rstrip("/")
+        self.interval_sec = interval_sec
+        self.series = series or DEFAULT_SERIES
+        self.scrape_slots = scrape_slots
+        self.timeout = timeout
+        self.columns = series_columns(self.series, scrape_slots)
+
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._latest: Dict[str, Optional[float]] = {c: None for c in self.columns}
+        self.last_scrape_time = 0.0
+        self.last_scrape_ms = 0.0
+        self.errors = 0
+
+    def scrape_once(self) -> Dict[str, Optional[float]]:
+        t0 = time.time()
+        values: Dict[str, Optional[float]] = {}
+        try:
+            values.update(self._scrape_metrics())
+            if self.scrape_slots:
+                values.update(self._scrape_slots())
+        except Exception:
+            self.errors += 1
+
+        with self._lock:
+            self._latest = {c: values.get(c) for c in self.columns}
+            self.last_scrape_time = t0
+            self.last_scrape_ms = (time.time() - t0) * 1000
+        return values
+
+    def _scrape_metrics(self) -> Dict[str, float]:
+        parser = PrometheusTextParser(self.series.keys())
+        values: Dict[str, float] = {}
+        counts: Dict[str, int] = {}
+
+        def add(name, value):
+            col, scale = self.series[name]
+            values[col] = values.get(col, 0.0) + value * scale
+            counts[col] = counts.get(col, 0) + 1
+
+        with self._session.get(f"{self.base_url}/metrics", timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=8192, decode_unicode=True):
+                if isinstance(chunk, bytes):
+                    chunk = chunk.decode("utf-8", errors="replace")
+                for name, _labels, value in parser.feed(chunk):
+                    add(name, value)
+            for name, _labels, value in parser.close():
+                add(name, value)
+        for col, count in counts.items():
+            if col.endswith("_pct"):
+                # A usage ratio per model / engine: the mean, not the sum (which can pass 100 %)
+                values[col] /= count
+        return values
+
+    def _scrape_slots(self) -> Dict[str, float]:
+        resp = self._session.get(f"{self.base_url}/slots", timeout=self.timeout)
+        if resp.status_code != 200:
+            return {}
+        slots = json.loads(resp.text)
+        busy = 0
+        for slot in slots:
+            # Newer llama-server reports is_processing, older ones a numeric state
+            if slot.get("is_processing") or slot.get("state", 0) != 0:
+                busy += 1
+        return {"slots_total": float(len(slots)), "slots_busy": float(busy)}
+
+    def latest(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return dict(self._latest)
+
+    def stop(self):
+        self._session.close()
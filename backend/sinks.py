@@ -0,0 +1,122 @@
+"""
+Snapshot sinks for backend.sampling.SamplerEngine.
+
+Every sink gets each backend.schemas.Snapshot via write(snapshot). The
+table sinks write `snapshot.row` (the flat metrics-log columns) in a fixed
+column order. The dashboard sink turns snapshots into dashboard payloads.
+The Prometheus sink serves the latest row as gauges.
+"""
+import csv
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+
+class CsvSink:
+    """
+    Metrics CSV: header once, one flushed line per snapshot. `offset` is the
+    byte offset of the next line (event log seek points).
+    """
+
+    def __init__(self, path: str, columns: List[str]):
+        self.columns = list(columns)
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+        self._file.flush()
+        self.offset = self._file.tell()
+
+    def write(self, snapshot):
+        row = snapshot.row
+        self._writer.writerow([row.get(c) for c in self.columns])
+        self._file.flush()
+        self.offset = self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ColumnarSink:
+    """Parquet / Arrow IPC metrics log (backend.columnar; pyarrow imported only here)."""
+
+    def __init__(self, path: str, columns: List[str], types: Dict[str, str] = None,
+                 export: Dict = None):
+        from backend.columnar import ColumnarWriter
+        export = export or {}
+        self.columns = list(columns)
+        self._writer = ColumnarWriter(
+            path, self.columns, types=types,
+            fmt=export.get('format', 'parquet'),
+            row_group_rows=export.get('row_group_rows', 1000),
+            flush_sec=export.get('flush_sec', 10.0),
+            segment_sec=export.get('segment_sec', 300.0))
+
+    def write(self, snapshot):
+        row = snapshot.row
+        self._writer.write([row.get(c) for c in self.columns])
+
+    def close(self):
+        self._writer.close()
+
+
+class DashboardSink:
+    """Queues a dashboard payload per snapshot on a DashboardPublisher (never blocks)."""
+
+    def __init__(self, publisher, payload_fn: Callable):
+        self.publisher = publisher
+        self.payload_fn = payload_fn
+
+    def write(self, snapshot):
+        self.publisher.publish(self.payload_fn(snapshot))
+
+    def close(self):
+        # The owner stops the publisher (after its final idle update)
+        pass
+
+
+class PrometheusSink:
+    """
+    Serves the latest snapshot row as Prometheus gauges on
+    http://<host>:<port>/metrics (`<prefix><column>`, numeric values only).
+    """
+
+    def __init__(self, port: int, host: str = "0.0.0.0", prefix: str = "aidaptiv_"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._text = b""
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                with sink._lock:
+                    body = sink._text
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def write(self, snapshot):
+        lines = []
+        for col, value in snapshot.row.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE {self.prefix}{col} gauge\n{self.prefix}{col} {value}")
+        text = ("\n".join(lines) + "\n").encode()
+        with self._lock:
+            self._text = text
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
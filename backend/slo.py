@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional
+
+# Default service-level objectives (overridable via test.slo in config.yaml)
+DEFAULT_SLO = {
+    "ttft_ms": 2000.0,        # Time to first token must be below this
+    "tpot_ms": 100.0,         # Time per output token (decode) must be below this
+    "target_pct": 90.0        # A level "meets SLO" when this % of requests do
+}
+
+
+def load_slo(config: dict) -> Dict[str, float]:
+    """Merge test.slo from the benchmark config over the defaults."""
+    slo = dict(DEFAULT_SLO)
+    slo.update((config.get('test', {}) or {}).get('slo') or {})
+    return slo
+
+
+def request_tpot_ms(m) -> float:
+    """Time per output token after the first one (decode phase)."""
+    if m.completion_tokens > 1 and m.total_latency_ms > m.ttft_ms:
+        return (m.total_latency_ms - m.ttft_ms) / (m.completion_tokens - 1)
+    return 0.0
+
+
+def meets_slo(m, slo: Dict[str, float]) -> bool:
+    if not m.success:
+        return False
+    return m.ttft_ms <= slo["ttft_ms"] and request_tpot_ms(m) <= slo["tpot_ms"]
+
+
+def score_level(metrics: List[Any], wall_time_sec: float, slo: Dict[str, float]) -> Dict[str, float]:
+    """
+    Goodput for one (context, concurrency) batch.
+
+    Goodput counts only requests that met both the TTFT and TPOT objectives,
+    normalised by the batch's wall-clock time.
+    """
+    good = [m for m in metrics if meets_slo(m, slo)]
+    valid = [m for m in metrics if m.success]
+    tpots = [request_tpot_ms(m) for m in valid]
+
+    scores = {
+        "avg_tpot_ms": sum(tpots) / len(tpots) if tpots else 0.0,
+        "slo_met": len(good),
+        "slo_attainment_pct": (len(good) / len(metrics)) * 100 if metrics else 0.0,
+        "throughput_rps": 0.0,
+        "goodput_rps": 0.0,
+        "goodput_tok_s": 0.0
+    }
+    if wall_time_sec > 0:
+        scores["throughput_rps"] = len(valid) / wall_time_sec
+        scores["goodput_rps"] = len(good) / wall_time_sec
+        scores["goodput_tok_s"] = sum(
+            m.completion_tokens for m in good) / wall_time_sec
+    return scores
+
+
+def _meets_target(entry: dict, slo: Dict[str, float]) -> bool:
+    return entry.get("slo_attainment_pct", 0.0) >= slo["target_pct"]
+
+
+def summarize_slo(aggregated: List[dict], slo: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Stage-level SLO capacity from the per-(context, concurrency) entries:
+    the largest context and the most concurrent users at which the target
+    attainment was still reached, plus peak goodput.
+
+    A level only counts when every measured level at or below it (no larger
+    context, no more users) passed too: a batch that passes after a failing
+    one, past the knee, does not raise capacity.
+    """
+    levels = [(e["context"], e.get("concurrency", 1), _meets_target(e, slo)) for e in aggregated]
+    failing = [(ctx, users) for ctx, users, ok in levels if not ok]
+    passing = {(ctx, users) for ctx, users, ok in levels
+               if ok and not any(c <= ctx and u <= users for c, u in failing)}
+
+    max_users_by_context = {}
+    max_context_by_users = {}
+    for ctx, users in passing:
+        max_users_by_context[ctx] = max(max_users_by_context.get(ctx, 0), users)
+        max_context_by_users[users] = max(max_context_by_users.get(users, 0), ctx)
+
+    return {
+        "objectives": slo,
+        "max_context_at_slo": max((ctx for ctx, _ in passing), default=0),
+        "max_users_at_slo": max((users for _, users in passing), default=0),
+        # JSON object keys must be strings
+        "max_users_at_slo_by_context": {str(k): v for k, v in sorted(max_users_by_context.items())},
+        "max_context_at_slo_by_users": {str(k): v for k, v in sorted(max_context_by_users.items())},
+        "peak_goodput_rps": max((e.get("goodput_rps", 0.0) for e in aggregated), default=0.0),
+        "peak_goodput_tok_s": max((e.get("goodput_tok_s", 0.0) for e in aggregated), default=0.0)
+    }
+
+
+def compare_slo(baseline: Optional[dict], aidaptiv: Optional[dict]) -> Dict[str, Any]:
+    """Side-by-side SLO capacity for the report API (aiDAPTIV vs baseline)."""
+    keys = ["max_context_at_slo", "max_users_at_slo",
+            "peak_goodput_rps", "peak_goodput_tok_s"]
+    comparison = {}
+    for k in keys:
+        b = (baseline or {}).get(k)
+        a = (aidaptiv or {}).get(k)
+        row = {"baseline": b, "aidaptiv": a, "ratio": None}
+        if b and a is not None:
+            row["ratio"] = a / b
+        comparison[k] = row
+    return comparison
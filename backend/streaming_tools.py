@@ -0,0 +1,375 @@
+"""
+Long-lived vendor tools as non-blocking samplers.
+
+Instead of starting `powermetrics -n 1` (or `nvidia-smi`) once per tick, a
+tool is launched once in its continuous mode:
+
+    powermetrics   sudo -n powermetrics -i <ms> -s gpu_power      (macOS)
+    nvidia-smi     nvidia-smi dmon -s pucmt -d <s>                (no pynvml)
+    amd-smi        amd-smi monitor -p -t -u -m -v -w <s>           (ROCm)
+
+A reader thread parses its stdout line by line and keeps the latest record
+per device; samplers read that without blocking. Records older than a few
+intervals are dropped, so a hung or restarting tool reads as no data rather
+than as its last values. A tool that exits is restarted with backoff. Streams are shared and reference counted (one
+process per tool and interval, whichever samplers use it).
+
+The parsers are plain line-fed classes, so recorded output can be replayed
+through them offline:
+
+    python -m backend.streaming_tools nvidia-smi recorded_dmon.txt
+"""
+import argparse
+import json
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class PowermetricsParser:
+    """`powermetrics -s gpu_power` samples -> {"index": 0, "util_pct", "power_w"}."""
+
+    # Mac M4 prints "GPU HW active residency"; older Macs "GPU active residency"
+    _UTIL = re.compile(r"GPU (?:HW )?active residency:\s+([\d\.]+)%", re.IGNORECASE)
+    _POWER = re.compile(r"GPU Power:\s+([\d]+)\s*mW", re.IGNORECASE)
+
+    def __init__(self):
+        self._util = None
+
+    def feed(self, line: str) -> Optional[Dict]:
+        m = self._UTIL.search(line)
+        if m:
+            self._util = float(m.group(1))
+            return None
+        m = self._POWER.search(line)
+        if m:
+            # Power is the last line of a sample's GPU section
+            record = {"index": 0, "util_pct": self._util, "power_w": float(m.group(1)) / 1000.0}
+            self._util = None
+            return record
+        return None
+
+
+class DmonParser:
+    """
+    `nvidia-smi dmon` rows -> one record per GPU. The first `#` line names
+    the columns (gpu pwr gtemp ... sm mem ... fb ... rxpci txpci); "-" is None.
+    """
+
+    # dmon column -> (device field, scale)
+    FIELDS = {"pwr": ("power_w", 1), "gtemp": ("temp_c", 1), "sm": ("util_pct", 1),
+              "mem": ("mem_util_pct", 1), "fb": ("vram_used_gb", 1 / 1024),
+              "rxpci": ("pcie_rx_mb_s", 1), "txpci": ("pcie_tx_mb_s", 1)}
+
+    def __init__(self):
+        self.columns: Optional[List[str]] = None
+
+    def feed(self, line: str) -> Optional[Dict]:
+        parts = line.split()
+        if not parts:
+            return None
+        if parts[0] == "#":
+            parts = parts[1:]
+        elif parts[0].startswith("#"):
+            parts[0] = parts[0][1:]
+        else:
+            if not self.columns or len(parts) != len(self.columns):
+                return None
+            row = dict(zip(self.columns, parts))
+            try:
+                record = {"index": int(row["gpu"])}
+            except (KeyError, ValueError):
+                return None
+            for col, (field, scale) in self.FIELDS.items():
+                try:
+                    record[field] = float(row[col]) * scale
+                except (KeyError, ValueError):
+                    record[field] = None
+            return record
+        # Header: the column-name line has "gpu" (the units line has "Idx")
+        if parts and parts[0].lower() == "gpu":
+            self.columns = [p.lower() for p in parts]
+        return None
+
+
+class AmdSmiMonitorParser:
+    """
+    `amd-smi monitor` rows -> one record per GPU. Values carry units
+    ("120 W", "45 °C", "0 %", "283 MB"), which are folded back into their
+    column; "N/A" is None.
+    """
+
+    FIELDS = {"POWER": "power_w", "GPU_TEMP": "temp_c", "GFX_UTIL": "util_pct",
+              "MEM_UTIL": "mem_util_pct", "VRAM_USED": "vram_used_gb", "VRAM_TOTAL": "vram_total_gb"}
+    _UNITS = {"W": 1, "°C": 1, "C": 1, "%": 1, "MHz": 1, "MB": 1 / 1024, "GB": 1, "KB": 1 / 1024**2}
+
+    def __init__(self):
+        self.columns: Optional[List[str]] = None
+
+    def _values(self, tokens: List[str]) -> List[Optional[float]]:
+        values = []
+        i = 0
+        while i < len(tokens):
+            tok = tokens[i]
+            value = None
+            scale = 1
+            if i + 1 < len(tokens) and tokens[i + 1] in self._UNITS:
+                scale = self._UNITS[tokens[i + 1]]
+                i += 1
+            try:
+                value = float(tok) * scale
+            except ValueError:
+                value = None  # N/A
+            values.append(value)
+            i += 1
+        return values
+
+    def feed(self, line: str) -> Optional[Dict]:
+        parts = line.split()
+        if not parts:
+            return None
+        if parts[0] == "GPU":
+            self.columns = parts
+            return None
+        if not self.columns or not parts[0].isdigit():
+            return None
+        values = self._values(parts)
+        if len(values) != len(self.columns):
+            return None
+        row = dict(zip(self.columns, values))
+        record = {"index": int(row["GPU"])}
+        for col, field in self.FIELDS.items():
+            record[field] = row.get(col)
+        return record
+
+
+def _powermetrics_cmd(interval_sec: float) -> List[str]:
+    # -n: fail instead of waiting for a password nobody will type
+    return ["sudo", "-n", "powermetrics", "-i", str(max(int(interval_sec * 1000), 50)), "-s", "gpu_power"]
+
+
+def _dmon_cmd(interval_sec: float) -> List[str]:
+    return ["nvidia-smi", "dmon", "-s", "pucmt", "-d", str(max(int(round(interval_sec)), 1))]
+
+
+def _amdsmi_cmd(interval_sec: float) -> List[str]:
+    return ["amd-smi", "monitor", "-p", "-t", "-u", "-m", "-v", "-w", str(max(int(round(interval_sec)), 1))]
+
+
+def _nvidia_query() -> List[Dict]:
+    """Names and VRAM totals of the NVIDIA GPUs (dmon reports neither), by index."""
+    devices = []
+    try:
+        res = subprocess.run(["nvidia-smi", "--query-gpu=index,name,memory.total",
+                              "--format=csv,noheader,nounits"],
+                             capture_output=True, text=True, timeout=5)
+        for line in res.stdout.splitlines():
+            index, name, total = [p.strip() for p in line.split(",")]
+            devices.append((int(index), {"name": name, "vram_total_gb": float(total) / 1024}))  # MiB
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return []
+    return [dev for _, dev in sorted(devices, key=lambda d: d[0])]
+
+
+# name -> (binary, command for an interval, parser factory, one-shot device query or None)
+TOOLS: Dict[str, tuple] = {
+    "powermetrics": ("powermetrics", _powermetrics_cmd, PowermetricsParser, None),
+    "nvidia-smi": ("nvidia-smi", _dmon_cmd, DmonParser, _nvidia_query),
+    "amd-smi": ("amd-smi", _amdsmi_cmd, AmdSmiMonitorParser, None),
+}
+
+
+class StreamingTool:
+    """One continuously running tool, parsed on a reader thread; restarted when it exits."""
+
+    def __init__(self, name: str, cmd: List[str], parser_factory: Callable,
+                 query: Callable[[], List[Dict]] = None, interval_sec: float = 1.0,
+                 stale_intervals: float = 3.0, restart_sec: float = 2.0, max_restart_sec: float = 60.0):
+        self.name = name
+        self.cmd = cmd
+        self.parser_factory = parser_factory
+        self.query = query
+        # Newest records older than this are not reported (dmon / amd-smi report
+        # at whole seconds at best, whatever interval was asked for)
+        self.stale_sec = max(interval_sec, 1.0) * stale_intervals
+        self.restart_sec = restart_sec
+        self.max_restart_sec = max_restart_sec
+        self.restarts = 0
+        self.records = 0
+        self.last_update = None  # monotonic time of the newest record
+        self._latest: Dict[int, tuple] = {}  # device index -> (monotonic time, record)
+        self._lock = threading.Lock()
+        # Device discovery, done once per stream whichever sampler asks first
+        self._devices: Optional[List[Dict]] = None
+        self._discover_lock = threading.Lock()
+        self._cycle = threading.Event()  # Set once a device index has reported twice
+        self._proc = None
+        self._proc_lock = threading.Lock()  # Spawning and stopping exclude each other
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"tool-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        backoff = self.restart_sec
+        while not self._stop.is_set():
+            started = time.monotonic()
+            parser = self.parser_factory()
+            try:
+                with self._proc_lock:
+                    # stop() may have run since the loop check: never spawn after it
+                    if self._stop.is_set():
+                        break
+                    self._proc = subprocess.Popen(self.cmd, stdout=subprocess.PIPE,
+                                                  stderr=subprocess.DEVNULL, text=True, bufsize=1)
+                for line in self._proc.stdout:
+                    record = parser.feed(line)
+                    if record is not None:
+                        now = time.monotonic()
+                        with self._lock:
+                            if record.get("index", 0) in self._latest:
+                                self._cycle.set()
+                            self._latest[record.get("index", 0)] = (now, record)
+                            self.records += 1
+                            self.last_update = now
+                self._proc.wait()
+            except OSError:
+                pass
+            if self._stop.is_set():
+                break
+            # Exited (or failed to start): restart, backing off while it keeps dying early
+            self.restarts += 1
+            backoff = self.restart_sec if time.monotonic() - started > self.max_restart_sec \
+                else min(backoff * 2, self.max_restart_sec)
+            self._stop.wait(backoff)
+
+    def latest(self) -> Dict[int, Dict]:
+        """Newest record per device index, unless stale (copied; never blocks on the tool)."""
+        now = time.monotonic()
+        with self._lock:
+            return {i: dict(r) for i, (t, r) in self._latest.items() if now - t <= self.stale_sec}
+
+    def devices(self, timeout: float = 3.0) -> List[Dict]:
+        """
+        Static info ({"name", ...}) per device index, found once and cached:
+        from the tool's one-shot query when it has one, else from the stream
+        (waits up to `timeout` for every device to have reported).
+        """
+        with self._discover_lock:
+            if self._devices is None:
+                found = self.query() if self.query else []
+                if not found:
+                    self._cycle.wait(timeout)
+                    found = [{} for _ in range(max(self.latest(), default=-1) + 1)]
+                self._devices = found
+            return [dict(d) for d in self._devices]
+
+    def stop(self):
+        with self._proc_lock:
+            self._stop.set()
+            proc = self._proc
+        if proc and proc.poll() is None:
+            try:
+                proc.terminate()
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+
+_streams_lock = threading.Lock()
+_streams: Dict[tuple, list] = {}  # (tool, interval) -> [StreamingTool, users]
+
+
+def available(tool: str) -> bool:
+    return tool in TOOLS and shutil.which(TOOLS[tool][0]) is not None
+
+
+def acquire(tool: str, interval_sec: float = 1.0) -> Optional[StreamingTool]:
+    """Shared running stream of a tool (started on first use); pair with release()."""
+    if not available(tool):
+        return None
+    key = (tool, interval_sec)
+    with _streams_lock:
+        entry = _streams.get(key)
+        if entry is None:
+            _, cmd, parser, query = TOOLS[tool]
+            entry = _streams[key] = [StreamingTool(tool, cmd(interval_sec), parser, query,
+                                                   interval_sec=interval_sec), 0]
+            entry[0].start()
+        entry[1] += 1
+        return entry[0]
+
+
+def release(stream: StreamingTool):
+    with _streams_lock:
+        for key, entry in list(_streams.items()):
+            if entry[0] is stream:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del _streams[key]
+                    stream.stop()
+                return
+
+
+class ToolDevices:
+    """
+    GPU devices seen by a streaming tool (nvidia-smi dmon / amd-smi monitor),
+    with the same interface as backend.nvgpu.NvmlDevices. The devices are
+    discovered once per shared stream (StreamingTool.devices): nvidia-smi
+    is queried for them directly, amd-smi's are taken from its first records.
+    """
+
+    def __init__(self, tool: str, interval_sec: float = 1.0, wait_sec: float = 3.0):
+        self.tool = tool
+        self.stream = acquire(tool, interval_sec)
+        self._static = self.stream.devices(wait_sec) if self.stream else []
+        vendor = "NVIDIA GPU" if tool == "nvidia-smi" else "AMD GPU"
+        self.names = [d.pop("name", None) or f"{vendor} ({tool})" for d in self._static]
+
+    def __len__(self):
+        return len(self.names)
+
+    def sample(self) -> List[Dict]:
+        latest = self.stream.latest() if self.stream else {}
+        out = []
+        for i in range(len(self.names)):
+            dev = {"index": i, "name": self.names[i]}
+            dev.update(self._static[i])
+            dev.update({k: v for k, v in latest.get(i, {}).items() if k != "index"})
+            out.append(dev)
+        return out
+
+    def power_w(self) -> Optional[float]:
+        power = [d["power_w"] for d in self.sample() if d.get("power_w") is not None]
+        return sum(power) if power else None
+
+    def close(self):
+        if self.stream:
+            release(self.stream)
+            self.stream = None
+        self.names = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded tool output through its parser")
+    parser.add_argument("tool", choices=sorted(TOOLS))
+    parser.add_argument("recording")
+    args = parser.parse_args()
+
+    p = TOOLS[args.tool][2]()
+    with open(args.recording) as f:
+        for line in f:
+            record = p.feed(line)
+            if record is not None:
+                print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Memory, disk and process-tree sampler plugins (backend.sampling).
+
+Linux reads go through a shared ProcfsSampler (kept-open /proc and /sys
+files); elsewhere psutil. The ProcfsSampler is not thread-safe: samplers
+sharing one must run on the same (fast) scheduler thread.
+"""
+import time
+from typing import Dict, List, Optional
+
+import psutil
+
+from backend.diskstats import AwaitWindow, interval_stats
+from backend.procfs import ProcfsSampler
+from backend.proctrack import ProcessTracker
+from backend.sampling import Sampler
+
+MB = 1024**2
+
+
+class MemorySampler(Sampler):
+    """RAM / swap in bytes, paging rates, and optionally CPU busy %."""
+
+    def __init__(self, procfs: ProcfsSampler = None, cpu: bool = False):
+        self.procfs = procfs
+        self.cpu = cpu
+        self._prev = None
+
+    def _read(self) -> Dict:
+        if self.procfs:
+            m = self.procfs.read_memory()
+            return {
+                "ram_used": m["ram_used"], "ram_total": m["ram_total"],
+                "ram_available": m["ram_available"], "swap_used": m["swap_used"],
+                "swap_in": m["swap_in_bytes"], "swap_out": m["swap_out_bytes"],
+                "major_faults": m["page_faults_major"],
+                "cpu_pct": self.procfs.read_cpu_pct() if self.cpu else None
+            }
+
+        ram = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        return {
+            "ram_used": ram.used, "ram_total": ram.total,
+            "ram_available": ram.available, "swap_used": swap.used,
+            "swap_in": swap.sin, "swap_out": swap.sout,
+            "major_faults": None,
+            "cpu_pct": psutil.cpu_percent(interval=None) if self.cpu else None
+        }
+
+    def sample(self) -> Dict:
+        mono = time.monotonic()
+        cur = self._read()
+        prev = self._prev
+
+        # Paging rates (major faults are only available from procfs)
+        cur.update(major_faults_s=None, swap_in_mb_s=0.0, swap_out_mb_s=0.0)
+        if prev and mono > prev["mono"]:
+            dt = mono - prev["mono"]
+            if cur["major_faults"] is not None and prev["major_faults"] is not None:
+                cur["major_faults_s"] = (cur["major_faults"] - prev["major_faults"]) / dt
+            cur["swap_in_mb_s"] = ((cur["swap_in"] - prev["swap_in"]) / MB) / dt
+            cur["swap_out_mb_s"] = ((cur["swap_out"] - prev["swap_out"]) / MB) / dt
+        cur["mono"] = mono
+        self._prev = cur
+        return cur
+
+
+def _total_counts(stats: List[Dict]) -> Dict:
+    """I/O and sector counts summed over disks (times don't add up across devices)."""
+    return {f: sum(st.get(f) or 0 for st in stats)
+            for f in ("read_ios", "write_ios", "read_sectors", "write_sectors")}
+
+
+class DiskSampler(Sampler):
+    """
+    Cumulative bytes and MB/s of the tier-3 device and of every other disk
+    ("OS" = total - tier 3), plus iostat-style stats of the tier-3 device.
+    Without a storage device, the tier-3 figures are the total of all disks.
+    """
+
+    def __init__(self, storage_device: str = None, procfs: ProcfsSampler = None,
+                 os_devices: List[str] = None):
+        self.storage_device = storage_device
+        self.procfs = procfs
+        self.os_devices = os_devices or []
+        self._prev = None
+        self._await_window = AwaitWindow()
+
+    def _read(self):
+        """(t3 read, t3 write, OS read, OS write) bytes and the raw tier-3 block stat."""
+        if self.procfs:
+            disks = self.procfs.read_disks()
+            devices = self.os_devices or list(disks)
+            tot_r = sum(disks[d]["read_bytes"] for d in devices if disks.get(d))
+            tot_w = sum(disks[d]["write_bytes"] for d in devices if disks.get(d))
+            if not self.storage_device:
+                return (tot_r, tot_w, 0, 0), _total_counts([disks[d] for d in devices if disks.get(d)])
+            t3 = disks.get(self.storage_device) or {}
+            t3_r, t3_w = t3.get("read_bytes", 0), t3.get("write_bytes", 0)
+            return (t3_r, t3_w, max(0, tot_r - t3_r), max(0, tot_w - t3_w)), t3
+        return self._psutil_counters(), self._psutil_t3_stat()
+
+    def _psutil_counters(self):
+        try:
+            tot = psutil.disk_io_counters()
+            if not self.storage_device:
+                return tot.read_bytes, tot.write_bytes, 0, 0
+            t3_r, t3_w = 0, 0
+            io = psutil.disk_io_counters(perdisk=True).get(self.storage_device)
+            if io:
+                t3_r, t3_w = io.read_bytes, io.write_bytes
+            # OS/Swap = Total - Tier 3; max(0, ...) guards against counter resets / desync
+            return t3_r, t3_w, max(0, tot.read_bytes - t3_r), max(0, tot.write_bytes - t3_w)
+        except Exception:
+            return 0, 0, 0, 0
+
+    def _psutil_t3_stat(self) -> Dict:
+        """psutil fallback for the tier-3 stat fields (no queue time on macOS)."""
+        try:
+            counters = psutil.disk_io_counters(perdisk=bool(self.storage_device))
+            io = counters.get(self.storage_device) if self.storage_device else counters
+        except Exception:
+            io = None
+        if not io:
+            return {}
+        stat = {
+            "read_ios": io.read_count, "write_ios": io.write_count,
+            "read_sectors": io.read_bytes // 512, "write_sectors": io.write_bytes // 512,
+            "read_ticks": getattr(io, "read_time", None),
+            "write_ticks": getattr(io, "write_time", None),
+            "io_ticks": getattr(io, "busy_time", None)
+        }
+        # All disks: only the counts add up
+        return stat if self.storage_device else _total_counts([stat])
+
+    def sample(self) -> Dict:
+        mono = time.monotonic()
+        counters, t3 = self._read()
+        prev = self._prev
+
+        # Rates (MB/s) and tier-3 IOPS / await / queue depth since the previous run
+        rates = (0.0, 0.0, 0.0, 0.0)
+        device = interval_stats({}, t3, 0)
+        if prev and mono > prev["mono"]:
+            dt = mono - prev["mono"]
+            rates = tuple(((c - p) / MB) / dt for c, p in zip(counters, prev["counters"]))
+            device = interval_stats(prev["t3"], t3, dt)
+            self._await_window.add(device["await_ms"])
+        self._prev = {"mono": mono, "counters": counters, "rates": rates,
+                      "t3": t3, "device": device, "await_avg_p95_ms": self._await_window.p95()}
+        return self._prev
+
+
+class ProcessSampler(Sampler):
+    """Inference server process-tree memory and I/O (ProcessTracker.sample())."""
+
+    def __init__(self, tracker: ProcessTracker = None):
+        self.tracker = tracker or ProcessTracker()
+
+    def sample(self) -> Optional[Dict]:
+        out = self.tracker.sample()
+        out["mono"] = time.monotonic()
+        return out
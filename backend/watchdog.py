@@ -0,0 +1,331 @@
+import errno
+import os
+import re
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+import psutil
+
+# Classified failure reasons recorded on RequestMetrics.failure_reason
+FAILURE_OOM_KILL = "oom_kill"
+FAILURE_SERVER_CRASH = "server_crash"
+FAILURE_STALL = "stall"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_CONNECTION_RESET = "connection_reset"
+FAILURE_HTTP_ERROR = "http_error"
+
+# Kernel log lines emitted by the OOM killer
+OOM_KMSG_RE = re.compile(
+    r"Out of memory: Killed process|oom-kill:|Memory cgroup out of memory", re.IGNORECASE)
+# The victim's PID: "Killed process 1234 (python)" (older kernels: "Kill process"),
+# "oom-kill:constraint=...,task=python,pid=1234,uid=0"
+OOM_KMSG_PID_RE = re.compile(r"Kill(?:ed)? process (\d+)|oom-kill:.*?\bpid=(\d+)", re.IGNORECASE)
+
+
+def oom_killed_pid(record: str) -> Optional[int]:
+    """PID of the process an OOM killer kmsg record names, None if it names none."""
+    m = OOM_KMSG_PID_RE.search(record)
+    if not m:
+        return None
+    return int(m.group(1) or m.group(2))
+
+
+class WatchdogAbort(Exception):
+    """Raised to skip a request because the watchdog already latched a failure."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Aborted by watchdog: {reason}")
+        self.reason = reason
+
+
+def _abort_response(resp):
+    """
+    Unblock a thread that is reading a streaming `requests` response.
+    Closing the response alone does not wake a blocked recv(), shutting the
+    socket down does.
+    """
+    if resp is None:
+        return  # Headers not in yet: StreamWatch.attach() aborts it on arrival
+    raw = getattr(resp, "raw", None)
+    sock = None
+    try:
+        conn = getattr(raw, "_connection", None)  # urllib3 2.x
+        sock = getattr(conn, "sock", None)
+        if sock is None:
+            sock = raw._fp.fp.raw._sock  # urllib3 1.x
+    except Exception:
+        pass
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    try:
+        resp.close()
+    except Exception:
+        pass
+
+
+class StreamWatch:
+    """
+    Liveness state of one in-flight streaming request. Registered before the
+    request is sent; the response is attached once its headers arrive.
+    """
+
+    def __init__(self, resp, started: float):
+        self.resp = resp
+        self.started = started
+        self.first_token = None
+        self.last_token = None
+        self.tokens = 0
+        self.reason: Optional[str] = None
+
+    def attach(self, resp):
+        self.resp = resp
+        if self.reason:
+            # Failed while the server had not answered yet
+            _abort_response(resp)
+
+    def on_token(self):
+        now = time.monotonic()
+        if self.first_token is None:
+            self.first_token = now
+        self.last_token = now
+        self.tokens += 1
+
+    def expected_itl(self) -> Optional[float]:
+        """Mean inter-token time observed on this stream so far (seconds)."""
+        if self.tokens < 3:
+            return None
+        return (self.last_token - self.first_token) / (self.tokens - 1)
+
+
+class FailureWatchdog:
+    """
+    Watches the inference server for fatal failures and in-flight streams for
+    stalls, and aborts streams as soon as either fires.
+
+    Fatal signals (latched until reset()): server PID exit, OOM kills seen in
+    /dev/kmsg or a cgroup's memory.events. A kmsg OOM kill only counts when
+    its victim is in the server's process tree (as of the last poll); without
+    a server PID any OOM kill on the host does. Stall: no token within
+    `stall_factor` x the stream's own inter-token time (at least `min_stall_sec`).
+    Until a stream has that time (fewer than 3 tokens), a gap longer than
+    both `min_stall_sec` and its TTFT is a stall, and no first token within
+    `prefill_stall_sec` (if set) is a prefill hang.
+
+    A stream that fails before its response headers arrive can only be
+    marked: the request's own timeout ends that wait, and attach() aborts
+    the response if it does come.
+    """
+
+    def __init__(self, server_pid: int = None, poll_interval_sec: float = 0.25,
+                 stall_factor: float = 10.0, min_stall_sec: float = 5.0,
+                 prefill_stall_sec: float = None,
+                 cgroup_path: str = None, watch_kmsg: bool = True):
+        self.server_pid = server_pid
+        self.poll_interval_sec = poll_interval_sec
+        self.stall_factor = stall_factor
+        self.min_stall_sec = min_stall_sec
+        self.prefill_stall_sec = prefill_stall_sec
+        self.cgroup_path = cgroup_path
+
+        self.failure: Optional[str] = None
+        self.failure_time: Optional[float] = None
+        self.running = False
+        self._thread = None
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._streams: Dict[int, StreamWatch] = {}
+
+        self._server_proc = None
+        if server_pid:
+            try:
+                self._server_proc = psutil.Process(server_pid)
+            except psutil.NoSuchProcess:
+                self._latch(FAILURE_SERVER_CRASH)
+
+        self._tree_pids = set()
+        self._kmsg_fd = None
+        if watch_kmsg:
+            self._kmsg_fd = self._open_kmsg()
+        self._last_oom_kills = self._read_cgroup_oom_kills()
+
+    # --- Stream registration (called from benchmark worker threads) ---
+
+    def watch(self, resp=None) -> StreamWatch:
+        w = StreamWatch(resp, time.monotonic())
+        with self._lock:
+            self._streams[id(w)] = w
+            failure = self.failure
+        # A fatal failure already happened: don't wait on this one either
+        if failure:
+            self._abort(w, failure)
+        return w
+
+    def release(self, w: StreamWatch):
+        with self._lock:
+            self._streams.pop(id(w), None)
+
+    def classify(self, w: StreamWatch = None, default: str = FAILURE_CONNECTION_RESET) -> str:
+        """Reason for a failed stream: the watchdog's verdict if it has one, else `default`."""
+        if w is not None and w.reason:
+            return w.reason
+        # A reset / 5xx is often the first sign of an OOM kill or exit, which can
+        # land a moment after the socket closes; give it one poll interval
+        deadline = time.monotonic() + self.poll_interval_sec
+        while True:
+            self._check_fatal()
+            if self.failure:
+                return self.failure
+            if time.monotonic() >= deadline:
+                return default
+            time.sleep(0.05)
+
+    def reset(self):
+        """Clear a latched failure (e.g. before probing the next context)."""
+        with self._lock:
+            self.failure = None
+            self.failure_time = None
+        if self._server_proc is not None and not self._server_alive():
+            self._latch(FAILURE_SERVER_CRASH)
+
+    # --- Monitoring ---
+
+    def _open_kmsg(self):
+        try:
+            fd = os.open("/dev/kmsg", os.O_RDONLY | os.O_NONBLOCK)
+            os.lseek(fd, 0, os.SEEK_END)  # Only new records
+            return fd
+        except OSError:
+            return None  # Not Linux or not root
+
+    def _refresh_tree(self):
+        # The victim is gone by the time its record is read: remember the tree each poll
+        try:
+            self._tree_pids = {self._server_proc.pid} | {
+                c.pid for c in self._server_proc.children(recursive=True)}
+        except psutil.Error:
+            pass  # Server gone: keep the last known tree
+
+    def _kmsg_oom(self) -> bool:
+        if self._kmsg_fd is None:
+            return False
+        if self._server_proc is not None:
+            self._refresh_tree()
+        found = False
+        while True:
+            try:
+                record = os.read(self._kmsg_fd, 8192)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                # EPIPE: records were overwritten before we read them; keep going
+                if e.errno == errno.EPIPE:
+                    continue
+                break
+            if not record:
+                break
+            text = record.decode("utf-8", errors="replace")
+            if not OOM_KMSG_RE.search(text):
+                continue
+            if self._server_proc is None or oom_killed_pid(text) in self._tree_pids:
+                found = True
+        return found
+
+    def _read_cgroup_oom_kills(self) -> int:
+        if not self.cgroup_path:
+            return 0
+        try:
+            with open(os.path.join(self.cgroup_path, "memory.events")) as f:
+                for line in f:
+                    key, _, value = line.partition(" ")
+                    if key == "oom_kill":
+                        return int(value)
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def _server_alive(self) -> bool:
+        try:
+            return self._server_proc.is_running() and self._server_proc.status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return False
+
+    def _check_fatal(self):
+        # Also called from worker threads via classify(); kmsg reads must not interleave
+        with self._check_lock:
+            oom = self._kmsg_oom()
+            if self.cgroup_path:
+                kills = self._read_cgroup_oom_kills()
+                if kills > self._last_oom_kills:
+                    self._last_oom_kills = kills
+                    oom = True
+
+        if oom:
+            self._latch(FAILURE_OOM_KILL)
+        elif self._server_proc is not None and not self._server_alive():
+            self._latch(FAILURE_SERVER_CRASH)
+
+    def _check_stalls(self):
+        now = time.monotonic()
+        with self._lock:
+            streams = list(self._streams.values())
+        for w in streams:
+            if w.reason:
+                continue
+            if w.last_token is None:
+                # Prefill (or no response yet): only an explicit bound, else timeout_seconds
+                if self.prefill_stall_sec and now - w.started > self.prefill_stall_sec:
+                    self._abort(w, FAILURE_STALL)
+                continue
+            itl = w.expected_itl()
+            if itl is None:
+                # 1-2 tokens, no inter-token time yet: a gap longer than the prefill itself
+                limit = max(self.min_stall_sec, w.first_token - w.started)
+            else:
+                limit = max(self.min_stall_sec, self.stall_factor * itl)
+            if now - w.last_token > limit:
+                self._abort(w, FAILURE_STALL)
+
+    def _latch(self, reason: str):
+        with self._lock:
+            if self.failure is None:
+                self.failure = reason
+                self.failure_time = time.time()
+            reason = self.failure
+            streams = list(self._streams.values())
+        for w in streams:
+            self._abort(w, reason)
+
+    def _abort(self, w: StreamWatch, reason: str):
+        if w.reason:
+            return
+        w.reason = reason
+        _abort_response(w.resp)
+
+    def _loop(self):
+        while self.running:
+            try:
+                self._check_fatal()
+                self._check_stalls()
+            except Exception as e:
+                print(f"❌ Watchdog Error: {e}")
+            time.sleep(self.poll_interval_sec)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread:
+            self._thread.join()
+        if self._kmsg_fd is not None:
+            os.close(self._kmsg_fd)
+            self._kmsg_fd = None
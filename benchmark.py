@@ -1,6 +1,5 @@
 import argparse
 import yaml
-import time
 import os
 import json
 import requests
@@ -8,10 +7,38 @@ import subprocess
 import platform
 import psutil
 from datetime import datetime
+from urllib.parse import urlparse
 from dataclasses import dataclass, asdict
 from typing import List, Optional, Dict
 import concurrent.futures
+import itertools
 from telemetry import TelemetryCollector
+from backend.attribution import ResourceCounters, RESOURCE_COLUMNS, attribute_requests
+from backend.cgroup import from_config as cgroup_from_config
+from backend.clock import RunClock
+from backend.columnar import HAS_ARROW, write_table
+from backend.energy import energy_stats
+from backend.events import EventLog
+from backend.memcomp import PEAK_COLUMNS, peak_composition
+from backend.residency import summarize_residency
+from backend.diskstats import summarize_device
+from backend.slo import load_slo, score_level, summarize_slo
+from backend.proctrack import ProcessTracker
+from backend.psi import stall_pct
+from backend.watchdog import (FailureWatchdog, WatchdogAbort,
+                              FAILURE_TIMEOUT, FAILURE_CONNECTION_RESET, FAILURE_HTTP_ERROR,
+                              FAILURE_OOM_KILL, FAILURE_SERVER_CRASH, FAILURE_STALL)
+
+
+# Column types of the columnar request / token logs (float64 otherwise)
+REQUEST_COLUMN_TYPES = {"context_len": "int64", "success": "bool", "pass_fail": "bool",
+                        "prompt_tokens": "int64", "completion_tokens": "int64",
+                        "error": "string", "failure_reason": "string", "attribution": "string",
+                        "start_ns": "int64", "first_token_ns": "int64", "end_ns": "int64"}
+TOKEN_COLUMNS = ["request_index", "request_timestamp", "context_len",
+                 "token_index", "t_ms", "itl_ms", "mono_ns"]
+TOKEN_COLUMN_TYPES = {"request_index": "int64", "context_len": "int64", "token_index": "int64",
+                      "mono_ns": "int64"}
 
 
 @dataclass
@@ -30,11 +57,23 @@ class RequestMetrics:
     tps_decode: float = 0.0
     error: str = ""
     pass_fail: bool = True     # Did the model satisfy the constraint?
+    # Classified cause when success is False (oom_kill, server_crash, stall, timeout, ...)
+    failure_reason: str = ""
+    # Raw resource counter snapshots at start / first token / end
+    counters: Optional[Dict] = None
+    # Prefill/decode resource deltas and peaks (see backend.attribution)
+    resources: Optional[Dict] = None
+    # Run clock (backend.clock) stamps, monotonic ns: sent, first token, stream end
+    start_ns: Optional[int] = None
+    first_token_ns: Optional[int] = None
+    end_ns: Optional[int] = None
+    # Arrival time of each streamed token chunk (monotonic ns)
+    token_ns: Optional[List[int]] = None
     # Capture relevant scenario data (e.g. injected needle)
     meta: Optional[Dict] = None
 
 
-def capture_metadata(config: dict) -> dict:
+def capture_metadata(config: dict, clock: RunClock = None) -> dict:
     """Captures reproducible run metadata."""
     meta = {
         "timestamp": datetime.now().isoformat(),
@@ -52,6 +91,8 @@ def capture_metadata(config: dict) -> dict:
             "scenario_name": config.get('test', {}).get('scenario_name', 'Unknown'),
             "model": config.get('runtime', {}).get('model_name'),
             "concurrency": config.get('test', {}).get('concurrency', 1),
+            "concurrency_levels": config.get('test', {}).get('concurrency_levels'),
+            "slo": config.get('test', {}).get('slo'),
             "runs_per_context": config.get('test', {}).get('runs_per_context', 1),
             "step_mode": config.get('test', {}).get('step_mode', 'linear'),
             "context_lengths": config.get('test', {}).get('context_lengths', []),
@@ -65,6 +106,10 @@ def capture_metadata(config: dict) -> dict:
         "runtime_version": "Unknown"  # TODO: Query runtime version
     }
 
+    # Wall-clock anchor of the run's monotonic timestamps (mono_ns / *_ns columns)
+    if clock:
+        meta["clock"] = clock.anchor()
+
     # Try to get git hash
     try:
         meta["git_commit"] = subprocess.check_output(
@@ -89,6 +134,22 @@ class BenchmarkSuite:
             self.results_dir = f"results/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             os.makedirs(self.results_dir, exist_ok=True)
 
+        # Failure watchdog, request resource counters and the cgroup v2
+        # memory constraint (created per sweep in run_sweep)
+        self.watchdog = None
+        self.counters = None
+        self.cgroup = None
+        # Single monotonic clock domain for requests, tokens and telemetry (re-anchored per sweep)
+        self.clock = RunClock()
+        # Typed event log of the current sweep (events_<mode>.jsonl)
+        self.events = None
+        self._request_ids = itertools.count()
+
+    def emit(self, kind: str, **fields):
+        """Write a typed event to the sweep's event log (backend.events)."""
+        if self.events:
+            self.events.emit(kind, **fields)
+
     def check_runtime(self):
         url = self.config['runtime']['endpoint']
         print(f"🔍 Checking runtime at {url}...")
@@ -153,15 +214,12 @@ class BenchmarkSuite:
         """
         Executes a single inference request with STREAMING to measure TTFT.
         """
-        print(
-            f"[DEBUG] run_prompt called: collector={'present' if collector else 'NONE'}, dry_run={dry_run}")
-
         # Select Scenario
         from scenarios import SyntheticScenario, NeedleInHaystackScenario
 
         scenario_type = self.config['test'].get('scenario', 'synthetic')
         scenario = NeedleInHaystackScenario(
-        ) if scenario_type == 'needle' else SyntheticScenario()
+            events=self.events) if scenario_type == 'needle' else SyntheticScenario(events=self.events)
 
         prompt, meta = scenario.generate_prompt(context_len)
         max_tokens = 10 if dry_run else self.config['test']['max_tokens_output']
@@ -177,26 +235,46 @@ class BenchmarkSuite:
             "seed": self.config['test'].get('seed', 42),
         }
 
-        t0 = time.time()
+        clock = self.clock
+        t0_ns = clock.now_ns()
+        first_ns = None
         ttft = 0.0
         output_tokens = 0
         prompt_tokens_count = 0
         completion_tokens_count = 0
         success = False
         error_msg = ""
+        failure_reason = ""
         full_response = []
+        watchdog = self.watchdog
+        watch = None
+        counters = {}
+        token_times = []
 
         # Notify telemetry that request is starting
-        if collector:
-            collector.start_request()
+        request_id = next(self._request_ids)
+        self.emit("request_start", request=request_id, context_len=context_len, warmup=dry_run)
+        slot = collector.start_request(request_id, context_len) if collector else None
+        if self.counters:
+            counters["start"] = self.counters.read()
 
         try:
+            # Server already OOM-killed / crashed: fail fast instead of waiting on timeouts
+            if watchdog and watchdog.failure:
+                raise WatchdogAbort(watchdog.failure)
+            # Watched from before the send: a hang before the headers counts too
+            if watchdog:
+                watch = watchdog.watch()
+
             with requests.post(
                 self.config['runtime']['endpoint'],
                 json=payload,
                 timeout=self.config['test']['timeout_seconds'],
                 stream=True
             ) as resp:
+                # Let the watchdog abort this stream on OOM / crash / stall
+                if watch:
+                    watch.attach(resp)
                 resp.raise_for_status()
 
                 # Streaming loop
@@ -213,7 +291,6 @@ class BenchmarkSuite:
                     if decoded.startswith("data: "):
                         # Parse chunk using helper
                         try:
-                            chunk_json = json.loads(decoded[6:])
                             chunk_json = json.loads(decoded[6:])
                             chunk_text, finish_reason, usage = self._parse_streaming_chunk(
                                 chunk_json)
@@ -230,38 +307,48 @@ class BenchmarkSuite:
 
                         # Only process chunks with actual content
                         if chunk_text:
+                            t_ns = clock.now_ns()
+                            token_times.append(t_ns)
+                            if slot:
+                                collector.on_token(slot)
+                            if watch:
+                                watch.on_token()
+
                             # First token logic
                             if output_tokens == 0:
-                                ttft = (time.time() - t0) * 1000
+                                first_ns = t_ns
+                                ttft = (t_ns - t0_ns) / 1e6
+                                if self.counters:
+                                    counters["first"] = self.counters.read()
                                 # Report TTFT to telemetry
                                 if collector:
-                                    collector.set_ttft(ttft)
+                                    collector.set_ttft(ttft, slot=slot, request=request_id)
 
                             full_response.append(chunk_text)
                             output_tokens += 1
 
-                            # Live TPS Update (Increased frequency for UI responsiveness)
-                            if collector and (output_tokens % 2 == 0):
-                                cur_elapsed = time.time() - t0
-                                if cur_elapsed > 0.05:
-                                    collector.set_tps(
-                                        output_tokens / cur_elapsed)
-
                         # Check for stream completion
                         if finish_reason:
                             break  # Stream completed normally
 
                 success = True
 
+        except WatchdogAbort as e:
+            error_msg = str(e)
+            failure_reason = e.reason
+            success = False
         except requests.exceptions.Timeout:
             error_msg = f"Request timeout after {self.config['test']['timeout_seconds']}s"
+            failure_reason = FAILURE_TIMEOUT
             success = False
-        except requests.exceptions.ConnectionError as e:
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
             error_msg = f"Connection failed: {str(e)[:100]}"
+            failure_reason = FAILURE_CONNECTION_RESET
             success = False
         except requests.exceptions.HTTPError as e:
             status_code = e.response.status_code if e.response else 'unknown'
             error_msg = f"HTTP {status_code}: {str(e)[:100]}"
+            failure_reason = FAILURE_HTTP_ERROR
             success = False
         except json.JSONDecodeError as e:
             error_msg = f"Invalid JSON at line {e.lineno}: {e.msg}"
@@ -270,9 +357,27 @@ class BenchmarkSuite:
             error_msg = f"Unexpected {type(e).__name__}: {str(e)[:100]}"
             success = False
 
-        total_lat = (time.time() - t0) * 1000
+        # Watchdog verdict: an aborted stream may have ended on a clean EOF, and a
+        # reset / 5xx may really be an OOM kill or server crash
+        if watch:
+            watchdog.release(watch)
+            if watch.reason:
+                success = False
+                failure_reason = watch.reason
+                error_msg = f"Aborted by watchdog: {watch.reason}"
+        if watchdog and not success and failure_reason in ("", FAILURE_CONNECTION_RESET, FAILURE_HTTP_ERROR):
+            failure_reason = watchdog.classify(
+                watch, default=failure_reason)
+        if not success and not failure_reason:
+            failure_reason = "error"
+        if collector and failure_reason in (FAILURE_OOM_KILL, FAILURE_SERVER_CRASH, FAILURE_STALL):
+            collector.mark_event(failure_reason, request=request_id, context_len=context_len)
+
+        end_ns = clock.now_ns()
+        total_lat = (end_ns - t0_ns) / 1e6
         if ttft == 0 and success:
             ttft = total_lat  # Fallback if single chunk
+            first_ns = end_ns
 
         # Stream Validation: Detect incomplete/truncated streams
         # Note: finish_reason is set in the streaming loop when detected
@@ -280,13 +385,13 @@ class BenchmarkSuite:
         # (This is stored in local scope during streaming, not accessible here)
         # The validation is implicit - if we got here with success=True, stream completed
 
+        if self.counters:
+            counters["end"] = self.counters.read()
+
         # Validate Response
         response_text = "".join(full_response)
         pass_fail = scenario.validate(response_text, meta)
 
-        # Calculate derived metrics
-        total_lat = (time.time() - t0) * 1000
-
         # Metric Calculations
         # 1. Fallback for token counts if not provided by API
         if prompt_tokens_count == 0:
@@ -317,10 +422,13 @@ class BenchmarkSuite:
 
         # Notify telemetry that request has completed
         if collector:
-            collector.end_request(total_lat)
+            collector.end_request(total_lat, slot=slot)
+        self.emit("request_end", request=request_id, context_len=context_len, success=success,
+                  failure_reason=failure_reason or None, latency_ms=round(total_lat, 3),
+                  completion_tokens=completion_tokens_count)
 
         return RequestMetrics(
-            timestamp=t0,
+            timestamp=clock.wall(t0_ns),
             context_len=context_len,
             success=success,
             ttft_ms=ttft,
@@ -332,43 +440,255 @@ class BenchmarkSuite:
             tps_prefill=tps_pre,
             tps_decode=tps_dec,
             error=error_msg,
+            failure_reason=failure_reason,
+            counters=counters or None,
+            start_ns=t0_ns,
+            first_token_ns=first_ns if first_ns is not None else t0_ns,
+            end_ns=end_ns,
+            token_ns=token_times,
             # TODO: Actual grading logic
             pass_fail=meta.get('pass_fail', True),
             meta=meta
         )
 
+    def _run_level(self, ctx: int, concurrency: int, collector, slo: dict):
+        """
+        Runs one measured batch (runs_per_context requests) at a given concurrency
+        and returns (request metrics, aggregated result entry).
+        """
+        ctx_metrics: List[RequestMetrics] = []
+
+        # Each level gets a fresh verdict (e.g. Ollama reloads the runner after an OOM kill)
+        if self.watchdog:
+            self.watchdog.reset()
+
+        if concurrency > 1:
+            print(
+                f"      Running {self.config['test']['runs_per_context']} requests with concurrency={concurrency}...")
+
+        # Wall-clock window of the batch (goodput denominator)
+        batch_start = self.clock.now_ns()
+        self.emit("level_start", context_len=ctx, concurrency=concurrency)
+        psi_start = collector.psi_snapshot()
+        energy_start = collector.energy_snapshot()
+        cg_start = self.cgroup.read_events() if self.cgroup else None
+
+        futures = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(self.config['test']['runs_per_context']):
+                futures.append(executor.submit(
+                    self.run_prompt, ctx, dry_run=False, collector=collector))
+
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    res = future.result()
+                    ctx_metrics.append(res)
+
+                    if res.success:
+                        # Update Telemetry Status with TPS (Approximate for concurrency)
+                        collector.set_tps(res.tps_overall)
+                    else:
+                        collector.set_tps(0.0)
+                        print(
+                            f"      ❌ Failed ({res.failure_reason}): {res.error}")
+                except Exception as e:
+                    print(f"      ❌ Thread Error: {e}")
+
+        batch_sec = (self.clock.now_ns() - batch_start) / 1e9
+        self.emit("level_end", context_len=ctx, concurrency=concurrency,
+                  completed=len(ctx_metrics), failed=sum(1 for m in ctx_metrics if not m.success))
+        # Share of the batch's wall time spent stalled on memory / io (PSI)
+        psi = stall_pct(psi_start, collector.psi_snapshot())
+        energy_end = collector.energy_snapshot()
+
+        # Reset TPS after context run
+        collector.set_tps(0.0)
+
+        # Calculate Statistics for this Context
+        valid_runs = [m for m in ctx_metrics if m.success]
+        pass_rate = (len(valid_runs) / len(ctx_metrics)) * \
+            100 if ctx_metrics else 0
+
+        avg_lat = 0
+        p50 = 0
+        p95 = 0
+        p99 = 0
+        avg_ttft = 0
+
+        if valid_runs:
+            lats = sorted([m.total_latency_ms for m in valid_runs])
+            ttfts = [m.ttft_ms for m in valid_runs]
+
+            avg_lat = sum(lats) / len(lats)
+            avg_ttft = sum(ttfts) / len(ttfts)
+
+            def get_p(lst, p):
+                return lst[int(len(lst) * p)]
+
+            p50 = get_p(lats, 0.50)
+            p95 = get_p(lats, 0.95)
+            p99 = get_p(lats, 0.99)
+
+        # Calculate TPS averages
+        avg_tps_pre = 0.0
+        avg_tps_dec = 0.0
+        if valid_runs:
+            avg_tps_pre = sum(
+                m.tps_prefill for m in valid_runs) / len(valid_runs)
+            avg_tps_dec = sum(
+                m.tps_decode for m in valid_runs) / len(valid_runs)
+
+        # Failure breakdown by classified reason
+        failure_reasons = {}
+        for m in ctx_metrics:
+            if not m.success:
+                failure_reasons[m.failure_reason] = failure_reasons.get(
+                    m.failure_reason, 0) + 1
+
+        # Goodput: SLO-meeting requests/tokens per second of batch wall time
+        slo_scores = score_level(ctx_metrics, batch_sec, slo)
+
+        print(
+            f"      ✅ Avg Lat: {int(avg_lat)}ms | P95: {int(p95)}ms | TTFT: {int(avg_ttft)}ms | Pass: {int(pass_rate)}% | Users: {concurrency}"
+            f" | SLO: {int(slo_scores['slo_attainment_pct'])}% | Goodput: {slo_scores['goodput_rps']:.2f} req/s")
+
+        entry = {
+            "context": ctx,
+            "concurrency": concurrency,
+            "avg_latency_ms": avg_lat,
+            "p50_latency_ms": p50,
+            "p95_latency_ms": p95,
+            "p99_latency_ms": p99,
+            "avg_ttft_ms": avg_ttft,
+            "tps_prefill": avg_tps_pre,
+            "tps_decode": avg_tps_dec,
+            "pass_rate_pct": pass_rate,
+            "total_prompt_tokens": sum(m.prompt_tokens for m in valid_runs) if valid_runs else 0,
+            "total_completion_tokens": sum(m.completion_tokens for m in valid_runs) if valid_runs else 0,
+            "run_count": len(valid_runs),
+            "failure_reasons": failure_reasons,
+            "wall_time_sec": batch_sec,
+            "psi": psi,
+            "thrashing": psi["memory_some_pct"] is not None and
+            psi["memory_some_pct"] >= collector.thrash.threshold_pct,
+            # memory.events of the server's cgroup during the batch (pressure.enforce)
+            "cgroup_events": self.cgroup.events_since(cg_start) if self.cgroup else None
+        }
+        entry.update(slo_scores)
+        # Energy of the batch: joules / request and tokens / joule (RAPL / hwmon + GPU)
+        entry.update(energy_stats(
+            energy_end - energy_start if energy_start is not None and energy_end is not None else None,
+            len(valid_runs), entry["total_completion_tokens"], batch_sec))
+
+        # Save test result to telemetry for dashboard display
+        if valid_runs:
+            avg_tps = sum(
+                m.tps_overall for m in valid_runs) / len(valid_runs)
+            collector.save_test_result(ctx, avg_ttft, avg_lat, avg_tps)
+
+        return ctx_metrics, entry
+
     def run_sweep(self, mode: str):
         print(f"\n🚀 Starting Sweep: {mode.upper()}")
 
-        # 0. Capture Metadata
-        meta = capture_metadata(self.config)
+        # 0. Capture Metadata (fresh clock anchor for this sweep)
+        self.clock = RunClock()
+        meta = capture_metadata(self.config, self.clock)
         with open(os.path.join(self.results_dir, f"metadata_{mode}.json"), 'w') as f:
             json.dump(meta, f, indent=2)
+        self.events = EventLog(os.path.join(self.results_dir, f"events_{mode}.jsonl"), clock=self.clock)
+        self.emit("stage_start", stage=mode)
 
         # 1. Apply Toggle (Placeholder command execution)
         cmd_key = 'enable_command' if mode == 'aidaptiv' else 'disable_command'
         cmd = self.config['aidaptiv'].get(cmd_key)
         if cmd:
             print(f"➡️ Executing: {cmd}")
+            self.emit("toggle", stage=mode, command=cmd)
 
         # 2. Start Telemetry
         telemetry_file = os.path.join(self.results_dir, f"metrics_{mode}.csv")
         storage_dev = self.config['aidaptiv'].get('storage_device', 'disk0')
         model_name = self.config['runtime'].get('model_name', 'Unknown')
 
+        # Inference server process tree: configured PID, else the endpoint's
+        # listening port, else a process name match
+        tracker = ProcessTracker(
+            pid=self.config['runtime'].get('server_pid'),
+            port=urlparse(self.config['runtime']['endpoint']).port)
+
+        # Enforce pressure.ram_limit_gb / test.ram_limit on the server's process
+        # tree with a cgroup v2 group (pressure.enforce)
+        self.cgroup = None
+        try:
+            self.cgroup = cgroup_from_config(self.config)
+            if self.cgroup:
+                self.cgroup.setup()
+                if tracker.root_pid:
+                    root = psutil.Process(tracker.root_pid)
+                    self.cgroup.add_pids([root.pid] + [c.pid for c in root.children(recursive=True)])
+                else:
+                    print("      ⚠️ Inference server process not found; cgroup limit applies to nothing")
+                print(f"      🔒 Memory limit {self.cgroup.ram_limit_gb} GB "
+                      f"(swap {self.cgroup.swap_limit_gb} GB) via {self.cgroup.path}")
+        except Exception as e:
+            print(f"      ❌ Could not apply cgroup limits: {e}")
+            if self.cgroup:
+                self.cgroup.teardown()
+            self.cgroup = None
+
+        telemetry_cfg = self.config['telemetry']
+        export_cfg = self.config.get('export', {}) or {}
         collector = TelemetryCollector(
             telemetry_file,
-            self.config['telemetry']['sample_interval_sec'],
+            telemetry_cfg['sample_interval_sec'],
             dashboard_url="http://localhost:8081",
             storage_device=storage_dev,
-            model_name=model_name
+            model_name=model_name,
+            server_metrics_url=telemetry_cfg.get('server_metrics_url'),
+            server_scrape_interval_sec=telemetry_cfg.get(
+                'server_scrape_interval_sec', 1.0),
+            server_scrape_slots=telemetry_cfg.get('server_scrape_slots', False),
+            process_tracker=tracker,
+            sampler_intervals=telemetry_cfg.get('sampler_intervals'),
+            samplers=telemetry_cfg.get('samplers'),
+            prometheus_port=telemetry_cfg.get('prometheus_port'),
+            hires=telemetry_cfg.get('hires'),
+            export=export_cfg,
+            psi=telemetry_cfg.get('psi'),
+            cgroup=self.cgroup,
+            clock=self.clock,
+            events=self.events,
+            memcomp=telemetry_cfg.get('memcomp'),
+            residency=telemetry_cfg.get('residency'),
+            adaptive=telemetry_cfg.get('adaptive')
         )
-        collector.start()
 
         all_metrics: List[RequestMetrics] = []
         aggregated_results = []
+        slo = load_slo(self.config)
+        self.counters = None
+        self.watchdog = None
 
         try:
+            # Inside the try: a failed start still tears down the cgroup, events and watchdog
+            collector.start()
+
+            # Cheap counters snapshotted at request start / first token / end
+            self.counters = ResourceCounters(storage_dev, tracker=tracker, clock=self.clock)
+
+            # Failure watchdog: aborts in-flight streams on OOM kill / crash / stall
+            wd_cfg = self.config['test'].get('watchdog', {}) or {}
+            if wd_cfg.get('enabled', True):
+                self.watchdog = FailureWatchdog(
+                    server_pid=tracker.root_pid,
+                    poll_interval_sec=wd_cfg.get('poll_interval_sec', 0.25),
+                    stall_factor=wd_cfg.get('stall_factor', 10.0),
+                    min_stall_sec=wd_cfg.get('min_stall_sec', 5.0),
+                    prefill_stall_sec=wd_cfg.get('prefill_stall_sec'),
+                    cgroup_path=wd_cfg.get('cgroup_path') or (self.cgroup.path if self.cgroup else None))
+                self.watchdog.start()
+
             contexts = self.config['test']['context_lengths']
             total_contexts = len(contexts)
 
@@ -384,130 +704,112 @@ class BenchmarkSuite:
                 collector.set_status(f"Running {scenario_name}")
 
                 # Warmup
+                self.emit("warmup_start", context_len=ctx)
                 self.run_prompt(ctx, dry_run=True, collector=collector)
+                self.emit("warmup_end", context_len=ctx)
+
+                # Measured Runs (one batch per concurrency level)
+                levels = self.config['test'].get('concurrency_levels') or [
+                    self.config.get('test', {}).get('concurrency', 1)]
+
+                stop_sweep = False
+                for concurrency in levels:
+                    ctx_metrics, entry = self._run_level(
+                        ctx, concurrency, collector, slo)
+                    all_metrics.extend(ctx_metrics)
+                    aggregated_results.append(entry)
+
+                    # Early exit on failure (OOM usually kills ability to proceed).
+                    # Higher concurrency levels are skipped for this context; if even
+                    # the lowest level fails, larger contexts won't fare better.
+                    if entry["pass_rate_pct"] < 50:
+                        if concurrency == levels[0]:
+                            print("      ⚠️ High failure rate, stopping sweep.")
+                            stop_sweep = True
+                        else:
+                            print(
+                                "      ⚠️ High failure rate, skipping higher concurrency.")
+                        break
 
-                # Measured Runs
-                ctx_metrics: List[RequestMetrics] = []
-
-                # Concurrent Execution
-                concurrency = self.config.get('test', {}).get('concurrency', 1)
-                if concurrency > 1:
-                    print(
-                        f"      Running {self.config['test']['runs_per_context']} requests with concurrency={concurrency}...")
-
-                futures = []
-                with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-                    for _ in range(self.config['test']['runs_per_context']):
-                        futures.append(executor.submit(
-                            self.run_prompt, ctx, dry_run=False, collector=collector))
-
-                    for future in concurrent.futures.as_completed(futures):
-                        try:
-                            res = future.result()
-                            all_metrics.append(res)
-                            ctx_metrics.append(res)
-
-                            if res.success:
-                                # Update Telemetry Status with TPS (Approximate for concurrency)
-                                collector.set_tps(res.tps_overall)
-                            else:
-                                collector.set_tps(0.0)
-                                print(f"      ❌ Failed: {res.error}")
-                        except Exception as e:
-                            print(f"      ❌ Thread Error: {e}")
-
-                # Reset TPS after context run
-                collector.set_tps(0.0)
-
-                # Calculate Statistics for this Context
-                valid_runs = [m for m in ctx_metrics if m.success]
-                pass_rate = (len(valid_runs) / len(ctx_metrics)) * \
-                    100 if ctx_metrics else 0
-
-                avg_lat = 0
-                p50 = 0
-                p95 = 0
-                p99 = 0
-                avg_ttft = 0
-
-                if valid_runs:
-                    lats = sorted([m.total_latency_ms for m in valid_runs])
-                    ttfts = [m.ttft_ms for m in valid_runs]
-
-                    avg_lat = sum(lats) / len(lats)
-                    avg_ttft = sum(ttfts) / len(ttfts)
-
-                    def get_p(lst, p):
-                        return lst[int(len(lst) * p)]
-
-                    p50 = get_p(lats, 0.50)
-                    p95 = get_p(lats, 0.95)
-                    p99 = get_p(lats, 0.99)
-
-                # Calculate TPS averages
-                avg_tps_pre = 0.0
-                avg_tps_dec = 0.0
-                if valid_runs:
-                    avg_tps_pre = sum(
-                        m.tps_prefill for m in valid_runs) / len(valid_runs)
-                    avg_tps_dec = sum(
-                        m.tps_decode for m in valid_runs) / len(valid_runs)
-
-                print(
-                    f"      ✅ Avg Lat: {int(avg_lat)}ms | P95: {int(p95)}ms | TTFT: {int(avg_ttft)}ms | Pass: {int(pass_rate)}% | Users: {concurrency}")
-
-                aggregated_results.append({
-                    "context": ctx,
-                    "avg_latency_ms": avg_lat,
-                    "p50_latency_ms": p50,
-                    "p95_latency_ms": p95,
-                    "p99_latency_ms": p99,
-                    "avg_ttft_ms": avg_ttft,
-                    "tps_prefill": avg_tps_pre,
-                    "tps_decode": avg_tps_dec,
-                    "pass_rate_pct": pass_rate,
-                    "total_prompt_tokens": sum(m.prompt_tokens for m in valid_runs) if valid_runs else 0,
-                    "total_completion_tokens": sum(m.completion_tokens for m in valid_runs) if valid_runs else 0,
-                    "run_count": len(valid_runs)
-                })
-
-                # Save test result to telemetry for dashboard display
-                if valid_runs:
-                    avg_tps = sum(
-                        m.tps_overall for m in valid_runs) / len(valid_runs)
-                    collector.save_test_result(ctx, avg_ttft, avg_lat, avg_tps)
-
-                # Early exit on failure (OOM usually kills ability to proceed)
-                if pass_rate < 50:
-                    print("      ⚠️ High failure rate, stopping sweep.")
+                if stop_sweep:
                     break
 
         finally:
+            # Join request phases with the telemetry timeline
+            try:
+                attribute_requests(all_metrics, collector.timeline)
+            except Exception as e:
+                print(f"      ⚠️ Resource attribution failed: {e}")
+
             # Save Per-Request Log (Request CSV)
             try:
-                req_csv_path = os.path.join(
-                    self.results_dir, f"requests_{mode}.csv")
-                with open(req_csv_path, 'w', newline='') as f:
-                    import csv
-                    writer = csv.writer(f)
-                    writer.writerow(["timestamp", "context_len", "success", "pass_fail", "ttft_ms",
-                                    "total_latency_ms", "prompt_tokens", "completion_tokens", "tps_overall", "tps_prefill", "tps_decode", "error"])
-                    for m in all_metrics:
-                        writer.writerow([
-                            m.timestamp, m.context_len, m.success, m.pass_fail,
-                            round(m.ttft_ms, 2), round(m.total_latency_ms, 2),
-                            m.prompt_tokens, m.completion_tokens,
-                            round(m.tps_overall, 2), round(
-                                m.tps_prefill, 2), round(m.tps_decode, 2),
-                            m.error
-                        ])
+                req_header = ["timestamp", "context_len", "success", "pass_fail", "ttft_ms",
+                              "total_latency_ms", "prompt_tokens", "completion_tokens", "tps_overall", "tps_prefill", "tps_decode", "error",
+                              "failure_reason"] + RESOURCE_COLUMNS + ["start_ns", "first_token_ns", "end_ns"]
+                req_rows = [[
+                    m.timestamp, m.context_len, m.success, m.pass_fail,
+                    round(m.ttft_ms, 2), round(m.total_latency_ms, 2),
+                    m.prompt_tokens, m.completion_tokens,
+                    round(m.tps_overall, 2), round(
+                        m.tps_prefill, 2), round(m.tps_decode, 2),
+                    m.error, m.failure_reason
+                ] + [(m.resources or {}).get(c) for c in RESOURCE_COLUMNS] +
+                    [m.start_ns, m.first_token_ns, m.end_ns] for m in all_metrics]
+
+                if export_cfg.get('write_csv', True):
+                    req_csv_path = os.path.join(
+                        self.results_dir, f"requests_{mode}.csv")
+                    with open(req_csv_path, 'w', newline='') as f:
+                        import csv
+                        writer = csv.writer(f)
+                        writer.writerow(req_header)
+                        writer.writerows(req_rows)
+
+                # Columnar request log + per-token timeline (export.write_parquet)
+                if export_cfg.get('write_parquet') and HAS_ARROW:
+                    fmt = export_cfg.get('format', 'parquet')
+                    write_table(os.path.join(self.results_dir, f"requests_{mode}"),
+                                req_header, req_rows, types=REQUEST_COLUMN_TYPES, fmt=fmt)
+                    token_rows = []
+                    for i, m in enumerate(all_metrics):
+                        prev = None
+                        for j, t_ns in enumerate(m.token_ns or []):
+                            token_rows.append([i, m.timestamp, m.context_len, j,
+                                               round((t_ns - m.start_ns) / 1e6, 3),
+                                               round((t_ns - prev) / 1e6, 3) if prev is not None else None,
+                                               t_ns])
+                            prev = t_ns
+                    write_table(os.path.join(self.results_dir, f"tokens_{mode}"),
+                                TOKEN_COLUMNS, token_rows, types=TOKEN_COLUMN_TYPES, fmt=fmt)
 
                 # Save Aggregated JSON
                 with open(os.path.join(self.results_dir, f"results_{mode}.json"), 'w') as f:
                     json.dump(aggregated_results, f, indent=2)
 
+                # Save Stage Summary (SLO capacity: max context / max users at SLO,
+                # tier-3 device utilisation per context, achieved telemetry sampling rates)
+                comp_rows = peak_composition(collector.timeline)
+                summary = {"slo": summarize_slo(aggregated_results, slo),
+                           "tier3": summarize_device(collector.timeline, storage_dev),
+                           "thrash": collector.thrash.summary() if collector.thrash else None,
+                           "telemetry": collector.sampler_stats(),
+                           "dashboard": collector.publisher_stats(),
+                           "cgroup": self.cgroup.summary() if self.cgroup else None,
+                           "memcomp": comp_rows,
+                           "weights": summarize_residency(collector.timeline)}
+                with open(os.path.join(self.results_dir, f"summary_{mode}.json"), 'w') as f:
+                    json.dump(summary, f, indent=2)
+
+                # Peak memory composition per context (where weights / KV actually lived)
+                if comp_rows:
+                    import csv
+                    with open(os.path.join(self.results_dir, f"memcomp_{mode}.csv"), 'w', newline='') as f:
+                        writer = csv.DictWriter(f, fieldnames=PEAK_COLUMNS)
+                        writer.writeheader()
+                        writer.writerows(comp_rows)
+
                 # Save Metadata
-                meta = capture_metadata(self.config)
+                meta = capture_metadata(self.config, self.clock)
                 with open(os.path.join(self.results_dir, f"metadata_{mode}.json"), 'w') as f:
                     json.dump(meta, f, indent=2)
 
@@ -517,7 +819,20 @@ class BenchmarkSuite:
             except Exception as e:
                 print(f"      ❌ Error saving results: {e}")
 
-            collector.stop()
+            try:
+                collector.stop()
+            except Exception as e:
+                print(f"      ❌ Error stopping telemetry: {e}")
+            self.emit("stage_end", stage=mode, requests=len(all_metrics))
+            self.events.close()
+            self.events = None
+            if self.watchdog:
+                self.watchdog.stop()
+                self.watchdog = None
+            if self.cgroup:
+                self.cgroup.teardown()
+                self.cgroup = None
+            self.counters = None
 
     def run(self, stage: str):
         # Full Suite or Specific Stage
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse, Response
 from pydantic import BaseModel
+from typing import List
 import uvicorn
 import json
 import os
@@ -9,6 +10,10 @@ import yaml
 import platform
 import time
 
+from backend.columnar import find_segments, read_columnar
+from backend.events import event_elapsed, read_events
+from backend.slo import compare_slo
+
 is_linux = platform.system() == 'Linux'
 has_systemd = is_linux and os.path.exists("/run/systemd/system")
 
@@ -26,6 +31,9 @@ current_snapshot = {
     "app": {"tps": 0.0, "model": "Unknown"}
 }
 
+# test_progress.results as assembled from batched deltas
+current_results = {}
+
 
 class DashboardUpdate(BaseModel):
     timestamp: float
@@ -35,9 +43,21 @@ class DashboardUpdate(BaseModel):
     disk: dict
     os_disk: dict
     app: dict
+    server: dict = {}  # Inference server /metrics (KV cache %, queue, preemptions)
+    processes: dict = {}  # Inference server process tree memory (total + per process)
+    hires: dict = {}  # Latest min/max/mean bucket of the high-rate capture
+    psi: dict = {}  # Pressure stall % (memory / io) and the thrashing flag
+    cgroup: dict = {}  # cgroup v2 memory limit stats (cg_* columns + limit_gb)
+    events: list = []  # Newest run events (backend.events) for timeline markers
     test_progress: dict = {}  # New field for test progress tracking
 
 
+class DashboardBatch(BaseModel):
+    samples: List[DashboardUpdate]
+    results: dict = {}  # Changed test_progress.results entries (all of them if results_full)
+    results_full: bool = False
+
+
 @app.get("/", response_class=HTMLResponse)
 def get_dashboard():
     # VERSION: 2026-01-19-fix-reports-visibility
@@ -248,6 +268,11 @@ def get_dashboard():
                     <div id="cpu_val" class="big-val">0%</div>
                     <div id="cpu_sub" class="sub-val">GPU / NPU Utilization</div>
                 </div>
+                <div class="card" id="cg_card" style="display:none;">
+                    <h2>Cgroup Limit</h2>
+                    <div id="cg_val" class="big-val">0.0 GB</div>
+                    <div id="cg_sub" class="sub-val">memory.current</div>
+                </div>
             </div>
 
             <!-- 2. RUN SUMMARY (AGGREGATE) -->
@@ -764,6 +789,44 @@ def get_dashboard():
 
             let currentChart = null;
 
+            // Events drawn on the memory timeline (kind -> line color, as plotter.OVERLAY_EVENTS)
+            const OVERLAY_EVENTS = {
+                context_change: 'gray', warmup_start: 'lightgray', toggle: 'purple',
+                oom_kill: 'red', server_crash: 'red', stall: 'darkred',
+                thrash_start: 'orange', thrash_end: 'gold',
+                cgroup_limit_hit: 'magenta', cgroup_oom_kill: 'red'
+            };
+            // Routine markers get a line only; the rest are labelled with their kind
+            const UNLABELLED_EVENTS = new Set(['context_change', 'warmup_start']);
+
+            // Chart.js plugin: dashed vertical line per marker ({index, color, label}) on a category x axis
+            const eventMarkers = (markers) => ({
+                id: 'eventMarkers',
+                afterDatasetsDraw(chart) {
+                    const area = chart.chartArea;
+                    const c = chart.ctx;
+                    c.save();
+                    c.setLineDash([4, 4]);
+                    c.lineWidth = 1;
+                    c.globalAlpha = 0.7;
+                    c.font = '10px sans-serif';
+                    markers.forEach(m => {
+                        const px = chart.scales.x.getPixelForValue(m.index);
+                        if (px < area.left || px > area.right) return;
+                        c.strokeStyle = m.color;
+                        c.beginPath();
+                        c.moveTo(px, area.top);
+                        c.lineTo(px, area.bottom);
+                        c.stroke();
+                        if (m.label) {
+                            c.fillStyle = m.color;
+                            c.fillText(m.label, px + 3, area.top + 10);
+                        }
+                    });
+                    c.restore();
+                }
+            });
+
             async function loadReportDetail(id) {
                 const res = await fetch(`/api/reports/${id}`);
                 const data = await res.json();
@@ -1000,8 +1063,35 @@ def get_dashboard():
 
                 const timeLabels = baseData.times.length > aiData.times.length ? baseData.times : aiData.times;
 
+                // Run events of both stages, placed at the nearest sample of the shared time axis
+                const fetchEvents = async (stage) => {
+                    const r = await fetch(`/api/reports/${id}/events?stage=${stage}&kinds=${Object.keys(OVERLAY_EVENTS).join(',')}`);
+                    const j = await r.json();
+                    return j.events || [];
+                };
+                const nearestIndex = (sec) => {
+                    let best = -1, bestDist = Infinity;
+                    timeLabels.forEach((t, i) => {
+                        const d = Math.abs(parseFloat(t) - sec);
+                        if (d < bestDist) { best = i; bestDist = d; }
+                    });
+                    return best;
+                };
+                const markers = [];
+                for (const stage of ["baseline", "aidaptiv"]) {
+                    (await fetchEvents(stage)).forEach(ev => {
+                        if (ev.elapsed_sec == null || !timeLabels.length) return;
+                        markers.push({
+                            index: nearestIndex(ev.elapsed_sec),
+                            color: OVERLAY_EVENTS[ev.kind],
+                            label: UNLABELLED_EVENTS.has(ev.kind) ? null : ev.kind
+                        });
+                    });
+                }
+
                 new Chart(ctxRes, {
                     type: 'line',
+                    plugins: [eventMarkers(markers)],
                     data: { labels: timeLabels, datasets: resDatasets },
                     options: { 
                         responsive: true, 
@@ -1184,6 +1274,20 @@ def get_dashboard():
                         document.getElementById('os_sub').innerText = os_sub;
                     }
 
+                    // Cgroup (only when the server runs under an enforced limit)
+                    const cg = data.cgroup || {};
+                    const cgCard = document.getElementById('cg_card');
+                    if (cg.cg_mem_current_gb != null) {
+                        cgCard.style.display = '';
+                        const cgLimit = cg.limit_gb ? ` / ${cg.limit_gb.toFixed(1)} GB` : '';
+                        document.getElementById(
+                            'cg_val').innerText = cg.cg_mem_current_gb.toFixed(1) + " GB" + cgLimit;
+                        document.getElementById('cg_sub').innerText =
+                            `high: ${cg.cg_high_events ?? 0} | max: ${cg.cg_max_events ?? 0} | oom-kill: ${cg.cg_oom_kill_events ?? 0}`;
+                    } else {
+                        cgCard.style.display = 'none';
+                    }
+
                     // Update Dots
                     const isRunning = data.status && (data.status.toLowerCase().includes('running') || data.status.toLowerCase().includes('bench'));
                     const dotMon = document.getElementById('dot-monitor');
@@ -1600,6 +1704,20 @@ def receive_update(update: DashboardUpdate):
     return {"status": "ok"}
 
 
+@app.post("/update_batch")
+def receive_update_batch(batch: DashboardBatch):
+    """Batched updates from the telemetry publisher; the newest sample wins."""
+    global current_snapshot, current_results
+    if batch.results_full:
+        current_results = dict(batch.results)
+    else:
+        current_results.update(batch.results)
+    if batch.samples:
+        current_snapshot = batch.samples[-1].model_dump()
+        current_snapshot.setdefault("test_progress", {})["results"] = current_results
+    return {"status": "ok", "results_count": len(current_results)}
+
+
 @app.get("/api/reports")
 def list_reports():
     """List all benchmark runs found in results / directory."""
@@ -1688,6 +1806,29 @@ def get_report(run_id: str):
         except:
             pass
 
+    # Load Stage Summaries (SLO capacity / goodput)
+    summaries = {}
+    for stage in ["baseline", "aidaptiv"]:
+        summary_p = os.path.join(run_dir, f"summary_{stage}.json")
+        summaries[stage] = None
+        if os.path.exists(summary_p):
+            try:
+                with open(summary_p, 'r') as f:
+                    summaries[stage] = json.load(f)
+            except:
+                pass
+
+    b_slo = (summaries["baseline"] or {}).get("slo")
+    a_slo = (summaries["aidaptiv"] or {}).get("slo")
+    data["slo"] = {
+        "baseline": b_slo,
+        "aidaptiv": a_slo,
+        "comparison": compare_slo(b_slo, a_slo)
+    }
+
+    # Tier-3 device IOPS / await / queue depth / utilisation per context
+    data["tier3"] = {stage: (summaries[stage] or {}).get("tier3") for stage in summaries}
+
     return data
 
 
@@ -1718,11 +1859,12 @@ def get_report_zip(run_id: str):
 
 
 @app.get("/api/reports/{run_id}/csv")
-def get_report_csv(run_id: str, stage: str = "all", log_type: str = "metrics"):
+def get_report_csv(run_id: str, stage: str = "all", log_type: str = "metrics", columns: str = None):
     """
     Get CSV data for charts or logs.
     stage: 'baseline' | 'aidaptiv'
     log_type: 'metrics' (Hardware/System) | 'requests' (Performance/Latency)
+    columns: optional comma-separated projection (only these columns are read)
     """
 
     run_dir = os.path.join("results", run_id)
@@ -1735,10 +1877,23 @@ def get_report_csv(run_id: str, stage: str = "all", log_type: str = "metrics"):
     elif stage == "aidaptiv":
         target_file = os.path.join(run_dir, f"{prefix}_aidaptiv.csv")
     else:
-        # Fallback to first found metrics
-        csv_files = glob.glob(os.path.join(run_dir, f"{prefix}_*.csv"))
-        if csv_files:
-            target_file = csv_files[0]
+        # Fallback to the first stage with a log. Exact names: a `{prefix}_*`
+        # glob would also pick up metrics_<mode>_hires(_events).csv
+        for name in ("baseline", "aidaptiv"):
+            candidate = os.path.join(run_dir, f"{prefix}_{name}.csv")
+            # Parquet / Arrow-only runs (export.write_csv: false) have segments only
+            if os.path.exists(candidate) or find_segments(candidate):
+                target_file = candidate
+                break
+
+    wanted = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    if target_file and (wanted or (not os.path.exists(target_file) and find_segments(target_file))):
+        # Projection, or a columnar-only log: read only the requested columns
+        try:
+            df = read_columnar(target_file, columns=wanted)
+            return {"csv": df.to_csv(index=False), "stage": stage, "type": prefix}
+        except Exception as e:
+            return {"csv": "", "error": str(e)}
 
     if target_file and os.path.exists(target_file):
         with open(target_file, 'r') as f:
@@ -1747,6 +1902,29 @@ def get_report_csv(run_id: str, stage: str = "all", log_type: str = "metrics"):
     return {"csv": "", "error": "File not found"}
 
 
+@app.get("/api/reports/{run_id}/events")
+def get_report_events(run_id: str, stage: str = "baseline", kinds: str = None):
+    """
+    Run events of a stage (events_<stage>.jsonl) for timeline overlays, each
+    with its `elapsed_sec` on the metrics timeline and its metrics `row` /
+    CSV byte `offset` (seek points). kinds: optional comma-separated filter.
+    """
+    run_dir = os.path.join("results", run_id)
+    path = os.path.join(run_dir, f"events_{stage}.jsonl")
+    if not os.path.exists(path):
+        return {"events": [], "error": "File not found"}
+    wanted = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else None
+    events = read_events(path, kinds=wanted)
+    try:
+        rows = read_columnar(os.path.join(run_dir, f"metrics_{stage}.csv"),
+                             columns=["elapsed_sec", "mono_ns"])
+        for ev, x in zip(events, event_elapsed(events, rows)):
+            ev["elapsed_sec"] = round(x, 3) if x is not None else None
+    except Exception:
+        pass  # No metrics log (or one without mono_ns): events without positions
+    return {"events": events, "stage": stage}
+
+
 @app.post("/api/config")
 def update_config(data: dict):
     """Update config.yaml with new test parameters."""
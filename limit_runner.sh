@@ -1,7 +1,15 @@
 #!/bin/bash
 # aiDAPTIV Benchmark - Memory Limit Launcher
-# Usage: ./limit_runner.sh [RAM_GB]
-# Example: ./limit_runner.sh 16
+# Usage: ./limit_runner.sh [RAM_GB] [SWAP_GB] [COMMAND...]
+# Example: ./limit_runner.sh 16 32 ollama serve
+#
+# Runs COMMAND inside a cgroup v2 group (memory.max / memory.swap.max) via
+# `python -m backend.cgroup`. The group is removed when the command exits or
+# on Ctrl+C. Extra options: python3 -m backend.cgroup --help
+#
+# Creating the group needs root, so a non-root caller is asked for sudo
+# (set NO_SUDO=1 to skip that and fail instead). COMMAND itself still runs
+# as the invoking user; when the script is already run as root, so is COMMAND.
 
 RAM_GB=${1:-16}
 SWAP_GB=${2:-32}
@@ -11,51 +19,33 @@ echo "=================================="
 
 # Check OS
 if [[ "$OSTYPE" == "darwin"* ]]; then
-    echo "❌ Error: This script requires Linux with systemd (cgroups)."
+    echo "❌ Error: This script requires Linux with cgroup v2."
     echo "   On macOS, OS-level memory limiting is not supported via this method."
     exit 1
 fi
 
-# Check for systemd-run
-if ! command -v systemd-run &> /dev/null; then
-    echo "❌ Error: systemd-run not found. Cannot enforce memory limits."
+# Check for a cgroup v2 mount
+if [ ! -f /sys/fs/cgroup/cgroup.controllers ]; then
+    echo "❌ Error: cgroup v2 not mounted at /sys/fs/cgroup. Cannot enforce memory limits."
     exit 1
 fi
 
 # Shift past the first two arguments (RAM and SWAP) to get the command
 shift 2
-COMMAND="$@"
-
-if [ -z "$COMMAND" ]; then
+if [ $# -eq 0 ]; then
     echo "❌ Error: No command provided to run."
     echo "Usage: ./limit_runner.sh [RAM_GB] [SWAP_GB] [COMMAND...]"
     exit 1
 fi
 
-echo "🔒 Configuring Constraints:"
-echo "   • RAM Limit:  ${RAM_GB} GB"
-echo "   • Swap Limit: ${SWAP_GB} GB"
-echo "   • Command:    $COMMAND"
-
-# Convert to Bytes/Strings for systemd
-MEM_LIMIT="${RAM_GB}G"
-
-UNIT_NAME="bench-constrained-$(date +%s)"
-
-# Run the user-provided command inside the cgroup
-sudo systemd-run --unit="$UNIT_NAME" \
-    --property=MemoryMax="$MEM_LIMIT" \
-    --property=MemorySwapMax="${SWAP_GB}G" \
-    --service-type=simple \
-    $COMMAND
-
-echo "✅ Process started in background unit: $UNIT_NAME"
-echo ""
-echo "📊 Cgroup Status:"
-systemctl status "$UNIT_NAME" --no-pager
-
-echo ""
-echo "⚠️  IMPORTANT:"
-echo "   1. Start your benchmark now."
-echo "   2. When finished, run: sudo systemctl stop $UNIT_NAME"
-echo ""
+cd "$(dirname "$0")"
+PYTHON=$(command -v python3)
+if [ "$(id -u)" -eq 0 ]; then
+    exec "$PYTHON" -m backend.cgroup "$RAM_GB" "$SWAP_GB" -- "$@"
+fi
+if [ -n "$NO_SUDO" ]; then
+    echo "❌ Error: Creating the cgroup needs root (unset NO_SUDO to use sudo)."
+    exit 1
+fi
+echo "🔒 sudo is needed to create the cgroup; $* runs as $(id -un)"
+exec sudo "$PYTHON" -m backend.cgroup --user "$(id -un)" "$RAM_GB" "$SWAP_GB" -- "$@"
@@ -4,6 +4,30 @@ import json
 import os
 import argparse
 
+from backend.columnar import read_columnar
+from backend.events import event_elapsed, event_log_path, read_events
+
+# Events drawn on timelines (kind -> line color); per-request events would clutter the plot
+OVERLAY_EVENTS = {
+    "context_change": "gray", "warmup_start": "lightgray", "toggle": "purple",
+    "oom_kill": "red", "server_crash": "red", "stall": "darkred",
+    "thrash_start": "orange", "thrash_end": "gold",
+    "cgroup_limit_hit": "magenta", "cgroup_oom_kill": "red"
+}
+
+
+def overlay_events(ax, events_path: str, df: pd.DataFrame):
+    """Vertical markers for the run's events on an elapsed_sec axis."""
+    events = read_events(events_path, kinds=OVERLAY_EVENTS)
+    labelled = set()
+    for ev, x in zip(events, event_elapsed(events, df)):
+        if x is None:
+            continue
+        kind = ev["kind"]
+        ax.axvline(x, color=OVERLAY_EVENTS[kind], linestyle='--', linewidth=0.8, alpha=0.7,
+                   label=kind if kind not in labelled else None)
+        labelled.add(kind)
+
 
 def plot_ttft_comparison(baseline_json: str, aidaptiv_json: str, output_dir: str):
     """
@@ -58,12 +82,23 @@ def plot_ttft_comparison(baseline_json: str, aidaptiv_json: str, output_dir: str
         print(f"Error plotting TTFT: {e}")
 
 
-def plot_ram_timeline(telemetry_csv: str, output_dir: str, label: str):
+def plot_ram_timeline(telemetry_csv: str, output_dir: str, label: str, events_path: str = None):
     """
-    Generates RAM usage timeline.
+    Generates RAM usage timeline, with the run's events (events_<mode>.jsonl
+    next to the metrics log, or `events_path`) overlaid.
     """
     try:
-        df = pd.read_csv(telemetry_csv)
+        # Only the plotted columns (metrics CSV or Parquet / Arrow segments)
+        columns = ['elapsed_sec', 'ram_used_gb', 'vram_used_gb']
+        events_path = events_path or event_log_path(telemetry_csv)
+        has_events = os.path.exists(events_path)
+        if has_events:
+            columns.append('mono_ns')
+        try:
+            df = read_columnar(telemetry_csv, columns=columns)
+        except ValueError:
+            # Log written before mono_ns existed: place events by row index
+            df = read_columnar(telemetry_csv, columns=columns[:3])
 
         plt.figure(figsize=(12, 6))
 
@@ -78,6 +113,9 @@ def plot_ram_timeline(telemetry_csv: str, output_dir: str, label: str):
         # Disk IO (secondary axis?)
         # For simplicity, just RAM/VRAM focused for OOM story
 
+        if has_events:
+            overlay_events(plt.gca(), events_path, df)
+
         plt.xlabel('Time (s)')
         plt.ylabel('Memory (GB)')
         plt.title(f'Memory Usage Timeline: {label}')
@@ -99,6 +137,7 @@ if __name__ == "__main__":
     parser.add_argument("--baseline", help="Path to results_baseline.json")
     parser.add_argument("--aidaptiv", help="Path to results_aidaptiv.json")
     parser.add_argument("--telemetry", help="Path to metrics.csv")
+    parser.add_argument("--events", help="Path to events_<mode>.jsonl (default: next to --telemetry)")
     parser.add_argument("--output", default=".")
 
     args = parser.parse_args()
@@ -107,4 +146,4 @@ if __name__ == "__main__":
         plot_ttft_comparison(args.baseline, args.aidaptiv, args.output)
 
     if args.telemetry:
-        plot_ram_timeline(args.telemetry, args.output, "test")
+        plot_ram_timeline(args.telemetry, args.output, "test", events_path=args.events)
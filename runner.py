@@ -131,6 +131,15 @@ def main():
     run_parser.add_argument(
         "--aidaptiv", choices=["on", "off"], help="Override aiDAPTIV setting")
 
+    # Calibrate Command
+    cal_parser = subparsers.add_parser(
+        "calibrate", help="Measure the sustainable sampling rate of each sampler")
+    cal_parser.add_argument("--config", default="config.yaml",
+                            help="Path to the benchmark YAML config (telemetry section)")
+    cal_parser.add_argument("--seconds", type=float, default=2.0,
+                            help="Back-to-back sampling time per sampler")
+    cal_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
     args = parser.parse_args()
 
     if args.command == "run":
@@ -144,6 +153,18 @@ def main():
         else:
             sys.exit(1)
 
+    elif args.command == "calibrate":
+        from backend.calibrate import calibrate, print_report
+        with open(args.config) as f:
+            raw = yaml.safe_load(f)
+        report = calibrate(raw.get('telemetry', {}),
+                           storage_device=raw.get('aidaptiv', {}).get('storage_device'),
+                           seconds=args.seconds)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
+
     else:
         parser.print_help()
 
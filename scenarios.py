@@ -7,6 +7,14 @@ from typing import Dict, Tuple
 class Scenario(ABC):
     """Abstract base class for benchmark scenarios."""
 
+    def __init__(self, events=None):
+        # Optional backend.events.EventLog of the sweep
+        self.events = events
+
+    def emit(self, kind: str, **fields):
+        if self.events:
+            self.events.emit(kind, scenario=type(self).__name__, **fields)
+
     @abstractmethod
     def generate_prompt(self, context_len: int) -> Tuple[str, Dict]:
         """
@@ -41,6 +49,7 @@ class SyntheticScenario(Scenario):
             string.ascii_letters + " ", k=noise_len))
 
         prompt = f"System: You are a helpful assistant.\nContext: {noise}\nUser: Please summarize the context."
+        self.emit("scenario_prompt", context_len=context_len, prompt_chars=len(prompt))
         return prompt, {}
 
     def validate(self, response: str, metadata: Dict) -> bool:
@@ -55,7 +64,8 @@ class NeedleInHaystackScenario(Scenario):
     and asks a question that requires retrieving that fact.
     """
 
-    def __init__(self):
+    def __init__(self, events=None):
+        super().__init__(events)
         self.facts = [
             ("The secret code is:", "BLUE-OMEGA-99"),
             ("The project manager's favorite color is:", "Octarine"),
@@ -78,6 +88,8 @@ class NeedleInHaystackScenario(Scenario):
             string.ascii_letters + " ", k=noise_part_len))
 
         prompt = f"Context:\n{noise_prefix}\n{needle}\n{noise_suffix}\n\nUser: {fact_intro}\nAnswer:"
+        self.emit("scenario_prompt", context_len=context_len, prompt_chars=len(prompt),
+                  needle_depth_pct=50, expected=fact_answer)
 
         return prompt, {"expected": fact_answer}
 
@@ -1,38 +1,140 @@
-import re
-import subprocess
-import threading
-import time
-import csv
-import psutil
-import shutil
 import os
 
 import platform
+from typing import TYPE_CHECKING
 
-# Try importing pynvml for NVIDIA support, but skip on macOS
-try:
-    if platform.system() == "Darwin":
-        HAS_NVML = False
-    else:
-        import pynvml
-        HAS_NVML = True
-except ImportError:
-    HAS_NVML = False
+import requests
 
+from backend.procfs import ProcfsSampler, list_block_devices
+from backend.clock import RunClock
+from backend.columns import CGROUP_COLUMNS, COMP_COLUMNS, ENERGY_COLUMNS, PSI_COLUMNS, RESIDENCY_COLUMNS
+from backend.inflight import INFLIGHT_COLUMNS, InflightTable, RequestSlot
+from backend.diskstats import DEVICE_COLUMNS, SERVER_IO_COLUMNS, server_io_stats
+from backend.proctrack import ProcessTracker
+from backend.publisher import DashboardPublisher
+from backend.sampling import SamplerEngine
+from backend.schemas import AidaptivMetrics, AppMetrics, DiskMetrics, GpuMetrics, Snapshot, SystemMetrics
+from backend.sinks import CsvSink, ColumnarSink, DashboardSink, PrometheusSink
 
-import requests
+# Optional samplers' modules (and numpy / pandas behind them) are imported
+# only when enabled; these are for annotations
+if TYPE_CHECKING:
+    from backend.cgroup import CgroupConstraint
+    from backend.events import EventLog
+
+
+# Integer columns of the columnar metrics log (float64 otherwise)
+METRIC_COLUMN_TYPES = {"context_len": "int64", "proc_count": "int64", "thrashing": "int64",
+                       "sample_overruns": "int64", "sample_missed": "int64",
+                       "cg_high_events": "int64", "cg_max_events": "int64",
+                       "cg_oom_events": "int64", "cg_oom_kill_events": "int64",
+                       "mono_ns": "int64", "inflight_reqs": "int64",
+                       "inflight_prefill": "int64", "inflight_decode": "int64",
+                       "sampler_focus": "int64"}
+
+# Samplers that can be switched off (telemetry.samplers.<name>.enabled); memory
+# and disk always run since every row is built from them
+OPTIONAL_SAMPLERS = ("process", "gpu", "power", "psi", "cgroup", "server", "memcomp", "residency",
+                     "energy")
+
+GB = 1024**3
+MB = 1024**2
+
+
+def _gb(n_bytes):
+    """Bytes -> GB rounded for the CSV; None stays None (field unavailable)."""
+    return round(n_bytes / GB, 3) if n_bytes is not None else None
 
 
 class TelemetryCollector:
-    def __init__(self, output_path: str, interval_sec: float = 1.0, dashboard_url: str = None, storage_device: str = "disk0", model_name: str = "Unknown"):
+    def __init__(self, output_path: str, interval_sec: float = 1.0, dashboard_url: str = None, storage_device: str = "disk0", model_name: str = "Unknown",
+                 server_metrics_url: str = None, server_scrape_interval_sec: float = 1.0, server_scrape_slots: bool = False,
+                 process_tracker: ProcessTracker = None, sampler_intervals: dict = None,
+                 hires: dict = None, export: dict = None, psi: dict = None,
+                 cgroup: "CgroupConstraint" = None, samplers: dict = None, prometheus_port: int = None,
+                 clock: RunClock = None, events: "EventLog" = None, memcomp: dict = None,
+                 residency: dict = None, adaptive: dict = None):
         self.output_path = output_path
         self.interval_sec = interval_sec
         self.dashboard_url = dashboard_url
         self.storage_device = storage_device
         self.model_name = model_name
+        # Monotonic ns clock of the run (rows carry mono_ns; wall times come from its anchor)
+        self.clock = clock or RunClock()
+        # Typed event log of the sweep; events record the metrics log position
+        self.events = events
+        self._rows = 0
+        self._csv_sink = None
+        if events:
+            events.position = self.log_position
         self.quantization = "Unknown"
         self.status_msg = "Initializing..."
 
+        # Per-sampler periods (seconds); the CSV row itself is written every interval_sec
+        self.sampler_intervals = {k: interval_sec for k in
+                                  ("memory", "disk", "process", "gpu", "power", "psi", "cgroup", "memcomp",
+                                   "residency", "energy")}
+        self.sampler_intervals.update(
+            {k: v for k, v in (sampler_intervals or {}).items() if v})
+        # Per-sampler switches and cost budgets: {name: {enabled, budget_ms}}
+        self.sampler_cfg = samplers or {}
+        self.enabled = {name: (self.sampler_cfg.get(name) or {}).get('enabled', True)
+                        for name in OPTIONAL_SAMPLERS}
+
+        # Inference server /metrics scraper (vLLM / llama.cpp), polled on its own interval
+        self.server_scraper = None
+        if server_metrics_url and self.enabled["server"]:
+            from backend.scraper import ServerMetricsScraper
+            self.server_scraper = ServerMetricsScraper(
+                server_metrics_url, interval_sec=server_scrape_interval_sec,
+                scrape_slots=server_scrape_slots)
+
+        # Inference server process tree (resolved once, handles cached)
+        self.process_tracker = process_tracker or ProcessTracker()
+
+        # Pressure stall information (Linux 4.20+) and the memory-thrash detector
+        # (both None when PSI is off or unavailable)
+        psi_cfg = psi or {}
+        self.psi = None
+        self.thrash = None
+        if platform.system() == "Linux" and psi_cfg.get('enabled', True) and self.enabled["psi"]:
+            from backend.psi import PsiSampler, ThrashDetector
+            psi_sampler = PsiSampler(cgroup_path=psi_cfg.get('cgroup_path'))
+            if psi_sampler.available:
+                self.psi = psi_sampler
+                self.thrash = ThrashDetector(
+                    threshold_pct=psi_cfg.get('thrash_threshold_pct', 10.0),
+                    min_sec=psi_cfg.get('thrash_min_sec', 1.0))
+
+        # cgroup v2 group the inference server runs in (pressure.enforce)
+        self.cgroup = cgroup
+
+        # Output formats (export.write_csv / export.write_parquet) and an
+        # optional Prometheus endpoint, all fed by the sampler engine
+        self.export_cfg = export or {}
+        self.prometheus_port = prometheus_port
+        self.engine = None
+
+        # Memory composition (telemetry.memcomp): tier-3 resident paths
+        self.memcomp_cfg = memcomp or {}
+        # Model weight page-cache residency (telemetry.residency)
+        self.residency_cfg = residency or {}
+        # Adaptive sampler intervals (telemetry.adaptive); focus phases are
+        # prefill and near-OOM (available RAM below near_oom_available_pct, or thrashing)
+        self.adaptive_cfg = adaptive or {}
+
+        # Optional 10-50 ms capture into a shared-memory ring (telemetry.hires)
+        self.hires_cfg = hires or {}
+        self.hires = None
+
+        # Dashboard updates are queued and sent from their own thread
+        self.publisher = DashboardPublisher(dashboard_url) if dashboard_url else None
+
+        # Linux: memory/swap/fault/disk counters from kept-open /proc + /sys files,
+        # shared by the memory and disk samplers
+        self._procfs = None
+        self._cgroup_prev = None
+
         # Load configured RAM limit from config.yaml
         self.ram_limit_gb = None
         try:
@@ -51,15 +153,19 @@ class TelemetryCollector:
                     self.ram_limit_gb = None
         except:
             pass
+        # An enforced cgroup limit is the real ceiling
+        if self.cgroup and self.cgroup.ram_limit_gb:
+            self.ram_limit_gb = self.cgroup.ram_limit_gb
 
         self.running = False
         self.current_tps = 0.0
 
-        # TTFT and Runtime tracking
+        # TTFT and Runtime tracking: latest TTFT / latency, plus one slot per
+        # in-flight request (concurrent workers each own theirs)
         self.current_ttft_ms = 0.0
-        self.current_runtime_ms = 0.0
         self.last_request_latency_ms = 0.0
-        self.request_start_time = None
+        self.inflight = InflightTable(self.clock)
+        self._live = {}  # Latest in-flight aggregates (per row)
 
         # Test progress tracking
         self.current_context = 0
@@ -67,44 +173,64 @@ class TelemetryCollector:
         self.planned_contexts = []
         self.test_results = {}  # {context_len: {ttft_ms, runtime_ms, tps}}
 
-        # Initialize NVML if available and get GPU Name
+        # In-memory sample timeline (cumulative counters + gauges) used to
+        # attribute device-wide resources to individual requests after a sweep
+        self.timeline = []
+
+        # Set from the GPU sampler when it starts
         self.gpu_name = "Unknown"
-        if HAS_NVML:
-            try:
-                pynvml.nvmlInit()
-                handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-                self.gpu_name = pynvml.nvmlDeviceGetName(handle)
-                if isinstance(self.gpu_name, bytes):
-                    self.gpu_name = self.gpu_name.decode('utf-8')
-            except:
-                pass
-        elif platform.system() == "Darwin":
-            self.gpu_name = "Apple Silicon"
 
     def set_status(self, msg: str):
+        if msg != self.status_msg and self.events:
+            self.events.emit("status", message=msg)
         self.status_msg = msg
 
     def set_tps(self, tps: float):
         self.current_tps = tps
 
-    def set_ttft(self, ttft_ms: float):
+    def set_ttft(self, ttft_ms: float, slot: RequestSlot = None, **fields):
         """Called by benchmark when first token arrives."""
         self.current_ttft_ms = ttft_ms
+        if slot:
+            self.inflight.first_token(slot)
+        self.mark_event("first_token", ttft_ms=round(ttft_ms, 3), **fields)
 
-    def start_request(self):
-        """Called when benchmark request starts."""
-        self.request_start_time = time.time()
-        self.current_ttft_ms = 0.0
-        self.current_runtime_ms = 0.0
+    def on_token(self, slot: RequestSlot):
+        """One streamed token chunk of the request owning `slot`."""
+        self.inflight.token(slot)
+
+    def mark_event(self, kind: str, **fields):
+        """
+        Log a typed event (backend.events) and keep full-resolution high-rate
+        samples around this moment (if enabled).
+        """
+        if self.events:
+            try:
+                self.events.emit(kind, **fields)
+            except Exception as e:
+                print(f"⚠️  Event log error: {e}")
+        if self.hires:
+            self.hires.mark(kind)
+
+    def log_position(self) -> dict:
+        """Index of the next metrics row and its byte offset in the CSV (None without CSV)."""
+        return {"row": self._rows, "offset": self._csv_sink.offset if self._csv_sink else None}
+
+    def start_request(self, request_id=None, context_len: int = 0) -> RequestSlot:
+        """Called when benchmark request starts; returns the request's in-flight slot."""
+        return self.inflight.begin(request_id, context_len)
 
-    def end_request(self, total_latency_ms: float):
+    def end_request(self, total_latency_ms: float, slot: RequestSlot = None):
         """Called when benchmark request completes."""
         self.last_request_latency_ms = total_latency_ms
-        self.request_start_time = None
-        self.current_runtime_ms = 0.0
+        if slot:
+            self.inflight.end(slot)
 
     def set_test_progress(self, current_context: int, total_contexts: int, planned_contexts: list = None):
         """Called when starting a new context test."""
+        if current_context != self.current_context:
+            self.mark_event("context_change", context_len=current_context,
+                            previous=self.current_context)
         self.current_context = current_context
         self.total_contexts = total_contexts
         if planned_contexts:
@@ -118,49 +244,133 @@ class TelemetryCollector:
             "tps": tps
         }
 
-    def _push_to_dashboard(self, now, ram_used, ram_total, vram_used, vram_total, t3_read, t3_write, os_read, os_write, cpu, tps):
-        if not self.dashboard_url:
+    def _push_to_dashboard(self, now, ram_used, ram_total, vram_used, vram_total, t3_read, t3_write, os_read, os_write, cpu, tps, server=None, procs=None, device=None, psi=None, cgroup=None):
+        if not self.publisher:
             return
         try:
-            # Calculate current runtime if request is active
-            current_runtime_ms = 0.0
-            if self.request_start_time:
-                current_runtime_ms = (
-                    time.time() - self.request_start_time) * 1000
-
-            payload = {
-                "timestamp": now,
-                "status": self.status_msg,
-                "system": {"ram_used_gb": ram_used, "ram_total_gb": ram_total, "cpu_pct": cpu},
-                "gpu": {"vram_used_gb": vram_used, "vram_total_gb": vram_total, "name": self.gpu_name},
-                "disk": {"read_mb_s": t3_read, "write_mb_s": t3_write},
-                "os_disk": {"read_mb_s": os_read, "write_mb_s": os_write},
-                "app": {
-                    "tps": tps,
-                    "model": self.model_name,
-                    "quantization": self.quantization,
-                    "ttft_ms": self.current_ttft_ms,
-                    "runtime_ms": current_runtime_ms,
-                    "last_latency_ms": self.last_request_latency_ms
-                },
-                "test_progress": {
-                    "current_context": self.current_context,
-                    "total_contexts": self.total_contexts,
-                    "planned_contexts": self.planned_contexts,
-                    "results": self.test_results
-                }
-            }
-            requests.post(f"{self.dashboard_url}/update",
-                          json=payload, timeout=0.1)
+            self.publisher.publish(self._dashboard_payload(
+                now, ram_used, ram_total, vram_used, vram_total, t3_read, t3_write,
+                os_read, os_write, cpu, tps, server=server, procs=procs, device=device,
+                psi=psi, cgroup=cgroup))
         except Exception as e:
             pass  # Silent fail to avoid disrupting benchmark
 
+    def _snapshot_payload(self, snap: Snapshot) -> dict:
+        """Dashboard update for one snapshot (DashboardSink)."""
+        # The Sidecar labels the "cpu" figure "AI Compute Load" (GPU / powermetrics utilisation)
+        return self._dashboard_payload(
+            snap.timestamp, snap.system.ram_used_gb, snap.system.ram_total_gb,
+            snap.gpu.vram_used_gb, snap.gpu.vram_total_gb,
+            snap.disk.read_bps / MB, snap.disk.write_bps / MB,
+            snap.os_disk.get("read_mb_s", 0.0), snap.os_disk.get("write_mb_s", 0.0),
+            snap.gpu.util_pct, snap.app.throughput_tok_s,
+            server=snap.server, procs=snap.processes, device=snap.device,
+            psi=snap.psi, cgroup=snap.cgroup or None,
+            gpus=[d.model_dump() for d in snap.gpu.devices], gtt_used=snap.gpu.gtt_used_gb)
+
+    def _dashboard_payload(self, now, ram_used, ram_total, vram_used, vram_total, t3_read, t3_write, os_read, os_write, cpu, tps, server=None, procs=None, device=None, psi=None, cgroup=None, gpus=None, gtt_used=None):
+        # Runtime of the oldest active request
+        live = self._live
+        current_runtime_ms = live.get("oldest_req_ms") or 0.0
+
+        return {
+            "timestamp": now,
+            "status": self.status_msg,
+            "system": {"ram_used_gb": ram_used, "ram_total_gb": ram_total, "cpu_pct": cpu},
+            "gpu": {"vram_used_gb": vram_used, "vram_total_gb": vram_total, "name": self.gpu_name,
+                    "gtt_used_gb": gtt_used, "devices": gpus or []},
+            "disk": {"read_mb_s": t3_read, "write_mb_s": t3_write, **(device or {})},
+            "os_disk": {"read_mb_s": os_read, "write_mb_s": os_write},
+            "server": server or {},
+            "processes": procs or {},
+            "hires": self.hires.latest if self.hires else {},
+            "psi": psi or {},
+            "cgroup": dict(cgroup, limit_gb=self.cgroup.ram_limit_gb) if cgroup and self.cgroup else {},
+            "app": {
+                "tps": tps,
+                "model": self.model_name,
+                "quantization": self.quantization,
+                "ttft_ms": self.current_ttft_ms,
+                "runtime_ms": current_runtime_ms,
+                "last_latency_ms": self.last_request_latency_ms,
+                "inflight": live
+            },
+            "events": self.events.recent() if self.events else [],
+            "test_progress": {
+                "current_context": self.current_context,
+                "total_contexts": self.total_contexts,
+                "planned_contexts": self.planned_contexts,
+                # Copy: the publisher thread diffs it against what was sent
+                "results": dict(self.test_results)
+            }
+        }
+
+    def build_samplers(self, engine: SamplerEngine):
+        """
+        Open the shared /proc reader and add every enabled sampler to `engine`
+        with this collector's intervals, budgets and settings. backend.calibrate
+        uses it too, so it measures exactly the samplers a run would.
+        """
+        procfs = None
+        os_devices = []
+        if platform.system() == "Linux":
+            try:
+                os_devices = list_block_devices()
+                devices = os_devices + \
+                    ([self.storage_device] if self.storage_device not in os_devices else [])
+                procfs = ProcfsSampler(devices=devices)
+            except OSError:
+                procfs = None
+        self._procfs = procfs
+
+        iv = self.sampler_intervals
+        enabled = self.enabled
+
+        def budget(name):
+            return (self.sampler_cfg.get(name) or {}).get('budget_ms')
+
+        engine.build("memory", iv["memory"], budget("memory"), procfs=procfs)
+        engine.build("disk", iv["disk"], budget("disk"), storage_device=self.storage_device,
+                     procfs=procfs, os_devices=os_devices)
+        if enabled["process"]:
+            engine.build("process", iv["process"], budget("process"), tracker=self.process_tracker)
+        if enabled["gpu"]:
+            engine.build("gpu", iv["gpu"], budget("gpu"), model_name=self.model_name,
+                         stream_interval_sec=iv["gpu"])
+            self.gpu_name = engine.samplers["gpu"].name
+        if self.psi:
+            engine.build("psi", iv["psi"], budget("psi"), psi=self.psi)
+            engine.on_sample("psi", self._on_psi)
+        if enabled["cgroup"] and self.cgroup and self.cgroup.active:
+            engine.build("cgroup", iv["cgroup"], budget("cgroup"), constraint=self.cgroup)
+            engine.on_sample("cgroup", self._on_cgroup)
+        if enabled["memcomp"]:
+            engine.build("memcomp", iv["memcomp"], budget("memcomp"),
+                         storage_device=self.storage_device,
+                         tier3_paths=self.memcomp_cfg.get('tier3_paths'),
+                         tier3_interval_sec=self.memcomp_cfg.get('tier3_interval_sec', 5.0))
+        if enabled["residency"] and enabled["process"]:
+            # Weight files are found in the server tree's maps (pids from the process sampler)
+            engine.build("residency", iv["residency"], budget("residency"),
+                         model_paths=self.residency_cfg.get('model_paths'),
+                         storage_device=self.storage_device,
+                         min_file_mb=self.residency_cfg.get('min_file_mb', 64.0),
+                         rescan_sec=self.residency_cfg.get('rescan_sec', 10.0))
+        if enabled["energy"]:
+            engine.build("energy", iv["energy"], budget("energy"))
+        if enabled["power"]:
+            engine.build("power", iv["power"], budget("power"),
+                         stream_interval_sec=iv["power"])
+        if self.server_scraper:
+            engine.build("server", self.server_scraper.interval_sec, budget("server"),
+                         scraper=self.server_scraper)
+
     def start(self):
         if self.running:
             return
 
         self.running = True
-        self._start_time = time.time()
+        self._start_time = self.clock.time()
 
         # Fetch model quantization info
         try:
@@ -176,41 +386,103 @@ class TelemetryCollector:
         except:
             pass
 
-        # Open CSV and write header
-        self._file = open(self.output_path, 'w', newline='')
-        self._writer = csv.writer(self._file)
-        self._writer.writerow([
+        # Fixed-rate sampler plugins on one engine. Ones that can block
+        # (powermetrics, HTTP scrape) run on its I/O thread so they cannot
+        # delay the row. Disabled samplers are never imported.
+        engine = SamplerEngine("telemetry", adaptive=self.adaptive_cfg)
+        self.engine = engine
+        self._row_proc_io = None  # (process sample mono, server tree I/O, stats) of the previous row
+        self.build_samplers(engine)
+        self._row_task = engine.every("row", self.interval_sec, self._write_sample)
+        if self.events:
+            # Without this, events after a quiet spell wait in the buffer for the next emit
+            engine.every("events", self.events.flush_sec, self.events.flush_if_due)
+
+        # Columns of the samplers that run (in _write_sample's order); the
+        # telemetry's own CPU and each sampler's cost per run last
+        samplers = engine.samplers
+        header = [
             "timestamp", "elapsed_sec",
             "ram_used_gb", "ram_total_gb",
             "vram_used_gb", "vram_total_gb",
             "disk_read_mb_s", "disk_write_mb_s",
             "cpu_pct",
-            "context_len", "tps"
-        ])
-
-        self._thread = threading.Thread(target=self._loop, daemon=True)
-        self._thread.start()
+            "context_len", "tps",
+            "swap_used_gb",
+            "proc_rss_gb", "proc_pss_gb", "proc_uss_gb", "proc_swap_gb", "proc_count",
+            "major_faults_s", "swap_in_mb_s", "swap_out_mb_s",
+            "sample_jitter_ms", "sample_overruns", "sample_missed"
+        ] + DEVICE_COLUMNS
+        if "psi" in samplers:
+            header += PSI_COLUMNS
+        if "cgroup" in samplers:
+            header += CGROUP_COLUMNS
+        header += SERVER_IO_COLUMNS + ["mono_ns"] + INFLIGHT_COLUMNS
+        for name, columns in (("memcomp", COMP_COLUMNS), ("residency", RESIDENCY_COLUMNS),
+                              ("energy", ENERGY_COLUMNS)):
+            if name in samplers:
+                header += columns
+        if "gpu" in samplers:
+            # One set of gpu<i>_* columns per device, fixed for the run
+            header += samplers["gpu"].columns
+        if "server" in samplers:
+            header += [f"server_{c}" for c in self.server_scraper.columns]
+        header += engine.overhead_columns()
+        self._columns = header
+
+        # Sinks: CSV, typed / compressed row groups alongside (or instead of) it,
+        # the dashboard and an optional Prometheus endpoint
+        if self.export_cfg.get('write_csv', True):
+            self._csv_sink = CsvSink(self.output_path, header)
+            engine.subscribe(self._csv_sink)
+        if self.export_cfg.get('write_parquet'):
+            from backend.columnar import HAS_ARROW
+            if HAS_ARROW:
+                engine.subscribe(ColumnarSink(self.output_path, header,
+                                              types=METRIC_COLUMN_TYPES, export=self.export_cfg))
+            else:
+                print("⚠️  export.write_parquet is set but pyarrow is not installed; writing CSV only")
+        if self.publisher:
+            engine.subscribe(DashboardSink(self.publisher, self._snapshot_payload))
+        if self.prometheus_port:
+            try:
+                engine.subscribe(PrometheusSink(self.prometheus_port))
+            except OSError as e:
+                print(f"⚠️  Prometheus endpoint on port {self.prometheus_port} unavailable: {e}")
+
+        if self.hires_cfg.get('enabled'):
+            from backend.ringbuffer import HighRateCapture
+            base, ext = os.path.splitext(self.output_path)
+            self.hires = HighRateCapture(
+                self.storage_device, f"{base}_hires{ext}", f"{base}_hires_events{ext}",
+                interval_ms=self.hires_cfg.get('interval_ms', 20),
+                decimate_sec=self.hires_cfg.get('decimate_sec', 0.5),
+                event_window_sec=self.hires_cfg.get('event_window_sec', 1.0),
+                capacity=self.hires_cfg.get('capacity'), clock=self.clock)
+            self.hires.start()
+
+        if self.publisher:
+            self.publisher.start()
+        engine.start()
         print(f"📊 Telemetry started. Logging to {self.output_path}")
 
     def stop(self):
         self.running = False
-        if self._thread:
-            self._thread.join()
-        if self._file:
-            self._file.close()
-
-        if HAS_NVML:
-            try:
-                pynvml.nvmlShutdown()
-            except:
-                pass
+        # Stops samplers (scraper, NVML, ...) and closes the CSV / Parquet / Prometheus sinks
+        if self.engine:
+            self.engine.stop()
+        if self.hires:
+            self.hires.stop()
+        if self._procfs:
+            self._procfs.close()
+            self._procfs = None
 
         # Reset Dashboard to 0 (Idle)
         self.status_msg = "Idle"
         self.current_context = 0
         try:
             self._push_to_dashboard(
-                time.time(),
+                self.clock.time(),
                 0, self.ram_limit_gb if self.ram_limit_gb else 16.0,  # Approximate or reuse last?
                 0, 0,
                 0, 0, 0, 0,
@@ -218,224 +490,227 @@ class TelemetryCollector:
             )
         except:
             pass
-
-        print("📊 Telemetry stopped.")
-
-    def _get_mac_gpu_util(self):
-        """
-        Uses active polling of powermetrics to get GPU stats.
-        Requires sudo.
-        """
-        try:
-            # We use a quick sample (10ms) to minimize blocking
-            # This is expensive, so maybe don't do it every single loop if loop is fast.
-            # But we need real-time.
-            cmd = ["sudo", "powermetrics", "-i",
-                   "50", "-n", "1", "-s", "gpu_power"]
-            res = subprocess.run(cmd, capture_output=True,
-                                 text=True, timeout=1)
-
-            # Parse output
-            # GPU Active Residency:  12.50%
-            # GPU Power: 432 mW
-            output = res.stdout
-
-            util = 0.0
-            power = 0.0
-
-            # Regex for Residency (Mac M4 specific 'GPU HW active residency')
-            m_util = re.search(
-                r"GPU HW active residency:\s+([\d\.]+)%", output, re.IGNORECASE)
-            if not m_util:
-                # Fallback for older Macs
-                m_util = re.search(
-                    r"GPU active residency:\s+([\d\.]+)%", output, re.IGNORECASE)
-
-            if m_util:
-                util = float(m_util.group(1))
-                # print(f"DEBUG UTIL: {util}")
-
-            # Regex for Power
-            m_pow = re.search(
-                r"GPU Power:\s+([\d]+)\s*mW", output, re.IGNORECASE)
-            if m_pow:
-                power = float(m_pow.group(1)) / 1000.0  # Convert to Watts
-
-            return util, power
-        except:
-            return 0.0, 0.0
-
-    def _get_gpu_metrics(self):
-        used = 0.0
-        total = 0.0
-
-        if HAS_NVML:
-            try:
-                count = pynvml.nvmlDeviceGetCount()
-                for i in range(count):
-                    handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-                    mem = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                    used += mem.used
-                    total += mem.total
-            except:
-                pass
-            return used / (1024**3), total / (1024**3)
-
-        # MacOS / Non-NVIDIA Fallback:
-        # Use simple heuristic + Model Size Offset
-
-        # Approximate Model Weights (since they often hide in Wired/Metal)
-        # Add to RSS for a realistic "Active AI Memory"
-        MODEL_SIZES = {
-            '8b': 5.5,
-            '7b': 5.0,
-            '13b': 8.0,
-            '33b': 18.0,
-            '70b': 40.0,
-            'llava': 7.0,  # Visual models usually larger
-            'moe': 20.0
+        if self.publisher:
+            self.publisher.stop(flush=True)
+
+        rates = ", ".join(f"{name} {st['actual_hz']}/{st['target_hz']} Hz"
+                          for name, st in self.sampler_stats().items())
+        print(f"📊 Telemetry stopped. Sampler rates: {rates}")
+
+    def sampler_stats(self) -> dict:
+        """Per-sampler achieved rate, overruns, missed ticks, jitter and cost budget."""
+        stats = self.engine.stats() if self.engine else {}
+        if self.hires:
+            stats["hires"] = self.hires.stats()
+        return stats
+
+    def publisher_stats(self) -> dict:
+        """Dashboard batches sent / failed and samples dropped."""
+        return self.publisher.stats() if self.publisher else {}
+
+    # --- Sampler listeners (run on the engine thread after each sample) ---
+
+    def _on_psi(self, pct: dict):
+        transition = self.thrash.update(self.clock.time(), pct["memory_some_pct"], self.current_context)
+        if transition:
+            self.mark_event(transition, context_len=self.current_context,
+                            psi_mem_some_pct=round(pct["memory_some_pct"], 2))
+            if transition == "thrash_start":
+                print(f"⚠️  Memory thrashing detected (PSI some {pct['memory_some_pct']:.1f}%) "
+                      f"at context {self.current_context}")
+
+    def _on_cgroup(self, cur: dict):
+        prev = self._cgroup_prev
+        self._cgroup_prev = cur
+        if prev and cur["events"]["oom_kill"] > prev["events"]["oom_kill"]:
+            self.mark_event("cgroup_oom_kill", context_len=self.current_context,
+                            oom_kill=cur["events"]["oom_kill"])
+        elif prev and prev["events"]["max"] == 0 and cur["events"]["max"] > 0:
+            self.mark_event("cgroup_limit_hit", context_len=self.current_context,
+                            limit_gb=self.cgroup.ram_limit_gb)
+            print(f"⚠️  Cgroup memory limit reached ({self.cgroup.ram_limit_gb} GB) "
+                  f"at context {self.current_context}")
+
+    def psi_snapshot(self):
+        """Raw PSI totals now (None without PSI); pair two with backend.psi.stall_pct."""
+        return self.psi.read() if self.psi else None
+
+    def energy_snapshot(self):
+        """Cumulative joules now (None without the energy sampler or any source)."""
+        sampler = self.engine.samplers.get("energy") if self.engine else None
+        return sampler.snapshot() if sampler else None
+
+    def _focus_reason(self, mem: dict, live: dict):
+        """Phase worth denser sampling right now: near-OOM, prefill, or None."""
+        available = mem.get("ram_available")
+        threshold = self.adaptive_cfg.get('near_oom_available_pct', 10.0)
+        if (self.thrash and self.thrash.thrashing) or (available is not None and mem["ram_total"] and
+                                     100.0 * available / mem["ram_total"] < threshold):
+            return "near_oom"
+        if live["inflight_prefill"]:
+            return "prefill"
+        return None
+
+    def _write_sample(self):
+        """Compose the latest value of every sampler into one Snapshot and publish it to the sinks."""
+        latest = self.engine.latest
+        samplers = self.engine.samplers
+        mem = latest.get("memory")
+        disk = latest.get("disk")
+        if not mem or not disk:
+            return
+        gpu = latest.get("gpu", {})
+        power = latest.get("power", {})
+        procs = latest.get("process") or {"total": {}, "processes": []}
+        proc_total = procs["total"]
+
+        mono_ns = self.clock.now_ns()
+        now = self.clock.wall(mono_ns)
+        elapsed = now - self._start_time
+
+        ram_used = mem["ram_used"] / GB
+        # Always report physical total
+        ram_total = mem["ram_total"] / GB
+        swap_used = mem["swap_used"] / GB
+
+        # GPU Compute: NVML utilization, else powermetrics residency (Mac)
+        compute_load = gpu.get("util")
+        if compute_load is None:
+            compute_load = power.get("util") or 0.0
+
+        vram_used = gpu.get("vram_used", 0.0)
+        vram_total = gpu.get("vram_total", 0.0)
+
+        # Disk IO (Tier 3 vs OS)
+        curr_t3_r, curr_t3_w, _, _ = disk["counters"]
+        t3_read_mb_s, t3_write_mb_s, os_read_mb_s, os_write_mb_s = disk["rates"]
+        dev = disk["device"]
+        device_row = {
+            "t3_read_iops": dev["read_iops"], "t3_write_iops": dev["write_iops"],
+            "t3_avg_req_kb": dev["avg_req_kb"], "t3_await_ms": dev["await_ms"],
+            "t3_queue_depth": dev["queue_depth"], "t3_util_pct": dev["util_pct"]
         }
 
-        base_gb = 0.0
-        mn = self.model_name.lower()
-        for k, v in MODEL_SIZES.items():
-            if k in mn:
-                base_gb = v
-                break
-
-        # Scrape Process RSS (Context + Overhead)
-        rss_used = 0.0
-        try:
-            for proc in psutil.process_iter(['name', 'memory_info', 'cmdline']):
-                try:
-                    p_info = proc.info
-                    if not p_info['memory_info']:
-                        continue
-
-                    name = p_info['name'].lower()
-
-                    # Logic: Catch 'ollama', 'runner' (the model process), and 'python'
-                    if 'ollama' in name or 'runner' in name or 'python' in name:
-                        rss_used += p_info['memory_info'].rss
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
-        except:
-            pass
-
-        rss_gb = rss_used / (1024**3)
-        total_ai_gb = base_gb + rss_gb
-
-        # Return as GB. For Total, just use System Total since it's Unified.
-        return total_ai_gb, psutil.virtual_memory().total / (1024**3)
-
-    def _get_disk_io(self):
-        try:
-            per_disk = psutil.disk_io_counters(perdisk=True)
-            t3_r, t3_w = 0, 0
-
-            # Tier 3 (Target Device)
-            if self.storage_device in per_disk:
-                t3_r = per_disk[self.storage_device].read_bytes
-                t3_w = per_disk[self.storage_device].write_bytes
-
-            # Total System
-            tot = psutil.disk_io_counters()
-
-            # OS/Swap = Total - Tier 3
-            # We use max(0, ...) to prevent negative spikes if counters reset or desync
-            os_r = max(0, tot.read_bytes - t3_r)
-            os_w = max(0, tot.write_bytes - t3_w)
-
-            return t3_r, t3_w, os_r, os_w
-        except:
-            return 0, 0, 0, 0
-
-    def _loop(self):
-        last_t3_r, last_t3_w, last_os_r, last_os_w = self._get_disk_io()
-        last_time = time.time()
-
-        while self.running:
-            try:
-                now = time.time()
-                dt = now - last_time
-                if dt < 0.1:
-                    time.sleep(0.1)
-                    continue
-
-                elapsed = now - self._start_time
-
-                # System Metrics
-                ram = psutil.virtual_memory()
-                ram_used = ram.used / (1024**3)
-                # Always report physical total
-                ram_total = ram.total / (1024**3)
-
-                # GPU Compute & Power
-                gpu_util = 0.0
-                gpu_power = 0.0
-
-                if not HAS_NVML:
-                    # Poll Mac
-                    gpu_util, gpu_power = self._get_mac_gpu_util()
-                else:
-                    try:
-                        handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-                        gpu_util = pynvml.nvmlDeviceGetUtilizationRates(handle).gpu
-                        try:
-                            gpu_power = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0
-                        except:
-                            pass
-                    except:
-                        pass
-
-                # Using Host CPU only if GPU is 0 (fallback) or as separate metric?
-                # User wants "Compute Workload".
-                compute_load = gpu_util
-
-                # GPU Metrics (VRAM)
-                vram_used, vram_total = self._get_gpu_metrics()
-
-                # Disk IO (Tier 3 vs OS)
-                curr_t3_r, curr_t3_w, curr_os_r, curr_os_w = self._get_disk_io()
-
-                # Tier 3 Rates
-                t3_read_mb_s = ((curr_t3_r - last_t3_r) / (1024**2)) / dt
-                t3_write_mb_s = ((curr_t3_w - last_t3_w) / (1024**2)) / dt
-
-                # OS Rates
-                os_read_mb_s = ((curr_os_r - last_os_r) / (1024**2)) / dt
-                os_write_mb_s = ((curr_os_w - last_os_w) / (1024**2)) / dt
-
-                last_t3_r, last_t3_w = curr_t3_r, curr_t3_w
-                last_os_r, last_os_w = curr_os_r, curr_os_w
-                last_time = now
-
-                # Write row
-                if self._writer:
-                    self._writer.writerow([
-                        round(now, 2), round(elapsed, 2),
-                        round(ram_used, 2), round(ram_total, 2),
-                        round(vram_used, 2), round(vram_total, 2),
-                        round(t3_read_mb_s, 2), round(t3_write_mb_s, 2),
-                        round(compute_load, 1),
-                        self.current_context, round(
-                            getattr(self, 'current_tps', 0.0), 2)
-                    ])
-                    self._file.flush()
-
-                # Update Sidecar
-                # Passing compute_load as 'cpu' argument to avoid changing signature again too much
-                # But the Sidecar will label it "AI Compute Load"
-                self._push_to_dashboard(
-                    now, ram_used, ram_total,
-                    vram_used, vram_total,
-                    t3_read_mb_s, t3_write_mb_s,
-                    os_read_mb_s, os_write_mb_s,
-                    compute_load, getattr(self, 'current_tps', 0.0)
-                )
-
-                time.sleep(self.interval_sec)
-
-            except Exception as e:
-                print(f"❌ Telemetry Thread Error: {e}")
-                time.sleep(1)  # Prevent busy loop on error
+        # Server process-tree I/O, and how much of the tier-3 traffic it explains
+        proc_io = proc_total.get("io")
+        proc_mono = procs.get("mono")
+        prev_mono, prev_io, server_io = self._row_proc_io or (None, None, None)
+        if server_io is None or proc_mono != prev_mono:
+            # Process sample moved on since the last row (else keep the last figures)
+            dt = proc_mono - prev_mono if proc_mono is not None and prev_mono is not None else 0
+            server_io = server_io_stats(prev_io, proc_io, dt, t3_read_mb_s, t3_write_mb_s)
+            self._row_proc_io = (proc_mono, proc_io, server_io) if proc_io is not None else None
+
+        # Memory composition (None when the sampler is off)
+        memcomp = latest.get("memcomp")
+        comp_row = samplers["memcomp"].row(memcomp) if "memcomp" in samplers else [None] * len(COMP_COLUMNS)
+        comp = dict(zip(COMP_COLUMNS, comp_row))
+
+        # Weight-file residency; tier-3 reads split into weight paging and the rest
+        weights = latest.get("residency")
+        weight_row = samplers["residency"].row(weights, t3_read_mb_s) if "residency" in samplers else []
+
+        # Cumulative energy (RAPL / hwmon + GPU)
+        energy = latest.get("energy")
+        energy_vals = samplers["energy"].row(energy) if "energy" in samplers else []
+
+        self.timeline.append({
+            "timestamp": now, "mono_ns": mono_ns,
+            "context_len": self.current_context,
+            "read_bytes": curr_t3_r, "write_bytes": curr_t3_w,
+            "swap_in_bytes": mem["swap_in"], "swap_out_bytes": mem["swap_out"],
+            "ram_used_gb": ram_used, "vram_used_gb": vram_used,
+            "swap_used_gb": swap_used,
+            "proc_read_bytes": proc_io["read_bytes"] if proc_io else None,
+            "proc_write_bytes": proc_io["write_bytes"] if proc_io else None,
+            "weight_resident_pct": weights["resident_pct"] if weights else None,
+            "weight_load_bytes": weights["load_bytes"] if weights else None,
+            "weight_refault_bytes": weights["refault_bytes"] if weights else None,
+            "energy_j": energy["energy_j"] if energy else None,
+            **device_row, **comp
+        })
+
+        psi_row = []
+        if "psi" in samplers:
+            psi = latest.get("psi", {})
+            psi_row = [
+                psi.get("mem_some_avg10"), psi.get("mem_full_avg10"),
+                psi.get("memory_some_pct"), psi.get("memory_full_pct"),
+                psi.get("io_some_pct"), psi.get("io_full_pct"),
+                int(self.thrash.thrashing)
+            ]
+
+        cgroup_row = self.cgroup.row(latest.get("cgroup")) if "cgroup" in samplers else []
+
+        # Latest inference server metrics (scraped on their own interval)
+        server = self.server_scraper.latest() if self.server_scraper else {}
+
+        # In-flight requests: aggregate tokens/s across all streams while any
+        # are active, else the last rate the benchmark reported
+        live = self.inflight.aggregate()
+        self._live = live
+        if self.engine.adaptive:
+            self.engine.focus(self._focus_reason(mem, live))
+        tps = self.current_tps
+        if live["inflight_reqs"] and live["live_tok_s"] is not None:
+            tps = live["live_tok_s"]
+
+        row_task = self._row_task
+        values = [
+            round(now, 2), round(elapsed, 2),
+            round(ram_used, 2), round(ram_total, 2),
+            round(vram_used, 2), round(vram_total, 2),
+            round(t3_read_mb_s, 2), round(t3_write_mb_s, 2),
+            round(compute_load, 1),
+            self.current_context, round(tps, 2),
+            round(swap_used, 2),
+            _gb(proc_total.get("rss")), _gb(proc_total.get("pss")),
+            _gb(proc_total.get("uss")), _gb(proc_total.get("swap")),
+            proc_total.get("count", 0),
+            round(mem["major_faults_s"], 1) if mem["major_faults_s"] is not None else None,
+            round(mem["swap_in_mb_s"], 2), round(mem["swap_out_mb_s"], 2),
+            # Sample timing quality: lateness of this row, cumulative overruns / skipped ticks
+            round(row_task.last_jitter_ms, 2), row_task.overruns, row_task.missed
+        ] + [round(device_row[c], 2) if device_row[c] is not None else None for c in DEVICE_COLUMNS] + psi_row + cgroup_row + \
+            [round(server_io[c], 2) if server_io[c] is not None else None for c in SERVER_IO_COLUMNS] + [mono_ns] + \
+            [round(live[c], 2) if isinstance(live[c], float) else live[c] for c in INFLIGHT_COLUMNS] + comp_row + weight_row + energy_vals
+        if "gpu" in samplers:
+            values += samplers["gpu"].row(gpu)
+        if "server" in samplers:
+            values += [server[c] for c in self.server_scraper.columns]
+        values += self.engine.overhead_row()
+
+        snapshot = Snapshot(
+            timestamp=now, mono_ns=mono_ns,
+            system=SystemMetrics(
+                ram_total_gb=ram_total, ram_used_gb=ram_used,
+                ram_available_gb=(mem.get("ram_available") or 0) / GB,
+                swap_used_gb=swap_used, cpu_util_pct=mem.get("cpu_pct") or 0.0,
+                page_faults_major=mem["major_faults_s"]),
+            gpu=GpuMetrics(
+                vram_total_gb=vram_total, vram_used_gb=vram_used,
+                util_pct=compute_load, mem_util_pct=gpu.get("mem_util") or 0.0,
+                power_w=power.get("power_w", gpu.get("power_w")), temp_c=gpu.get("temp_c"),
+                gtt_total_gb=gpu.get("gtt_total"), gtt_used_gb=gpu.get("gtt_used"),
+                devices=gpu.get("devices", [])),
+            disk=DiskMetrics(
+                read_bps=t3_read_mb_s * MB, write_bps=t3_write_mb_s * MB,
+                read_iops=dev["read_iops"], write_iops=dev["write_iops"],
+                await_avg_p95_ms=disk.get("await_avg_p95_ms"), queue_depth=dev["queue_depth"],
+                await_ms=dev["await_ms"], avg_req_kb=dev["avg_req_kb"], util_pct=dev["util_pct"]),
+            app=AppMetrics(concurrent_reqs=live["inflight_reqs"], throughput_tok_s=tps),
+            aidaptiv=AidaptivMetrics(),
+            os_disk={"read_mb_s": os_read_mb_s, "write_mb_s": os_write_mb_s},
+            device=dict(dev, **server_io),
+            processes=procs,
+            psi=dict(zip(PSI_COLUMNS, psi_row)),
+            cgroup=dict(zip(CGROUP_COLUMNS, cgroup_row)),
+            server=server,
+            inflight=live,
+            residency=dict(zip(RESIDENCY_COLUMNS, weight_row), files=weights["files"]) if weights else {},
+            energy=dict(zip(ENERGY_COLUMNS, energy_vals), zones=energy["zones"],
+                        source=energy["source"]) if energy else {},
+            memcomp=dict(comp, swaps=memcomp.get("swaps", []), zram=memcomp.get("zram", {})) if memcomp else {},
+            row=dict(zip(self._columns, values)))
+        self.engine.publish(snapshot)
+        self._rows += 1
@@ -0,0 +1,11 @@
+import os
+
+import pytest
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+@pytest.fixture
+def fixture_path():
+    """Path of a file under tests/fixtures."""
+    return lambda *parts: os.path.join(FIXTURES, *parts)
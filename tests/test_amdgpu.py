@@ -0,0 +1,60 @@
+"""amdgpu sysfs telemetry on a recorded tree (tests/fixtures/amdgpu): a Strix Halo APU and a discrete card."""
+import pytest
+
+from backend.amdgpu import AMD_DEVICE_FIELDS, AmdGpuDevices, find_devices
+from backend.gpu_samplers import GpuSampler
+
+
+@pytest.fixture
+def root(fixture_path):
+    return fixture_path("amdgpu")
+
+
+def test_find_devices_skips_connectors_other_vendors_and_display_only(root):
+    assert [p.split("/")[-2] for p in find_devices(root)] == ["card0", "card2"]
+
+
+def test_sample_reports_gtt_apart_from_vram(root):
+    devices = AmdGpuDevices(root)
+    try:
+        assert devices.names == ["AMD Radeon 8060S", "AMD GPU (0x744c)"]
+        apu, dgpu = devices.sample()
+    finally:
+        devices.close()
+    assert set(AMD_DEVICE_FIELDS) <= set(apu)
+    assert apu["vram_used_gb"] == pytest.approx(0.25)
+    assert apu["vram_total_gb"] == pytest.approx(0.5)
+    assert (apu["gtt_used_gb"], apu["gtt_total_gb"]) == (40.0, 64.0)
+    assert (apu["util_pct"], apu["mem_util_pct"]) == (97, 35)
+    # power1_average is preferred over power1_input
+    assert apu["power_w"] == pytest.approx(85.0)
+    assert apu["temp_c"] == pytest.approx(71.0)
+
+    assert dgpu["mem_util_pct"] is None
+    assert dgpu["power_w"] == pytest.approx(30.0)
+    assert dgpu["gtt_used_gb"] == 0.5
+
+
+def test_power_summed_over_devices(root):
+    devices = AmdGpuDevices(root)
+    try:
+        assert devices.power_w() == pytest.approx(115.0)
+    finally:
+        devices.close()
+
+
+def test_gpu_sampler_on_amdgpu(root, monkeypatch):
+    monkeypatch.setattr("backend.nvgpu.HAS_NVML", False)  # No NVIDIA devices on this "host"
+    monkeypatch.setattr("backend.gpu_samplers.platform.system", lambda: "Linux")
+    sampler = GpuSampler(sysfs_root=root)
+    try:
+        assert sampler.name == "AMD Radeon 8060S + AMD GPU (0x744c)"
+        assert sampler.columns[:4] == ["gpu0_vram_used_gb", "gpu0_vram_total_gb",
+                                       "gpu0_gtt_used_gb", "gpu0_gtt_total_gb"]
+        out = sampler.sample()
+    finally:
+        sampler.close()
+    assert out["vram_total"] == pytest.approx(24.5)
+    assert (out["gtt_used"], out["gtt_total"]) == (40.5, 96.0)
+    assert out["util"] == 50.0
+    assert out["temp_c"] == pytest.approx(71.0)
@@ -0,0 +1,77 @@
+"""Per-request resource attribution: counter snapshots and time apportioning."""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from backend.attribution import GB, MB, ResourceCounters, _apportion, attribute_requests
+from backend.proctrack import ProcessTracker
+
+
+def test_counters_read_does_not_wait_for_tracker_lock():
+    tracker = ProcessTracker(pid=os.getpid())
+    assert tracker.resolve()
+    counters = ResourceCounters("nonexistent0", tracker=tracker)
+    with tracker._lock:  # A telemetry sample() in progress
+        snap = counters.read()
+    assert snap["rss_bytes"] > 0
+    assert {"read_bytes", "write_bytes", "swap_in_bytes", "swap_out_bytes", "mono_ns"} <= set(snap)
+
+
+def test_counters_without_server_tree():
+    snap = ResourceCounters("nonexistent0", tracker=ProcessTracker(pid=None, names=())).read()
+    assert snap["rss_bytes"] is None
+
+
+def metric(start, first, end, counters=None):
+    return SimpleNamespace(start_ns=start, first_token_ns=first, end_ns=end, counters=counters, resources=None)
+
+
+def sample(t, read_mb, ram_gb=None, energy_j=None):
+    return {"mono_ns": t, "read_bytes": read_mb * MB, "write_bytes": 0, "swap_in_bytes": 0,
+            "swap_out_bytes": 0, "ram_used_gb": ram_gb, "energy_j": energy_j}
+
+
+def test_apportion_splits_overlap_equally():
+    # One interval, 100 MB read; window A covers it all, B its second half
+    shares = _apportion([(0, 10), (5, 10)], [sample(0, 0), sample(10, 100)], ["read_bytes"])
+    assert shares[0]["read_bytes"] == pytest.approx(75 * MB)  # 50 alone + 25 shared
+    assert shares[1]["read_bytes"] == pytest.approx(25 * MB)
+
+
+def test_apportion_across_intervals_and_idle_gaps():
+    samples = [sample(0, 0), sample(10, 40), sample(20, 40), sample(30, 100)]
+    shares = _apportion([(5, 25)], samples, ["read_bytes"])
+    # Half of the first interval (20), none of the idle one, half of the last (30)
+    assert shares[0]["read_bytes"] == pytest.approx(50 * MB)
+
+
+def test_overlapping_requests_are_apportioned():
+    a = metric(0, 4, 10)
+    b = metric(6, 8, 20)
+    samples = [sample(t, t * 10, ram_gb=float(t), energy_j=float(t)) for t in range(0, 21, 2)]
+    attribute_requests([a, b], samples)
+    assert a.resources["attribution"] == b.resources["attribution"] == "apportioned"
+    # 10 MB per ns of timeline; A's prefill (0-4) ran alone
+    assert a.resources["prefill_read_mb"] == 40.0
+    # 6-8 shared by A's decode and B's prefill, 8-10 by both decodes
+    assert a.resources["decode_read_mb"] == 20 + 10 + 10
+    assert b.resources["prefill_read_mb"] == 10.0
+    assert b.resources["decode_read_mb"] == 10 + 100
+    total = sum(m.resources[f"{p}_read_mb"] for m in (a, b) for p in ("prefill", "decode"))
+    assert total == 200.0  # Every byte of the timeline goes to exactly one owner
+    assert a.resources["decode_peak_ram_gb"] == 10.0
+    assert b.resources["decode_energy_j"] == pytest.approx(11.0)
+
+
+def test_lone_request_uses_exact_counters():
+    snaps = {k: {"read_bytes": v * MB, "write_bytes": 0, "swap_in_bytes": 0, "swap_out_bytes": MB,
+                 "rss_bytes": rss * MB}
+             for k, v, rss in (("start", 0, 100), ("first", 30, 300), ("end", 35, 250))}
+    m = metric(0, 4, 10, counters=snaps)
+    attribute_requests([m], [sample(0, 0), sample(10, 999)])
+    res = m.resources
+    assert res["attribution"] == "exact"
+    assert (res["prefill_read_mb"], res["decode_read_mb"]) == (30.0, 5.0)
+    assert (res["prefill_swap_out_mb"], res["decode_rss_delta_mb"]) == (0.0, -50.0)
+    assert res["peak_rss_gb"] == round(300 * MB / GB, 3)
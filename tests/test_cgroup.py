@@ -0,0 +1,138 @@
+"""CgroupConstraint against a fake cgroupfs / procfs under tmp_path."""
+import os
+import sys
+
+import pytest
+
+from backend.cgroup import (GB, CgroupConstraint, from_config, io_max_line, limit_value,
+                            parse_flat_keyed)
+
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def fake(tmp_path):
+    """A cgroup root with the server's current group, and a /proc with one server process."""
+    root, proc = tmp_path / "cgroup", tmp_path / "proc"
+    write(str(root / "cgroup.controllers"), "cpu io memory pids\n")
+    write(str(root / "user.slice" / "cgroup.procs"), "")
+    write(str(proc / "4242" / "cgroup"), "0::/user.slice\n")
+    write(str(proc / "4242" / "statm"), f"500000 {GB // PAGE} 1000 10 0 20000 0\n")
+    return root, proc
+
+
+def test_limit_value():
+    assert limit_value(None) == "max"
+    assert limit_value(1.5) == str(int(1.5 * GB))
+
+
+def test_parse_flat_keyed():
+    assert parse_flat_keyed("low 0\nhigh 12\nbad x\n\nmax 3\n") == {"low": 0, "high": 12, "max": 3}
+
+
+def test_io_max_line():
+    assert io_max_line(None) is None
+    assert io_max_line("259:0 wbps=1") == "259:0 wbps=1"
+    assert io_max_line({"device": "259:0", "wbps": 104857600, "riops": 0}) == "259:0 wbps=104857600"
+    with pytest.raises(ValueError):
+        io_max_line({"device": "no-such-disk", "rbps": 1})
+
+
+def test_setup_creates_group_with_limits(fake):
+    root, proc = fake
+    cg = CgroupConstraint(name="bench", ram_limit_gb=8, swap_limit_gb=0, root=str(root), proc_root=str(proc))
+    assert cg.fake
+    cg.setup()
+    assert cg.created and cg.active
+    assert read(str(root / "cgroup.subtree_control")) == "+memory"
+    assert read(str(root / "bench" / "memory.max")) == str(8 * GB)
+    assert read(str(root / "bench" / "memory.swap.max")) == "0"
+    assert read(str(root / "bench" / "memory.high")) == "max"
+    assert not os.path.exists(root / "bench" / "io.max")
+
+
+def test_add_pids_records_precharged_rss(fake, capsys):
+    root, proc = fake
+    cg = CgroupConstraint(name="bench", ram_limit_gb=8, root=str(root), proc_root=str(proc))
+    cg.setup()
+    cg.add_pids([4242])
+    assert cg.pids() == [4242]
+    assert cg.precharged_bytes == GB
+    assert cg.summary()["precharged_gb"] == 1.0
+    assert "stays charged to its old group" in capsys.readouterr().out
+
+
+def test_sample_and_row_count_events_since_setup(fake):
+    root, proc = fake
+    group = root / "bench"
+    cg = CgroupConstraint(name="bench", ram_limit_gb=8, root=str(root), proc_root=str(proc))
+    cg.setup()
+    write(str(group / "memory.events"), "low 0\nhigh 5\nmax 1\noom 0\noom_kill 0\n")
+    cg._events_start = cg.read_events()  # As if the kernel had counted before setup
+
+    write(str(group / "memory.current"), f"{3 * GB}\n")
+    write(str(group / "memory.stat"), f"anon {2 * GB}\nfile {GB}\nkernel 4096\npgmajfault 7\n")
+    write(str(group / "memory.events"), "low 0\nhigh 9\nmax 3\noom 0\noom_kill 0\n")
+    sample = cg.sample()
+    assert sample["stat"] == {"anon": 2 * GB, "file": GB, "kernel": 4096, "pgmajfault": 7}
+    assert cg.row(sample) == [3.0, 2.0, 1.0, 4, 2, 0, 0, None, None]
+    assert cg.row(None) == [None] * 9
+
+    summary = cg.summary()
+    assert summary["peak_gb"] == 3.0
+    assert summary["limit_hit"]
+    assert summary["limit_hit_at"] == sample["timestamp"]
+
+
+def test_teardown_moves_pids_back_and_removes_group(fake):
+    root, proc = fake
+    cg = CgroupConstraint(name="bench", ram_limit_gb=8, root=str(root), proc_root=str(proc))
+    cg.setup()
+    cg.add_pid(4242)
+    cg.teardown()
+    assert read(str(root / "user.slice" / "cgroup.procs")) == "4242"
+    assert not os.path.exists(root / "bench")
+    assert not cg.active
+
+
+def test_spawn_joins_in_the_child_and_records_origin_in_the_parent(fake):
+    root, proc = fake
+    write(str(proc / str(os.getpid()) / "cgroup"), "0::/user.slice\n")
+    cg = CgroupConstraint(name="bench", ram_limit_gb=8, root=str(root), proc_root=str(proc))
+    cg.setup()
+    child = cg.spawn([sys.executable, "-c", "pass"])
+    assert child.wait(timeout=30) == 0
+    assert read(str(root / "bench" / "cgroup.procs")) == str(child.pid)
+    assert cg._origin == {child.pid: "/user.slice"}
+
+
+def test_joined_group_limits_are_restored(fake):
+    root, proc = fake
+    write(str(root / "shared" / "memory.max"), "max\n")
+    write(str(root / "shared" / "memory.high"), f"{4 * GB}\n")
+    cg = CgroupConstraint(path="/shared", ram_limit_gb=2, high_gb=1, root=str(root), proc_root=str(proc))
+    cg.setup()
+    assert cg.joined and not cg.created
+    assert read(str(root / "shared" / "memory.max")) == str(2 * GB)
+    cg.teardown()
+    assert read(str(root / "shared" / "memory.max")) == "max"
+    assert read(str(root / "shared" / "memory.high")) == str(4 * GB)
+    assert os.path.isdir(root / "shared")
+
+
+def test_from_config():
+    assert from_config({"pressure": {}}) is None
+    cg = from_config({"pressure": {"enforce": True, "cgroup_root": "/tmp/x"},
+                      "test": {"ram_limit": 16, "swap_limit": 0}})
+    assert (cg.ram_limit_gb, cg.swap_limit_gb, cg.path) == (16, 0, "/tmp/x/aidaptiv-bench")
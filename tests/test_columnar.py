@@ -0,0 +1,76 @@
+"""Segmented Parquet / Arrow logs: round trip, projection and a crashed run's tail."""
+import csv
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from backend.columnar import (ColumnarWriter, find_segments, read_columnar, read_rows, strip_base,
+                              write_table)
+
+COLUMNS = ["elapsed_sec", "ram_used_gb", "context_len"]
+TYPES = {"context_len": "int64"}
+
+
+def rows(n, start=0):
+    return [[float(i), 10.0 + i / 10, 1024 * (i + 1)] for i in range(start, start + n)]
+
+
+def write_csv(path, data):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(data)
+
+
+def test_strip_base():
+    assert strip_base("results/x/metrics_baseline.csv") == "results/x/metrics_baseline"
+    assert strip_base("results/x/metrics_baseline-0003.parquet") == "results/x/metrics_baseline"
+    assert strip_base("results/x/metrics_baseline") == "results/x/metrics_baseline"
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_round_trip_typed_and_projected(tmp_path, fmt):
+    base = str(tmp_path / "metrics_baseline.csv")
+    write_table(base, COLUMNS, rows(5), types=TYPES, fmt=fmt)
+    assert [os.path.basename(p) for p in find_segments(base)] == [f"metrics_baseline-0000.{fmt}"]
+    df = read_columnar(base)
+    assert list(df.columns) == COLUMNS
+    assert df["context_len"].dtype == "int64"
+    assert df["context_len"].tolist() == [1024, 2048, 3072, 4096, 5120]
+    assert list(read_columnar(base, columns=["ram_used_gb"]).columns) == ["ram_used_gb"]
+
+
+def test_segments_and_row_ranges(tmp_path):
+    base = str(tmp_path / "metrics_baseline")
+    writer = ColumnarWriter(base, COLUMNS, types=TYPES, row_group_rows=2, segment_sec=0)
+    writer.write_rows(rows(5))
+    writer.close()
+    assert len(find_segments(base)) == 3  # 2 + 2 + 1 rows, each segment closed on flush
+    assert writer.rows_written == 5
+    assert read_columnar(base)["elapsed_sec"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    window = read_rows(base, 1, 3, columns=["elapsed_sec"])
+    assert window["elapsed_sec"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_crashed_run_tail_comes_from_csv(tmp_path):
+    base = str(tmp_path / "metrics_baseline")
+    data = rows(6)
+    write_csv(f"{base}.csv", data)
+    writer = ColumnarWriter(base, COLUMNS, types=TYPES, row_group_rows=2, segment_sec=0)
+    writer.write_rows(data[:4])  # Two closed segments
+    writer.segment_sec = float("inf")
+    writer.write_rows(data[4:])  # Written into a segment that never gets its footer
+    assert len(find_segments(base)) == 3
+
+    df = read_columnar(base, columns=["elapsed_sec", "context_len"])
+    assert df["elapsed_sec"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert df["context_len"].tolist()[-1] == 6144
+    writer.close()
+
+
+def test_csv_only(tmp_path):
+    base = str(tmp_path / "metrics_baseline")
+    write_csv(f"{base}.csv", rows(3))
+    assert read_columnar(f"{base}.csv", columns=["context_len"])["context_len"].tolist() == [1024, 2048, 3072]
@@ -0,0 +1,38 @@
+"""Report endpoints: which stage log a run's CSV request resolves to."""
+import pytest
+
+fastapi = pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient  # noqa: E402
+
+import dashboard  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return TestClient(dashboard.app)
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_all_stages_skips_hires_logs(tmp_path, client):
+    run = tmp_path / "results/run1"
+    write(run / "metrics_aidaptiv_hires.csv", "t,hires\n1,2\n")
+    write(run / "metrics_aidaptiv_hires_events.csv", "t,kind\n1,x\n")
+    write(run / "metrics_aidaptiv.csv", "elapsed_sec,ram_used_gb\n0.0,1.5\n")
+    out = client.get("/api/reports/run1/csv").json()
+    assert out["csv"].startswith("elapsed_sec,ram_used_gb")
+
+
+def test_all_stages_prefers_baseline(tmp_path, client):
+    run = tmp_path / "results/run1"
+    write(run / "requests_aidaptiv.csv", "request_id\n2\n")
+    write(run / "requests_baseline.csv", "request_id\n1\n")
+    assert client.get("/api/reports/run1/csv?log_type=requests").json()["csv"] == "request_id\n1\n"
+
+
+def test_missing_run(client):
+    assert client.get("/api/reports/nope/csv").json()["error"] == "File not found"
@@ -0,0 +1,115 @@
+"""iostat-style device figures, server I/O attribution and block device discovery."""
+import os
+
+import pytest
+
+from backend.diskstats import AwaitWindow, interval_stats, server_io_stats, summarize_device
+from backend.procfs import list_block_devices
+from backend.proctrack import ProcessTracker, read_proc_io
+
+
+def stat(**kw):
+    base = {"read_ios": 0, "write_ios": 0, "read_sectors": 0, "write_sectors": 0,
+            "read_ticks": 0, "write_ticks": 0, "in_flight": 0, "io_ticks": 0, "time_in_queue": 0}
+    base.update(kw)
+    return base
+
+
+def test_interval_stats():
+    prev = stat()
+    cur = stat(read_ios=300, write_ios=100, read_sectors=2400, write_sectors=800,
+               read_ticks=600, write_ticks=400, in_flight=3, io_ticks=500, time_in_queue=2000)
+    out = interval_stats(prev, cur, 2.0)
+    assert (out["read_iops"], out["write_iops"]) == (150.0, 50.0)
+    assert out["avg_req_kb"] == pytest.approx(4.0)
+    assert (out["read_await_ms"], out["write_await_ms"], out["await_ms"]) == (2.0, 4.0, 2.5)
+    assert out["queue_depth"] == 1.0
+    assert out["util_pct"] == 25.0
+    assert out["in_flight"] == 3
+
+
+def test_interval_stats_idle_and_missing_fields():
+    out = interval_stats(stat(), {"read_ios": 0, "write_ios": 0}, 1.0)
+    assert out["await_ms"] is None and out["avg_req_kb"] is None
+    assert out["queue_depth"] is None and out["util_pct"] is None
+    assert interval_stats({}, stat(), 1.0)["read_iops"] == 0.0
+
+
+def test_server_io_capped_at_device():
+    mb = 1024 ** 2
+    prev = {"read_bytes": 0, "write_bytes": 0, "syscr": 0, "syscw": 0}
+    cur = {"read_bytes": 40 * mb, "write_bytes": 2 * mb, "syscr": 100, "syscw": 10}
+    out = server_io_stats(prev, cur, 2.0, t3_read_mb_s=15.0, t3_write_mb_s=3.0)
+    assert (out["proc_read_mb_s"], out["proc_write_mb_s"]) == (20.0, 1.0)
+    assert (out["proc_syscr_s"], out["proc_syscw_s"]) == (50.0, 5.0)
+    # The process tree read more than the device did (other disks / page cache): capped
+    assert (out["t3_server_read_mb_s"], out["t3_noise_read_mb_s"]) == (15.0, 0.0)
+    assert (out["t3_server_write_mb_s"], out["t3_noise_write_mb_s"]) == (1.0, 2.0)
+    assert set(server_io_stats(None, cur, 1.0, 1.0, 1.0).values()) == {None}
+
+
+def test_await_window_p95_of_interval_averages():
+    window = AwaitWindow(size=20)
+    assert window.p95() is None
+    for v in list(range(1, 20)) + [None, 100]:
+        window.add(v)
+    assert window.p95() == 100
+    window.add(1)  # Oldest value (1) drops out
+    assert window.p95() == 100
+
+
+def test_list_block_devices_skips_virtual_and_stacked(tmp_path):
+    block = tmp_path / "sys/block"
+    for name in ("nvme0n1", "sda", "loop0", "zram0", "dm-0", "md0", "ram0", "bcache0"):
+        os.makedirs(block / name / "slaves")
+    (block / "bcache0/slaves/sda").touch()  # Stacked on sda
+    assert list_block_devices(str(tmp_path)) == ["nvme0n1", "sda"]
+    assert list_block_devices(str(tmp_path / "missing")) == []
+
+
+def timeline(t, read_mb, proc_read_mb=None, ctx=0):
+    mb = 1024 ** 2
+    s = {"timestamp": float(t), "read_bytes": read_mb * mb, "write_bytes": 0, "context_len": ctx}
+    if proc_read_mb is not None:
+        s.update(proc_read_bytes=proc_read_mb * mb, proc_write_bytes=0)
+    return s
+
+
+def test_summarize_device_splits_server_and_noise():
+    samples = [timeline(0, 0, 0, ctx=4096), timeline(1, 100, 80, ctx=4096),
+               timeline(2, 150, 200, ctx=8192),  # Process read more than the device: capped at 50
+               timeline(3, 160, 200, ctx=8192)]
+    out = summarize_device(samples, "nvme0n1")
+    overall = out["overall"]
+    assert (overall["read_mb"], overall["server_read_mb"], overall["noise_read_mb"]) == (160.0, 130.0, 30.0)
+    assert out["by_context"]["4096"]["server_read_mb"] == 80.0
+    assert out["by_context"]["8192"]["noise_read_mb"] == 10.0
+
+
+def test_summarize_device_without_process_io():
+    out = summarize_device([timeline(0, 0), timeline(1, 10)], "sda")
+    assert out["overall"]["read_mb"] == 10.0
+    assert out["overall"]["server_read_mb"] is None and out["overall"]["noise_read_mb"] is None
+
+
+def test_read_proc_io(tmp_path):
+    os.makedirs(tmp_path / "42")
+    (tmp_path / "42/io").write_text("rchar: 1\nwchar: 2\nsyscr: 3\nsyscw: 4\nread_bytes: 4096\n"
+                                    "write_bytes: 8192\ncancelled_write_bytes: 0\n")
+    assert read_proc_io(42, str(tmp_path)) == {"syscr": 3, "syscw": 4, "read_bytes": 4096, "write_bytes": 8192}
+    assert read_proc_io(43, str(tmp_path)) is None
+
+
+def io(read_bytes):
+    return {"read_bytes": read_bytes, "write_bytes": 0, "syscr": 0, "syscw": 0}
+
+
+def test_tree_io_keeps_exited_workers_bytes():
+    tracker = ProcessTracker(pid=os.getpid())
+    tracker._add_io(1, io(100))  # First sight of a process: baseline only
+    tracker._add_io(2, io(50))
+    tracker._add_io(1, io(300))
+    tracker._add_io(2, io(80))
+    tracker._io_last.pop(2)  # Worker 2 exited
+    tracker._add_io(1, io(350))
+    assert tracker._io_total["read_bytes"] == 200 + 30 + 50
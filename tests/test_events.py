@@ -0,0 +1,87 @@
+"""Typed sweep event log: buffering, flushing, unknown kinds and metrics-log windows."""
+import csv
+
+from backend.clock import RunClock
+from backend.events import EventLog, event_log_path, read_events, read_window
+
+
+class FakeClock(RunClock):
+    def __init__(self):
+        super().__init__()
+        self.ns = self.anchor_mono_ns
+
+    def now_ns(self):
+        return self.ns
+
+
+def lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_event_log_path():
+    assert event_log_path("results/x/metrics_baseline.csv") == "results/x/events_baseline.jsonl"
+    assert event_log_path("results/x/metrics_aidaptiv-0002.parquet") == "results/x/events_aidaptiv.jsonl"
+
+
+def test_buffered_until_due_then_flushed_by_timer(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    clock = FakeClock()
+    log = EventLog(path, clock=clock, flush_sec=1.0)
+    log.emit("stage_start", stage="baseline")
+    assert lines(path) == []
+    log.flush_if_due()  # Not due yet
+    assert lines(path) == []
+    clock.ns += int(1.5e9)  # No further emit: the periodic flush writes it
+    log.flush_if_due()
+    assert [e["kind"] for e in read_events(path)] == ["stage_start"]
+    log.close()
+
+
+def test_emit_flushes_when_buffer_full(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    log = EventLog(path, clock=FakeClock(), max_buffered=3)
+    for i in range(3):
+        log.emit("request_start", request=i)
+    assert len(lines(path)) == 3
+    log.close()
+
+
+def test_unknown_kind_is_dropped_once_reported(tmp_path, capsys):
+    path = str(tmp_path / "events.jsonl")
+    log = EventLog(path, clock=FakeClock())
+    assert log.emit("not_a_kind", x=1) is None
+    assert log.emit("not_a_kind", x=2) is None
+    assert capsys.readouterr().out.count("not_a_kind") == 1
+    log.emit("status", message="ok")
+    log.close()
+    assert [e["kind"] for e in read_events(path)] == ["status"]
+    assert log.count == 1
+
+
+def test_position_recorded_and_window_read_by_offset(tmp_path):
+    metrics = str(tmp_path / "metrics_baseline.csv")
+    with open(metrics, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["elapsed_sec", "ram_used_gb"])
+        offsets = []
+        for i in range(5):
+            f.flush()
+            offsets.append(f.tell())
+            writer.writerow([float(i), 1.0 + i])
+    path = event_log_path(metrics)
+    log = EventLog(path, clock=FakeClock(), position=lambda: {"row": 2, "offset": offsets[2]})
+    log.emit("thrash_start")
+    log.close()
+
+    event, = read_events(path, kinds=["thrash_start"])
+    assert (event["row"], event["offset"]) == (2, offsets[2])
+    window = read_window(metrics, event, rows=2)
+    assert window["elapsed_sec"].tolist() == [2.0, 3.0]
+
+
+def test_truncated_last_line_skipped(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    with open(path, "w") as f:
+        f.write('{"kind": "status", "mono_ns": 1}\n{"kind": "sta')
+    assert [e["kind"] for e in read_events(path)] == ["status"]
@@ -0,0 +1,76 @@
+"""In-flight request table under concurrent streaming workers."""
+import threading
+
+from backend.clock import RunClock
+from backend.inflight import InflightTable
+
+
+class FakeClock(RunClock):
+    def __init__(self):
+        super().__init__()
+        self.ns = 0
+
+    def now_ns(self):
+        return self.ns
+
+
+def test_phases_rate_and_oldest():
+    clock = FakeClock()
+    table = InflightTable(clock)
+    assert table.aggregate()["live_tok_s"] is None  # No previous call yet
+
+    a = table.begin("a", 4096)
+    clock.ns = int(0.5e9)
+    b = table.begin("b", 8192)
+    clock.ns = int(1e9)
+    table.first_token(a)
+    for _ in range(10):
+        table.token(a)
+    agg = table.aggregate()
+    assert (agg["inflight_reqs"], agg["inflight_prefill"], agg["inflight_decode"]) == (2, 1, 1)
+    assert agg["live_tok_s"] == 10.0  # 10 tokens over the 1 s since the first call
+    assert agg["oldest_req_ms"] == 1000.0
+    assert [r["request"] for r in agg["requests"]] == ["a", "b"]
+    assert agg["requests"][0]["ttft_ms"] == 1000.0 and agg["requests"][1]["ttft_ms"] is None
+
+    table.end(a)
+    table.end(a)  # Retiring twice must not count its tokens twice
+    clock.ns = int(2e9)
+    agg = table.aggregate()
+    assert agg["inflight_reqs"] == 1 and agg["tokens_total"] == 10
+    assert agg["live_tok_s"] == 0.0  # Retired tokens stay in the total: no negative rate
+    assert agg["oldest_req_ms"] == 1500.0
+    table.end(b)
+    assert table.aggregate()["oldest_req_ms"] is None
+
+
+def test_concurrent_workers_account_every_token():
+    table = InflightTable()
+    workers, tokens = 16, 500
+    start = threading.Barrier(workers + 1)
+    snapshots = []
+
+    def worker(i):
+        start.wait()
+        slot = table.begin(i, 1024)
+        table.first_token(slot)
+        for _ in range(tokens):
+            table.token(slot)
+        table.end(slot)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for t in threads:
+        t.start()
+    start.wait()
+    while any(t.is_alive() for t in threads):
+        snapshots.append(table.aggregate())
+    for t in threads:
+        t.join()
+
+    final = table.aggregate()
+    assert final["inflight_reqs"] == 0
+    assert final["tokens_total"] == workers * tokens
+    # Totals seen while workers ran never go backwards (a slot's tokens move to retired atomically)
+    totals = [s["tokens_total"] for s in snapshots] + [final["tokens_total"]]
+    assert totals == sorted(totals)
+    assert all(s["inflight_reqs"] <= workers for s in snapshots)
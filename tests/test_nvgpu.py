@@ -0,0 +1,157 @@
+"""Per-device NVML telemetry against a fake pynvml."""
+from types import SimpleNamespace
+
+import pytest
+
+from backend import nvgpu
+from backend.gpu_samplers import GpuSampler, gpu_name, summarize
+from backend.nvgpu import GB, NvmlDevices, device_columns
+from backend.sampling import SamplerEngine
+
+
+class NVMLError(Exception):
+    pass
+
+
+class NVMLError_NotFound(NVMLError):
+    pass
+
+
+class FakeNvml:
+    """Two GPUs; device 0 keeps a utilisation sample buffer, device 1 has none."""
+
+    NVMLError = NVMLError
+    NVMLError_NotFound = NVMLError_NotFound
+    NVML_GPU_UTILIZATION_SAMPLES = 1
+    NVML_TEMPERATURE_GPU = 0
+    NVML_PCIE_UTIL_TX_BYTES = 0
+    NVML_PCIE_UTIL_RX_BYTES = 1
+
+    def __init__(self):
+        self.inits = 0
+        self.shutdowns = 0
+        self.buffer = [(1000, 80), (2000, 100)]
+
+    def nvmlInit(self):
+        self.inits += 1
+
+    def nvmlShutdown(self):
+        self.shutdowns += 1
+
+    def nvmlDeviceGetCount(self):
+        return 2
+
+    def nvmlDeviceGetHandleByIndex(self, i):
+        return i
+
+    def nvmlDeviceGetName(self, handle):
+        return b"NVIDIA H100 80GB HBM3"
+
+    def nvmlDeviceGetMemoryInfo(self, handle):
+        return SimpleNamespace(used=(handle + 1) * 10 * GB, total=80 * GB)
+
+    def nvmlDeviceGetUtilizationRates(self, handle):
+        return SimpleNamespace(gpu=50, memory=20 + handle)
+
+    def nvmlDeviceGetSamples(self, handle, kind, last_ts):
+        if handle == 1:
+            raise NVMLError("Not Supported")
+        samples = [SimpleNamespace(timeStamp=ts, sampleValue=SimpleNamespace(uiVal=v))
+                   for ts, v in self.buffer if ts > last_ts]
+        if not samples:
+            raise NVMLError_NotFound()
+        return kind, samples
+
+    def nvmlDeviceGetPowerUsage(self, handle):
+        if handle == 1:
+            raise NVMLError("Not Supported")
+        return 250000  # mW
+
+    def nvmlDeviceGetTemperature(self, handle, sensor):
+        return 60 + handle
+
+    def nvmlDeviceGetPcieThroughput(self, handle, counter):
+        return 2048 if counter == self.NVML_PCIE_UTIL_TX_BYTES else 1024  # KB/s
+
+
+@pytest.fixture
+def fake_nvml(monkeypatch):
+    fake = FakeNvml()
+    monkeypatch.setattr(nvgpu, "pynvml", fake, raising=False)
+    monkeypatch.setattr(nvgpu, "HAS_NVML", True)
+    monkeypatch.setattr(nvgpu, "_nvml_users", 0)
+    return fake
+
+
+def test_device_columns():
+    assert device_columns(2, ["power_w", "temp_c"]) == ["gpu0_power_w", "gpu0_temp_c",
+                                                        "gpu1_power_w", "gpu1_temp_c"]
+
+
+def test_nvml_is_shared_and_shut_down_once(fake_nvml):
+    a, b = NvmlDevices(), NvmlDevices()
+    assert (a.ok, b.ok, fake_nvml.inits) == (True, True, 1)
+    a.close()
+    a.close()  # Idempotent: does not drop b's reference
+    assert fake_nvml.shutdowns == 0
+    b.close()
+    assert fake_nvml.shutdowns == 1
+
+
+def test_sample_per_device(fake_nvml):
+    devices = NvmlDevices()
+    try:
+        assert devices.names == ["NVIDIA H100 80GB HBM3"] * 2
+        first, second = devices.sample()
+        assert first["vram_used_gb"] == 10.0 and second["vram_used_gb"] == 20.0
+        assert first["util_pct"] == 90.0  # Mean of the buffered samples, not the instantaneous 50
+        assert second["util_pct"] == 50   # No buffer: instantaneous rate
+        assert second["mem_util_pct"] == 21
+        assert (first["power_w"], second["power_w"]) == (250.0, None)
+        assert (first["pcie_tx_mb_s"], first["pcie_rx_mb_s"]) == (2.0, 1.0)
+        assert devices.power_w() == 250.0
+
+        # Nothing buffered since the last read: the instantaneous rate
+        assert devices.sample()[0]["util_pct"] == 50
+        fake_nvml.buffer.append((3000, 10))
+        assert devices.sample()[0]["util_pct"] == 10.0
+    finally:
+        devices.close()
+
+
+def test_gpu_sampler_sums_devices(fake_nvml):
+    sampler = GpuSampler()
+    try:
+        assert sampler.name == "2x NVIDIA H100 80GB HBM3"
+        assert sampler.columns[:2] == ["gpu0_vram_used_gb", "gpu0_vram_total_gb"]
+        out = sampler.sample()
+        assert (out["vram_used"], out["vram_total"]) == (30.0, 160.0)
+        assert out["util"] == 70.0
+        assert out["temp_c"] == 61
+        assert out["power_w"] == 250.0
+        assert len(sampler.row(out)) == len(sampler.columns)
+    finally:
+        sampler.close()
+    assert fake_nvml.shutdowns == 1
+
+
+def test_summarize_skips_missing_values():
+    out = summarize([{"vram_used_gb": 1.0, "util_pct": None}, {"vram_used_gb": 2.0, "gtt_used_gb": 4.0}])
+    assert out["vram_used"] == 3.0
+    assert out["util"] is None and out["power_w"] is None
+    assert out["gtt_used"] == 4.0
+
+
+def test_gpu_sampler_runs_on_io_thread(fake_nvml):
+    engine = SamplerEngine("test")
+    engine.add("gpu", GpuSampler(), 1.0)
+    try:
+        assert engine._io_sched.get("gpu") is not None
+        assert engine._sched.get("gpu") is None
+    finally:
+        engine.stop()
+
+
+def test_gpu_name_groups_devices_by_model():
+    assert gpu_name(SimpleNamespace(names=["A100", "H100", "A100"])) == "2x A100 + H100"
+    assert gpu_name(SimpleNamespace(names=["H100"])) == "H100"
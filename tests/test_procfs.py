@@ -0,0 +1,96 @@
+"""preadv-based /proc and /sys parsing on a recorded tree (tests/fixtures/procfs)."""
+import pytest
+
+from backend.procfs import ProcfsSampler, _find_int, _PreadFile, list_block_devices
+
+KB = 1024
+
+
+@pytest.fixture
+def root(fixture_path):
+    return fixture_path("procfs")
+
+
+@pytest.fixture
+def sampler(root):
+    s = ProcfsSampler(root=root, devices=list_block_devices(root) + ["nvme0n1p2"])
+    yield s
+    s.close()
+
+
+def test_find_int_first_and_later_lines():
+    buf = bytearray(b"pgmajfault 4321\npswpin 7\nempty \n")
+    end = len(buf)
+    assert _find_int(buf, b"\npgmajfault ", end) == 4321  # No newline before the first line
+    assert _find_int(buf, b"\npswpin ", end) == 7
+    assert _find_int(buf, b"\nempty ", end) is None
+    assert _find_int(buf, b"\nmissing ", end) is None
+    assert _find_int(buf, b"\npswpin ", 10) is None  # Beyond the bytes read
+
+
+def test_devices(root, sampler):
+    assert list_block_devices(root) == ["nvme0n1"]  # loop0 is virtual
+    assert sampler.devices == ["nvme0n1", "nvme0n1p2"]  # Partitions from /sys/class/block
+
+
+def test_meminfo_and_vmstat(sampler):
+    mem = sampler.read_meminfo()
+    assert mem["MemTotal"] == 131072000 * KB
+    assert mem["SwapFree"] == 12582912 * KB
+    vm = sampler.read_vmstat()
+    assert vm == {"pgmajfault": 4321, "pswpin": 1000, "pswpout": 2500}
+
+
+def test_read_memory(sampler):
+    out = sampler.read_memory()
+    # total - free - buffers - (cached + SReclaimable)
+    assert out["ram_used"] == (131072000 - 8192000 - 512000 - 40960000 - 2048000) * KB
+    assert out["ram_available"] == 65536000 * KB
+    assert out["swap_used"] == (16777216 - 12582912) * KB
+    assert out["swap_in_bytes"] == 1000 * sampler.page_size
+
+
+def test_cpu_pct_from_stat(sampler):
+    assert sampler.read_cpu_pct() is None  # First call only sets the baseline
+    assert sampler.read_cpu_pct() == 0.0
+
+
+def test_disk_stat(sampler):
+    disk = sampler.read_disk("nvme0n1")
+    assert (disk["read_ios"], disk["write_ios"], disk["in_flight"]) == (12000, 3000, 2)
+    assert (disk["io_ticks"], disk["time_in_queue"]) == (7000, 12000)
+    assert disk["read_bytes"] == 960000 * 512
+    assert sampler.read_disk("nvme0n1p2")["write_sectors"] == 800
+    assert sampler.read_disk("sdz") is None
+
+
+def test_read_fast_matches_read_memory(sampler):
+    mem = sampler.read_memory()
+    ram, swap, majflt, swpin, swpout, rd, wr = sampler.read_fast("nvme0n1")
+    assert (ram, swap, majflt) == (mem["ram_used"], mem["swap_used"], 4321)
+    assert (swpin, swpout) == (mem["swap_in_bytes"], mem["swap_out_bytes"])
+    assert (rd, wr) == (960000 * 512, 240000 * 512)
+
+
+def test_buffer_grows_for_large_files(root):
+    f = _PreadFile(f"{root}/proc/vmstat", 16)
+    try:
+        n = f.read()
+        assert len(f.buf) > n  # Grown until the whole file fit
+        assert bytes(f.buf[:n]).endswith(b"pgfault 99999999\n")
+    finally:
+        f.close()
+
+
+def test_read_fast_after_buffer_growth(root):
+    s = ProcfsSampler(root=root, devices=["nvme0n1"])
+    try:
+        s._meminfo.close()
+        s._block["nvme0n1"].close()
+        s._meminfo = _PreadFile(f"{root}/proc/meminfo", 32)
+        s._block["nvme0n1"] = _PreadFile(f"{root}/sys/block/nvme0n1/stat", 16)
+        ram, *_, rd, wr = s.read_fast("nvme0n1")
+        assert ram == s.read_memory()["ram_used"]
+        assert (rd, wr) == (960000 * 512, 240000 * 512)
+    finally:
+        s.close()
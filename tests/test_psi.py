@@ -0,0 +1,54 @@
+"""PSI parsing, per-interval stall % and the thrash detector."""
+from backend.psi import PsiSampler, ThrashDetector, parse_psi, stall_pct
+
+MEMORY = """\
+some avg10=1.50 avg60=0.80 avg300=0.20 total=1000000
+full avg10=0.25 avg60=0.10 avg300=0.00 total=200000
+"""
+
+
+def test_parse_psi():
+    assert parse_psi(MEMORY) == {"some_avg10": 1.5, "some_total": 1000000,
+                                 "full_avg10": 0.25, "full_total": 200000}
+    # /proc/pressure/cpu has no "full" line on older kernels
+    assert parse_psi("some avg10=0.00 avg60=0.00 avg300=0.00 total=5\n") == {"some_avg10": 0.0, "some_total": 5}
+    assert parse_psi("") == {}
+
+
+def test_stall_pct():
+    prev = {"mono": 10.0, "memory": {"some_total": 1000000, "full_total": 200000}, "io": {}}
+    cur = {"mono": 12.0, "memory": {"some_total": 1500000, "full_total": 200000}, "io": {}}
+    assert stall_pct(prev, cur) == {"memory_some_pct": 25.0, "memory_full_pct": 0.0,
+                                    "io_some_pct": None, "io_full_pct": None}
+
+
+def test_stall_pct_without_interval():
+    snap = {"mono": 10.0, "memory": {"some_total": 1}}
+    assert set(stall_pct(None, snap).values()) == {None}
+    assert set(stall_pct(snap, snap).values()) == {None}
+    # Counter reset (group recreated) and stalls longer than the interval are clamped
+    later = {"mono": 11.0, "memory": {"some_total": 0, "full_total": 5000000}}
+    pct = stall_pct({"mono": 10.0, "memory": {"some_total": 9, "full_total": 0}}, later)
+    assert (pct["memory_some_pct"], pct["memory_full_pct"]) == (0.0, 100.0)
+
+
+def test_sampler_reads_cgroup_pressure(tmp_path):
+    (tmp_path / "memory.pressure").write_text(MEMORY)
+    psi = PsiSampler(cgroup_path=str(tmp_path))
+    assert psi.available and list(psi.paths) == ["memory"]
+    assert psi.read()["memory"]["some_total"] == 1000000
+    assert not PsiSampler(root=str(tmp_path / "missing")).available
+
+
+def test_thrash_detector():
+    det = ThrashDetector(threshold_pct=10.0, min_sec=1.0)
+    assert det.update(0.0, 12.0, context_len=4096) is None
+    assert det.update(0.5, 3.0) is None           # Dip resets the onset
+    assert det.update(1.0, 15.0, context_len=8192) is None
+    assert det.update(2.0, 20.0, context_len=8192) == "thrash_start"
+    assert det.update(3.0, None) is None
+    assert det.update(4.0, 6.0) is None           # Above half the threshold: still thrashing
+    assert det.update(5.0, 4.0) == "thrash_end"
+    summary = det.summary()
+    assert (summary["onset_context"], summary["onset_timestamp"]) == (8192, 1.0)
+    assert [e["event"] for e in summary["events"]] == ["thrash_start", "thrash_end"]
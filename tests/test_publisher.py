@@ -0,0 +1,107 @@
+"""Batching, lossy dashboard publisher against a recording session."""
+import pytest
+
+from backend.publisher import DashboardPublisher
+
+
+class FakeResponse:
+    def __init__(self, ack):
+        self.ack = ack
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.ack
+
+
+class FakeSession:
+    """Records payloads; acks with the result count it holds (or fails while `down`)."""
+
+    def __init__(self):
+        self.payloads = []
+        self.held = {}
+        self.down = False
+
+    def post(self, url, json, timeout):
+        if self.down:
+            raise ConnectionError("dashboard down")
+        self.payloads.append(json)
+        if json["results_full"]:
+            self.held = dict(json["results"])
+        else:
+            self.held.update(json["results"])
+        return FakeResponse({"results_count": len(self.held)})
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def publisher():
+    pub = DashboardPublisher("http://dash:8080/", max_queue=4, batch_size=3)
+    pub._session = FakeSession()
+    return pub
+
+
+def sample(i, results=None):
+    s = {"timestamp": i}
+    if results is not None:
+        s["test_progress"] = {"stage": "baseline", "results": results}
+    return s
+
+
+def test_full_queue_drops_oldest(publisher):
+    for i in range(6):
+        publisher.publish(sample(i))
+    assert publisher.stats()["dropped_samples"] == 2
+    assert [s["timestamp"] for s in publisher._take_batch()] == [2, 3, 4]
+
+
+def test_batches_and_results_deltas(publisher):
+    session = publisher._session
+    assert publisher.url == "http://dash:8080/update_batch"
+    publisher._send([sample(0, {"4096": 1.0}), sample(1, {"4096": 1.0, "8192": 2.0})])
+    first = session.payloads[-1]
+    assert first["results_full"] and first["results"] == {"4096": 1.0, "8192": 2.0}
+    # Results travel once per batch, not inside every sample
+    assert all("results" not in s["test_progress"] for s in first["samples"])
+
+    publisher._send([sample(2, {"4096": 1.0, "8192": 2.5})])
+    assert session.payloads[-1]["results"] == {"8192": 2.5}
+    assert not session.payloads[-1]["results_full"]
+    assert publisher.stats()["sent_samples"] == 3
+
+
+def test_failure_drops_batch_and_resyncs(publisher):
+    session = publisher._session
+    publisher._send([sample(0, {"4096": 1.0})])
+    session.down = True
+    publisher._send([sample(1, {"4096": 1.0, "8192": 2.0})])
+    stats = publisher.stats()
+    assert (stats["failed_batches"], stats["dropped_samples"]) == (1, 1)
+    assert "dashboard down" in stats["last_error"]
+    session.down = False
+    publisher._send([sample(2, {"4096": 1.0, "8192": 2.0})])
+    assert session.payloads[-1]["results_full"]  # Full resync after a failure
+
+
+def test_resync_when_dashboard_lost_results(publisher):
+    session = publisher._session
+    publisher._send([sample(0, {"4096": 1.0})])
+    session.held = {}  # Dashboard restarted
+    publisher._send([sample(1, {"4096": 1.0, "8192": 2.0})])
+    assert not session.payloads[-1]["results_full"]  # The ack reveals the mismatch ...
+    publisher._send([sample(2, {"4096": 1.0, "8192": 2.0})])
+    assert session.payloads[-1]["results_full"]  # ... and the next batch resends everything
+
+
+def test_thread_sends_queue_and_stop_flushes(publisher):
+    publisher.flush_interval_sec = 0.01
+    publisher.start()
+    for i in range(7):
+        publisher.publish(sample(i))
+    publisher.stop(flush=True)
+    sent = [s["timestamp"] for p in publisher._session.payloads for s in p["samples"]]
+    assert sent == sorted(sent) and len(sent) + publisher.dropped_samples == 7
+    assert publisher.stats()["queued"] == 0
@@ -0,0 +1,117 @@
+"""Sampler engine: cost accounting, adaptive back-off, focus phases and calibration."""
+from types import SimpleNamespace
+
+import pytest
+
+from backend import calibrate as calibrate_mod
+from backend import sampling
+from backend.sampling import Sampler, SamplerEngine
+
+
+class Counter(Sampler):
+    def __init__(self):
+        self.n = 0
+
+    def sample(self):
+        self.n += 1
+        return {"n": self.n} if self.n % 2 else None  # None keeps the previous output
+
+
+@pytest.fixture
+def engine():
+    engine = SamplerEngine("test", adaptive={"enabled": True, "overhead_pct": 2.0, "max_factor": 4,
+                                             "focus_factor": 2.0, "patience": 2})
+    engine.add("a", Counter(), 1.0, budget_ms=10.0)
+    yield engine
+    engine.stop()
+
+
+def pending(engine, name):
+    return engine._tasks[name]._pending_interval
+
+
+def test_run_keeps_latest_and_notifies(engine):
+    seen = []
+    engine.on_sample("a", seen.append)
+    engine._run("a")
+    engine._run("a")  # Returns None: latest and listeners untouched
+    assert engine.latest["a"] == {"n": 1} and seen == [{"n": 1}]
+
+
+def test_backs_off_when_over_budget_and_relaxes(engine):
+    engine._adapt("a", 20.0, 1.0)
+    assert pending(engine, "a") is None  # One expensive run is not a streak
+    engine._adapt("a", 20.0, 1.0)
+    assert (engine._factor["a"], pending(engine, "a")) == (2, 2.0)
+    for _ in range(6):
+        engine._adapt("a", 20.0, 1.0)
+    assert engine._factor["a"] == 4  # Capped at max_factor
+    engine._tasks["a"].interval_sec = 4.0
+
+    engine._adapt("a", 7.0, 1.0)  # Under budget but not under half of it: neutral
+    assert engine._streak["a"] == 0
+    engine._adapt("a", 1.0, 1.0)
+    engine._adapt("a", 1.0, 1.0)
+    assert (engine._factor["a"], pending(engine, "a")) == (2, 2.0)
+
+
+def test_backs_off_on_cpu_share(engine):
+    # 30 ms of CPU per 1 s run is 3 % of a core, over overhead_pct (2 %), though within budget
+    engine._adapt("a", 5.0, 30.0)
+    engine._adapt("a", 5.0, 30.0)
+    assert engine._factor["a"] == 2
+
+
+def test_focus_divides_intervals(engine):
+    engine.focus("prefill")
+    engine._adapt("a", 1.0, 1.0)
+    assert pending(engine, "a") == 0.5
+    engine._tasks["a"].interval_sec = 0.5
+    engine.focus(None)
+    engine._adapt("a", 1.0, 1.0)
+    assert pending(engine, "a") == 1.0
+
+
+def test_overhead_row(engine, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(sampling, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    engine._cpu_ms["a"], engine._cost_ms["a"] = 1.23456, 2.5
+    assert engine.overhead_columns() == ["telemetry_cpu_pct", "sampler_focus", "sampler_a_cpu_ms",
+                                         "sampler_a_wall_ms", "sampler_a_interval_sec"]
+    assert engine.overhead_row() == [None, 0, 1.235, 2.5, 1.0]
+    engine._tasks["a"].cpu_ms += 20.0
+    now[0] += 2.0
+    engine.focus("near_oom")
+    assert engine.overhead_row()[:2] == [1.0, 1]  # 20 ms of CPU over 2 s
+
+
+class FakeTime:
+    """perf_counter advances 1 ms per call, thread_time 0.5 ms."""
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def perf_counter(self):
+        self.wall += 0.001
+        return self.wall
+
+    def thread_time(self):
+        self.cpu += 0.0005
+        return self.cpu
+
+
+def test_calibrate_rates(monkeypatch):
+    def build(collector, engine):
+        engine.add("memory", Counter(), collector.sampler_intervals["memory"])
+    monkeypatch.setattr("telemetry.TelemetryCollector.build_samplers", build)
+    monkeypatch.setattr(calibrate_mod, "time", FakeTime())
+    report = calibrate_mod.calibrate({"sample_interval_sec": 0.5, "adaptive": {"overhead_pct": 2.0}},
+                                     seconds=0.01, warmup=1)
+    r = report["samplers"]["memory"]
+    assert r["thread"] == "fast" and r["runs"] > 0
+    assert r["max_hz"] == pytest.approx(1000.0)    # 1 ms per run
+    assert r["budget_hz"] == pytest.approx(40.0)   # 2 % of a core at 0.5 ms CPU per run
+    assert r["sustainable_hz"] == pytest.approx(40.0)
+    assert r["configured_hz"] == 2.0
+    assert report["threads"]["fast"]["max_common_hz"] == pytest.approx(1000.0)
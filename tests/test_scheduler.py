@@ -0,0 +1,108 @@
+"""Fixed-rate scheduler: absolute deadlines, skipped ticks and re-anchoring."""
+import threading
+import time
+
+import pytest
+
+from backend import scheduler
+from backend.scheduler import FixedRateScheduler, SamplerTask
+
+
+class FakeTime:
+    """Monotonic clock the task under test advances while it "works"."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def thread_time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(scheduler, "time", fake)
+    return fake
+
+
+def run_at(clock, sched, task, start, duration):
+    """Run `task` starting at `start` for `duration` seconds of fake time."""
+    clock.now = start
+    deadline = task.next_deadline
+
+    def work():
+        clock.now += duration
+    task.fn = work
+    sched._run(task, deadline)
+
+
+def test_late_start_does_not_drift(clock):
+    sched = FixedRateScheduler()
+    task = sched.add("t", 1.0, None)
+    run_at(clock, sched, task, 0.0, 0.2)
+    assert task.next_deadline == 1.0
+    run_at(clock, sched, task, 1.3, 0.1)  # Started 300 ms late
+    assert task.last_jitter_ms == pytest.approx(300.0)
+    assert task.next_deadline == 2.0  # Still on the 1 s grid, not 2.3
+    assert (task.missed, task.overruns) == (0, 0)
+
+
+def test_overrun_skips_missed_deadlines(clock):
+    sched = FixedRateScheduler()
+    task = sched.add("t", 1.0, None)
+    run_at(clock, sched, task, 0.0, 2.5)  # Ends at 2.5: deadlines 1 and 2 are gone
+    assert task.next_deadline == 3.0
+    assert (task.missed, task.overruns) == (2, 1)
+    assert task.stats()["missed_ticks"] == 2
+
+
+def test_set_interval_reanchors_on_the_run(clock):
+    sched = FixedRateScheduler()
+    task = sched.add("t", 1.0, None)
+    run_at(clock, sched, task, 0.0, 0.1)
+    task.set_interval(0.25)
+    assert task.interval_sec == 1.0  # Applied at the end of the next run
+    run_at(clock, sched, task, 1.0, 0.1)
+    assert task.interval_sec == 0.25
+    assert task.next_deadline == 1.25  # Anchored at that run's start
+    run_at(clock, sched, task, 1.25, 0.0)
+    assert task.next_deadline == 1.5
+    task.set_interval(0)
+    run_at(clock, sched, task, 1.5, 0.0)
+    assert task.interval_sec == 0.001  # Floor
+
+
+def test_errors_are_counted_not_raised(clock, capsys):
+    sched = FixedRateScheduler("s")
+    task = SamplerTask("bad", 1.0, None, 0)
+
+    def boom():
+        raise RuntimeError("boom")
+    task.fn = boom
+    sched._run(task, 0.0)
+    assert (task.errors, task.runs) == (1, 1)
+    assert "s/bad sampler error: boom" in capsys.readouterr().out
+
+
+def test_threaded_rate_and_order():
+    sched = FixedRateScheduler()
+    calls = []
+    lock = threading.Lock()
+
+    def record(name):
+        def fn():
+            with lock:
+                calls.append(name)
+        return fn
+    sched.add("a", 0.02, record("a"))
+    sched.add("b", 0.02, record("b"))
+    sched.start()
+    time.sleep(0.3)
+    sched.stop()
+    runs = {n: calls.count(n) for n in "ab"}
+    assert 8 <= runs["a"] <= 17 and abs(runs["a"] - runs["b"]) <= 1
+    assert calls[:2] == ["a", "b"]  # Same deadline: add() order
+    assert sched.stats()["a"]["runs"] == runs["a"]
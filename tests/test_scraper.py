@@ -0,0 +1,113 @@
+"""Prometheus text parser and the /metrics scraper, against a stand-in server."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.scraper import PrometheusTextParser, ServerMetricsScraper
+
+VLLM_METRICS = """\
+# HELP vllm:gpu_cache_usage_perc GPU KV-cache usage. 1 means 100 percent usage.
+# TYPE vllm:gpu_cache_usage_perc gauge
+vllm:gpu_cache_usage_perc{model_name="llama"} 0.25
+vllm:gpu_cache_usage_perc{model_name="qwen"} 0.75
+vllm:num_requests_running{model_name="llama"} 3.0
+vllm:num_requests_running{model_name="qwen"} 1.0
+vllm:num_requests_waiting{model_name="llama"} 2.0
+vllm:num_preemptions_total{model_name="llama"} 7.0 1700000000000
+vllm:prompt_tokens_total{model_name="llama"} 123456.0
+"""
+
+SLOTS = [{"id": 0, "is_processing": True}, {"id": 1, "is_processing": False}, {"id": 2, "state": 1}]
+
+
+def test_parser_handles_split_chunks():
+    parser = PrometheusTextParser(["vllm:num_requests_running"])
+    text = VLLM_METRICS.rstrip("\n")  # Last line without a newline
+    samples = []
+    for i in range(0, len(text), 7):
+        samples.extend(parser.feed(text[i:i + 7]))
+    samples.extend(parser.close())
+    assert samples == [("vllm:num_requests_running", {"model_name": "llama"}, 3.0),
+                       ("vllm:num_requests_running", {"model_name": "qwen"}, 1.0)]
+
+
+def test_parser_skips_comments_and_bad_values():
+    parser = PrometheusTextParser()
+    assert list(parser.feed("# TYPE x gauge\nx NaN-ish\nx{a=\"1\"} 2\n")) == [("x", {"a": "1"}, 2.0)]
+
+
+def test_parser_quoted_label_values():
+    line = 'x{path="C:\\\\models\\\\a,b}.gguf",msg="say \\"hi\\"\\nbye", le="+Inf"} 3 1700000000000\n'
+    assert list(PrometheusTextParser().feed(line)) == [
+        ("x", {"path": "C:\\models\\a,b}.gguf", "msg": 'say "hi"\nbye', "le": "+Inf"}, 3.0)]
+    assert list(PrometheusTextParser().feed('x{a="1",} 2\nx{} 4\n')) == [("x", {"a": "1"}, 2.0), ("x", {}, 4.0)]
+
+
+def test_parser_skips_malformed_labels():
+    assert list(PrometheusTextParser().feed('x{a="unterminated} 2\ny{a=1} 3\n')) == []
+
+
+@pytest.fixture
+def server():
+    """Stand-in inference server; set `server.up = False` to fail every request."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if not httpd.up:
+                self.send_error(503)
+                return
+            if self.path == "/metrics":
+                body = VLLM_METRICS.encode()
+            elif self.path == "/slots":
+                body = json.dumps(SLOTS).encode()
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.up = True
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_scrape_sums_labels_and_scales(server):
+    scraper = ServerMetricsScraper(server.url, scrape_slots=True, timeout=2.0)
+    try:
+        scraper.scrape_once()
+        latest = scraper.latest()
+    finally:
+        scraper.stop()
+    assert latest["kv_cache_usage_pct"] == 50.0  # Ratios averaged across models, counts summed
+    assert latest["requests_running"] == 4.0
+    assert latest["requests_waiting"] == 2.0
+    assert latest["preemptions_total"] == 7.0
+    assert (latest["slots_total"], latest["slots_busy"]) == (3.0, 2.0)
+    # Series the server does not export
+    assert latest["requests_swapped"] is None
+    assert scraper.errors == 0
+
+
+def test_failed_scrape_clears_previous_values(server):
+    scraper = ServerMetricsScraper(server.url, timeout=2.0)
+    try:
+        scraper.scrape_once()
+        assert scraper.latest()["requests_running"] == 4.0
+        server.up = False
+        scraper.scrape_once()
+        latest = scraper.latest()
+    finally:
+        scraper.stop()
+    assert scraper.errors == 1
+    assert all(v is None for v in latest.values())
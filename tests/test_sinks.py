@@ -0,0 +1,58 @@
+"""Snapshot sinks: CSV seek offsets, the columnar log and the Prometheus endpoint."""
+import csv
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from backend.sinks import ColumnarSink, CsvSink, PrometheusSink
+
+COLUMNS = ["elapsed_sec", "ram_used_gb", "context_len"]
+
+
+def snap(i):
+    return SimpleNamespace(row={"elapsed_sec": float(i), "ram_used_gb": 1.5 * i, "context_len": 1024,
+                                "not_logged": "x"})
+
+
+def test_csv_sink_rows_and_offsets(tmp_path):
+    path = str(tmp_path / "metrics.csv")
+    sink = CsvSink(path, COLUMNS)
+    offsets = [sink.offset]
+    for i in range(3):
+        sink.write(snap(i))
+        offsets.append(sink.offset)
+    sink.close()
+    with open(path, newline="") as f:
+        assert list(csv.reader(f)) == [COLUMNS, ["0.0", "0.0", "1024"], ["1.0", "1.5", "1024"],
+                                       ["2.0", "3.0", "1024"]]
+    with open(path, "rb") as f:
+        f.seek(offsets[1])
+        assert f.readline() == b"1.0,1.5,1024\r\n"
+
+
+def test_columnar_sink(tmp_path):
+    pytest.importorskip("pyarrow")
+    from backend.columnar import read_columnar
+    path = str(tmp_path / "metrics.csv")
+    sink = ColumnarSink(path, COLUMNS, types={"context_len": "int64"}, export={"format": "arrow"})
+    for i in range(4):
+        sink.write(snap(i))
+    sink.close()
+    df = read_columnar(path)
+    assert df["ram_used_gb"].tolist() == [0.0, 1.5, 3.0, 4.5]
+    assert df["context_len"].dtype == "int64"
+
+
+def test_prometheus_sink_serves_numeric_columns():
+    sink = PrometheusSink(0, host="127.0.0.1")
+    try:
+        sink.write(SimpleNamespace(row={"ram_used_gb": 3.5, "thrashing": True, "name": "gpu", "x": None}))
+        port = sink._server.server_address[1]
+        text = requests.get(f"http://127.0.0.1:{port}/metrics", timeout=2).text
+        assert "aidaptiv_ram_used_gb 3.5" in text
+        assert "aidaptiv_thrashing 1" in text
+        assert "name" not in text and "aidaptiv_x" not in text
+        assert requests.get(f"http://127.0.0.1:{port}/other", timeout=2).status_code == 404
+    finally:
+        sink.close()
@@ -0,0 +1,70 @@
+"""SLO scoring of a batch and stage-level capacity."""
+from types import SimpleNamespace
+
+import pytest
+
+from backend.slo import DEFAULT_SLO, compare_slo, load_slo, meets_slo, request_tpot_ms, score_level, summarize_slo
+
+
+def req(ttft_ms=100.0, total_ms=1100.0, tokens=11, success=True):
+    return SimpleNamespace(ttft_ms=ttft_ms, total_latency_ms=total_ms, completion_tokens=tokens, success=success)
+
+
+def entry(ctx, users, pct, goodput=1.0):
+    return {"context": ctx, "concurrency": users, "slo_attainment_pct": pct,
+            "goodput_rps": goodput, "goodput_tok_s": goodput * 10}
+
+
+def test_load_slo_overrides_defaults():
+    assert load_slo({}) == DEFAULT_SLO
+    assert load_slo({"test": {"slo": {"ttft_ms": 500}}})["ttft_ms"] == 500
+    assert load_slo({"test": {"slo": {"ttft_ms": 500}}})["tpot_ms"] == DEFAULT_SLO["tpot_ms"]
+
+
+def test_request_tpot_and_meets_slo():
+    assert request_tpot_ms(req()) == 100.0
+    assert request_tpot_ms(req(tokens=1)) == 0.0
+    assert meets_slo(req(), DEFAULT_SLO)
+    assert not meets_slo(req(ttft_ms=2500.0, total_ms=3500.0), DEFAULT_SLO)
+    assert not meets_slo(req(total_ms=2100.0), DEFAULT_SLO)  # 200 ms / token
+    assert not meets_slo(req(success=False), DEFAULT_SLO)
+
+
+def test_score_level():
+    scores = score_level([req(), req(ttft_ms=3000.0, total_ms=4000.0), req(success=False)], 2.0, DEFAULT_SLO)
+    assert scores["slo_met"] == 1
+    assert scores["slo_attainment_pct"] == pytest.approx(100 / 3)
+    assert scores["throughput_rps"] == 1.0
+    assert (scores["goodput_rps"], scores["goodput_tok_s"]) == (0.5, 5.5)
+    assert score_level([], 0.0, DEFAULT_SLO)["slo_attainment_pct"] == 0.0
+
+
+def test_capacity_stops_at_first_failing_level():
+    aggregated = [entry(4096, 1, 100), entry(4096, 2, 95), entry(4096, 4, 60),
+                  entry(4096, 8, 92),  # Passes past the knee: not capacity
+                  entry(8192, 1, 100), entry(8192, 2, 40),
+                  entry(16384, 1, 50), entry(32768, 1, 91)]
+    out = summarize_slo(aggregated, DEFAULT_SLO)
+    assert out["max_users_at_slo_by_context"] == {"4096": 2, "8192": 1}  # 32768 is past the 16384 failure
+    assert out["max_users_at_slo"] == 2
+    # At 1 user: 4096 and 8192 pass, 16384 fails, so 32768 doesn't count
+    assert out["max_context_at_slo_by_users"] == {"1": 8192, "2": 4096}
+    assert out["max_context_at_slo"] == 8192
+
+
+def test_capacity_zero_when_lowest_level_fails():
+    out = summarize_slo([entry(4096, 1, 10), entry(4096, 2, 100)], DEFAULT_SLO)
+    assert (out["max_users_at_slo"], out["max_context_at_slo"]) == (0, 0)
+    assert out["max_users_at_slo_by_context"] == {}
+    assert summarize_slo([], DEFAULT_SLO)["peak_goodput_rps"] == 0.0
+
+
+def test_repeated_level_must_pass_every_time():
+    out = summarize_slo([entry(4096, 1, 100), entry(4096, 2, 100), entry(4096, 2, 50)], DEFAULT_SLO)
+    assert out["max_users_at_slo"] == 1
+
+
+def test_compare_slo():
+    out = compare_slo({"max_users_at_slo": 2, "max_context_at_slo": 0}, {"max_users_at_slo": 6})
+    assert out["max_users_at_slo"] == {"baseline": 2, "aidaptiv": 6, "ratio": 3.0}
+    assert out["max_context_at_slo"]["ratio"] is None
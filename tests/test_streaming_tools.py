@@ -0,0 +1,94 @@
+"""Vendor tool parsers, fed recorded output (tests/fixtures/tools)."""
+import sys
+import time
+
+import pytest
+
+from backend.streaming_tools import (AmdSmiMonitorParser, DmonParser, PowermetricsParser,
+                                     StreamingTool)
+
+
+def replay(parser, path):
+    with open(path, encoding="utf-8") as f:
+        return [r for r in (parser.feed(line) for line in f) if r is not None]
+
+
+def test_powermetrics_one_record_per_sample(fixture_path):
+    records = replay(PowermetricsParser(), fixture_path("tools", "powermetrics_gpu.txt"))
+    assert records == [{"index": 0, "util_pct": 12.5, "power_w": 0.432},
+                       {"index": 0, "util_pct": 97.31, "power_w": 18.734}]
+
+
+def test_powermetrics_older_macs_residency_line():
+    parser = PowermetricsParser()
+    assert parser.feed("GPU active residency:  40.00% (389 MHz: 40%)") is None
+    assert parser.feed("GPU Power: 1500 mW") == {"index": 0, "util_pct": 40.0, "power_w": 1.5}
+
+
+def test_dmon_records_per_gpu(fixture_path):
+    records = replay(DmonParser(), fixture_path("tools", "nvidia_smi_dmon.txt"))
+    assert [r["index"] for r in records] == [0, 1, 0, 1, 0, 1]
+    busy = records[2]
+    assert busy["power_w"] == 284.0
+    assert busy["temp_c"] == 61.0
+    assert busy["util_pct"] == 98.0
+    assert busy["mem_util_pct"] == 71.0
+    assert busy["vram_used_gb"] == pytest.approx(22.0)
+    assert (busy["pcie_rx_mb_s"], busy["pcie_tx_mb_s"]) == (1420.0, 96.0)
+    # "-" is not reported
+    assert records[1]["pcie_rx_mb_s"] is None
+
+
+def test_dmon_ignores_rows_before_header():
+    parser = DmonParser()
+    assert parser.feed("    0     71     38      -     12") is None
+    parser.feed("# gpu pwr sm")
+    assert parser.feed("0 71 12") == {"index": 0, "power_w": 71.0, "temp_c": None, "util_pct": 12.0,
+                                      "mem_util_pct": None, "vram_used_gb": None,
+                                      "pcie_rx_mb_s": None, "pcie_tx_mb_s": None}
+
+
+def test_amd_smi_units_and_na(fixture_path):
+    records = replay(AmdSmiMonitorParser(), fixture_path("tools", "amd_smi_monitor.txt"))
+    assert [r["index"] for r in records] == [0, 1, 0, 1]
+    first, apu = records[0], records[1]
+    assert first["power_w"] == 120.0
+    assert first["temp_c"] == 45.0
+    assert first["util_pct"] == 33.0
+    assert first["mem_util_pct"] == 5.0
+    assert first["vram_used_gb"] == pytest.approx(2.0)
+    assert first["vram_total_gb"] == pytest.approx(64.0)
+    assert apu["power_w"] is None
+    assert records[2]["vram_used_gb"] == pytest.approx(49.0)
+
+
+def _wait(pred, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pred():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_stream_restarts_exited_tool():
+    script = "print('# gpu pwr sm', flush=True)\nprint('0 7 5', flush=True)"
+    stream = StreamingTool("fake", [sys.executable, "-c", script], DmonParser, restart_sec=0.05)
+    stream.start()
+    try:
+        assert _wait(lambda: stream.restarts >= 2)
+        assert stream.latest()[0]["power_w"] == 7.0
+    finally:
+        stream.stop()
+
+
+def test_stream_drops_stale_records():
+    script = "import time\nprint('# gpu pwr sm', flush=True)\nprint('0 7 5', flush=True)\ntime.sleep(30)"
+    stream = StreamingTool("hung", [sys.executable, "-c", script], DmonParser)
+    stream.stale_sec = 0.3
+    stream.start()
+    try:
+        assert _wait(lambda: stream.records)
+        assert _wait(lambda: stream.latest() == {})
+    finally:
+        stream.stop()
@@ -0,0 +1,43 @@
+"""TelemetryCollector: optional samplers' modules and columns only when enabled."""
+import csv
+import subprocess
+import sys
+import time
+
+import pytest
+
+from telemetry import OPTIONAL_SAMPLERS, TelemetryCollector
+
+OPTIONAL_MODULES = ("backend.psi", "backend.cgroup", "backend.scraper", "backend.memcomp",
+                    "backend.residency", "backend.energy", "backend.events", "backend.columnar",
+                    "numpy", "pandas")
+
+
+def test_import_pulls_in_no_optional_sampler():
+    code = (f"import sys, telemetry; "
+            f"print(','.join(m for m in {OPTIONAL_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def run(tmp_path, samplers, seconds=0.6):
+    path = str(tmp_path / "metrics.csv")
+    collector = TelemetryCollector(path, 0.1, samplers=samplers,
+                                   server_metrics_url="http://127.0.0.1:9")
+    collector.start()
+    time.sleep(seconds)
+    collector.stop()
+    with open(path, newline="") as f:
+        return collector, list(csv.reader(f))
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="procfs memory / disk samplers")
+def test_disabled_samplers_are_not_built_or_logged(tmp_path):
+    collector, rows = run(tmp_path, {name: {"enabled": False} for name in OPTIONAL_SAMPLERS})
+    header = rows[0]
+    assert collector.server_scraper is None and collector.psi is None and collector.thrash is None
+    assert set(collector.engine.samplers) == {"memory", "disk"}
+    assert not [c for c in header if c.startswith(("psi_", "cg_", "comp_", "weight_", "server_"))]
+    assert "energy_j" not in header and "thrashing" not in header
+    assert len(rows) > 2
+    assert {len(r) for r in rows[1:]} == {len(header)}
@@ -0,0 +1,123 @@
+"""OOM attribution of /dev/kmsg records (fed through a pipe)."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend.watchdog import FAILURE_OOM_KILL, FailureWatchdog, oom_killed_pid
+
+
+@pytest.mark.parametrize("record, pid", [
+    ("6,1234,5678,-;Out of memory: Killed process 4242 (python) total-vm:1024kB", 4242),
+    ("3,99,1,-;Memory cgroup out of memory: Killed process 77 (llama-server)", 77),
+    ("6,1,2,-;oom-kill:constraint=CONSTRAINT_MEMCG,task=python,pid=31337,uid=0", 31337),
+    ("3,1,2,-;Out of memory: Kill process 12 (java) score 900", 12),
+    ("6,1,2,-;Memory cgroup out of memory", None),
+])
+def test_oom_killed_pid(record, pid):
+    assert oom_killed_pid(record) == pid
+
+
+@pytest.fixture
+def kmsg_watchdog():
+    """Watchdog of a child "server" reading kmsg records from a pipe."""
+    server = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    watchdog = FailureWatchdog(server_pid=server.pid, watch_kmsg=False)
+    watchdog._kmsg_fd = r
+    yield watchdog, server, w
+    server.kill()
+    server.wait()
+    os.close(r)
+    os.close(w)
+
+
+def test_oom_of_unrelated_process_is_ignored(kmsg_watchdog):
+    watchdog, server, w = kmsg_watchdog
+    os.write(w, f"3,1,2,-;Out of memory: Killed process {server.pid + 100000} (chrome)\n".encode())
+    watchdog._check_fatal()
+    assert watchdog.failure is None
+
+
+def test_oom_of_server_latches(kmsg_watchdog):
+    watchdog, server, w = kmsg_watchdog
+    watchdog._check_fatal()  # Poll once while the server is alive
+    server.kill()
+    server.wait()
+    os.write(w, f"6,1,2,-;oom-kill:constraint=CONSTRAINT_NONE,task=python,pid={server.pid},uid=0\n".encode())
+    watchdog._check_fatal()
+    assert watchdog.failure == FAILURE_OOM_KILL
+
+
+def test_without_server_any_oom_latches():
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    watchdog = FailureWatchdog(watch_kmsg=False)
+    watchdog._kmsg_fd = r
+    try:
+        os.write(w, b"3,1,2,-;Out of memory: Killed process 4242 (python)\n")
+        watchdog._check_fatal()
+        assert watchdog.failure == FAILURE_OOM_KILL
+    finally:
+        os.close(r)
+        os.close(w)
+
+
+class FakeResp:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def stalled(watchdog, w, idle_sec):
+    """Move `w`'s timestamps `idle_sec` into the past and run the stall check."""
+    w.started -= idle_sec
+    if w.first_token is not None:
+        w.first_token -= idle_sec
+        w.last_token -= idle_sec
+    watchdog._check_stalls()
+    return w.reason
+
+
+def test_stall_after_one_token_uses_ttft_bound():
+    watchdog = FailureWatchdog(watch_kmsg=False, min_stall_sec=1.0)
+    w = watchdog.watch(FakeResp())
+    w.started -= 3.0  # 3 s prefill
+    w.on_token()
+    assert stalled(watchdog, w, 2.0) is None  # Gap shorter than the TTFT
+    assert stalled(watchdog, w, 1.5) == "stall"
+    assert w.resp.closed
+
+
+def test_prefill_hang_only_with_bound():
+    unbounded = FailureWatchdog(watch_kmsg=False)
+    w = unbounded.watch()
+    assert stalled(unbounded, w, 600.0) is None
+
+    watchdog = FailureWatchdog(watch_kmsg=False, prefill_stall_sec=30.0)
+    w = watchdog.watch()  # No response yet: hung before the headers
+    assert stalled(watchdog, w, 10.0) is None
+    assert stalled(watchdog, w, 25.0) == "stall"
+    resp = FakeResp()
+    w.attach(resp)  # Headers arrive after the verdict: aborted at once
+    assert resp.closed
+
+
+def test_stall_uses_stream_itl_after_three_tokens():
+    watchdog = FailureWatchdog(watch_kmsg=False, stall_factor=10.0, min_stall_sec=0.5)
+    w = watchdog.watch(FakeResp())
+    for _ in range(3):
+        w.on_token()
+    w.first_token -= 0.2  # 0.1 s per token
+    assert stalled(watchdog, w, 0.4) is None
+    assert stalled(watchdog, w, 0.8) == "stall"
+
+
+def test_latched_failure_aborts_new_watch():
+    watchdog = FailureWatchdog(watch_kmsg=False)
+    watchdog._latch(FAILURE_OOM_KILL)
+    assert watchdog.watch().reason == FAILURE_OOM_KILL